@@ -0,0 +1,82 @@
+import argparse
+import logging
+from socketserver import ThreadingMixIn
+from wsgiref.simple_server import WSGIRequestHandler, WSGIServer, make_server
+from src.api.wsgi import ApiApp
+from src.database.mongodb import MongoDB
+from src.services.contact_service import ContactService
+from src.services.delivery_service import DeliveryService
+from src.services.frequency_service import FrequencyService
+from src.services.history_service import HistoryService
+from src.services.import_job_service import ImportJobService
+from src.services.suppression_service import SuppressionService
+from src.services.task_service import TaskService
+from src.services.webhook_service import WebhookService
+from src.utils.config import get_setting
+from src.utils.logger import logger, setup_logging
+
+
+class ThreadingWSGIServer(ThreadingMixIn, WSGIServer):
+    """
+    Servidor WSGI com uma thread por conexão: envios lentos não bloqueiam os demais.
+    """
+    daemon_threads = True
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        logging.getLogger('src.api').debug("%s - %s", self.address_string(), format % args)
+
+
+def create_app(insecure: bool = False) -> ApiApp:
+    """
+    Cria a API com os mesmos serviços (e a mesma conexão) usados pelo app.py.
+
+    Args:
+        insecure (bool): Aceita requisições sem autenticação quando API_TOKEN não está configurado
+    """
+    db = MongoDB().get_database()
+    history_service = HistoryService(db)
+    suppression_service = SuppressionService(db)
+    contact_service = ContactService(history_service, suppression_service, FrequencyService(db))
+    # Carrega o índice de supressão (compartilhado pelo processo)
+    suppression_service.refresh_index()
+    delivery_service = DeliveryService(db)
+    delivery_service.start()
+    history_service.quota_service.start()
+    return ApiApp(history_service, WebhookService(db), ImportJobService(contact_service), delivery_service=delivery_service, insecure=insecure)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="API HTTP do SBsender")
+    parser.add_argument('--host', default=get_setting('api', 'host', 'API_HOST', '0.0.0.0'))
+    parser.add_argument('--port', type=int, default=get_setting('api', 'port', 'API_PORT', 8080, cast=int))
+    parser.add_argument('--dispatcher', action='store_true', help="Também envia os jobs pendentes ao provedor (quando o app.py não está em execução)")
+    parser.add_argument('--insecure', action='store_true', help="Aceita requisições sem API_TOKEN (só para uso local, com --host 127.0.0.1)")
+    args = parser.parse_args()
+    setup_logging()
+
+    if not get_setting('api', 'token', 'API_TOKEN'):
+        if not args.insecure:
+            parser.error("configure API_TOKEN ou use --insecure para aceitar requisições sem autenticação")
+        logger.warning("API sem autenticação (--insecure) em %s:%s", args.host, args.port)
+
+    app = create_app(insecure=args.insecure)
+    if args.dispatcher:
+        TaskService(MongoDB().get_database()).start_processing()
+    server = make_server(args.host, args.port, app, server_class=ThreadingWSGIServer, handler_class=QuietRequestHandler)
+    logger.info("API disponível em http://%s:%s", args.host, args.port)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        # Grava os status de entrega que ainda estão na fila
+        app.delivery_service.stop()
+        # Grava o consumo de cotas e devolve o saldo dos blocos reservados
+        app.history_service.quota_service.stop()
+
+
+if __name__ == '__main__':
+    main()
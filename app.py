@@ -1,19 +1,340 @@
 import streamlit as st
 from src.services.contact_service import ContactService
 from src.services.webhook_service import WebhookService
-from src.services.history_service import HistoryService
+from src.services.webhook_health_service import WebhookHealthService
+from src.services.history_service import HISTORY_PAGE_SIZE, HistoryService
 from src.services.client_service import ClientService
 from src.services.task_service import TaskService
+from src.services.suppression_service import SuppressionService
+from src.services.frequency_service import FrequencyService
+from src.services.import_job_service import ImportJobService
+from src.services.simulation_service import DispatchSimulator
+from src.services.stats_service import LOCAL_TIMEZONE, stats_day
 from src.database.mongodb import MongoDB
-from datetime import datetime, time
+from datetime import datetime, time, timedelta
+from bson import ObjectId
 import time as time_module
-from src.utils.logger import logger
+from src.utils.logger import logger, setup_logging
+from src.utils.metrics import start_metrics_exporter
+from src.ui.number_list import render_number_list
+from src.utils.import_readers import IMPORT_EXTENSIONS, inspect_file
 import hashlib
+import pandas as pd
+import pytz
+import tempfile
+import os
+from src.utils.export_writers import EXPORT_FORMATS
+
+setup_logging()
+
+# Intervalo de atualização do painel de importações (segundos)
+IMPORT_JOBS_REFRESH = 2
+
+# Pasta dos arquivos de exportação do histórico; os mais antigos que EXPORT_FILE_TTL
+# (segundos) são apagados a cada exportação, inclusive os de sessões encerradas
+EXPORT_DIRECTORY = os.path.join(tempfile.gettempdir(), 'sbsender_exports')
+EXPORT_FILE_TTL = 3600
+# Maior arquivo oferecido no download do app: o st.download_button carrega o
+# arquivo inteiro em memória. Exportações maiores usam GET /history/export da API
+EXPORT_DOWNLOAD_MAX_BYTES = 200 * 1024 * 1024
+
+# st.fragment (ou st.experimental_fragment) reexecuta só o painel; sem ele,
+# o painel é atualizado pelo botão
+_fragment = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+
+def render_import_result(result, key):
+    """
+    Exibe o resultado de uma importação concluída.
+    """
+    st.write("### Resultado do Processamento")
+    if result.get('duplicate_of'):
+        st.warning(f"Esta lista já foi importada para o mesmo webhook (registro {result['duplicate_of']}); nenhum novo envio foi criado.")
+    quota = result.get('quota')
+    if result.get('rejected') and quota:
+        st.error(
+            f"A cota mensal do cliente não comporta a importação ({quota['requested']} números; "
+            f"restam {quota['remaining']} de {quota['monthly_quota']} em {quota['month']}); a importação não foi registrada."
+        )
+    admission = result.get('admission')
+    if admission and admission['decision'] != 'accepted' and not quota:
+        def local(value):
+            return pytz.utc.localize(value).astimezone(LOCAL_TIMEZONE).strftime('%d/%m/%Y %H:%M')
+        if result.get('rejected'):
+            st.error(
+                f"A fila de envio está cheia; a importação não foi registrada. "
+                f"Início estimado se enviada agora: {local(admission['estimated_start'])}. Tente novamente mais tarde."
+            )
+        else:
+            st.info(f"A fila de envio está cheia; o envio foi agendado para {local(admission['scheduled_for'])}.")
+    st.write(f"Total processado: {result['total_processed']}")
+    st.write(f"Números válidos: {result['total_valid']}")
+    st.write(f"Números inválidos: {result['total_invalid']}")
+    if result['total_duplicates']:
+        st.write(f"Números repetidos removidos: {result['total_duplicates']}")
+    if result['total_suppressed']:
+        st.write(f"Números suprimidos (opt-out): {result['total_suppressed']}")
+    if result['total_frequency_capped']:
+        st.write(f"Números contatados recentemente (limite de frequência): {result['total_frequency_capped']}")
+    if result.get('personalized'):
+        st.write(f"Mensagens personalizadas: {result['total_valid']} em {result['message_chunks']} lotes")
+        if result['preview_messages']:
+            st.info("Exemplos de mensagens:\n\n" + "\n\n".join(result['preview_messages']))
+    if result.get('state_breakdown'):
+        with st.expander("Números válidos por estado e DDD"):
+            by_state, by_ddd = st.columns(2)
+            with by_state:
+                st.dataframe(
+                    pd.DataFrame(sorted(result['state_breakdown'].items(), key=lambda item: -item[1]), columns=["UF", "Números"]),
+                    hide_index=True, use_container_width=True
+                )
+            with by_ddd:
+                st.dataframe(
+                    pd.DataFrame(sorted(result['ddd_breakdown'].items(), key=lambda item: -item[1]), columns=["DDD", "Números"]),
+                    hide_index=True, use_container_width=True
+                )
+    
+    if result["valid_numbers"]:
+        st.success(f"✅ Números válidos ({len(result['valid_numbers'])}):")
+        render_number_list(result["valid_numbers"], key=f"{key}_valid", file_name="numeros_validos.csv")
+    
+    if result["invalid_numbers"]:
+        st.error(f"❌ Números inválidos ({len(result['invalid_numbers'])}):")
+        render_number_list(result["invalid_numbers"], key=f"{key}_invalid", file_name="numeros_invalidos.csv")
+
+def _render_import_jobs_panel(import_job_service):
+    jobs = import_job_service.get_jobs(st.session_state.import_jobs)
+    if not jobs:
+        return
+    
+    st.write("### Importações")
+    for job in jobs:
+        label = f"{job['submitted_at'].strftime('%H:%M:%S')} - {job['webhook_name'] or 'Webhook'} ({job['method'].upper()})"
+        if import_job_service.is_active(job):
+            fraction = job['bytes_processed'] / job['bytes_total'] if job['bytes_total'] else 0
+            st.progress(
+                min(fraction, 1.0),
+                text=f"⏳ {label} - {job['rows_read']} linhas lidas, {job['valid']} válidos, {job['invalid']} inválidos"
+            )
+        elif job['status'] == 'completed':
+            result = job['result']
+            if result.get('rejected') and result.get('quota'):
+                title = f"❌ {label} - recusada: cota mensal do cliente ({result['total_valid']} válidos)"
+            elif result.get('rejected'):
+                title = f"⏳ {label} - recusada: fila de envio cheia ({result['total_valid']} válidos)"
+            else:
+                title = f"✅ {label} - {result['total_valid']} válidos"
+            with st.expander(title):
+                render_import_result(result, key=f"import_{job['id']}")
+        else:
+            st.error(f"❌ {label} - {job['error']}")
+    
+    if _fragment is None and any(import_job_service.is_active(job) for job in jobs):
+        st.button("🔄 Atualizar progresso")
+
+if _fragment is not None:
+    _render_import_jobs_panel = _fragment(run_every=IMPORT_JOBS_REFRESH)(_render_import_jobs_panel)
+
+def render_import_jobs(import_job_service):
+    """
+    Exibe o progresso das importações enviadas nesta sessão.
+    """
+    _render_import_jobs_panel(import_job_service)
+
+def render_dashboard(stats_service, client_service):
+    """
+    Exibe os totais por dia e por cliente a partir de 'daily_stats', sem ler o histórico.
+    """
+    st.header("📈 Dashboard")
+    clients = client_service.get_all_clients()
+    client_names = {c['_id']: c['name'] for c in clients}
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        today = datetime.strptime(stats_day(), '%Y-%m-%d').date()
+        period = st.date_input("Período:", value=(today - timedelta(days=29), today), key="dashboard_period")
+    with col2:
+        client_filter = st.selectbox(
+            "Cliente:",
+            options=[None] + list(client_names),
+            format_func=lambda x: "Todos os Clientes" if x is None else client_names[x],
+            key="dashboard_client"
+        )
+    if not isinstance(period, (list, tuple)) or len(period) != 2:
+        st.info("Selecione a data inicial e a final.")
+        return
+    
+    stats = stats_service.get_daily_stats(
+        period[0].isoformat(), period[1].isoformat(),
+        client_id=ObjectId(client_filter) if client_filter else None
+    )
+    if not stats:
+        st.info("Nenhuma estatística no período.")
+        with st.expander("Manutenção"):
+            st.write("Se o histórico é anterior ao dashboard, os contadores podem ser reconstruídos a partir dele.")
+            if st.button("Recalcular a partir do histórico"):
+                with st.spinner("Recalculando..."):
+                    st.success(f"{stats_service.backfill()} registros de estatísticas gravados.")
+        return
+    
+    frame = pd.DataFrame(stats)
+    totals = frame[['imports', 'valid', 'invalid', 'sent', 'failed']].sum()
+    for column, (label, name) in zip(st.columns(5), [
+        ("Importações", 'imports'), ("Válidos", 'valid'), ("Inválidos", 'invalid'), ("Enviados", 'sent'), ("Falhas", 'failed')
+    ]):
+        with column:
+            st.metric(label, int(totals[name]))
+    
+    st.write("### Por dia")
+    st.line_chart(frame.groupby('day')[['valid', 'sent', 'failed']].sum())
+    
+    st.write("### Por cliente")
+    frame['client'] = frame['client_id'].map(lambda value: client_names.get(str(value), "Sem cliente"))
+    by_client = frame.groupby('client')[['imports', 'valid', 'invalid', 'sent', 'failed']].sum().sort_values('valid', ascending=False)
+    st.dataframe(
+        by_client.rename(columns={'imports': "Importações", 'valid': "Válidos", 'invalid': "Inválidos", 'sent': "Enviados", 'failed': "Falhas"}),
+        use_container_width=True
+    )
+
+def render_send_simulation(simulator):
+    """
+    Projeta a duração e o custo do envio da fila atual e de uma campanha
+    proposta, sem enviar nada (dry-run do dispatcher).
+    """
+    with st.expander("⏱️ Simular envio"):
+        col1, col2 = st.columns(2)
+        with col1:
+            numbers = st.number_input("Números da nova campanha (0 = só a fila atual):", min_value=0, value=0, step=10000, key="simulation_numbers")
+        with col2:
+            latency = st.number_input("Latência do provedor por POST (s):", min_value=0.0, value=float(round(simulator.latency, 2)), step=0.1, key="simulation_latency")
+        if not st.button("Simular", key="simulation_run"):
+            return
+        simulator.latency = latency
+        result = simulator.simulate(proposed=[{'numbers': numbers, 'name': "Nova campanha"}] if numbers else [])
+        if not result['campaigns']:
+            st.info("Nenhum envio pendente.")
+            return
+
+        def local(value):
+            return pytz.utc.localize(value).astimezone(LOCAL_TIMEZONE).strftime('%d/%m/%Y %H:%M')
+
+        for column, (label, value) in zip(st.columns(4), [
+            ("Fim projetado", local(result['finish'])),
+            ("Duração", f"{result['duration_seconds'] / 3600:.1f} h"),
+            ("Pico", f"{result['peak_numbers_per_minute']:,} números/min".replace(',', '.')),
+            ("Custo", f"{result['cost_total']:.2f}")
+        ]):
+            with column:
+                st.metric(label, value)
+        st.dataframe(
+            pd.DataFrame([{
+                "Campanha": campaign['name'],
+                "Números": campaign['numbers'],
+                "Lotes": campaign['chunks'],
+                "Início": local(campaign['projected_start']),
+                "Fim": local(campaign['projected_finish']),
+                "Custo": campaign['cost']
+            } for campaign in result['campaigns']]),
+            hide_index=True, use_container_width=True
+        )
+        settings = result['settings']
+        rate = f"limite de {settings['rate_limit']:.0f} números/min" if settings['rate_limit'] else "sem limite de ritmo"
+        chunks = f"Lotes de {settings['chunk_size']} números" if settings['chunk_size'] else "Lista inteira em um POST"
+        st.caption(f"{chunks} · {rate} · latência de {settings['latency']:.2f}s por POST")
+
+def _purge_export_files(max_age: float = EXPORT_FILE_TTL):
+    """
+    Apaga os arquivos de exportação mais antigos que max_age segundos.
+    """
+    if not os.path.isdir(EXPORT_DIRECTORY):
+        return
+    limit = time_module.time() - max_age
+    for name in os.listdir(EXPORT_DIRECTORY):
+        path = os.path.join(EXPORT_DIRECTORY, name)
+        try:
+            if os.path.getmtime(path) < limit:
+                os.remove(path)
+        except OSError as e:
+            logger.warning("Não foi possível apagar a exportação %s: %s", path, e)
+
+def render_history_export(history_service, client_id):
+    """
+    Exporta os números do histórico filtrado para CSV ou Parquet.
+    
+    O arquivo é gravado em disco à medida que o cursor avança e só depois
+    oferecido para download. Como o download do Streamlit carrega o arquivo
+    inteiro em memória, arquivos acima de EXPORT_DOWNLOAD_MAX_BYTES não são
+    oferecidos aqui: a exportação deve ser feita pela API (GET /history/export),
+    que envia o arquivo em streaming.
+    """
+    with st.expander("📤 Exportar números"):
+        today = datetime.strptime(stats_day(), '%Y-%m-%d').date()
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            period = st.date_input("Período:", value=(today.replace(day=1), today), key="export_period")
+        with col2:
+            status = st.selectbox(
+                "Registros:",
+                options=[None, 'completed', 'failed'],
+                format_func=lambda x: {None: "Todos", 'completed': "Enviados", 'failed': "Com falha"}[x],
+                key="export_status"
+            )
+        with col3:
+            export_format = st.radio("Formato:", list(EXPORT_FORMATS), format_func=str.upper, key="export_format", horizontal=True)
+        if not isinstance(period, (list, tuple)) or len(period) != 2:
+            st.info("Selecione a data inicial e a final.")
+            return
+        
+        if st.button("Gerar arquivo", key="export_generate"):
+            # Datas locais convertidas para UTC, como gravadas no histórico
+            start, end = (
+                LOCAL_TIMEZONE.localize(datetime.combine(day, time.min)).astimezone(pytz.utc).replace(tzinfo=None)
+                for day in (period[0], period[1] + timedelta(days=1))
+            )
+            previous = st.session_state.pop('export_file', None)
+            if previous and os.path.exists(previous['path']):
+                os.remove(previous['path'])
+            _purge_export_files()
+            os.makedirs(EXPORT_DIRECTORY, exist_ok=True)
+            file = tempfile.NamedTemporaryFile(suffix=f".{export_format}", dir=EXPORT_DIRECTORY, delete=False)
+            try:
+                with file:
+                    for data in history_service.export_numbers(export_format, client_id=client_id, start_date=start, end_date=end, status=status):
+                        file.write(data)
+                        if file.tell() > EXPORT_DOWNLOAD_MAX_BYTES:
+                            break
+                if os.path.getsize(file.name) > EXPORT_DOWNLOAD_MAX_BYTES:
+                    os.remove(file.name)
+                    st.warning(
+                        f"O arquivo passa de {EXPORT_DOWNLOAD_MAX_BYTES // (1024 * 1024)} MB, o limite do download pelo app. "
+                        "Escolha um período menor ou exporte pela API (GET /history/export)."
+                    )
+                else:
+                    st.session_state.export_file = {
+                        'path': file.name,
+                        'format': export_format,
+                        'name': f"historico_{period[0]:%Y%m%d}_{period[1]:%Y%m%d}.{export_format}"
+                    }
+            except Exception as e:
+                os.remove(file.name)
+                st.error(f"Erro ao exportar: {str(e)}")
+        
+        export_file = st.session_state.get('export_file')
+        if export_file and os.path.exists(export_file['path']):
+            with open(export_file['path'], 'rb') as file:
+                st.download_button(
+                    label=f"📥 Baixar {export_file['name']}",
+                    data=file,
+                    file_name=export_file['name'],
+                    mime=EXPORT_FORMATS[export_file['format']],
+                    key="export_download"
+                )
 
 def main():
     # Inicializa o estado da sessão se necessário
     if 'processed_forms' not in st.session_state:
         st.session_state.processed_forms = set()
+    if 'import_jobs' not in st.session_state:
+        st.session_state.import_jobs = []
     
     st.title("📱 SBsender")
     
@@ -26,19 +347,28 @@ def main():
         webhook_service = WebhookService(db)
         client_service = ClientService(db)
         history_service = HistoryService(db)
-        contact_service = ContactService(history_service)
+        suppression_service = SuppressionService(db)
+        frequency_service = FrequencyService(db)
+        contact_service = ContactService(history_service, suppression_service, frequency_service)
+        import_job_service = ImportJobService(contact_service)
+        webhook_health_service = WebhookHealthService(webhook_service)
+        stats_service = history_service.stats_service
         
         # Inicializa e inicia o processamento em background
         if 'task_service' not in st.session_state:
             task_service = TaskService(db)
             task_service.start_processing()
             st.session_state.task_service = task_service
+            start_metrics_exporter()
+            history_service.quota_service.start()
+            # Carrega o índice de supressão (compartilhado pelo processo)
+            suppression_service.refresh_index()
         
         # Menu lateral
         st.sidebar.title("Menu")
         menu = st.sidebar.radio(
             "",
-            ["Mensagem via Webhook", "Webhooks", "Clientes", "Histórico de Envios"]
+            ["Mensagem via Webhook", "Dashboard", "Webhooks", "Clientes", "Lista de Supressão", "Histórico de Envios"]
         )
         
         if menu == "Mensagem via Webhook":
@@ -73,39 +403,28 @@ def main():
             # Seleção do método de importação
             import_method = st.radio(
                 "Escolha o método:",
-                ["Texto", "Arquivo CSV"]
+                ["Texto", "Arquivo (CSV, TXT, XLSX)"]
             )
             
             if import_method == "Texto":
                 text_input = st.text_area(
-                    "Cole os números aqui (um por linha):",
+                    "Cole os números aqui (um por linha ou separados por vírgula):",
                     height=200
                 )
                 
                 if st.button("Processar Números"):
                     if text_input:
-                        result = contact_service.process_contacts(
+                        job_id = import_job_service.submit_text(
                             text_input,
                             webhook_url=next((w['url'] for w in webhooks if w['_id'] == webhook_id), ''),
                             webhook_id=webhook_id,
                             webhook_name=next((w['title'] for w in webhooks if w['_id'] == webhook_id), ''),
-                            method='txt'  # Especifica o método como 'txt'
+                            method='txt',  # Especifica o método como 'txt'
+                            client_id=str(client_id)
                         )
-                        
-                        st.write("### Resultado do Processamento")
-                        st.write(f"Total processado: {result['total_processed']}")
-                        st.write(f"Números válidos: {result['total_valid']}")
-                        st.write(f"Números inválidos: {result['total_invalid']}")
-                        
-                        if result["valid_numbers"]:
-                            st.success(f"✅ Números válidos ({len(result['valid_numbers'])}):")
-                            st.json(result["valid_numbers"])
-                        
-                        if result["invalid_numbers"]:
-                            st.error(f"❌ Números inválidos ({len(result['invalid_numbers'])}):")
-                            st.json(result["invalid_numbers"])
+                        st.session_state.import_jobs.insert(0, job_id)
             
-            else:  # CSV
+            else:  # Arquivo
                 col1, col2 = st.columns([3, 1])
                 with col1:
                     st.markdown(
@@ -137,9 +456,9 @@ def main():
                     )
                     uploaded_file = st.file_uploader(
                         " ",  # Espaço em branco para não mostrar o label
-                        type="csv",
+                        type=IMPORT_EXTENSIONS,
                         label_visibility="collapsed",
-                        help="Arraste ou clique para selecionar um arquivo CSV (máx. 200MB)"
+                        help="Arraste ou clique para selecionar um arquivo CSV, TXT ou XLSX, também compactado em .gz ou .zip (máx. 200MB)"
                     )
                 
                 with col2:
@@ -158,38 +477,55 @@ def main():
                         st.error("Arquivo modelo não encontrado. Por favor, crie o arquivo modelo_contatos.csv")
                 
                 if uploaded_file:
-                    # Lê o CSV para mostrar as colunas disponíveis
-                    import pandas as pd
-                    df = pd.read_csv(uploaded_file)
-                    column = st.selectbox("Selecione a coluna com os números:", df.columns)
+                    # Detecta formato, colunas, delimitador e codificação só pelo início do arquivo
+                    # (getvalue não copia o conteúdo já carregado pelo uploader)
+                    file_content = uploaded_file.getvalue()
+                    try:
+                        file_format = inspect_file(file_content, uploaded_file.name)
+                    except Exception as e:
+                        st.error(f"Não foi possível ler o arquivo: {str(e)}")
+                        return
+                    columns = file_format['columns']
+                    if not columns:
+                        st.error("Não foi possível ler o cabeçalho do arquivo")
+                        return
+                    
+                    column = st.selectbox(
+                        "Selecione a coluna com os números:",
+                        columns,
+                        index=columns.index(file_format['phone_column']) if file_format['phone_column'] in columns else 0
+                    )
+                    if file_format['kind'] == 'csv':
+                        delimiter_name = {',': 'vírgula', ';': 'ponto e vírgula', '\t': 'tabulação', '|': 'barra vertical'}
+                        st.caption(f"Delimitador: {delimiter_name.get(file_format['delimiter'], file_format['delimiter'])} - Codificação: {file_format['encoding']}")
+                    message_template = st.text_area(
+                        "Mensagem personalizada (opcional):",
+                        placeholder="Olá {nome}, tudo bem?",
+                        help="Use o nome de uma coluna entre chaves para personalizar a mensagem de cada contato. Colunas disponíveis: "
+                             + ", ".join(f"{{{c}}}" for c in columns)
+                    )
                     
-                    if st.button("Processar CSV"):
-                        # Volta o cursor do arquivo para o início
-                        uploaded_file.seek(0)
-                        result = contact_service.process_csv(
-                            uploaded_file.read(),
+                    if st.button("Processar Arquivo"):
+                        job_id = import_job_service.submit_file(
+                            file_content,
+                            uploaded_file.name,
                             column,
                             webhook_url=next((w['url'] for w in webhooks if w['_id'] == webhook_id), ''),
                             webhook_id=webhook_id,
                             webhook_name=next((w['title'] for w in webhooks if w['_id'] == webhook_id), ''),
-                            method='csv'  # Especifica o método como 'csv'
+                            method='csv',  # Especifica o método como 'csv'
+                            client_id=str(client_id),
+                            message_template=message_template,
+                            file_format=file_format
                         )
-                        
-                        if "error" in result:
-                            st.error(result["error"])
-                        else:
-                            st.write("### Resultado do Processamento")
-                            st.write(f"Total processado: {result['total_processed']}")
-                            st.write(f"Números válidos: {result['total_valid']}")
-                            st.write(f"Números inválidos: {result['total_invalid']}")
-                            
-                            if result["valid_numbers"]:
-                                st.success(f"✅ Números válidos ({len(result['valid_numbers'])}):")
-                                st.json(result["valid_numbers"])
-                            
-                            if result["invalid_numbers"]:
-                                st.error(f"❌ Números inválidos ({len(result['invalid_numbers'])}):")
-                                st.json(result["invalid_numbers"])
+                        st.session_state.import_jobs.insert(0, job_id)
+            
+            # Importações desta sessão, atualizadas em background
+            render_import_jobs(import_job_service)
+        
+        elif menu == "Dashboard":
+            render_dashboard(stats_service, client_service)
+            render_send_simulation(DispatchSimulator(db))
         
         elif menu == "Webhooks":
             st.header("🔗 Gerenciar Webhooks")
@@ -230,6 +566,12 @@ def main():
             # Lista webhooks existentes
             st.write("### Webhooks Cadastrados")
             webhooks = webhook_service.get_all_webhooks()
+
+            # Saúde lida do cache (verificado em background pelo dispatcher)
+            if st.button("Verificar webhooks agora"):
+                with st.spinner("Verificando webhooks..."):
+                    webhook_health_service.check_all(force=True)
+            webhook_health = webhook_health_service.get_all_health()
             
             for webhook in webhooks:
                 with st.container():
@@ -237,6 +579,16 @@ def main():
                     
                     with col1:
                         st.write(f"**{webhook['title']}**")
+                        health = webhook_health.get(webhook['_id'])
+                        if health:
+                            icon = "🟢" if health['healthy'] else "🔴"
+                            st.caption(
+                                f"{icon} {health['error'] or 'OK'} · p50 {health['p50'] * 1000:.0f} ms · "
+                                f"p95 {health['p95'] * 1000:.0f} ms · erros {health['error_rate']:.0%} "
+                                f"({health['samples']} verificações) · {pytz.utc.localize(health['checked_at']).astimezone(LOCAL_TIMEZONE).strftime('%d/%m %H:%M')}"
+                            )
+                        else:
+                            st.caption("⚪ Ainda não verificado")
                     
                     with col2:
                         st.write(f"Cliente: {webhook.get('client_name', 'N/A')}")
@@ -299,6 +651,7 @@ def main():
                 st.write("### Adicionar Novo Cliente")
                 name = st.text_input("Nome:")
                 description = st.text_area("Descrição (opcional):")
+                monthly_quota = st.number_input("Cota mensal de números (0 = sem limite):", min_value=0, step=1000)
                 submitted = st.form_submit_button("Adicionar")
                 
                 if submitted and name:
@@ -307,15 +660,15 @@ def main():
                     
                     try:
                         if form_hash not in st.session_state.processed_forms:
-                            logger.info(f"Tentando criar novo cliente - Nome: {name}")
-                            client_service.create_client(name, description)
+                            logger.info("Tentando criar novo cliente - Nome: %s", name)
+                            client_service.create_client(name, description, int(monthly_quota))
                             logger.info("Cliente criado com sucesso")
                             st.session_state.processed_forms.add(form_hash)
                             st.success("Cliente adicionado com sucesso!")
                             time_module.sleep(1)
                             st.rerun()
                     except Exception as e:
-                        logger.error(f"Erro ao criar cliente: {str(e)}")
+                        logger.error("Erro ao criar cliente: %s", e)
                         st.error(f"Erro ao adicionar cliente: {str(e)}")
             
             # Lista clientes existentes
@@ -330,6 +683,9 @@ def main():
                         st.write(f"**{client['name']}**")
                         if client.get('description'):
                             st.write(client['description'])
+                        if client.get('monthly_quota'):
+                            usage = history_service.quota_service.get_usage(client['_id'])
+                            st.caption(f"Cota de {usage['month']}: {usage['used']} de {usage['monthly_quota']} números usados")
                     
                     with col2:
                         edit_key = f"edit_client_{client['_id']}"
@@ -353,6 +709,10 @@ def main():
                         with st.form(f"edit_client_{client['_id']}", clear_on_submit=True):
                             new_name = st.text_input("Novo nome:", client['name'])
                             new_description = st.text_area("Nova descrição:", client.get('description', ''))
+                            new_quota = st.number_input(
+                                "Cota mensal de números (0 = sem limite):", min_value=0, step=1000,
+                                value=int(client.get('monthly_quota') or 0)
+                            )
                             
                             col1, col2 = st.columns(2)
                             with col1:
@@ -361,7 +721,8 @@ def main():
                                         client_service.update_client(
                                             client['_id'],
                                             new_name,
-                                            new_description
+                                            new_description,
+                                            int(new_quota)
                                         )
                                         st.success("Cliente atualizado com sucesso!")
                                         del st.session_state.editing_client
@@ -375,6 +736,38 @@ def main():
                                     del st.session_state.editing_client
                                     st.rerun()
         
+        elif menu == "Lista de Supressão":
+            st.header("🚫 Lista de Supressão (Opt-out)")
+            st.write("Números desta lista são descartados automaticamente em todas as importações.")
+            st.metric("Números suprimidos", suppression_service.count())
+            
+            suppression_input = st.text_area(
+                "Cole os números aqui (um por linha):",
+                height=200,
+                key="suppression_input"
+            )
+            reason = st.text_input("Motivo (opcional):", key="suppression_reason")
+            
+            col1, col2 = st.columns(2)
+            with col1:
+                add_clicked = st.button("Adicionar à Lista")
+            with col2:
+                remove_clicked = st.button("Remover da Lista")
+            
+            if (add_clicked or remove_clicked) and suppression_input:
+                numbers = [line.strip() for line in suppression_input.split('\n') if line.strip()]
+                try:
+                    if add_clicked:
+                        result = suppression_service.add_numbers(numbers, reason or None)
+                        st.success(f"{result['total_changed']} números adicionados à lista de supressão.")
+                    else:
+                        result = suppression_service.remove_numbers(numbers)
+                        st.success(f"{result['total_changed']} números removidos da lista de supressão.")
+                    if result['total_invalid']:
+                        st.warning(f"{result['total_invalid']} números inválidos foram ignorados.")
+                except Exception as e:
+                    st.error(f"Erro ao atualizar a lista de supressão: {str(e)}")
+        
         else:  # Histórico
             st.header("📋 Histórico de Envios")
             
@@ -389,30 +782,74 @@ def main():
                 key="history_client_filter"
             )
 
-            # Busca histórico com filtro de cliente
-            history_data = contact_service.get_history(client_id=str(client_filter) if client_filter else None)
+            render_history_export(history_service, str(client_filter) if client_filter else None)
             
-            if history_data:
-                for entry in history_data:
-                    entry = history_service.format_history_entry(entry)
+            # Página atual do histórico (paginação por cursor; volta ao início ao trocar o filtro)
+            if st.session_state.get('history_filter') != client_filter:
+                st.session_state.history_filter = client_filter
+                st.session_state.history_cursors = [None]
+            cursors = st.session_state.history_cursors
+            page = history_service.get_history_page(
+                client_id=str(client_filter) if client_filter else None,
+                limit=HISTORY_PAGE_SIZE, cursor=cursors[-1]
+            )
+            
+            if page['items']:
+                for entry in history_service.format_history_entries(page['items']):
                     with st.expander(entry['display_title']):
                         col1, col2, col3, col4 = st.columns(4)
                         with col1:
-                            st.metric("Total", entry['total_processed'])
+                            st.metric("Total", entry.get('total_processed', 0))
                         with col2:
-                            st.metric("Válidos", len(entry['valid_numbers']))
+                            st.metric("Válidos", entry.get('valid_count', 0))
                         with col3:
-                            st.metric("Inválidos", len(entry['invalid_numbers']))
+                            st.metric("Inválidos", entry.get('invalid_count', 0))
                         with col4:
-                            st.metric("Método", "CSV" if entry['method'] == 'csv' else "Texto")
+                            st.metric("Método", "CSV" if entry.get('method') == 'csv' else "Texto")
+                        
+                        if entry.get('status') == 'pending' and isinstance(entry.get('scheduled_for'), datetime):
+                            # Adiado pelo controle de admissão (fila de envio cheia)
+                            scheduled_for = pytz.utc.localize(entry['scheduled_for']).astimezone(LOCAL_TIMEZONE)
+                            st.caption(f"⏳ Envio agendado para {scheduled_for.strftime('%d/%m/%Y %H:%M')} (fila de envio cheia)")
                         
-                        if entry["valid_numbers"]:
-                            st.success(f"✅ Números válidos ({len(entry['valid_numbers'])}):")
-                            st.json(entry["valid_numbers"])
+                        if entry.get('delivery'):
+                            # Contadores atualizados pelos callbacks de status do provedor
+                            delivery = entry['delivery']
+                            st.caption(
+                                f"Entrega: {delivery.get('delivered', 0)} entregues · {delivery.get('read', 0)} lidas · "
+                                f"{delivery.get('failed', 0)} falhas · {delivery.get('sent', 0)} aguardando"
+                            )
                         
-                        if entry["invalid_numbers"]:
-                            st.error(f"❌ Números inválidos ({len(entry['invalid_numbers'])}):")
-                            st.json(entry["invalid_numbers"])
+                        # A página traz só os totais; as listas de números (do banco ou
+                        # dos arquivos do histórico) são carregadas sob demanda
+                        loaded_key = f"history_numbers_{entry['_id']}"
+                        label = "📦 Carregar números arquivados" if entry.get('archived') else "Carregar números"
+                        if st.button(label, key=f"load_{loaded_key}"):
+                            st.session_state[loaded_key] = True
+                        if st.session_state.get(loaded_key):
+                            full = history_service.get_history_by_id(entry['_id']) or {}
+                            if entry.get('archived') and 'valid_numbers' not in full:
+                                st.warning("Registro arquivado não encontrado nos arquivos do histórico.")
+                            valid_numbers = full.get('valid_numbers') or full.get('numbers') or []
+                            invalid_numbers = full.get('invalid_numbers') or []
+                            
+                            if valid_numbers:
+                                st.success(f"✅ Números válidos ({len(valid_numbers)}):")
+                                render_number_list(valid_numbers, key=f"history_{entry['_id']}_valid", file_name="numeros_validos.csv")
+                            
+                            if invalid_numbers:
+                                st.error(f"❌ Números inválidos ({len(invalid_numbers)}):")
+                                render_number_list(invalid_numbers, key=f"history_{entry['_id']}_invalid", file_name="numeros_invalidos.csv")
+                
+                col1, col2 = st.columns(2)
+                with col1:
+                    if len(cursors) > 1 and st.button("⬅️ Mais recentes", key="history_previous"):
+                        cursors.pop()
+                        st.rerun()
+                with col2:
+                    if page['next_cursor'] and st.button("Mais antigos ➡️", key="history_next"):
+                        cursors.append(page['next_cursor'])
+                        st.rerun()
             else:
                 st.info("Nenhum envio registrado ainda.")
                 return
@@ -0,0 +1,138 @@
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict
+
+
+class MockProvider:
+    """
+    Servidor HTTP local que simula o PROVIDER_WEBHOOK_URL.
+
+    Cada POST recebido aguarda a latência configurada e responde 200, ou 500
+    de acordo com a taxa de erro. Os contadores permitem conferir quantas
+    requisições e números chegaram ao provedor durante um benchmark.
+    """
+
+    def __init__(self, host: str = '127.0.0.1', port: int = 0, latency_ms: float = 0.0,
+                 error_rate: float = 0.0, seed: int = None):
+        """
+        Args:
+            host (str): Endereço de escuta
+            port (int): Porta de escuta (0 escolhe uma porta livre)
+            latency_ms (float): Latência artificial por requisição, em milissegundos
+            error_rate (float): Fração de requisições respondidas com erro (0.0 a 1.0)
+            seed (int, optional): Semente para tornar os erros reproduzíveis
+        """
+        self.latency_ms = latency_ms
+        self.error_rate = error_rate
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.stats = {'requests': 0, 'errors': 0, 'numbers': 0, 'bytes': 0}
+
+        provider = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = self.rfile.read(length)
+                provider._handle(self, body)
+
+            def log_message(self, format, *args):
+                # Silencia o log padrão do http.server
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def _handle(self, handler: BaseHTTPRequestHandler, body: bytes):
+        if self.latency_ms:
+            time.sleep(self.latency_ms / 1000.0)
+
+        try:
+            payload = json.loads(body or b'{}')
+        except ValueError:
+            payload = {}
+        numbers = payload.get('valid_numbers') or []
+
+        with self._lock:
+            failed = self._random.random() < self.error_rate
+            self.stats['requests'] += 1
+            self.stats['bytes'] += len(body)
+            if failed:
+                self.stats['errors'] += 1
+            else:
+                self.stats['numbers'] += len(numbers)
+
+        status = 500 if failed else 200
+        response = json.dumps({'success': not failed, 'received': len(numbers)}).encode()
+        handler.send_response(status)
+        handler.send_header('Content-Type', 'application/json')
+        handler.send_header('Content-Length', str(len(response)))
+        handler.end_headers()
+        handler.wfile.write(response)
+
+    def reset_stats(self) -> Dict:
+        """
+        Zera os contadores e retorna os valores anteriores.
+        """
+        with self._lock:
+            previous = dict(self.stats)
+            self.stats = {'requests': 0, 'errors': 0, 'numbers': 0, 'bytes': 0}
+        return previous
+
+    def start(self) -> 'MockProvider':
+        """
+        Inicia o servidor em uma thread em background.
+        """
+        if self.thread is None:
+            self.thread = threading.Thread(target=self.server.serve_forever)
+            self.thread.daemon = True
+            self.thread.start()
+        return self
+
+    def stop(self):
+        """
+        Encerra o servidor.
+        """
+        if self.thread is not None:
+            self.server.shutdown()
+            self.thread.join()
+            self.thread = None
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc, tb):
+        self.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Provedor de mensagens simulado para benchmarks")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8099)
+    parser.add_argument('--latency-ms', type=float, default=0.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    args = parser.parse_args()
+
+    provider = MockProvider(args.host, args.port, args.latency_ms, args.error_rate)
+    print(f"Provedor simulado escutando em {provider.url}")
+    try:
+        provider.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        provider.server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,430 @@
+"""
+Suíte de benchmarks de throughput do SBsender.
+
+Mede normalização de telefones (inclusive a escalabilidade com 1/2/4/8
+processos e o cache de normalização), importação de CSV, latência de escrita do
+register_import, carregamento da página de histórico, mensagens por segundo
+do dispatcher contra um provedor HTTP simulado e eventos por segundo na
+gravação dos status de entrega. O resultado é emitido em JSON
+para que regressões possam ser comparadas entre versões.
+
+Uso:
+    python -m benchmarks.run_benchmarks --output bench.json
+    python -m benchmarks.run_benchmarks --csv-sizes 10000 --skip-db
+
+Os benchmarks que dependem do MongoDB usam BENCH_MONGODB_URI (padrão
+mongodb://localhost:27017) e um banco descartável (sbsender_bench). Se o
+servidor não estiver acessível, eles são marcados como ignorados no resultado.
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime
+from typing import Callable, Dict, List
+
+import numpy as np
+
+from src.utils.phone_utils import format_phone_number, normalize_phone_array, validate_phone_list
+from src.utils.ddd_table import VALID_DDDS
+
+DEFAULT_MONGODB_URI = 'mongodb://localhost:27017'
+DEFAULT_BENCH_DATABASE = 'sbsender_bench'
+DDDS = sorted(VALID_DDDS)
+
+
+def generate_numbers(count: int, invalid_ratio: float = 0.1, seed: int = 42) -> List[str]:
+    """
+    Gera números de telefone brutos em formatos variados, como chegam nas importações.
+    """
+    rng = random.Random(seed)
+    patterns = [
+        lambda d, n: f"55{d}9{n}",
+        lambda d, n: f"+55 ({d}) 9{n[:4]}-{n[4:]}",
+        lambda d, n: f"0{d}9{n}",
+        lambda d, n: f"{d} 9{n[:4]}-{n[4:]}",
+        lambda d, n: f"55{d}{n}",
+    ]
+    numbers = []
+    for _ in range(count):
+        if rng.random() < invalid_ratio:
+            numbers.append(str(rng.randint(1000, 99999999)))
+            continue
+        ddd = str(rng.choice(DDDS))
+        # Celulares de 8 dígitos (padrão sem o 9) começam com 6 a 9
+        subscriber = f"{rng.randint(6, 9)}{rng.randint(0, 9999999):07d}"
+        numbers.append(rng.choice(patterns)(ddd, subscriber))
+    return numbers
+
+
+def _timed(func: Callable) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    func()
+    return time.perf_counter() - start
+
+
+def _peak_rss_mb() -> float:
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    return round(peak / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def bench_phone_normalization(count: int, repeat: int) -> Dict:
+    numbers = generate_numbers(count)
+    scalar = min(_timed(lambda: [format_phone_number(n) for n in numbers]) for _ in range(repeat))
+    batch = min(_timed(lambda: validate_phone_list(numbers)) for _ in range(repeat))
+    vectorized = min(_timed(lambda: normalize_phone_array(numbers)) for _ in range(repeat))
+    return {
+        'numbers': count,
+        'scalar_seconds': round(scalar, 4),
+        'scalar_numbers_per_second': round(count / scalar),
+        'batch_seconds': round(batch, 4),
+        'batch_numbers_per_second': round(count / batch),
+        'vectorized_seconds': round(vectorized, 4),
+        'vectorized_numbers_per_second': round(count / vectorized),
+    }
+
+
+def bench_parallel_scaling(count: int, workers: List[int], block_rows: int) -> Dict:
+    """
+    Escalabilidade da normalização distribuída entre processos (ParallelNormalizer),
+    em blocos do mesmo tamanho usado pelo pipeline de importação.
+    """
+    from src.utils.parallel_normalize import ParallelNormalizer
+
+    numbers = generate_numbers(count)
+    blocks = [numbers[start:start + block_rows] for start in range(0, count, block_rows)]
+    expected = normalize_phone_array(numbers)
+    results = {'numbers': count, 'block_rows': block_rows, 'cpu_count': os.cpu_count(), 'workers': {}}
+    baseline = None
+    try:
+        for worker_count in workers:
+            normalizer = ParallelNormalizer(worker_count, min_rows=0)
+            # Aquece o pool para não medir a criação dos processos
+            normalizer.normalize(blocks[0])
+            output = []
+            elapsed = _timed(lambda: output.extend(normalizer.normalize(block) for block in blocks))
+            baseline = baseline or elapsed
+            results['workers'][str(worker_count)] = {
+                'seconds': round(elapsed, 4),
+                'numbers_per_second': round(count / elapsed),
+                'speedup': round(baseline / elapsed, 2),
+                'matches_sequential': bool((np.concatenate(output) == expected).all()),
+            }
+    finally:
+        ParallelNormalizer.shutdown()
+    return results
+
+
+def bench_phone_cache(count: int, block_rows: int) -> Dict:
+    """
+    Cache de normalização (PhoneCache): importação com cache frio, a mesma lista
+    de novo (acertos em memória) e após reinício com a tabela em disco.
+    """
+    import tempfile
+    from src.utils.phone_cache import DiskPhoneTable, PhoneCache
+
+    numbers = generate_numbers(count)
+    blocks = [numbers[start:start + block_rows] for start in range(0, count, block_rows)]
+    run = lambda cache: _timed(lambda: [cache.normalize(block) for block in blocks])
+    baseline = _timed(lambda: [normalize_phone_array(block) for block in blocks])
+
+    memory = PhoneCache(capacity=2 * count)
+    cold = run(memory)
+    warm = run(memory)
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'phone_cache.bin')
+        disk_cold = run(PhoneCache(capacity=2 * count, disk_table=DiskPhoneTable(path, 4 * count)))
+        restarted = PhoneCache(capacity=2 * count, disk_table=DiskPhoneTable(path, 4 * count))
+        disk_warm = run(restarted)
+        disk_stats = restarted.stats()
+    return {
+        'numbers': count,
+        'uncached_seconds': round(baseline, 4),
+        'memory_cold_seconds': round(cold, 4),
+        'memory_warm_seconds': round(warm, 4),
+        'disk_cold_seconds': round(disk_cold, 4),
+        'disk_warm_seconds': round(disk_warm, 4),
+        'memory_stats': memory.stats(),
+        'disk_stats': disk_stats,
+    }
+
+
+def bench_csv_import(sizes: List[int]) -> Dict:
+    from src.services.contact_service import ContactService
+
+    contact_service = ContactService(history_service=None)
+    results = {}
+    for size in sizes:
+        rows = ['nome,telefone,cidade']
+        rows.extend(f"Contato {i},{number},Cidade" for i, number in enumerate(generate_numbers(size)))
+        content = '\n'.join(rows).encode('utf-8')
+        del rows
+
+        result = {}
+        elapsed = _timed(lambda: result.update(contact_service.process_csv(
+            content, 'telefone', webhook_url='', webhook_id='', webhook_name='', method='csv'
+        )))
+        if 'error' in result:
+            results[str(size)] = {'error': result['error']}
+            continue
+        results[str(size)] = {
+            'rows': size,
+            'bytes': len(content),
+            'seconds': round(elapsed, 4),
+            'rows_per_second': round(size / elapsed),
+            'valid': result['total_valid'],
+            'invalid': result['total_invalid'],
+            'peak_rss_mb': _peak_rss_mb(),
+        }
+        del content, result
+    return results
+
+
+def connect_bench_database(uri: str, database: str):
+    """
+    Conecta ao MongoDB de benchmark, falhando rápido se o servidor não responder.
+    """
+    from pymongo import MongoClient
+
+    client = MongoClient(uri, serverSelectionTimeoutMS=2000)
+    client.admin.command('ping')
+    client.drop_database(database)
+    return client, client[database]
+
+
+def bench_register_import(db, sizes: List[int], repeat: int) -> Dict:
+    from bson import ObjectId
+    from src.services.history_service import HistoryService
+
+    history_service = HistoryService(db)
+    webhook_id = str(ObjectId())
+    results = {}
+    for size in sizes:
+        numbers = validate_phone_list(generate_numbers(size, invalid_ratio=0))[0]
+        latencies = []
+        try:
+            for _ in range(repeat):
+                latencies.append(_timed(lambda: history_service.register_import(
+                    valid_numbers=numbers,
+                    invalid_numbers=[],
+                    webhook_id=webhook_id,
+                    webhook_name='bench',
+                    webhook_url='http://127.0.0.1/',
+                    method='csv'
+                )))
+        except Exception as e:
+            results[str(size)] = {'error': str(e)}
+            continue
+        latencies.sort()
+        results[str(size)] = {
+            'numbers': size,
+            'repeat': repeat,
+            'min_ms': round(latencies[0] * 1000, 2),
+            'median_ms': round(latencies[len(latencies) // 2] * 1000, 2),
+            'max_ms': round(latencies[-1] * 1000, 2),
+        }
+    db['history'].delete_many({})
+    return results
+
+
+def bench_history_page(db, entries: int, numbers_per_entry: int) -> Dict:
+    from src.services.history_service import HistoryService
+
+    history_service = HistoryService(db)
+    numbers = validate_phone_list(generate_numbers(numbers_per_entry, invalid_ratio=0))[0]
+    webhook_id = db['webhooks'].insert_one({'title': 'bench', 'url': 'http://127.0.0.1/', 'active': True}).inserted_id
+    for _ in range(entries):
+        history_service.register_import(numbers, [], str(webhook_id), 'bench', 'http://127.0.0.1/', 'txt')
+
+    def load_page():
+        history_service.format_history_entries(history_service.get_history_page()['items'])
+
+    elapsed = _timed(load_page)
+    db['history'].delete_many({})
+    db['webhooks'].delete_many({})
+    return {
+        'entries': entries,
+        'numbers_per_entry': numbers_per_entry,
+        'seconds': round(elapsed, 4),
+        'entries_per_second': round(entries / elapsed),
+    }
+
+
+def bench_dispatcher(db, jobs: int, numbers_per_job: int, latency_ms: float, error_rate: float) -> Dict:
+    from benchmarks.mock_provider import MockProvider
+    from src.services.history_service import HistoryService
+    from src.services.task_service import TaskService
+
+    history_service = HistoryService(db)
+    numbers = validate_phone_list(generate_numbers(numbers_per_job, invalid_ratio=0))[0]
+
+    with MockProvider(latency_ms=latency_ms, error_rate=error_rate, seed=42) as provider:
+        os.environ['PROVIDER_WEBHOOK_URL'] = provider.url
+        webhook_id = db['webhooks'].insert_one({'title': 'bench', 'url': provider.url, 'active': True}).inserted_id
+        for _ in range(jobs):
+            history_service.register_import(numbers, [], str(webhook_id), 'bench', provider.url, 'csv')
+
+        task_service = TaskService(db)
+        statuses = {}
+
+        def drain():
+            for message in db['history'].find({'status': 'pending'}):
+                status = task_service.process_message(message)
+                statuses[status] = statuses.get(status, 0) + 1
+
+        elapsed = _timed(drain)
+        provider_stats = provider.reset_stats()
+
+    db['history'].delete_many({})
+    db['webhooks'].delete_many({})
+    sent = jobs * numbers_per_job
+    return {
+        'jobs': jobs,
+        'numbers_per_job': numbers_per_job,
+        'provider_latency_ms': latency_ms,
+        'provider_error_rate': error_rate,
+        'seconds': round(elapsed, 4),
+        'jobs_per_second': round(jobs / elapsed, 2),
+        'messages_per_second': round(sent / elapsed),
+        'statuses': statuses,
+        'provider': provider_stats,
+    }
+
+
+def bench_delivery_ingest(db, events: int, callback_size: int) -> Dict:
+    from src.services.delivery_service import DEFAULT_FLUSH_SIZE, DeliveryService
+
+    db['delivery_status'].create_index([('history_id', 1), ('phone', 1)], unique=True)
+    history_ids = [str(db['history'].insert_one({'status': 'completed'}).inserted_id) for _ in range(10)]
+    numbers = list(dict.fromkeys(validate_phone_list(generate_numbers(events, invalid_ratio=0))[0]))
+    service = DeliveryService(db, flush_size=DEFAULT_FLUSH_SIZE, flush_interval=3600, max_buffered=len(numbers) * 2)
+
+    results = {}
+    # Primeira passada insere os status; a segunda atualiza os mesmos números
+    for status in ('delivered', 'read'):
+        batch = [
+            {'history_id': history_ids[position % len(history_ids)], 'phone': number, 'status': status}
+            for position, number in enumerate(numbers)
+        ]
+
+        def ingest():
+            pending = 0
+            for start in range(0, len(batch), callback_size):
+                pending += service.submit(batch[start:start + callback_size])['accepted']
+                if pending >= DEFAULT_FLUSH_SIZE:
+                    service.flush()
+                    pending = 0
+            service.flush()
+
+        elapsed = _timed(ingest)
+        results[status] = {
+            'events': len(batch),
+            'seconds': round(elapsed, 4),
+            'events_per_second': round(len(batch) / elapsed),
+        }
+    results['callback_size'] = callback_size
+    db['delivery_status'].drop()
+    db['history'].delete_many({})
+    return results
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(['git', 'rev-parse', 'HEAD'], stderr=subprocess.DEVNULL).decode().strip()
+    except Exception:
+        return None
+
+
+def _parse_sizes(value: str) -> List[int]:
+    return [int(v) for v in value.split(',') if v.strip()]
+
+
+def run(args) -> Dict:
+    report = {
+        'timestamp': datetime.utcnow().isoformat(),
+        'git_commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'results': {},
+    }
+    results = report['results']
+
+    results['phone_normalization'] = bench_phone_normalization(args.normalization_count, args.repeat)
+    results['parallel_scaling'] = bench_parallel_scaling(args.parallel_count, args.workers, args.block_rows)
+    results['phone_cache'] = bench_phone_cache(args.normalization_count, args.block_rows)
+    results['csv_import'] = bench_csv_import(args.csv_sizes)
+
+    db_benchmarks = ['register_import', 'history_page', 'dispatcher', 'delivery_ingest']
+    if args.skip_db:
+        for name in db_benchmarks:
+            results[name] = {'skipped': 'desativado via --skip-db'}
+        return report
+
+    try:
+        client, db = connect_bench_database(args.mongodb_uri, args.database)
+    except Exception as e:
+        for name in db_benchmarks:
+            results[name] = {'skipped': f"MongoDB indisponível: {str(e)}"}
+        return report
+
+    try:
+        results['register_import'] = bench_register_import(db, args.register_sizes, args.repeat)
+        results['history_page'] = bench_history_page(db, args.history_entries, args.history_numbers)
+        results['dispatcher'] = bench_dispatcher(
+            db, args.dispatcher_jobs, args.dispatcher_numbers, args.latency_ms, args.error_rate
+        )
+        results['delivery_ingest'] = bench_delivery_ingest(db, args.delivery_events, args.callback_size)
+    finally:
+        client.drop_database(args.database)
+        client.close()
+    return report
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(description="Benchmarks de throughput do SBsender")
+    parser.add_argument('--output', help="Arquivo JSON de saída (padrão: stdout)")
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--normalization-count', type=int, default=200000)
+    parser.add_argument('--parallel-count', type=int, default=2000000)
+    parser.add_argument('--workers', type=_parse_sizes, default=[1, 2, 4, 8], help="Processos testados na escalabilidade")
+    parser.add_argument('--block-rows', type=int, default=50000, help="Linhas por bloco (igual a IMPORT_BLOCK_ROWS)")
+    parser.add_argument('--csv-sizes', type=_parse_sizes, default=[10000, 1000000, 5000000])
+    parser.add_argument('--register-sizes', type=_parse_sizes, default=[1000, 10000, 100000])
+    parser.add_argument('--history-entries', type=int, default=200)
+    parser.add_argument('--history-numbers', type=int, default=1000)
+    parser.add_argument('--dispatcher-jobs', type=int, default=50)
+    parser.add_argument('--dispatcher-numbers', type=int, default=1000)
+    parser.add_argument('--latency-ms', type=float, default=50.0)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--delivery-events', type=int, default=100000, help="Eventos de status de entrega por passada")
+    parser.add_argument('--callback-size', type=int, default=100, help="Eventos por callback do provedor")
+    parser.add_argument('--mongodb-uri', default=os.getenv('BENCH_MONGODB_URI', DEFAULT_MONGODB_URI))
+    parser.add_argument('--database', default=DEFAULT_BENCH_DATABASE)
+    parser.add_argument('--skip-db', action='store_true', help="Ignora os benchmarks que dependem do MongoDB")
+    return parser
+
+
+def main():
+    args = build_parser().parse_args()
+    report = run(args)
+    output = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+
+if __name__ == '__main__':
+    main()
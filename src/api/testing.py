@@ -0,0 +1,63 @@
+from typing import Dict, Iterable, Optional, Union
+from urllib.parse import urlencode
+from wsgiref.util import setup_testing_defaults
+import io
+import json
+
+
+class LocalResponse:
+    """
+    Resposta de uma requisição feita pelo LocalClient.
+    """
+
+    def __init__(self, status: str, headers: Dict[str, str], body: bytes):
+        self.status_code = int(status.split()[0])
+        self.headers = headers
+        self.body = body
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class LocalClient:
+    """
+    Cliente que chama uma aplicação WSGI no próprio processo, sem rede.
+
+    Usado nos testes da API; o corpo pode ser um iterável de bytes, lido pela
+    aplicação em pedaços como em uma requisição real.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    def request(self, method: str, path: str, body: Union[bytes, Iterable[bytes], None] = None, headers: Optional[Dict[str, str]] = None, query: Optional[Dict] = None) -> LocalResponse:
+        environ = {'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': urlencode(query or {})}
+        if body is not None:
+            if not isinstance(body, bytes):
+                body = b''.join(body)
+            environ['CONTENT_LENGTH'] = str(len(body))
+            environ['wsgi.input'] = io.BytesIO(body)
+        for name, value in (headers or {}).items():
+            key = name.upper().replace('-', '_')
+            environ[key if key in ('CONTENT_TYPE', 'CONTENT_LENGTH') else f"HTTP_{key}"] = value
+        setup_testing_defaults(environ)
+
+        response = {}
+
+        def start_response(status, response_headers, exc_info=None):
+            response['status'] = status
+            response['headers'] = dict(response_headers)
+
+        chunks = self.app(environ, start_response)
+        try:
+            content = b''.join(chunks)
+        finally:
+            if hasattr(chunks, 'close'):
+                chunks.close()
+        return LocalResponse(response['status'], response['headers'], content)
+
+    def get(self, path: str, **kwargs) -> LocalResponse:
+        return self.request('GET', path, **kwargs)
+
+    def post(self, path: str, body=None, **kwargs) -> LocalResponse:
+        return self.request('POST', path, body=body, **kwargs)
@@ -0,0 +1,388 @@
+from datetime import datetime
+from http import HTTPStatus
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import parse_qs
+import hmac
+import itertools
+import json
+import logging
+import re
+import tempfile
+import time
+from bson import ObjectId
+from bson.errors import InvalidId
+from ..services.delivery_service import DeliveryBacklogFull
+from ..services.history_service import HISTORY_PAGE_SIZE
+from ..utils.config import get_setting
+from ..utils.export_writers import EXPORT_FORMATS
+from ..utils.import_readers import inspect_stream
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+REQUEST_SECONDS = metrics.histogram('sbsender_api_request_seconds', 'Latência das requisições da API')
+
+# Tipo de conteúdo do corpo do envio de listas e o formato de leitura de cada um
+CONTENT_KINDS = {
+    'application/x-ndjson': 'ndjson',
+    'application/jsonl': 'ndjson',
+    'text/csv': 'csv',
+    'text/plain': 'txt'
+}
+# Bytes copiados por vez do corpo da requisição para o arquivo temporário
+BODY_READ_BYTES = 1024 * 1024
+# Tamanho máximo padrão do corpo de um envio (API_MAX_BODY_BYTES)
+DEFAULT_MAX_BODY_BYTES = 2 * 1024 ** 3
+# Tamanho máximo do corpo de um callback de status de entrega
+CALLBACK_MAX_BODY_BYTES = 16 * 1024 * 1024
+
+
+class ApiError(Exception):
+    """
+    Erro de requisição, respondido com o status HTTP e a mensagem em JSON.
+    """
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, ObjectId):
+        return str(value)
+    raise TypeError(f"Tipo não serializável: {type(value).__name__}")
+
+
+def _parse_date(value: Optional[str], name: str) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ApiError(400, f"Data inválida em '{name}': {value}")
+
+
+class ApiApp:
+    """
+    API HTTP (WSGI) para envio de listas por sistemas externos.
+
+    Rotas:
+        POST /webhooks/<webhook_id>/imports  Envia uma lista (NDJSON, CSV ou texto, opcionalmente gzip)
+        GET  /jobs/<job_id>                  Progresso e resultado de um envio
+        GET  /history                        Histórico paginado (cursor)
+        GET  /history/export                 Números do histórico em CSV ou Parquet, em streaming
+        POST /callbacks/delivery             Status de entrega por número, enviados pelo provedor
+        GET  /health                         Verificação de disponibilidade
+        GET  /metrics                        Métricas no formato Prometheus
+
+    O corpo de cada envio é copiado em blocos para um arquivo temporário, sem
+    ficar inteiro em memória, e processado em background pelo ImportJobService
+    (pool de IMPORT_WORKERS threads); a requisição responde 202 com o ID do
+    job assim que o corpo termina de chegar. As rotas de envio, jobs e histórico
+    exigem 'Authorization: Bearer <token>' com o API_TOKEN; sem API_TOKEN, elas
+    respondem 401, a menos que a API tenha sido criada com insecure=True (uso
+    local). O callback usa DELIVERY_CALLBACK_TOKEN (header X-Callback-Token ou
+    parâmetro 'token'), se configurado, ou o mesmo token da API; sem nenhum dos
+    dois, a rota do callback não é registrada (nem com insecure), já que ela
+    altera os status de entrega do histórico.
+    """
+
+    def __init__(self, history_service, webhook_service, import_job_service, token: Optional[str] = None, max_body_bytes: Optional[int] = None, delivery_service=None, callback_token: Optional[str] = None, insecure: bool = False):
+        """
+        Args:
+            history_service: HistoryService usado na listagem do histórico
+            webhook_service: WebhookService usado para localizar o webhook do envio
+            import_job_service: ImportJobService que processa os envios (com o ContactService)
+            token (str, optional): Token exigido nas requisições (padrão: API_TOKEN)
+            max_body_bytes (int, optional): Tamanho máximo do corpo de um envio (padrão: API_MAX_BODY_BYTES)
+            delivery_service (DeliveryService, optional): Recebe os callbacks de status de entrega
+            callback_token (str, optional): Token do callback (padrão: DELIVERY_CALLBACK_TOKEN)
+            insecure (bool): Aceita requisições sem autenticação quando não há token configurado
+        """
+        self.history_service = history_service
+        self.webhook_service = webhook_service
+        self.import_job_service = import_job_service
+        self.token = token if token is not None else get_setting('api', 'token', 'API_TOKEN')
+        self.insecure = insecure
+        if max_body_bytes is None:
+            max_body_bytes = get_setting('api', 'max_body_bytes', 'API_MAX_BODY_BYTES', DEFAULT_MAX_BODY_BYTES, cast=int)
+        self.max_body_bytes = max_body_bytes
+        self.delivery_service = delivery_service
+        self.callback_token = callback_token if callback_token is not None else get_setting('delivery', 'callback_token', 'DELIVERY_CALLBACK_TOKEN')
+        # (método, padrão da rota, handler, autenticação: 'api', 'callback' ou None)
+        self.routes: List[Tuple[str, re.Pattern, Callable, Optional[str]]] = [
+            ('POST', re.compile(r'^/webhooks/(?P<webhook_id>[^/]+)/imports$'), self.submit_import, 'api'),
+            ('GET', re.compile(r'^/jobs/(?P<job_id>[^/]+)$'), self.get_job, 'api'),
+            ('GET', re.compile(r'^/history$'), self.list_history, 'api'),
+            ('GET', re.compile(r'^/history/export$'), self.export_history, 'api'),
+            ('GET', re.compile(r'^/health$'), self.health, None),
+            ('GET', re.compile(r'^/metrics$'), self.render_metrics, None)
+        ]
+        if delivery_service is not None and (self.callback_token or self.token):
+            self.routes.append(('POST', re.compile(r'^/callbacks/delivery$'), self.receive_delivery, 'callback'))
+        elif delivery_service is not None:
+            logger.warning("Callback de status de entrega desativado: configure DELIVERY_CALLBACK_TOKEN ou API_TOKEN")
+
+    def __call__(self, environ: Dict, start_response) -> Iterable[bytes]:
+        with REQUEST_SECONDS.time():
+            try:
+                handler, params, auth = self._route(environ)
+                if auth == 'callback':
+                    self._authorize_callback(environ)
+                elif auth:
+                    self._authorize(environ)
+                status, headers, body = handler(environ, **params)
+            except ApiError as e:
+                status, headers, body = self._json(e.status, {'error': e.message})
+            except Exception as e:
+                logger.error("Erro na API (%s %s): %s", environ.get('REQUEST_METHOD'), environ.get('PATH_INFO'), e)
+                status, headers, body = self._json(500, {'error': "Erro interno"})
+
+        metrics.counter('sbsender_api_requests_total', 'Requisições da API por status HTTP', code=str(status)).inc()
+        start_response(f"{status} {HTTPStatus(status).phrase}", headers)
+        return body
+
+    def _route(self, environ: Dict) -> Tuple[Callable, Dict[str, str], Optional[str]]:
+        path = environ.get('PATH_INFO') or '/'
+        method = environ.get('REQUEST_METHOD', 'GET')
+        allowed = False
+        for route_method, pattern, handler, auth in self.routes:
+            match = pattern.match(path)
+            if match is None:
+                continue
+            if route_method == method:
+                return handler, match.groupdict(), auth
+            allowed = True
+        if allowed:
+            raise ApiError(405, f"Método {method} não permitido em {path}")
+        raise ApiError(404, f"Rota não encontrada: {path}")
+
+    def _authorize(self, environ: Dict):
+        if not self.token:
+            if self.insecure:
+                return
+            raise ApiError(401, "API sem token configurado (API_TOKEN)")
+        expected = f"Bearer {self.token}"
+        if not hmac.compare_digest(environ.get('HTTP_AUTHORIZATION', '').encode('utf-8'), expected.encode('utf-8')):
+            raise ApiError(401, "Token de acesso inválido")
+
+    def _authorize_callback(self, environ: Dict):
+        if not self.callback_token:
+            # Sem token próprio, o callback exige o token da API
+            return self._authorize(environ)
+        received = environ.get('HTTP_X_CALLBACK_TOKEN') or self._query(environ).get('token', '')
+        if not hmac.compare_digest(received.encode('utf-8'), self.callback_token.encode('utf-8')):
+            raise ApiError(401, "Token do callback inválido")
+
+    @staticmethod
+    def _json(status: int, payload: Dict, headers: Optional[List[Tuple[str, str]]] = None):
+        body = json.dumps(payload, default=_json_default, ensure_ascii=False).encode('utf-8')
+        return status, [
+            ('Content-Type', 'application/json; charset=utf-8'),
+            ('Content-Length', str(len(body)))
+        ] + (headers or []), [body]
+
+    @staticmethod
+    def _query(environ: Dict) -> Dict[str, str]:
+        return {key: values[-1] for key, values in parse_qs(environ.get('QUERY_STRING', '')).items()}
+
+    def _spool_body(self, environ: Dict):
+        """
+        Copia o corpo da requisição em blocos para um arquivo temporário.
+        """
+        length = environ.get('CONTENT_LENGTH')
+        if length:
+            remaining = int(length)
+            if remaining > self.max_body_bytes:
+                raise ApiError(413, f"Corpo maior que o limite de {self.max_body_bytes} bytes")
+        elif environ.get('wsgi.input_terminated'):
+            remaining = None
+        else:
+            raise ApiError(411, "Informe o Content-Length do corpo")
+
+        stream = environ['wsgi.input']
+        spool = tempfile.TemporaryFile(prefix='sbsender-api-')
+        try:
+            received = 0
+            while remaining is None or remaining > 0:
+                data = stream.read(BODY_READ_BYTES if remaining is None else min(BODY_READ_BYTES, remaining))
+                if not data:
+                    break
+                received += len(data)
+                if received > self.max_body_bytes:
+                    raise ApiError(413, f"Corpo maior que o limite de {self.max_body_bytes} bytes")
+                spool.write(data)
+                if remaining is not None:
+                    remaining -= len(data)
+            if not received:
+                raise ApiError(400, "Corpo da requisição vazio")
+            spool.seek(0)
+            return spool
+        except Exception:
+            spool.close()
+            raise
+
+    def submit_import(self, environ: Dict, webhook_id: str):
+        """
+        Recebe uma lista de números e a envia para processamento em background.
+
+        O formato vem do Content-Type (application/x-ndjson, text/csv ou
+        text/plain) e Content-Encoding: gzip é aceito. No NDJSON cada linha é um
+        objeto (ex.: {"telefone": "...", "nome": "..."}) ou só o número. Parâmetros
+        opcionais: 'column' (coluna dos números; padrão: detectada) e 'template'
+        (mensagem personalizada com as colunas, ex.: "Olá {nome}").
+        """
+        try:
+            webhook = self.webhook_service.get_webhook_by_id(webhook_id)
+        except InvalidId:
+            webhook = None
+        if not webhook:
+            raise ApiError(404, f"Webhook não encontrado: {webhook_id}")
+
+        content_type = (environ.get('CONTENT_TYPE') or '').split(';')[0].strip().lower()
+        kind = CONTENT_KINDS.get(content_type)
+        if kind is None:
+            raise ApiError(415, f"Content-Type não suportado: {content_type or '(vazio)'}; use {', '.join(CONTENT_KINDS)}")
+        encoding = (environ.get('HTTP_CONTENT_ENCODING') or 'identity').strip().lower()
+        if encoding not in ('identity', 'gzip'):
+            raise ApiError(415, f"Content-Encoding não suportado: {encoding}")
+
+        query = self._query(environ)
+        spool = self._spool_body(environ)
+        try:
+            try:
+                file_format = inspect_stream(spool, kind, 'gzip' if encoding == 'gzip' else None)
+            except Exception as e:
+                raise ApiError(400, f"Conteúdo inválido: {e}")
+            column = query.get('column') or file_format['phone_column']
+            if column not in file_format['columns']:
+                raise ApiError(400, f"Coluna '{column}' não encontrada; colunas: {', '.join(file_format['columns'])}")
+
+            job_id = self.import_job_service.submit_stream(
+                spool, file_format, column,
+                webhook_url=webhook['url'],
+                webhook_id=webhook['_id'],
+                webhook_name=webhook['title'],
+                method='api',
+                client_id=webhook.get('client_id'),
+                message_template=query.get('template')
+            )
+        except Exception:
+            spool.close()
+            raise
+
+        logger.info("Envio via API: job %s para o webhook %s (%s)", job_id, webhook['_id'], kind)
+        return self._json(202, {
+            'job_id': job_id,
+            'status': 'queued',
+            'column': column,
+            'status_url': f"/jobs/{job_id}"
+        }, [('Location', f"/jobs/{job_id}")])
+
+    def get_job(self, environ: Dict, job_id: str):
+        """
+        Retorna o progresso de um envio e, ao terminar, os totais (sem as listas de números).
+        """
+        job = self.import_job_service.get_job(job_id)
+        if job is None:
+            raise ApiError(404, f"Job não encontrado: {job_id}")
+        return self._json(200, job)
+
+    def list_history(self, environ: Dict):
+        """
+        Lista o histórico do mais recente para o mais antigo. Parâmetros
+        opcionais: client_id, status, start e end (datas ISO, UTC), limit e
+        cursor (o 'next_cursor' da página anterior).
+        """
+        query = self._query(environ)
+        try:
+            limit = int(query.get('limit') or HISTORY_PAGE_SIZE)
+        except ValueError:
+            raise ApiError(400, f"Limite inválido: {query['limit']}")
+        client_id = query.get('client_id')
+        if client_id and not ObjectId.is_valid(client_id):
+            raise ApiError(400, f"Cliente inválido: {client_id}")
+        try:
+            page = self.history_service.get_history_page(
+                client_id=client_id,
+                status=query.get('status'),
+                start_date=_parse_date(query.get('start'), 'start'),
+                end_date=_parse_date(query.get('end'), 'end'),
+                limit=limit,
+                cursor=query.get('cursor')
+            )
+        except ValueError as e:
+            raise ApiError(400, str(e))
+        return self._json(200, page)
+
+    def export_history(self, environ: Dict):
+        """
+        Exporta os números do histórico em CSV ou Parquet ('format', padrão csv),
+        com os filtros opcionais client_id, status, start e end (datas ISO, UTC).
+        O corpo é gerado à medida que o cursor avança, sem o arquivo ficar
+        inteiro em memória nem em disco.
+        """
+        query = self._query(environ)
+        export_format = query.get('format') or 'csv'
+        if export_format not in EXPORT_FORMATS:
+            raise ApiError(400, f"Formato inválido: {export_format} (use {', '.join(EXPORT_FORMATS)})")
+        client_id = query.get('client_id')
+        if client_id and not ObjectId.is_valid(client_id):
+            raise ApiError(400, f"Cliente inválido: {client_id}")
+        chunks = iter(self.history_service.export_numbers(
+            export_format,
+            client_id=client_id,
+            status=query.get('status'),
+            start_date=_parse_date(query.get('start'), 'start'),
+            end_date=_parse_date(query.get('end'), 'end')
+        ))
+        # O primeiro pedaço é gerado antes da resposta, para que erros (ex.: Parquet
+        # sem pyarrow) ainda sejam respondidos em JSON
+        first = next(chunks, b'')
+        return 200, [
+            ('Content-Type', EXPORT_FORMATS[export_format]),
+            ('Content-Disposition', f'attachment; filename="historico.{export_format}"')
+        ], itertools.chain([first], chunks)
+
+    def receive_delivery(self, environ: Dict):
+        """
+        Recebe eventos de status de entrega: um objeto, uma lista, {"events": [...]}
+        em JSON ou um evento por linha em NDJSON. Cada evento tem history_id,
+        phone, status (sent, delivered, read ou failed) e, opcionalmente, error.
+        Responde 202 depois de enfileirar os eventos (gravados em lote) ou 503
+        com Retry-After se a fila estiver cheia.
+        """
+        length = int(environ.get('CONTENT_LENGTH') or 0)
+        if length > CALLBACK_MAX_BODY_BYTES:
+            raise ApiError(413, f"Corpo maior que o limite de {CALLBACK_MAX_BODY_BYTES} bytes")
+        body = environ['wsgi.input'].read(length) if length else b''
+        content_type = (environ.get('CONTENT_TYPE') or '').split(';')[0].strip().lower()
+        try:
+            if CONTENT_KINDS.get(content_type) == 'ndjson':
+                events = [json.loads(line) for line in body.splitlines() if line.strip()]
+            else:
+                events = json.loads(body or b'[]')
+                if isinstance(events, dict):
+                    events = events.get('events', [events])
+        except ValueError as e:
+            raise ApiError(400, f"JSON inválido: {e}")
+        if not isinstance(events, list):
+            raise ApiError(400, "Envie um evento, uma lista de eventos ou {\"events\": [...]}")
+        try:
+            counts = self.delivery_service.submit(events)
+        except DeliveryBacklogFull as e:
+            return self._json(503, {'error': str(e)}, [('Retry-After', '5')])
+        return self._json(202, counts)
+
+    def health(self, environ: Dict):
+        return self._json(200, {'status': 'ok', 'time': time.time()})
+
+    def render_metrics(self, environ: Dict):
+        body = metrics.render_prometheus().encode('utf-8')
+        return 200, [
+            ('Content-Type', 'text/plain; version=0.0.4; charset=utf-8'),
+            ('Content-Length', str(len(body)))
+        ], [body]
@@ -64,14 +64,14 @@ class MongoDB:
                     last_error = e
                     retry_count += 1
                     if retry_count < max_retries:
-                        logger.warning(f"Tentativa {retry_count} falhou, tentando novamente em 2 segundos...")
+                        logger.warning("Tentativa %s falhou, tentando novamente em 2 segundos...", retry_count)
                         time.sleep(2)
             
             # Se chegou aqui, todas as tentativas falharam
             raise Exception(f"Todas as tentativas de conexão falharam. Último erro: {str(last_error)}")
             
         except Exception as e:
-            logger.error(f"Erro ao conectar ao MongoDB: {str(e)}")
+            logger.error("Erro ao conectar ao MongoDB: %s", e)
             raise Exception(f"Erro ao conectar ao MongoDB: {str(e)}")
 
     def setup_database(self):
@@ -83,13 +83,13 @@ class MongoDB:
                 raise Exception("Conexão com o banco de dados não estabelecida")
                 
             # Lista de collections necessárias
-            required_collections = ['webhooks', 'clients', 'history']
+            required_collections = ['webhooks', 'clients', 'history', 'suppressions', 'contact_log', 'message_chunks', 'daily_stats', 'delivery_status', 'queue_counters', 'quota_usage']
             existing_collections = self.db.list_collection_names()
 
             # Cria as collections que não existem
             for collection in required_collections:
                 if collection not in existing_collections:
-                    logger.info(f"Criando collection {collection}")
+                    logger.info("Criando collection %s", collection)
                     self.db.create_collection(collection)
                     
                     # Adiciona índices necessários
@@ -103,10 +103,35 @@ class MongoDB:
                         self.db[collection].create_index([("client_id", 1)])
                         self.db[collection].create_index([("webhook_id", 1)])
                         self.db[collection].create_index([("status", 1)])
+                    elif collection == 'suppressions':
+                        self.db[collection].create_index([("updated_at", 1)])
+                    elif collection == 'contact_log':
+                        self.db[collection].create_index([("client_id", 1), ("phone", 1)], unique=True)
+                        self.db[collection].create_index([("client_id", 1), ("last_contacted_at", -1)])
+                        self.db[collection].create_index([("expires_at", 1)], expireAfterSeconds=0)
+                    elif collection == 'message_chunks':
+                        self.db[collection].create_index([("history_id", 1), ("seq", 1)], unique=True)
+                    elif collection == 'daily_stats':
+                        self.db[collection].create_index([("day", 1), ("client_id", 1), ("webhook_id", 1)], unique=True)
+                        self.db[collection].create_index([("client_id", 1), ("day", 1)])
+                    elif collection == 'delivery_status':
+                        self.db[collection].create_index([("history_id", 1), ("phone", 1)], unique=True)
+                        self.db[collection].create_index([("history_id", 1), ("status", 1)])
+                    elif collection == 'quota_usage':
+                        self.db[collection].create_index([("client_id", 1), ("month", 1)])
+
+            # Índices adicionados depois da criação das collections; create_index
+            # não faz nada se o índice já existir
+            self.db['history'].create_index([("timestamp", -1), ("_id", -1)])
+            self.db['history'].create_index(
+                [("idempotency_key", 1)],
+                unique=True,
+                partialFilterExpression={'idempotency_key': {'$exists': True}}
+            )
 
             logger.info("Setup do banco de dados concluído com sucesso")
         except Exception as e:
-            logger.error(f"Erro ao configurar banco de dados: {str(e)}")
+            logger.error("Erro ao configurar banco de dados: %s", e)
             raise Exception(f"Erro ao configurar banco de dados: {str(e)}")
 
     def get_database(self):
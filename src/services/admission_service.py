@@ -0,0 +1,215 @@
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional
+import argparse
+import logging
+from pymongo import ReplaceOne, UpdateOne
+from ..database.mongodb import MongoDB
+from ..utils.config import get_setting
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ADMISSION_TOTAL = {
+    decision: metrics.counter('sbsender_admission_total', 'Importações por decisão do controle de admissão', decision=decision)
+    for decision in ('accepted', 'deferred', 'rejected')
+}
+PENDING_NUMBERS = metrics.gauge('sbsender_pending_numbers', 'Números na fila de envio (contador global do controle de admissão)')
+
+# Documento com os contadores globais; os de cada cliente usam client_key
+GLOBAL_KEY = 'global'
+# Status em que os números de um registro ainda contam na fila
+QUEUED_STATUSES = ('pending', 'processing')
+
+
+def client_key(client_id) -> str:
+    """
+    Retorna o _id do documento de contadores de um cliente.
+    """
+    return f"client:{client_id}"
+
+
+class AdmissionService:
+    """
+    Controle de admissão das importações a partir do volume na fila de envio.
+
+    A collection 'queue_counters' tem um documento global e um por cliente com
+    'pending_numbers' e 'pending_jobs', ajustados com $inc quando um registro
+    entra na fila (register_import) e quando sai dela (status final no
+    dispatcher); a decisão lê só esses documentos, sem contar o histórico.
+
+    Com ADMISSION_SEND_RATE (números por minuto) configurado, cada importação é:
+
+    - aceita, se a fila global (ADMISSION_MAX_PENDING) e a do cliente
+      (ADMISSION_MAX_PENDING_PER_CLIENT) comportam os números;
+    - adiada ('scheduled_for'), pelo tempo que a fila leva para liberar o
+      excesso no ritmo configurado, se esse tempo for até ADMISSION_MAX_DELAY_HOURS;
+    - recusada, caso contrário.
+
+    Em todos os casos a decisão traz o início estimado do envio (fila global
+    dividida pelo ritmo). Os limites são aproximados: duas importações
+    simultâneas podem ler os mesmos contadores antes de somar os seus números.
+    """
+
+    def __init__(self, db=None, send_rate: Optional[float] = None, max_pending: Optional[int] = None,
+                 max_pending_per_client: Optional[int] = None, max_delay_hours: Optional[float] = None):
+        """
+        Args:
+            db: Banco de dados (padrão: conexão do MongoDB)
+            send_rate (float, optional): Números enviados por minuto (padrão: ADMISSION_SEND_RATE; 0 desativa)
+            max_pending (int, optional): Números na fila global (padrão: ADMISSION_MAX_PENDING; 0 = sem limite)
+            max_pending_per_client (int, optional): Números na fila de um cliente (padrão: ADMISSION_MAX_PENDING_PER_CLIENT)
+            max_delay_hours (float, optional): Adiamento máximo antes de recusar (padrão: ADMISSION_MAX_DELAY_HOURS)
+        """
+        self.db = db if db is not None else MongoDB().get_database()
+        self.collection = self.db['queue_counters']
+        if send_rate is None:
+            send_rate = get_setting('admission', 'send_rate', 'ADMISSION_SEND_RATE', 0.0, cast=float)
+        if max_pending is None:
+            max_pending = get_setting('admission', 'max_pending', 'ADMISSION_MAX_PENDING', 0, cast=int)
+        if max_pending_per_client is None:
+            max_pending_per_client = get_setting('admission', 'max_pending_per_client', 'ADMISSION_MAX_PENDING_PER_CLIENT', 0, cast=int)
+        if max_delay_hours is None:
+            max_delay_hours = get_setting('admission', 'max_delay_hours', 'ADMISSION_MAX_DELAY_HOURS', 24.0, cast=float)
+        self.send_rate = send_rate
+        self.max_pending = max_pending
+        self.max_pending_per_client = max_pending_per_client
+        self.max_delay = timedelta(hours=max_delay_hours)
+
+    @property
+    def enabled(self) -> bool:
+        return self.send_rate > 0
+
+    def get_pending(self, client_id=None) -> Dict[str, Dict[str, int]]:
+        """
+        Lê os contadores da fila global e do cliente (uma consulta).
+
+        Returns:
+            Dict[str, Dict[str, int]]: 'global' e 'client', cada um com 'numbers' e 'jobs'
+        """
+        keys = [GLOBAL_KEY, client_key(client_id)]
+        docs = {doc['_id']: doc for doc in self.collection.find({'_id': {'$in': keys}})}
+        pending = {}
+        for name, key in zip(('global', 'client'), keys):
+            doc = docs.get(key, {})
+            pending[name] = {
+                'numbers': max(int(doc.get('pending_numbers', 0)), 0),
+                'jobs': max(int(doc.get('pending_jobs', 0)), 0)
+            }
+        return pending
+
+    def decide(self, client_id, numbers: int, now: Optional[datetime] = None) -> Dict:
+        """
+        Decide se uma importação entra na fila agora, depois ou não entra.
+
+        Args:
+            client_id: ID do cliente (ObjectId ou None)
+            numbers (int): Números válidos da importação
+            now (datetime, optional): Data da decisão em UTC (padrão: agora)
+
+        Returns:
+            Dict: 'decision' ('accepted', 'deferred' ou 'rejected'), 'estimated_start',
+                'scheduled_for' (só nos adiados) e os números na fila global e do cliente
+        """
+        now = now or datetime.utcnow()
+        if not self.enabled:
+            return {'decision': 'accepted', 'estimated_start': now, 'scheduled_for': None}
+
+        pending = self.get_pending(client_id)
+        queued, client_queued = pending['global']['numbers'], pending['client']['numbers']
+        per_minute = self.send_rate
+        estimated_start = now + timedelta(minutes=queued / per_minute)
+
+        # Números da fila que precisam sair antes desta importação caber em cada
+        # limite; uma importação nunca espera por uma fila vazia
+        excess = 0
+        if self.max_pending:
+            excess = max(excess, min(queued + numbers - self.max_pending, queued))
+        if self.max_pending_per_client:
+            excess = max(excess, min(client_queued + numbers - self.max_pending_per_client, client_queued))
+
+        decision = {
+            'decision': 'accepted',
+            'estimated_start': estimated_start,
+            'scheduled_for': None,
+            'pending_numbers': queued,
+            'client_pending_numbers': client_queued
+        }
+        if excess > 0:
+            delay = timedelta(minutes=excess / per_minute)
+            if delay > self.max_delay:
+                decision['decision'] = 'rejected'
+            else:
+                decision['decision'] = 'deferred'
+                decision['scheduled_for'] = now + delay
+                decision['estimated_start'] = max(estimated_start, decision['scheduled_for'])
+        ADMISSION_TOTAL[decision['decision']].inc()
+        return decision
+
+    def _increment(self, client_id, numbers: int, jobs: int):
+        now = datetime.utcnow()
+        counters = {'pending_numbers': int(numbers), 'pending_jobs': int(jobs)}
+        self.collection.bulk_write([
+            UpdateOne({'_id': key}, {'$inc': counters, '$set': {'updated_at': now}}, upsert=True)
+            for key in (GLOBAL_KEY, client_key(client_id))
+        ], ordered=False)
+        PENDING_NUMBERS.inc(numbers)
+
+    def reserve(self, client_id, numbers: int):
+        """
+        Soma os números de um registro que entrou na fila.
+        """
+        self._increment(client_id, numbers, 1)
+
+    def release(self, client_id, numbers: int):
+        """
+        Desconta os números de um registro que saiu da fila (enviado ou com falha).
+        """
+        self._increment(client_id, -numbers, -1)
+
+    def rebuild(self) -> int:
+        """
+        Reconstrói os contadores a partir dos registros na fila do histórico.
+
+        Deve ser executado com o dispatcher parado e sem importações em
+        andamento, para não perder incrementos concorrentes.
+
+        Returns:
+            int: Quantidade de documentos de contadores gravados
+        """
+        totals = {GLOBAL_KEY: {'pending_numbers': 0, 'pending_jobs': 0}}
+        for row in self.db['history'].aggregate([
+            {'$match': {'status': {'$in': list(QUEUED_STATUSES)}, 'queued_numbers': {'$exists': True}}},
+            {'$group': {'_id': '$client_id', 'numbers': {'$sum': '$queued_numbers'}, 'jobs': {'$sum': 1}}}
+        ], allowDiskUse=True):
+            totals[client_key(row['_id'])] = {'pending_numbers': row['numbers'], 'pending_jobs': row['jobs']}
+            totals[GLOBAL_KEY]['pending_numbers'] += row['numbers']
+            totals[GLOBAL_KEY]['pending_jobs'] += row['jobs']
+
+        now = datetime.utcnow()
+        # Zera os clientes que não têm mais nada na fila
+        self.collection.update_many(
+            {'_id': {'$nin': list(totals)}},
+            {'$set': {'pending_numbers': 0, 'pending_jobs': 0, 'updated_at': now}}
+        )
+        self.collection.bulk_write([
+            ReplaceOne({'_id': key}, dict(counters, updated_at=now), upsert=True)
+            for key, counters in totals.items()
+        ], ordered=False)
+        PENDING_NUMBERS.set(totals[GLOBAL_KEY]['pending_numbers'])
+        logger.info("Contadores da fila reconstruídos: %s números em %s registros",
+                    totals[GLOBAL_KEY]['pending_numbers'], totals[GLOBAL_KEY]['pending_jobs'])
+        return len(totals)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Contadores da fila do controle de admissão (queue_counters)")
+    parser.add_argument('--rebuild', action='store_true', help="Reconstrói os contadores a partir do histórico")
+    args = parser.parse_args(argv)
+    if args.rebuild:
+        print(f"{AdmissionService().rebuild()} documentos gravados em queue_counters")
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
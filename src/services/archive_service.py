@@ -0,0 +1,216 @@
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Dict, Iterator, List, Optional
+import argparse
+import gzip
+import logging
+import os
+import zlib
+from bson import ObjectId, json_util
+from pymongo import UpdateOne
+from ..database.mongodb import MongoDB
+from ..utils.config import get_setting
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+ARCHIVED_TOTAL = metrics.counter('sbsender_history_archived_total', 'Registros do histórico movidos para o arquivo')
+
+# Só registros finalizados são arquivados; pendentes continuam na fila do dispatcher
+ARCHIVE_STATUSES = ['completed', 'failed']
+# Registros por bloco gravado (um membro gzip por partição em cada bloco)
+ARCHIVE_BATCH_SIZE = 500
+# Bytes comprimidos lidos por vez de um membro do arquivo
+READ_BLOCK_BYTES = 64 * 1024
+# Campos mantidos no documento que fica no Mongo; o restante (listas de números,
+# detalhes, resposta do provedor) só existe no arquivo
+STUB_FIELDS = frozenset({
+    '_id', 'operation', 'method', 'total_processed', 'valid_count', 'invalid_count', 'filtered_counts',
+    'webhook_id', 'webhook_name', 'webhook_url', 'client_id', 'client_name', 'status', 'timestamp',
+    'processing_started_at', 'processed_at', 'response_status', 'error', 'chunks_total', 'chunks_sent',
+    'personalized', 'message_chunks', 'idempotency_key', 'delivery', 'delivery_updated_at',
+    'scheduled_for'
+})
+
+
+class ArchiveService:
+    """
+    Arquivamento do histórico antigo em arquivos JSONL comprimidos.
+
+    Registros finalizados com mais de HISTORY_ARCHIVE_DAYS dias são gravados em
+    HISTORY_ARCHIVE_DIR/<cliente>/<AAAA-MM>.jsonl.gz e, no Mongo, ficam só os
+    campos de STUB_FIELDS mais 'archived' com a localização no arquivo. Cada
+    execução acrescenta um membro gzip ao arquivo da partição; o registro guarda
+    a posição desse membro, então a leitura descomprime só ele.
+    """
+
+    def __init__(self, db=None, directory: Optional[str] = None, max_age_days: Optional[float] = None):
+        """
+        Args:
+            db: Banco de dados (padrão: conexão do MongoDB)
+            directory (str, optional): Diretório dos arquivos (padrão: HISTORY_ARCHIVE_DIR)
+            max_age_days (float, optional): Idade mínima para arquivar (padrão: HISTORY_ARCHIVE_DAYS; 0 desativa)
+        """
+        self.db = db if db is not None else MongoDB().get_database()
+        self.history_collection = self.db['history']
+        self.chunks_collection = self.db['message_chunks']
+        if directory is None:
+            directory = get_setting('app', 'history_archive_dir', 'HISTORY_ARCHIVE_DIR', 'archive')
+        if max_age_days is None:
+            max_age_days = get_setting('app', 'history_archive_days', 'HISTORY_ARCHIVE_DAYS', 0.0, cast=float)
+        self.directory = directory
+        self.max_age = timedelta(days=max_age_days)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_age.total_seconds() > 0
+
+    @staticmethod
+    def _partition(entry: Dict) -> str:
+        client = str(entry['client_id']) if entry.get('client_id') else 'sem_cliente'
+        return os.path.join(client, f"{entry['timestamp']:%Y-%m}.jsonl.gz")
+
+    def _append_member(self, partition: str, lines: List[bytes]) -> int:
+        """
+        Acrescenta as linhas como um novo membro gzip e retorna a posição dele.
+        """
+        path = os.path.join(self.directory, partition)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'ab') as file:
+            offset = file.tell()
+            file.write(gzip.compress(b''.join(lines)))
+            file.flush()
+            os.fsync(file.fileno())
+        return offset
+
+    def _archive_batch(self, entries: List[Dict]) -> int:
+        partitions = defaultdict(list)
+        for entry in entries:
+            if entry.get('personalized'):
+                # Os lotes de mensagens só servem ao envio; vão junto para o arquivo
+                entry['archived_message_chunks'] = list(
+                    self.chunks_collection.find({'history_id': entry['_id']}, {'_id': 0}).sort('seq', 1)
+                )
+            partitions[self._partition(entry)].append(entry)
+
+        archived_at = datetime.utcnow()
+        operations = []
+        for partition, group in partitions.items():
+            offset = self._append_member(partition, [json_util.dumps(entry).encode('utf-8') + b'\n' for entry in group])
+            for entry in group:
+                unset = {field: '' for field in entry if field not in STUB_FIELDS}
+                unset.pop('archived_message_chunks', None)
+                operations.append(UpdateOne(
+                    {'_id': entry['_id'], 'archived': {'$exists': False}},
+                    {
+                        '$set': {'archived': {'partition': partition, 'offset': offset, 'archived_at': archived_at}},
+                        **({'$unset': unset} if unset else {})
+                    }
+                ))
+
+        # O arquivo é gravado (fsync) antes de remover os campos do Mongo
+        self.history_collection.bulk_write(operations, ordered=False)
+        personalized = [entry['_id'] for entry in entries if entry.get('personalized')]
+        if personalized:
+            self.chunks_collection.delete_many({'history_id': {'$in': personalized}})
+        ARCHIVED_TOTAL.inc(len(entries))
+        return len(entries)
+
+    def archive_old(self, now: Optional[datetime] = None) -> int:
+        """
+        Arquiva os registros finalizados mais antigos que a idade configurada.
+
+        Returns:
+            int: Quantidade de registros arquivados
+        """
+        if not self.enabled:
+            return 0
+        cutoff = (now or datetime.utcnow()) - self.max_age
+        cursor = self.history_collection.find({
+            'timestamp': {'$lt': cutoff},
+            'status': {'$in': ARCHIVE_STATUSES},
+            'archived': {'$exists': False}
+        }).sort('timestamp', 1).batch_size(ARCHIVE_BATCH_SIZE)
+
+        total = 0
+        batch = []
+        for entry in cursor:
+            batch.append(entry)
+            if len(batch) >= ARCHIVE_BATCH_SIZE:
+                total += self._archive_batch(batch)
+                batch = []
+        if batch:
+            total += self._archive_batch(batch)
+        if total:
+            logger.info("%s registros do histórico arquivados em %s", total, self.directory)
+        return total
+
+    def iter_member(self, location: Dict) -> Iterator[Dict]:
+        """
+        Percorre os registros de um membro gzip do arquivo, uma linha por vez:
+        a memória depende do maior registro, não do tamanho do membro.
+
+        Args:
+            location (Dict): Campo 'archived' de um registro (partição e posição do membro)
+
+        Returns:
+            Iterator[Dict]: Registros completos, na ordem em que foram gravados
+        """
+        path = os.path.join(self.directory, location['partition'])
+        try:
+            file = open(path, 'rb')
+        except FileNotFoundError:
+            logger.error("Arquivo do histórico não encontrado: %s", path)
+            return
+        with file:
+            file.seek(location['offset'])
+            # Descomprime só o membro gravado junto com o registro
+            decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+            pending = b''
+            while not decompressor.eof:
+                block = file.read(READ_BLOCK_BYTES)
+                if not block:
+                    break
+                lines = (pending + decompressor.decompress(block)).split(b'\n')
+                # A última linha pode continuar no próximo bloco
+                pending = lines.pop()
+                for line in lines:
+                    if line:
+                        yield json_util.loads(line)
+            if pending:
+                yield json_util.loads(pending)
+
+    def fetch(self, entry: Dict) -> Optional[Dict]:
+        """
+        Lê do arquivo o registro completo correspondente a um registro arquivado,
+        parando de descomprimir ao encontrá-lo.
+
+        Args:
+            entry (Dict): Registro do Mongo com o campo 'archived'
+
+        Returns:
+            Optional[Dict]: Registro como estava no Mongo antes do arquivamento,
+            ou None se não for encontrado
+        """
+        location = entry.get('archived')
+        if not location:
+            return None
+        target = ObjectId(entry['_id'])
+        for record in self.iter_member(location):
+            if record['_id'] == target:
+                return record
+        return None
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Arquivamento do histórico antigo")
+    parser.add_argument('--days', type=float, help="Idade mínima em dias (padrão: HISTORY_ARCHIVE_DAYS)")
+    args = parser.parse_args(argv)
+    service = ArchiveService(max_age_days=args.days)
+    if not service.enabled:
+        parser.error("Informe --days ou configure HISTORY_ARCHIVE_DAYS")
+    print(f"{service.archive_old()} registros arquivados em {service.directory}")
+
+
+if __name__ == '__main__':
+    main()
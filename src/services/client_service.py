@@ -1,6 +1,8 @@
 from datetime import datetime
 from bson import ObjectId
 from ..database.mongodb import MongoDB
+from ..utils.logger import summarize_payload
+from .quota_service import QuotaService
 from typing import Dict, List, Optional
 import logging
 
@@ -15,11 +17,16 @@ class ClientService:
         self.collection = self.db['clients']
         logger.info("ClientService inicializado")
 
-    def create_client(self, name: str, description: str = None) -> Dict:
+    def create_client(self, name: str, description: str = None, monthly_quota: Optional[int] = None) -> Dict:
         """
         Cria um novo cliente.
+
+        Args:
+            name (str): Nome do cliente
+            description (str, optional): Descrição
+            monthly_quota (int, optional): Números importados por mês (None ou 0 = sem limite)
         """
-        logger.info(f"Iniciando criação de cliente - Nome: {name}")
+        logger.info("Iniciando criação de cliente - Nome: %s", name)
         
         # Verifica se já existe um cliente com o mesmo nome
         existing_client = self.collection.find_one({
@@ -27,21 +34,22 @@ class ClientService:
             'active': True
         })
         if existing_client:
-            logger.warning(f"Cliente com nome '{name}' já existe")
+            logger.warning("Cliente com nome '%s' já existe", name)
             raise ValueError(f"Já existe um cliente com o nome '{name}'")
         
         client = {
             'name': name.strip(),  # Remove espaços em branco
             'description': description.strip() if description else None,  # Remove espaços em branco
+            'monthly_quota': int(monthly_quota) if monthly_quota else None,
             'created_at': datetime.utcnow(),
             'updated_at': datetime.utcnow(),
             'active': True
         }
         
-        logger.debug(f"Dados do cliente a ser criado: {client}")
+        logger.debug("Dados do cliente a ser criado: %s", summarize_payload(client))
         result = self.collection.insert_one(client)
         client['_id'] = str(result.inserted_id)
-        logger.info(f"Cliente criado com sucesso. ID: {client['_id']}")
+        logger.info("Cliente criado com sucesso. ID: %s", client['_id'])
         return client
 
     def get_all_clients(self) -> List[Dict]:
@@ -52,27 +60,31 @@ class ClientService:
         clients = list(self.collection.find({'active': True}))
         for client in clients:
             client['_id'] = str(client['_id'])
-        logger.info(f"Total de clientes encontrados: {len(clients)}")
+        logger.info("Total de clientes encontrados: %s", len(clients))
         return clients
 
     def get_client_by_id(self, client_id: str) -> Optional[Dict]:
         """
         Busca um cliente pelo ID.
         """
-        logger.info(f"Buscando cliente pelo ID: {client_id}")
+        logger.info("Buscando cliente pelo ID: %s", client_id)
         client = self.collection.find_one({'_id': ObjectId(client_id), 'active': True})
         if client:
             client['_id'] = str(client['_id'])
-            logger.info(f"Cliente encontrado: {client['_id']}")
+            logger.info("Cliente encontrado: %s", client['_id'])
         else:
-            logger.info(f"Cliente não encontrado com ID: {client_id}")
+            logger.info("Cliente não encontrado com ID: %s", client_id)
         return client
 
-    def update_client(self, client_id: str, name: str, description: str = None) -> Optional[Dict]:
+    def update_client(self, client_id: str, name: str, description: str = None,
+                      monthly_quota: Optional[int] = None) -> Optional[Dict]:
         """
         Atualiza um cliente existente.
+
+        Args:
+            monthly_quota (int, optional): Nova cota mensal (0 = sem limite; None mantém a atual)
         """
-        logger.info(f"Atualizando cliente com ID: {client_id}")
+        logger.info("Atualizando cliente com ID: %s", client_id)
         
         # Verifica se já existe outro cliente com o mesmo nome
         existing_client = self.collection.find_one({
@@ -81,7 +93,7 @@ class ClientService:
             'active': True
         })
         if existing_client:
-            logger.warning(f"Outro cliente com nome '{name}' já existe")
+            logger.warning("Outro cliente com nome '%s' já existe", name)
             raise ValueError(f"Já existe outro cliente com o nome '{name}'")
         
         update_data = {
@@ -89,6 +101,8 @@ class ClientService:
             'description': description,
             'updated_at': datetime.utcnow()
         }
+        if monthly_quota is not None:
+            update_data['monthly_quota'] = int(monthly_quota) or None
         
         result = self.collection.update_one(
             {'_id': ObjectId(client_id), 'active': True},
@@ -96,17 +110,19 @@ class ClientService:
         )
         
         if result.modified_count:
-            logger.info(f"Cliente atualizado com sucesso: {client_id}")
+            if monthly_quota is not None:
+                QuotaService.invalidate(client_id)
+            logger.info("Cliente atualizado com sucesso: %s", client_id)
             client = self.get_client_by_id(client_id)
             return client
-        logger.info(f"Cliente não encontrado ou não atualizado: {client_id}")
+        logger.info("Cliente não encontrado ou não atualizado: %s", client_id)
         return None
 
     def delete_client(self, client_id: str) -> bool:
         """
         Desativa um cliente (soft delete).
         """
-        logger.info(f"Desativando cliente com ID: {client_id}")
+        logger.info("Desativando cliente com ID: %s", client_id)
         result = self.collection.update_one(
             {'_id': ObjectId(client_id), 'active': True},
             {
@@ -117,7 +133,7 @@ class ClientService:
             }
         )
         if result.modified_count:
-            logger.info(f"Cliente desativado com sucesso: {client_id}")
+            logger.info("Cliente desativado com sucesso: %s", client_id)
         else:
-            logger.info(f"Cliente não encontrado ou não desativado: {client_id}")
+            logger.info("Cliente não encontrado ou não desativado: %s", client_id)
         return bool(result.modified_count)
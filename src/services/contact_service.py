@@ -1,76 +1,135 @@
-from typing import Dict, List, Optional, Any
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import numpy as np
 import pandas as pd
-from ..utils.phone_utils import format_phone_number
+from ..utils.phone_index import PhoneIndex
+from ..utils.ddd_table import ddd_counts, summarize_ddd_counts
+from ..utils.parallel_normalize import ParallelNormalizer
+from ..utils.phone_cache import get_phone_cache
+from ..utils.phone_digest import PhoneSetDigest
+from ..utils.template_utils import MessageTemplate
+from ..utils.import_readers import inspect_file, iter_blocks, iter_stream_blocks, split_numbers
+from ..utils.config import get_setting
 from .message_service import MessageService
 from datetime import datetime
 from bson import ObjectId
 from ..database.mongodb import MongoDB
+from ..utils.metrics import metrics
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Métricas do pipeline de importação
+PROCESS_SECONDS = metrics.histogram('sbsender_process_contacts_seconds', 'Duração do processamento de contatos')
+NUMBERS_TOTAL = {
+    status: metrics.counter('sbsender_import_numbers_total', 'Números processados nas importações', status=status)
+    for status in ('valid', 'invalid')
+}
+
+# Linhas processadas por bloco nas importações
+IMPORT_BLOCK_ROWS = 50000
+# Mensagens por lote gravado em 'message_chunks' (e por POST ao provedor)
+DEFAULT_MESSAGE_CHUNK_SIZE = 1000
+# Mensagens renderizadas devolvidas como amostra no resultado
+PREVIEW_MESSAGES = 5
+
 class ContactService:
-    def __init__(self, history_service=None):
+    def __init__(self, history_service=None, suppression_service=None, frequency_service=None, workers: Optional[int] = None):
         """
         Inicializa o serviço de contatos.
         
         Args:
             history_service: Serviço para registro de histórico (opcional)
+            suppression_service: Serviço da lista de supressão (opcional)
+            frequency_service: Serviço de limite de frequência por número (opcional)
+            workers (int, optional): Processos usados na normalização (padrão: IMPORT_PROCESS_WORKERS; 0 = no próprio processo)
         """
         self.history_service = history_service
+        self.suppression_service = suppression_service
+        self.frequency_service = frequency_service
+        if workers is None:
+            workers = get_setting('app', 'import_process_workers', 'IMPORT_PROCESS_WORKERS', 0, cast=int)
+        self.normalizer = ParallelNormalizer(workers)
+        # Cache de normalização compartilhado pelo processo (None se PHONE_CACHE_SIZE=0)
+        self.phone_cache = get_phone_cache()
         self.message_service = MessageService()
 
-    def process_contacts(self, input_text: str, webhook_url: str, webhook_id: str, webhook_name: str, method: str = 'txt') -> Dict[str, Any]:
+    def _normalize(self, strings: List[str]) -> np.ndarray:
+        """
+        Normaliza os números do bloco, consultando o cache antes do normalizador.
+        """
+        if self.phone_cache is None:
+            return self.normalizer.normalize(strings)
+        return self.phone_cache.normalize(strings, self.normalizer.normalize)
+
+    def _filter_mask(self, values: np.ndarray, client_id: Optional[str], filtered_counts: Dict[str, int], seen: Optional[PhoneIndex] = None) -> np.ndarray:
+        """
+        Retorna a máscara dos números válidos (int64) que seguem para envio.
+        
+        Remove, nesta ordem, os números repetidos (mantendo a primeira ocorrência,
+        inclusive em relação aos números em 'seen'), os da lista de supressão e os
+        contatados pelo cliente dentro da janela de frequência. As quantidades
+        descartadas são somadas em filtered_counts.
+        """
+        keep = ~pd.Series(values).duplicated().to_numpy()
+        if seen is not None:
+            keep &= ~seen.contains(values)
+        filtered_counts['duplicates'] = filtered_counts.get('duplicates', 0) + int(len(values) - keep.sum())
+        positions = np.flatnonzero(keep)
+        
+        # Remove os números da lista de supressão (opt-out)
+        if self.suppression_service is not None and len(positions):
+            suppressed = self.suppression_service.suppressed_mask(values[positions])
+            filtered_counts['suppressed'] = filtered_counts.get('suppressed', 0) + int(suppressed.sum())
+            positions = positions[~suppressed]
+        
+        # Remove os números já contatados pelo cliente dentro da janela de frequência
+        if self.frequency_service is not None and client_id and len(positions):
+            capped = self.frequency_service.recently_contacted_mask(client_id, values[positions])
+            filtered_counts['frequency_capped'] = filtered_counts.get('frequency_capped', 0) + int(capped.sum())
+            positions = positions[~capped]
+        
+        keep = np.zeros(len(values), dtype=bool)
+        keep[positions] = True
+        return keep
+
+    def process_contacts(self, input_text: str, webhook_url: str, webhook_id: str, webhook_name: str, method: str = 'txt', client_id: Optional[str] = None, progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, Any]:
         """
         Processa uma lista de contatos a partir de um texto.
         
         Args:
-            input_text (str): Texto com os números de telefone
+            input_text (str): Texto com os números de telefone (um por linha ou separados por vírgula)
             webhook_url (str): URL do webhook para envio
             webhook_id (str): ID do webhook para registro
             webhook_name (str): Nome do webhook selecionado
             method (str): Método de importação ('txt' ou 'csv')
+            client_id (str, optional): ID do cliente, usado no limite de frequência
+            progress (Callable, optional): Recebe o progresso acumulado a cada bloco processado
             
         Returns:
             Dict[str, Any]: Resultado do processamento com números válidos e inválidos
         """
-        # Divide o texto em linhas e remove espaços em branco
-        numbers = [line.strip() for line in input_text.split('\n') if line.strip()]
+        # Separa os números por quebra de linha ou vírgula e remove espaços em branco
+        numbers = split_numbers(input_text)
         
-        # Processa cada número
-        valid_numbers = []
-        invalid_numbers = []
-        
-        for number in numbers:
-            formatted = format_phone_number(number)
-            if formatted:
-                valid_numbers.append(formatted)
-            else:
-                invalid_numbers.append(number)
-        
-        result = {
-            "valid_numbers": valid_numbers,
-            "invalid_numbers": invalid_numbers,
-            "total_processed": len(numbers),
-            "total_valid": len(valid_numbers),
-            "total_invalid": len(invalid_numbers),
-            "timestamp": datetime.now().isoformat()
-        }
-        
-        # Registra a operação no histórico
-        if self.history_service:
-            self.history_service.register_import(
-                valid_numbers=valid_numbers,
-                invalid_numbers=invalid_numbers,
-                webhook_id=webhook_id,
-                webhook_name=webhook_name,
-                webhook_url=webhook_url,
-                method=method
-            )
+        def blocks():
+            bytes_processed = 0
+            for start in range(0, len(numbers), IMPORT_BLOCK_ROWS):
+                block = numbers[start:start + IMPORT_BLOCK_ROWS]
+                bytes_processed += sum(len(number) + 1 for number in block)
+                yield pd.DataFrame({'phone': block}, dtype=object), bytes_processed
         
-        return result
+        return self._import_blocks(
+            blocks(), 'phone',
+            webhook_url=webhook_url,
+            webhook_id=webhook_id,
+            webhook_name=webhook_name,
+            method=method,
+            client_id=client_id,
+            progress=progress
+        )
 
-    def process_csv(self, file_content: bytes, column_name: str, webhook_url: str, webhook_id: str, webhook_name: str, method: str = 'csv') -> Dict[str, Any]:
+    def process_csv(self, file_content: bytes, column_name: str, webhook_url: str, webhook_id: str, webhook_name: str, method: str = 'csv', client_id: Optional[str] = None, message_template: Optional[str] = None, progress: Optional[Callable[[Dict[str, int]], None]] = None, csv_format: Optional[Dict] = None) -> Dict[str, Any]:
         """
         Processa contatos a partir de um arquivo CSV.
         
@@ -81,32 +140,275 @@ class ContactService:
             webhook_id (str): ID do webhook para registro
             webhook_name (str): Nome do webhook selecionado
             method (str): Método de importação ('txt' ou 'csv')
+            client_id (str, optional): ID do cliente, usado no limite de frequência
+            message_template (str, optional): Mensagem personalizada com colunas do CSV, ex.: "Olá {nome}"
+            progress (Callable, optional): Recebe o progresso acumulado a cada bloco processado
+            csv_format (Dict, optional): Resultado de sniff_csv; se omitido, é detectado aqui
             
         Returns:
             Dict[str, Any]: Resultado do processamento
         """
-        try:
-            # Lê o CSV
-            df = pd.read_csv(pd.io.common.BytesIO(file_content))
+        return self.process_file(
+            file_content, 'contatos.csv', column_name,
+            webhook_url=webhook_url,
+            webhook_id=webhook_id,
+            webhook_name=webhook_name,
+            method=method,
+            client_id=client_id,
+            message_template=message_template,
+            progress=progress,
+            file_format=csv_format
+        )
+
+    def process_file(self, file_content: bytes, file_name: str, column_name: str, webhook_url: str, webhook_id: str, webhook_name: str, method: str = 'csv', client_id: Optional[str] = None, message_template: Optional[str] = None, progress: Optional[Callable[[Dict[str, int]], None]] = None, file_format: Optional[Dict] = None) -> Dict[str, Any]:
+        """
+        Processa contatos a partir de um arquivo CSV, TXT ou XLSX, comprimido ou não (.gz, .zip).
+        
+        O arquivo é lido uma única vez, em blocos de IMPORT_BLOCK_ROWS linhas,
+        apenas com a coluna dos números e as colunas usadas pelo template
+        (ver import_readers).
+        
+        Args:
+            file_content (bytes): Conteúdo do arquivo
+            file_name (str): Nome do arquivo, usado para identificar o formato
+            column_name (str): Nome da coluna que contém os números
+            webhook_url (str): URL do webhook para envio
+            webhook_id (str): ID do webhook para registro
+            webhook_name (str): Nome do webhook selecionado
+            method (str): Método de importação ('txt' ou 'csv')
+            client_id (str, optional): ID do cliente, usado no limite de frequência
+            message_template (str, optional): Mensagem personalizada com colunas do arquivo, ex.: "Olá {nome}"
+            progress (Callable, optional): Recebe o progresso acumulado a cada bloco processado
+            file_format (Dict, optional): Resultado de inspect_file; se omitido, é detectado aqui
             
-            if column_name not in df.columns:
-                return {"error": f"Coluna '{column_name}' não encontrada no arquivo"}
+        Returns:
+            Dict[str, Any]: Resultado do processamento
+        """
+        try:
+            file_format = file_format or inspect_file(file_content, file_name)
+            return self._import_format(
+                file_format, lambda usecols: iter_blocks(file_content, file_format, usecols, IMPORT_BLOCK_ROWS),
+                column_name, message_template,
+                webhook_url=webhook_url,
+                webhook_id=webhook_id,
+                webhook_name=webhook_name,
+                method=method,
+                client_id=client_id,
+                progress=progress
+            )
             
-            # Extrai os números da coluna selecionada
-            numbers = df[column_name].astype(str).tolist()
-            numbers_text = '\n'.join(numbers)
+        except Exception as e:
+            return {"error": f"Erro ao processar arquivo: {str(e)}"}
+
+    def process_stream(self, stream, file_format: Dict, column_name: str, webhook_url: str, webhook_id: str, webhook_name: str, method: str = 'api', client_id: Optional[str] = None, message_template: Optional[str] = None, progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, Any]:
+        """
+        Processa contatos lidos de um stream CSV, TXT ou NDJSON (ex.: o corpo de
+        uma requisição da API), em blocos de IMPORT_BLOCK_ROWS linhas.
+        
+        Args:
+            stream: Arquivo binário posicionado no início
+            file_format (Dict): Resultado de inspect_stream
+            column_name (str): Nome da coluna (ou campo do NDJSON) que contém os números
+            webhook_url (str): URL do webhook para envio
+            webhook_id (str): ID do webhook para registro
+            webhook_name (str): Nome do webhook selecionado
+            method (str): Método de importação registrado no histórico
+            client_id (str, optional): ID do cliente, usado no limite de frequência
+            message_template (str, optional): Mensagem personalizada com colunas do arquivo, ex.: "Olá {nome}"
+            progress (Callable, optional): Recebe o progresso acumulado a cada bloco processado
             
-            # Usa o método process_contacts para processar os números
-            return self.process_contacts(
-                numbers_text,
+        Returns:
+            Dict[str, Any]: Resultado do processamento
+        """
+        try:
+            return self._import_format(
+                file_format, lambda usecols: iter_stream_blocks(stream, file_format, usecols, IMPORT_BLOCK_ROWS),
+                column_name, message_template,
                 webhook_url=webhook_url,
                 webhook_id=webhook_id,
                 webhook_name=webhook_name,
-                method=method
+                method=method,
+                client_id=client_id,
+                progress=progress
             )
             
         except Exception as e:
-            return {"error": f"Erro ao processar arquivo CSV: {str(e)}"}
+            return {"error": f"Erro ao processar arquivo: {str(e)}"}
+
+    def _import_format(self, file_format: Dict, open_blocks: Callable[[List[str]], Iterable[Tuple[pd.DataFrame, int]]], column_name: str, message_template: Optional[str], **kwargs) -> Dict[str, Any]:
+        """
+        Valida a coluna dos números e o template contra as colunas detectadas e
+        processa os blocos lidos só com as colunas necessárias.
+        """
+        template = MessageTemplate(message_template) if message_template and message_template.strip() else None
+        if template is not None and self.history_service is None:
+            return {"error": "Mensagens personalizadas exigem o serviço de histórico"}
+        
+        header = file_format['columns']
+        if column_name not in header:
+            return {"error": f"Coluna '{column_name}' não encontrada no arquivo"}
+        if template is not None:
+            missing = template.missing_fields(header)
+            if missing:
+                return {"error": f"Colunas do template não encontradas no arquivo: {', '.join(missing)}"}
+        
+        usecols = list(dict.fromkeys([column_name] + (template.fields if template else [])))
+        return self._import_blocks(open_blocks(usecols), column_name, template=template, **kwargs)
+
+    def _import_blocks(self, blocks: Iterable[Tuple[pd.DataFrame, int]], column_name: str, webhook_url: str, webhook_id: str, webhook_name: str, method: str, client_id: Optional[str] = None, template: Optional[MessageTemplate] = None, progress: Optional[Callable[[Dict[str, int]], None]] = None) -> Dict[str, Any]:
+        """
+        Processa uma importação bloco a bloco.
+        
+        Para cada bloco os números são normalizados e filtrados; com template, as
+        mensagens do bloco são renderizadas de forma vetorizada e gravadas em
+        lotes na collection 'message_chunks'. Em memória fica apenas o bloco atual
+        e os números válidos em int64.
+        
+        Args:
+            blocks (Iterable[Tuple[pd.DataFrame, int]]): Blocos de linhas e bytes lidos até o fim de cada bloco
+            column_name (str): Coluna com os números
+            template (MessageTemplate, optional): Template das mensagens personalizadas
+            progress (Callable, optional): Recebe o progresso acumulado a cada bloco processado
+            
+        Returns:
+            Dict[str, Any]: Resultado do processamento
+        """
+        started_at = time.perf_counter()
+        history_id = ObjectId()
+        chunk_size = get_setting('provider', 'chunk_size', 'PROVIDER_CHUNK_SIZE', 0, cast=int) or DEFAULT_MESSAGE_CHUNK_SIZE
+        chunks_written = 0
+        
+        seen = PhoneIndex()
+        filtered_counts = {}
+        valid_parts = []
+        valid_total = 0
+        invalid_numbers = []
+        preview = []
+        total_rows = 0
+        pending_numbers = np.zeros(0, dtype=np.int64)
+        pending_messages = []
+        ddd_totals = np.zeros(100, dtype=np.int64)
+        # Resumo do conjunto de números válidos, base da chave de idempotência
+        digest = PhoneSetDigest()
+        
+        try:
+            for frame, bytes_processed in blocks:
+                numbers = frame[column_name].fillna('').str.strip()
+                present = (numbers != '').to_numpy()
+                frame, numbers = frame[present], numbers[present]
+                total_rows += len(frame)
+                
+                # Normaliza todos os números do bloco de uma vez (0 = inválido)
+                normalized = self._normalize(numbers.tolist())
+                valid_mask = normalized > 0
+                invalid_numbers.extend(numbers[~valid_mask].tolist())
+                frame, values = frame[valid_mask], normalized[valid_mask]
+                
+                # Remove repetidos (também entre blocos), suprimidos e contatados recentemente
+                keep = self._filter_mask(values, client_id, filtered_counts, seen)
+                frame, values = frame[keep], values[keep]
+                seen.add(values)
+                ddd_totals += ddd_counts(values)
+                digest.update(values)
+                valid_parts.append(values)
+                valid_total += len(values)
+                
+                if template is not None:
+                    # Renderiza só as mensagens do bloco atual e grava os lotes completos
+                    messages = template.render_frame(frame).tolist()
+                    if len(preview) < PREVIEW_MESSAGES:
+                        preview.extend(messages[:PREVIEW_MESSAGES - len(preview)])
+                    pending_numbers = np.concatenate([pending_numbers, values])
+                    pending_messages.extend(messages)
+                    
+                    complete = len(pending_messages) - len(pending_messages) % chunk_size
+                    for start in range(0, complete, chunk_size):
+                        self.history_service.store_message_chunk(
+                            history_id, chunks_written,
+                            pending_numbers[start:start + chunk_size],
+                            pending_messages[start:start + chunk_size]
+                        )
+                        chunks_written += 1
+                    pending_numbers = pending_numbers[complete:]
+                    pending_messages = pending_messages[complete:]
+                
+                if progress is not None:
+                    progress({
+                        'rows_read': total_rows,
+                        'valid': valid_total,
+                        'invalid': len(invalid_numbers),
+                        'bytes_processed': bytes_processed
+                    })
+            
+            if pending_messages:
+                self.history_service.store_message_chunk(history_id, chunks_written, pending_numbers, pending_messages)
+                chunks_written += 1
+            
+            valid = np.concatenate(valid_parts) if valid_parts else np.zeros(0, dtype=np.int64)
+            valid_numbers = valid.astype(str).tolist()
+            breakdown = summarize_ddd_counts(ddd_totals)
+            
+            result = {
+                "valid_numbers": valid_numbers,
+                "invalid_numbers": invalid_numbers,
+                "total_processed": total_rows,
+                "total_valid": len(valid_numbers),
+                "total_invalid": len(invalid_numbers),
+                "total_duplicates": filtered_counts.get('duplicates', 0),
+                "total_suppressed": filtered_counts.get('suppressed', 0),
+                "total_frequency_capped": filtered_counts.get('frequency_capped', 0),
+                "ddd_breakdown": breakdown['by_ddd'],
+                "state_breakdown": breakdown['by_state'],
+                "timestamp": datetime.now().isoformat()
+            }
+            if template is not None:
+                result.update({
+                    "personalized": True,
+                    "message_chunks": chunks_written,
+                    "preview_messages": preview
+                })
+            NUMBERS_TOTAL['valid'].inc(len(valid_numbers))
+            NUMBERS_TOTAL['invalid'].inc(len(invalid_numbers))
+            
+            # Registra a operação no histórico
+            if self.history_service:
+                entry = self.history_service.register_import(
+                    valid_numbers=valid_numbers,
+                    invalid_numbers=invalid_numbers,
+                    webhook_id=webhook_id,
+                    webhook_name=webhook_name,
+                    webhook_url=webhook_url,
+                    method=method,
+                    filtered_counts=filtered_counts,
+                    history_id=history_id,
+                    message_template=template.template if template is not None else None,
+                    message_chunks=chunks_written,
+                    numbers_digest=digest.hexdigest()
+                )
+                result["history_id"] = entry['_id']
+                if entry.get('admission'):
+                    result["admission"] = entry['admission']
+                if entry.get('quota'):
+                    result["quota"] = entry['quota']
+                if entry.get('duplicate'):
+                    # Importação idêntica já registrada: nada novo para enviar
+                    result["duplicate_of"] = entry['_id']
+                    if chunks_written:
+                        self.history_service.delete_message_chunks(history_id)
+                elif entry.get('status') == 'rejected':
+                    # Recusada pelo controle de admissão ou pela cota: nada foi gravado no histórico
+                    result["rejected"] = True
+                    if chunks_written:
+                        self.history_service.delete_message_chunks(history_id)
+            
+            PROCESS_SECONDS.observe(time.perf_counter() - started_at)
+            return result
+            
+        except Exception:
+            # Não deixa lotes de mensagens órfãos de uma importação que falhou
+            if chunks_written:
+                self.history_service.delete_message_chunks(history_id)
+            raise
 
     def send_messages(self, numbers: List[str], message: str, webhook_url: str, webhook_id: str) -> Dict[str, Any]:
         """
@@ -146,62 +448,3 @@ class ContactService:
                 "success": False,
                 "message": f"Erro ao enviar mensagens: {str(e)}"
             }
-
-    def get_history(self, client_id: str = None) -> List[Dict]:
-        """
-        Retorna o histórico de envios, opcionalmente filtrado por cliente.
-        """
-        try:
-            # Busca o webhook relacionado ao cliente
-            if client_id:
-                webhook_ids = []
-                webhooks = list(self.history_service.db['webhooks'].find({'client_id': ObjectId(client_id)}))
-                for webhook in webhooks:
-                    webhook_ids.append(webhook['_id'])
-                
-                query = {
-                    'status': {'$exists': True},
-                    'webhook_id': {'$in': webhook_ids}
-                }
-            else:
-                query = {'status': {'$exists': True}}
-            
-            history = list(self.history_service.history_collection.find(query).sort('timestamp', -1))
-            
-            # Converte ObjectId para string para serialização
-            for entry in history:
-                entry['_id'] = str(entry['_id'])
-                if 'client_id' in entry:
-                    entry['client_id'] = str(entry['client_id'])
-                if 'webhook_id' in entry:
-                    entry['webhook_id'] = str(entry['webhook_id'])
-                if 'timestamp' in entry:
-                    entry['created_at'] = entry['timestamp']
-                # Adiciona campos necessários se não existirem
-                if 'method' not in entry:
-                    entry['method'] = 'txt'
-                if 'total_processed' not in entry:
-                    entry['total_processed'] = len(entry.get('valid_numbers', []))
-                if 'valid_numbers' not in entry:
-                    entry['valid_numbers'] = entry.get('numbers', [])
-                if 'invalid_numbers' not in entry:
-                    entry['invalid_numbers'] = []
-                
-                # Busca o nome do cliente pelo webhook
-                if 'webhook_id' in entry:
-                    webhook = self.history_service.db['webhooks'].find_one({'_id': ObjectId(entry['webhook_id'])})
-                    if webhook and 'client_id' in webhook:
-                        client = self.history_service.db['clients'].find_one({'_id': webhook['client_id']})
-                        if client:
-                            entry['client_name'] = client['name']
-                        else:
-                            entry['client_name'] = 'Cliente'
-                    else:
-                        entry['client_name'] = 'Cliente'
-                else:
-                    entry['client_name'] = 'Cliente'
-            
-            return history
-        except Exception as e:
-            logger.error(f"Erro ao buscar histórico: {str(e)}")
-            raise Exception(f"Erro ao buscar histórico: {str(e)}")
@@ -0,0 +1,266 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+import logging
+import threading
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+from ..database.mongodb import MongoDB
+from ..utils.config import get_setting
+from ..utils.metrics import metrics
+from ..utils.phone_utils import normalize_phone_array
+
+logger = logging.getLogger(__name__)
+
+EVENTS_TOTAL = {
+    result: metrics.counter('sbsender_delivery_events_total', 'Eventos de status de entrega por resultado', result=result)
+    for result in ('accepted', 'rejected', 'applied', 'stale')
+}
+FLUSH_SECONDS = metrics.histogram('sbsender_delivery_flush_seconds', 'Duração de cada gravação em lote dos status de entrega')
+BUFFERED_EVENTS = metrics.gauge('sbsender_delivery_buffered_events', 'Eventos de entrega aguardando gravação')
+
+# Status aceitos e a ordem entre eles: um evento só substitui um status de
+# ordem menor (um 'delivered' atrasado não desfaz um 'read'; um 'delivered'
+# depois de 'failed' indica que a nova tentativa do provedor deu certo)
+DELIVERY_STATUSES = {'sent': 1, 'failed': 2, 'delivered': 3, 'read': 4}
+# Eventos acumulados que disparam uma gravação antes do intervalo
+DEFAULT_FLUSH_SIZE = 5000
+# Intervalo máximo entre gravações, em segundos
+DEFAULT_FLUSH_INTERVAL = 0.5
+# Eventos em memória a partir dos quais novos envios são recusados
+DEFAULT_MAX_BUFFERED = 200000
+# Operações por bulk_write e números por consulta $in
+WRITE_BATCH_SIZE = 1000
+
+
+class DeliveryBacklogFull(Exception):
+    """
+    A fila de eventos em memória está cheia; o provedor deve reenviar depois.
+    """
+
+
+class DeliveryService:
+    """
+    Recebe os eventos de status por número enviados pelo provedor (callback) e
+    os grava em lote.
+
+    Os eventos são validados e acumulados em memória; uma thread grava o
+    acumulado a cada DELIVERY_FLUSH_INTERVAL segundos, ou antes, ao atingir
+    DELIVERY_FLUSH_SIZE eventos. Cada gravação:
+
+    - mantém só o evento de maior ordem de cada (registro, número);
+    - lê o status atual desses números (uma consulta $in por registro);
+    - grava em 'delivery_status' (um documento por registro e número, com o
+      telefone em int64) só os que avançam de status, com bulk_write;
+    - ajusta com $inc os contadores 'delivery.<status>' do registro no histórico.
+
+    Os contadores são exatos com um único processo recebendo os callbacks; a
+    atualização condicional ao status lido impede regressões de status mesmo
+    com mais de um processo.
+    """
+
+    def __init__(self, db=None, flush_size: Optional[int] = None, flush_interval: Optional[float] = None, max_buffered: Optional[int] = None):
+        """
+        Args:
+            db: Banco de dados (padrão: conexão do MongoDB)
+            flush_size (int, optional): Eventos que disparam uma gravação (padrão: DELIVERY_FLUSH_SIZE)
+            flush_interval (float, optional): Segundos entre gravações (padrão: DELIVERY_FLUSH_INTERVAL)
+            max_buffered (int, optional): Limite de eventos em memória (padrão: DELIVERY_MAX_BUFFERED)
+        """
+        self.db = db if db is not None else MongoDB().get_database()
+        self.collection = self.db['delivery_status']
+        self.history_collection = self.db['history']
+        if flush_size is None:
+            flush_size = get_setting('delivery', 'flush_size', 'DELIVERY_FLUSH_SIZE', DEFAULT_FLUSH_SIZE, cast=int)
+        if flush_interval is None:
+            flush_interval = get_setting('delivery', 'flush_interval', 'DELIVERY_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL, cast=float)
+        if max_buffered is None:
+            max_buffered = get_setting('delivery', 'max_buffered', 'DELIVERY_MAX_BUFFERED', DEFAULT_MAX_BUFFERED, cast=int)
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_buffered = max_buffered
+
+        # (history_id, telefone como recebido, status, erro, recebido em)
+        self._buffer: List[Tuple[ObjectId, str, str, Optional[str], datetime]] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    def submit(self, events: Iterable[Dict]) -> Dict[str, int]:
+        """
+        Valida os eventos e os coloca na fila de gravação.
+
+        Cada evento tem 'history_id' (enviado ao provedor no payload), 'phone',
+        'status' (um de DELIVERY_STATUSES) e, opcionalmente, 'error'.
+
+        Returns:
+            Dict[str, int]: 'accepted' e 'rejected'
+
+        Raises:
+            DeliveryBacklogFull: Se a fila estiver cheia
+        """
+        received_at = datetime.utcnow()
+        accepted = []
+        rejected = 0
+        for event in events:
+            if not isinstance(event, dict):
+                rejected += 1
+                continue
+            status = str(event.get('status') or '').lower()
+            history_id = event.get('history_id')
+            phone = event.get('phone')
+            if status not in DELIVERY_STATUSES or not phone or not ObjectId.is_valid(history_id):
+                rejected += 1
+                continue
+            error = event.get('error')
+            accepted.append((ObjectId(history_id), str(phone), status, str(error)[:500] if error else None, received_at))
+
+        with self._lock:
+            if len(self._buffer) + len(accepted) > self.max_buffered:
+                raise DeliveryBacklogFull(f"Fila de eventos de entrega cheia ({len(self._buffer)} eventos)")
+            self._buffer.extend(accepted)
+            buffered = len(self._buffer)
+        BUFFERED_EVENTS.set(buffered)
+        EVENTS_TOTAL['accepted'].inc(len(accepted))
+        EVENTS_TOTAL['rejected'].inc(rejected)
+        if buffered >= self.flush_size:
+            self._wake.set()
+        return {'accepted': len(accepted), 'rejected': rejected}
+
+    def flush(self) -> int:
+        """
+        Grava os eventos acumulados. Em caso de erro, eles voltam para a fila.
+
+        Returns:
+            int: Quantidade de números com status atualizado
+        """
+        with self._flush_lock:
+            with self._lock:
+                events, self._buffer = self._buffer, []
+            if not events:
+                return 0
+            try:
+                with FLUSH_SECONDS.time():
+                    return self._apply(events)
+            except Exception:
+                with self._lock:
+                    self._buffer[:0] = events[:max(self.max_buffered - len(self._buffer), 0)]
+                raise
+            finally:
+                BUFFERED_EVENTS.set(len(self._buffer))
+
+    def _apply(self, events: List[Tuple]) -> int:
+        # Normaliza todos os telefones do lote de uma vez (0 = inválido)
+        phones = normalize_phone_array([event[1] for event in events]).tolist()
+
+        # Mantém o evento de maior ordem de cada número (o mais recente em empate)
+        latest: Dict[ObjectId, Dict[int, Tuple]] = defaultdict(dict)
+        rejected = 0
+        for (history_id, _, status, error, received_at), phone in zip(events, phones):
+            if not phone:
+                rejected += 1
+                continue
+            current = latest[history_id].get(phone)
+            if current is None or DELIVERY_STATUSES[status] >= DELIVERY_STATUSES[current[0]]:
+                latest[history_id][phone] = (status, error, received_at)
+        EVENTS_TOTAL['rejected'].inc(rejected)
+
+        operations = []
+        history_operations = []
+        stale = 0
+        now = datetime.utcnow()
+        for history_id, updates in latest.items():
+            numbers = list(updates)
+            previous = {}
+            for start in range(0, len(numbers), WRITE_BATCH_SIZE):
+                for doc in self.collection.find(
+                    {'history_id': history_id, 'phone': {'$in': numbers[start:start + WRITE_BATCH_SIZE]}},
+                    {'_id': 0, 'phone': 1, 'status': 1}
+                ):
+                    previous[doc['phone']] = doc['status']
+
+            counters = defaultdict(int)
+            for phone, (status, error, received_at) in updates.items():
+                old = previous.get(phone)
+                if old is not None and DELIVERY_STATUSES.get(old, 0) >= DELIVERY_STATUSES[status]:
+                    stale += 1
+                    continue
+                fields = {'status': status, 'updated_at': received_at}
+                if error:
+                    fields['error'] = error
+                if old is None:
+                    operations.append(UpdateOne({'history_id': history_id, 'phone': phone}, {'$set': fields}, upsert=True))
+                else:
+                    # Só aplica se o status não mudou desde a leitura
+                    operations.append(UpdateOne({'history_id': history_id, 'phone': phone, 'status': old}, {'$set': fields}))
+                    counters[f'delivery.{old}'] -= 1
+                counters[f'delivery.{status}'] += 1
+
+            counters = {name: value for name, value in counters.items() if value}
+            if counters:
+                history_operations.append(UpdateOne(
+                    {'_id': history_id},
+                    {'$inc': counters, '$set': {'delivery_updated_at': now}}
+                ))
+
+        for start in range(0, len(operations), WRITE_BATCH_SIZE):
+            try:
+                self.collection.bulk_write(operations[start:start + WRITE_BATCH_SIZE], ordered=False)
+            except BulkWriteError as e:
+                # Upsert concorrente do mesmo número em outro processo; o primeiro vence
+                duplicates = [error for error in e.details.get('writeErrors', []) if error.get('code') == 11000]
+                if len(duplicates) != len(e.details.get('writeErrors', [])):
+                    raise
+                logger.warning("%s status de entrega gravados em paralelo por outro processo", len(duplicates))
+        for start in range(0, len(history_operations), WRITE_BATCH_SIZE):
+            self.history_collection.bulk_write(history_operations[start:start + WRITE_BATCH_SIZE], ordered=False)
+
+        EVENTS_TOTAL['applied'].inc(len(operations))
+        EVENTS_TOTAL['stale'].inc(stale)
+        return len(operations)
+
+    def start(self):
+        """
+        Inicia a thread de gravação periódica (uma vez por instância).
+        """
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._flush_loop, name='delivery-flush', daemon=True)
+            self._thread.start()
+        logger.info("Gravação de status de entrega a cada %ss ou %s eventos", self.flush_interval, self.flush_size)
+
+    def stop(self):
+        """
+        Para a thread de gravação e grava o que restou na fila.
+        """
+        self._stopped.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+        self.flush()
+
+    def _flush_loop(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Erro ao gravar status de entrega: %s", e)
+
+    def get_status_counts(self, history_id) -> Dict[str, int]:
+        """
+        Conta os números de um registro por status a partir de 'delivery_status'
+        (usado para conferir os contadores do histórico).
+        """
+        counts = {status: 0 for status in DELIVERY_STATUSES}
+        for row in self.collection.aggregate([
+            {'$match': {'history_id': ObjectId(history_id)}},
+            {'$group': {'_id': '$status', 'count': {'$sum': 1}}}
+        ]):
+            counts[row['_id']] = row['count']
+        return counts
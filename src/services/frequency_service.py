@@ -0,0 +1,90 @@
+from datetime import datetime, timedelta
+from typing import Optional
+import logging
+import numpy as np
+from bson import ObjectId
+from pymongo import UpdateOne
+from ..database.mongodb import MongoDB
+from ..utils.config import get_setting
+from ..utils.phone_index import PhoneIndex
+
+logger = logging.getLogger(__name__)
+
+# Tamanho dos lotes de escrita e de consulta na collection contact_log
+BATCH_SIZE = 10000
+# Acima deste tamanho, a importação lê os contatos recentes do cliente de uma vez
+# em vez de consultar os números da importação em lotes com $in
+SCAN_THRESHOLD = 50000
+
+
+class FrequencyService:
+    """
+    Limite de frequência de contato por número e por cliente.
+
+    A collection 'contact_log' guarda, para cada par (cliente, número), a data
+    do último envio. Os documentos expiram por TTL (expires_at) ao fim da
+    janela configurada em FREQUENCY_CAP_HOURS; com 0 o limite fica desativado.
+    """
+
+    def __init__(self, db=None, window_hours: Optional[float] = None):
+        """
+        Inicializa o serviço de limite de frequência.
+        """
+        self.db = db if db is not None else MongoDB().get_database()
+        self.collection = self.db['contact_log']
+        if window_hours is None:
+            window_hours = get_setting('app', 'frequency_cap_hours', 'FREQUENCY_CAP_HOURS', 24.0, cast=float)
+        self.window = timedelta(hours=window_hours)
+
+    @property
+    def enabled(self) -> bool:
+        return self.window.total_seconds() > 0
+
+    def record_contacts(self, client_id, numbers: np.ndarray, contacted_at: Optional[datetime] = None) -> int:
+        """
+        Registra o envio para uma lista de números de um cliente.
+
+        Args:
+            client_id: ID do cliente dono do envio
+            numbers (np.ndarray): Números enviados (int64)
+            contacted_at (datetime, optional): Data do envio (padrão: agora)
+
+        Returns:
+            int: Quantidade de números registrados
+        """
+        if not self.enabled or client_id is None or not len(numbers):
+            return 0
+
+        client_obj_id = ObjectId(client_id)
+        contacted_at = contacted_at or datetime.utcnow()
+        fields = {'last_contacted_at': contacted_at, 'expires_at': contacted_at + self.window}
+        for start in range(0, len(numbers), BATCH_SIZE):
+            batch = np.asarray(numbers[start:start + BATCH_SIZE], dtype=np.int64).tolist()
+            self.collection.bulk_write([
+                UpdateOne({'client_id': client_obj_id, 'phone': number}, {'$set': fields}, upsert=True)
+                for number in batch
+            ], ordered=False)
+        return len(numbers)
+
+    def recently_contacted_mask(self, client_id, numbers: np.ndarray) -> np.ndarray:
+        """
+        Retorna a máscara dos números contatados pelo cliente dentro da janela.
+        """
+        if not self.enabled or client_id is None or not len(numbers):
+            return np.zeros(len(numbers), dtype=bool)
+
+        client_obj_id = ObjectId(client_id)
+        cutoff = datetime.utcnow() - self.window
+        query = {'client_id': client_obj_id, 'last_contacted_at': {'$gte': cutoff}}
+
+        if len(numbers) > SCAN_THRESHOLD:
+            cursor = self.collection.find(query, {'phone': 1, '_id': 0}).batch_size(BATCH_SIZE)
+            recent = PhoneIndex(np.fromiter((doc['phone'] for doc in cursor), dtype=np.int64))
+            return recent.contains(numbers)
+
+        recent = []
+        for start in range(0, len(numbers), BATCH_SIZE):
+            batch = numbers[start:start + BATCH_SIZE].tolist()
+            cursor = self.collection.find({**query, 'phone': {'$in': batch}}, {'phone': 1, '_id': 0})
+            recent.extend(doc['phone'] for doc in cursor)
+        return np.isin(numbers, np.asarray(recent, dtype=np.int64))
@@ -1,12 +1,59 @@
-from datetime import datetime
+from datetime import datetime, timedelta
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 from ..database.mongodb import MongoDB
-from typing import Dict, List, Optional
+from ..utils.config import get_setting
+from ..utils.metrics import metrics
+from ..utils.phone_digest import idempotency_key
+from ..utils.phone_codec import encode_phones, decode_phones, decode_phone_strings
+from ..utils.export_writers import iter_export_bytes
+from ..utils.list_preview import EXPORT_BLOCK_ROWS
+from .stats_service import LOCAL_TIMEZONE, StatsService
+from .admission_service import AdmissionService
+from .archive_service import STUB_FIELDS, ArchiveService
+from .quota_service import QuotaService
+from typing import Dict, Iterator, List, Optional, Tuple
 import logging
-import pytz
+import numpy as np
+import pandas as pd
+import time
 
 logger = logging.getLogger(__name__)
 
+REGISTER_IMPORT_SECONDS = metrics.histogram('sbsender_register_import_seconds', 'Latência do register_import (consultas e escrita)')
+DUPLICATE_IMPORTS_TOTAL = metrics.counter('sbsender_duplicate_imports_total', 'Importações recusadas pela chave de idempotência')
+
+# Colunas da exportação de números (uma linha por número)
+EXPORT_COLUMNS = ['history_id', 'timestamp', 'client_name', 'webhook_name', 'status', 'phone']
+# Campos lidos do histórico na exportação; os demais não saem do servidor
+EXPORT_PROJECTION = {
+    'timestamp': 1, 'client_name': 1, 'webhook_name': 1, 'status': 1,
+    'valid_numbers_packed': 1, 'valid_numbers': 1, 'numbers': 1, 'archived': 1
+}
+# Registros do histórico por lote do cursor na exportação (cada um pode ter milhões de números)
+EXPORT_CURSOR_BATCH = 10
+# Registros por página na listagem paginada (padrão e máximo)
+HISTORY_PAGE_SIZE = 50
+MAX_HISTORY_PAGE_SIZE = 500
+# Campos da listagem paginada: os mesmos mantidos nos registros arquivados, sem as listas de números
+HISTORY_PAGE_PROJECTION = {field: 1 for field in STUB_FIELDS | {'archived'}}
+
+
+def expand_packed_numbers(entry: Dict) -> Dict:
+    """
+    Converte os números válidos compactados (valid_numbers_packed) de um registro
+    do histórico de volta para a lista 'valid_numbers'. Registros antigos, que
+    já guardam a lista, são retornados sem alteração.
+    """
+    packed = entry.pop('valid_numbers_packed', None)
+    if packed is not None:
+        numbers = decode_phone_strings(packed)
+        entry['valid_numbers'] = numbers
+        if isinstance(entry.get('details'), dict):
+            entry['details']['valid_numbers'] = numbers
+    return entry
+
+
 class HistoryService:
     def __init__(self, db=None):
         """
@@ -14,11 +61,35 @@ class HistoryService:
         """
         self.db = db if db is not None else MongoDB().get_database()
         self.history_collection = self.db['history']
+        self.chunks_collection = self.db['message_chunks']
+        self.stats_service = StatsService(self.db)
+        self.archive_service = ArchiveService(self.db)
+        self.admission_service = AdmissionService(self.db)
+        self.quota_service = QuotaService(self.db)
+        # Janela em que uma importação idêntica é recusada (0 desativa a chave de idempotência)
+        window_hours = get_setting('app', 'idempotency_window_hours', 'IDEMPOTENCY_WINDOW_HOURS', 24.0, cast=float)
+        self.idempotency_window = timedelta(hours=window_hours)
 
-    def register_import(self, valid_numbers: List[str], invalid_numbers: List[str], webhook_id: str, webhook_name: str, webhook_url: str, method: str = 'txt') -> Dict:
+    def register_import(self, valid_numbers: List[str], invalid_numbers: List[str], webhook_id: str, webhook_name: str, webhook_url: str, method: str = 'txt', filtered_counts: Optional[Dict[str, int]] = None, history_id: Optional[ObjectId] = None, message_template: Optional[str] = None, message_chunks: int = 0, numbers_digest: Optional[str] = None) -> Dict:
         """
         Registra uma importação de números no histórico.
         
+        Com numbers_digest, o registro recebe uma chave de idempotência (cliente,
+        webhook, conjunto de números e template) protegida por um índice único:
+        uma importação idêntica dentro de IDEMPOTENCY_WINDOW_HOURS (ex.: clique
+        duplo ou reenvio de outra aba) não cria outro registro pendente, e o
+        registro existente é retornado com 'duplicate': True. Depois da janela,
+        ou se o registro anterior falhou, a chave é liberada para a nova importação.
+        
+        Antes da gravação, o controle de admissão (AdmissionService) compara os
+        números com a fila de envio: a importação pode ser aceita, adiada (o
+        registro recebe 'scheduled_for' e o dispatcher só o envia a partir dessa
+        data) ou recusada (nada é gravado e o retorno tem status 'rejected').
+        Em todos os casos, 'admission' traz a decisão e o início estimado do envio.
+        Os números também são descontados da cota mensal do cliente
+        (QuotaService); sem cota suficiente, a importação é recusada e o retorno
+        traz 'quota' com a cota e o consumo do mês.
+        
         Args:
             valid_numbers (List[str]): Lista de números válidos
             invalid_numbers (List[str]): Lista de números inválidos
@@ -26,37 +97,51 @@ class HistoryService:
             webhook_name (str): Nome do webhook selecionado
             webhook_url (str): URL do webhook
             method (str): Método de importação ('txt' ou 'csv')
+            filtered_counts (Dict[str, int], optional): Números válidos descartados por filtro (ex.: {'suppressed': 10})
+            history_id (ObjectId, optional): _id pré-alocado, usado quando os lotes de mensagens já foram gravados
+            message_template (str, optional): Template das mensagens personalizadas
+            message_chunks (int): Quantidade de lotes gravados em 'message_chunks'
+            numbers_digest (str, optional): PhoneSetDigest dos números válidos
             
         Returns:
-            Dict: Registro criado no histórico
+            Dict: Registro criado no histórico (ou o existente, com 'duplicate': True,
+                ou {'_id': None, 'status': 'rejected'} se a fila ou a cota não comportam a importação)
         """
+        started_at = time.perf_counter()
+
         # Converte o webhook_id para ObjectId
         webhook_obj_id = ObjectId(webhook_id)
         
         # Busca o cliente através do webhook
         webhook = self.db['webhooks'].find_one({'_id': webhook_obj_id})
         client_name = 'Cliente'
+        client_id = None
         if webhook and 'client_id' in webhook:
+            client_id = webhook['client_id']
             client = self.db['clients'].find_one({'_id': webhook['client_id']})
             if client:
                 client_name = client['name']
         
+        filtered_counts = filtered_counts or {}
+        
         history_entry = {
             'operation': method.lower(),  # 'txt' ou 'csv'
             'method': method.lower(),  # Campo adicional para compatibilidade
-            'total_processed': len(valid_numbers) + len(invalid_numbers),
+            'total_processed': len(valid_numbers) + len(invalid_numbers) + sum(filtered_counts.values()),
             'valid_count': len(valid_numbers),
             'invalid_count': len(invalid_numbers),
-            'valid_numbers': valid_numbers,
+            'filtered_counts': filtered_counts,
+            # Números válidos em int64 ordenados e comprimidos (ver phone_codec)
+            'valid_numbers_packed': encode_phones(valid_numbers),
             'invalid_numbers': invalid_numbers,
             'webhook_id': webhook_obj_id,
             'webhook_name': webhook_name,
             'webhook_url': webhook_url,
+            'client_id': client_id,
             'client_name': client_name,
             'status': 'pending',
             'timestamp': datetime.utcnow(),
             'details': {
-                'valid_numbers': valid_numbers,
                 'invalid_numbers': invalid_numbers,
                 'webhook_id': str(webhook_obj_id),
                 'webhook_name': webhook_name,
@@ -66,11 +151,143 @@ class HistoryService:
             }
         }
         
-        result = self.history_collection.insert_one(history_entry)
+        if history_id is not None:
+            history_entry['_id'] = history_id
+        if message_template:
+            # As mensagens renderizadas ficam em 'message_chunks', um documento por lote
+            history_entry['personalized'] = True
+            history_entry['message_template'] = message_template
+            history_entry['message_chunks'] = message_chunks
+        if numbers_digest and self.idempotency_window.total_seconds() > 0:
+            history_entry['idempotency_key'] = idempotency_key(client_id, webhook_obj_id, numbers_digest, message_template)
+        
+        # Controle de admissão pela fila de envio (contadores, sem contar o histórico)
+        admission = self.admission_service.decide(client_id, len(valid_numbers), history_entry['timestamp'])
+        if admission['decision'] == 'rejected':
+            logger.warning("Importação recusada pelo controle de admissão (cliente %s, %s números, início estimado %s)",
+                           client_id, len(valid_numbers), admission['estimated_start'])
+            REGISTER_IMPORT_SECONDS.observe(time.perf_counter() - started_at)
+            return {'_id': None, 'status': 'rejected', 'timestamp': history_entry['timestamp'], 'admission': admission}
+        if admission['scheduled_for'] is not None:
+            history_entry['scheduled_for'] = admission['scheduled_for']
+        # Números somados aos contadores da fila (descontados pelo dispatcher)
+        history_entry['queued_numbers'] = len(valid_numbers)
+        
+        # Cota mensal do cliente (verificada em memória; o banco só é consultado
+        # quando o bloco reservado pelo processo acaba)
+        if not self.quota_service.reserve(client_id, len(valid_numbers), history_entry['timestamp']):
+            REGISTER_IMPORT_SECONDS.observe(time.perf_counter() - started_at)
+            return {
+                '_id': None, 'status': 'rejected', 'timestamp': history_entry['timestamp'],
+                'quota': dict(self.quota_service.get_usage(client_id, history_entry['timestamp']), requested=len(valid_numbers))
+            }
+        if client_id is not None and valid_numbers:
+            # Números descontados da cota (os que falharem no envio são devolvidos)
+            history_entry['quota_numbers'] = len(valid_numbers)
+        
+        try:
+            try:
+                result = self.history_collection.insert_one(history_entry)
+            except DuplicateKeyError:
+                if 'idempotency_key' not in history_entry:
+                    # Conflito de _id (ex.: history_id repetido), não de importação idêntica
+                    raise
+                existing = self._release_idempotency_key(history_entry['idempotency_key'], history_entry['timestamp'])
+                if existing is not None:
+                    DUPLICATE_IMPORTS_TOTAL.inc()
+                    logger.warning("Importação idêntica ao registro %s ignorada (webhook %s)", existing['_id'], webhook_obj_id)
+                    self.quota_service.release(client_id, len(valid_numbers), history_entry['timestamp'])
+                    return {
+                        '_id': str(existing['_id']),
+                        'status': existing.get('status'),
+                        'timestamp': existing.get('timestamp'),
+                        'duplicate': True
+                    }
+                result = self.history_collection.insert_one(history_entry)
+        except Exception:
+            self.quota_service.release(client_id, len(valid_numbers), history_entry['timestamp'])
+            raise
+        try:
+            self.admission_service.reserve(client_id, len(valid_numbers))
+        except Exception as e:
+            logger.error("Erro ao atualizar os contadores da fila: %s", e)
+        try:
+            self.stats_service.record_import(client_id, webhook_obj_id, len(valid_numbers), len(invalid_numbers), history_entry['timestamp'])
+        except Exception as e:
+            logger.error("Erro ao atualizar estatísticas diárias: %s", e)
         history_entry['_id'] = str(result.inserted_id)
         history_entry['webhook_id'] = str(webhook_obj_id)  # Converte de volta para string na resposta
+        history_entry.pop('valid_numbers_packed')
+        history_entry['valid_numbers'] = list(valid_numbers)
+        history_entry['admission'] = admission
+        if client_id is not None:
+            history_entry['client_id'] = str(client_id)
+        REGISTER_IMPORT_SECONDS.observe(time.perf_counter() - started_at)
         return history_entry
 
+    def _release_idempotency_key(self, key: str, now: datetime) -> Optional[Dict]:
+        """
+        Trata uma chave de idempotência já usada: retorna o registro que a detém,
+        se ainda estiver valendo, ou libera a chave (registro fora da janela ou
+        com falha) e retorna None.
+        """
+        existing = self.history_collection.find_one({'idempotency_key': key}, {'status': 1, 'timestamp': 1})
+        if existing is None:
+            return None
+        timestamp = existing.get('timestamp')
+        expired = not isinstance(timestamp, datetime) or now - timestamp >= self.idempotency_window
+        if existing.get('status') != 'failed' and not expired:
+            return existing
+        self.history_collection.update_one(
+            {'_id': existing['_id'], 'idempotency_key': key},
+            {'$unset': {'idempotency_key': ''}, '$set': {'idempotency_released_at': now}}
+        )
+        return None
+
+    def store_message_chunk(self, history_id: ObjectId, seq: int, numbers, messages: List[str]):
+        """
+        Grava um lote de mensagens personalizadas de uma importação.
+        
+        Args:
+            history_id (ObjectId): _id do registro do histórico
+            seq (int): Posição do lote (a partir de 0)
+            numbers: Números do lote (int64 ou str), na mesma ordem das mensagens
+            messages (List[str]): Mensagens renderizadas
+        """
+        self.chunks_collection.insert_one({
+            'history_id': history_id,
+            'seq': seq,
+            'count': len(messages),
+            # Sem ordenação, para manter o alinhamento com as mensagens
+            'numbers_packed': encode_phones(numbers, sort=False),
+            'messages': messages
+        })
+
+    def iter_message_chunks(self, history_id) -> Iterator[Tuple[int, List[str], List[str]]]:
+        """
+        Percorre os lotes de mensagens de uma importação em ordem, um por vez.
+        
+        Returns:
+            Iterator[Tuple[int, List[str], List[str]]]: (seq, números, mensagens)
+        """
+        cursor = self.chunks_collection.find({'history_id': ObjectId(history_id)}).sort('seq', 1).batch_size(1)
+        for chunk in cursor:
+            yield chunk['seq'], decode_phone_strings(chunk['numbers_packed']), chunk['messages']
+
+    def get_message_chunk_sizes(self, history_id) -> List[int]:
+        """
+        Retorna a quantidade de mensagens de cada lote de uma importação, em
+        ordem, sem ler os números nem as mensagens.
+        """
+        cursor = self.chunks_collection.find({'history_id': ObjectId(history_id)}, {'_id': 0, 'count': 1}).sort('seq', 1)
+        return [chunk['count'] for chunk in cursor]
+
+    def delete_message_chunks(self, history_id) -> int:
+        """
+        Remove os lotes de mensagens de uma importação.
+        """
+        return self.chunks_collection.delete_many({'history_id': ObjectId(history_id)}).deleted_count
+
     def register_send(self, numbers: List[str], webhook_id: str, webhook_name: str, webhook_url: str) -> Dict:
         """
         Registra uma operação de envio no histórico.
@@ -137,27 +354,242 @@ class HistoryService:
             record['_id'] = str(record['_id'])
             if record.get('webhook_id'):
                 record['webhook_id'] = str(record['webhook_id'])
-            # Converte o timestamp para string ISO
-            if 'timestamp' in record:
-                record['timestamp'] = record['timestamp'].isoformat()
-            history.append(record)
+            if record.get('client_id'):
+                record['client_id'] = str(record['client_id'])
+            history.append(expand_packed_numbers(record))
         
         return history
 
+    def _export_query(self, client_id: Optional[str], start_date: Optional[datetime], end_date: Optional[datetime], status: Optional[str]) -> Dict:
+        query = {}
+        if client_id:
+            # Registros antigos não têm client_id; usa também os webhooks do cliente
+            webhook_ids = [webhook['_id'] for webhook in self.db['webhooks'].find({'client_id': ObjectId(client_id)}, {'_id': 1})]
+            query['$or'] = [{'client_id': ObjectId(client_id)}, {'webhook_id': {'$in': webhook_ids}}]
+        if start_date or end_date:
+            query['timestamp'] = {}
+            if start_date:
+                query['timestamp']['$gte'] = start_date
+            if end_date:
+                query['timestamp']['$lt'] = end_date
+        if status:
+            query['status'] = status
+        return query
+
+    @staticmethod
+    def _entry_numbers(entry: Dict) -> np.ndarray:
+        if entry.get('valid_numbers_packed') is not None:
+            return decode_phones(entry['valid_numbers_packed'])
+        # Registros antigos guardam a lista de strings
+        numbers = pd.to_numeric(pd.Series(entry.get('valid_numbers') or entry.get('numbers') or [], dtype=object), errors='coerce')
+        return numbers.dropna().to_numpy(dtype=np.int64)
+
+    def iter_export_frames(self, client_id: Optional[str] = None, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None, status: Optional[str] = None, block_rows: int = EXPORT_BLOCK_ROWS) -> Iterator[pd.DataFrame]:
+        """
+        Percorre os números dos registros do histórico em blocos, uma linha por número.
+        
+        O cursor traz só os campos de EXPORT_PROJECTION, poucos registros por vez,
+        e cada registro é convertido e descartado antes do próximo; a memória
+        depende do maior registro, não do total exportado. Registros arquivados
+        são lidos do arquivo depois dos demais: o cursor guarda só os _id de
+        cada membro gzip, e cada membro é descomprimido uma única vez.
+        
+        Args:
+            client_id (str, optional): Filtra por cliente
+            start_date (datetime, optional): Data inicial (UTC, inclusive)
+            end_date (datetime, optional): Data final (UTC, exclusive)
+            status (str, optional): Filtra por status (ex.: 'completed' para os enviados)
+            block_rows (int): Linhas por bloco
+            
+        Returns:
+            Iterator[pd.DataFrame]: Blocos com as colunas de EXPORT_COLUMNS
+        """
+        query = self._export_query(client_id, start_date, end_date, status)
+        cursor = self.history_collection.find(query, EXPORT_PROJECTION).sort('timestamp', 1).batch_size(EXPORT_CURSOR_BATCH)
+        # (partição, posição do membro) -> _id dos registros exportados daquele membro
+        members = {}
+        for entry in cursor:
+            location = entry.get('archived')
+            if location:
+                members.setdefault((location['partition'], location['offset']), set()).add(entry['_id'])
+                continue
+            yield from self._entry_frames(entry, block_rows)
+
+        for (partition, offset), ids in members.items():
+            for record in self.archive_service.iter_member({'partition': partition, 'offset': offset}):
+                if record['_id'] in ids:
+                    ids.discard(record['_id'])
+                    yield from self._entry_frames(record, block_rows)
+                    if not ids:
+                        break
+            if ids:
+                logger.warning("%d registro(s) arquivado(s) não encontrados em %s", len(ids), partition)
+
+    def _entry_frames(self, entry: Dict, block_rows: int) -> Iterator[pd.DataFrame]:
+        numbers = self._entry_numbers(entry)
+        for start in range(0, len(numbers), block_rows):
+            yield pd.DataFrame({
+                'history_id': str(entry['_id']),
+                'timestamp': entry.get('timestamp'),
+                'client_name': entry.get('client_name', 'Cliente'),
+                'webhook_name': entry.get('webhook_name', 'Webhook'),
+                'status': entry.get('status', ''),
+                'phone': numbers[start:start + block_rows]
+            }, columns=EXPORT_COLUMNS)
+
+    def export_numbers(self, export_format: str = 'csv', **filters) -> Iterator[bytes]:
+        """
+        Gera um arquivo CSV ou Parquet com os números do histórico, em pedaços de
+        bytes produzidos à medida que o cursor avança.
+        
+        Args:
+            export_format (str): 'csv' ou 'parquet' (requer pyarrow)
+            **filters: client_id, start_date, end_date e status de iter_export_frames
+            
+        Returns:
+            Iterator[bytes]: Conteúdo do arquivo em pedaços
+        """
+        empty = pd.DataFrame({
+            'history_id': pd.Series(dtype=str),
+            'timestamp': pd.Series(dtype='datetime64[ns]'),
+            'client_name': pd.Series(dtype=str),
+            'webhook_name': pd.Series(dtype=str),
+            'status': pd.Series(dtype=str),
+            'phone': pd.Series(dtype=np.int64)
+        })
+        return iter_export_bytes(self.iter_export_frames(**filters), empty, export_format)
+
+    def get_history_page(self, client_id: Optional[str] = None, status: Optional[str] = None, start_date: Optional[datetime] = None, end_date: Optional[datetime] = None, limit: int = HISTORY_PAGE_SIZE, cursor: Optional[str] = None) -> Dict:
+        """
+        Retorna uma página do histórico, do registro mais recente para o mais
+        antigo, só com os campos de HISTORY_PAGE_PROJECTION.
+        
+        A paginação é por chave: o cursor guarda o timestamp e o _id do último
+        registro da página anterior, e a consulta continua a partir dele pelo
+        índice (timestamp, _id). O custo de cada página não depende da posição,
+        ao contrário de skip.
+        
+        Args:
+            client_id (str, optional): Filtra por cliente
+            status (str, optional): Filtra por status
+            start_date (datetime, optional): Data inicial (UTC, inclusive)
+            end_date (datetime, optional): Data final (UTC, exclusive)
+            limit (int): Registros por página (até MAX_HISTORY_PAGE_SIZE)
+            cursor (str, optional): 'next_cursor' da página anterior
+            
+        Returns:
+            Dict: 'items' (registros com os IDs em string) e 'next_cursor' (None na última página)
+        """
+        limit = max(1, min(int(limit), MAX_HISTORY_PAGE_SIZE))
+        query = self._export_query(client_id, start_date, end_date, status)
+        if cursor:
+            try:
+                timestamp, last_id = cursor.split('_', 1)
+                timestamp, last_id = datetime.fromisoformat(timestamp), ObjectId(last_id)
+            except Exception:
+                raise ValueError(f"Cursor inválido: {cursor}")
+            after = {'$or': [{'timestamp': {'$lt': timestamp}}, {'timestamp': timestamp, '_id': {'$lt': last_id}}]}
+            query = {'$and': [query, after]} if query else after
+        
+        # Um registro a mais indica se existe próxima página
+        entries = list(
+            self.history_collection.find(query, HISTORY_PAGE_PROJECTION)
+            .sort([('timestamp', -1), ('_id', -1)])
+            .limit(limit + 1)
+        )
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            last = entries[-1]
+            if isinstance(last.get('timestamp'), datetime):
+                next_cursor = f"{last['timestamp'].isoformat()}_{last['_id']}"
+        
+        self._fill_client_names(entries)
+        for entry in entries:
+            entry['_id'] = str(entry['_id'])
+            if entry.get('webhook_id'):
+                entry['webhook_id'] = str(entry['webhook_id'])
+            if entry.get('client_id'):
+                entry['client_id'] = str(entry['client_id'])
+        return {'items': entries, 'next_cursor': next_cursor}
+
+    def _fill_client_names(self, entries: List[Dict]):
+        """
+        Preenche 'client_name' dos registros antigos, gravados sem o campo, pelo
+        cliente do webhook: duas consultas para a página inteira.
+        """
+        missing = [entry for entry in entries if not entry.get('client_name') and entry.get('webhook_id')]
+        if not missing:
+            return
+        webhook_ids = list({entry['webhook_id'] for entry in missing})
+        webhook_clients = {
+            webhook['_id']: webhook.get('client_id')
+            for webhook in self.db['webhooks'].find({'_id': {'$in': webhook_ids}}, {'client_id': 1})
+        }
+        client_ids = list({client_id for client_id in webhook_clients.values() if client_id})
+        names = {
+            client['_id']: client.get('name')
+            for client in self.db['clients'].find({'_id': {'$in': client_ids}}, {'name': 1})
+        } if client_ids else {}
+        for entry in missing:
+            name = names.get(webhook_clients.get(entry['webhook_id']))
+            if name:
+                entry['client_name'] = name
+
     def get_history_by_id(self, history_id: str) -> Optional[Dict]:
         """
-        Busca um registro específico do histórico.
+        Busca um registro específico do histórico. Registros arquivados são lidos
+        por completo do arquivo (ver ArchiveService).
         """
         history = self.history_collection.find_one({'_id': ObjectId(history_id)})
+        if history and history.get('archived'):
+            archived = self.archive_service.fetch(history)
+            if archived is not None:
+                archived.pop('archived_message_chunks', None)
+                history = dict(archived, archived=history['archived'])
         if history:
             history['_id'] = str(history['_id'])
             if history.get('webhook_id'):
                 history['webhook_id'] = str(history['webhook_id'])
-            # Converte o timestamp para string ISO
-            if 'timestamp' in history:
-                history['timestamp'] = history['timestamp'].isoformat()
+            if history.get('client_id'):
+                history['client_id'] = str(history['client_id'])
+            expand_packed_numbers(history)
         return history
 
+    def format_history_entries(self, entries: List[Dict]) -> List[Dict]:
+        """
+        Formata uma página de registros do histórico para exibição.
+        
+        Os timestamps são convertidos de UTC para o horário local todos de uma
+        vez, com operações vetorizadas do pandas e o fuso criado uma única vez.
+        Os registros trazem os datetimes do banco (UTC); a conversão para texto
+        fica na exibição e na serialização da API.
+        
+        Args:
+            entries (List[Dict]): Registros do histórico
+            
+        Returns:
+            List[Dict]: Os mesmos registros, com 'display_title'
+        """
+        if not entries:
+            return entries
+        
+        # Sem timestamp, usa o horário atual
+        timestamps = pd.to_datetime(
+            pd.Series([entry.get('timestamp') for entry in entries], dtype=object), utc=True
+        ).fillna(pd.Timestamp.now(tz='UTC'))
+        
+        # Converte UTC para horário local (Brasil); datetime_as_string formata o
+        # array inteiro em C ('AAAA-MM-DDTHH:MM'), bem mais rápido que strftime
+        local = timestamps.dt.tz_convert(LOCAL_TIMEZONE).dt.tz_localize(None).to_numpy(dtype='datetime64[m]')
+        iso_dates = np.datetime_as_string(local).tolist()
+        for entry, iso_date in zip(entries, iso_dates):
+            formatted_date = f"{iso_date[8:10]}/{iso_date[5:7]}/{iso_date[:4]} {iso_date[11:16]}"
+            client_name = entry.get('client_name', 'Cliente')
+            webhook_name = entry.get('webhook_name', 'Webhook')
+            entry['display_title'] = f"{formatted_date} - {webhook_name} ({client_name})"
+        return entries
+
     def format_history_entry(self, entry: Dict) -> Dict:
         """
         Formata um registro do histórico para exibição.
@@ -168,20 +600,4 @@ class HistoryService:
         Returns:
             Dict: Registro formatado
         """
-        timestamp = entry.get('timestamp', datetime.utcnow())
-        if isinstance(timestamp, str):
-            try:
-                timestamp = datetime.fromisoformat(timestamp.replace('Z', '+00:00'))
-            except ValueError:
-                timestamp = datetime.utcnow()
-                
-        # Converte UTC para horário local (Brasil)
-        local_tz = pytz.timezone('America/Sao_Paulo')
-        local_timestamp = pytz.utc.localize(timestamp).astimezone(local_tz)
-        
-        formatted_date = local_timestamp.strftime('%d/%m/%Y %H:%M')
-        client_name = entry.get('client_name', 'Cliente')
-        webhook_name = entry.get('webhook_name', 'Webhook')
-        
-        entry['display_title'] = f"{formatted_date} - {webhook_name} ({client_name})"
-        return entry
+        return self.format_history_entries([entry])[0]
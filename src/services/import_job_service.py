@@ -0,0 +1,211 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Dict, List, Optional
+import logging
+import os
+import threading
+import uuid
+from ..utils.config import get_setting
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+IMPORT_JOBS = {
+    status: metrics.gauge('sbsender_import_jobs', 'Importações em background por status', status=status)
+    for status in ('queued', 'running')
+}
+# Jobs finalizados mantidos no registro para consulta
+MAX_FINISHED_JOBS = 200
+# Campos do resultado omitidos nos jobs que guardam só os totais
+NUMBER_LIST_FIELDS = ('valid_numbers', 'invalid_numbers')
+
+
+class ImportJobService:
+    """
+    Importações de contatos executadas em background.
+
+    As importações rodam em um pool de threads compartilhado pelo processo
+    (IMPORT_WORKERS, padrão 4), fora da execução do script do Streamlit: a
+    página não trava e a importação continua se o usuário navegar para outra
+    tela. Cada job tem um registro em memória com o progresso (linhas lidas,
+    válidos, inválidos e bytes processados), atualizado a cada bloco e
+    consultado pela interface sem acessar o banco.
+    """
+    _executor = None
+    _jobs: Dict[str, Dict] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, contact_service, max_workers: Optional[int] = None):
+        """
+        Inicializa o serviço de importações em background.
+
+        Args:
+            contact_service: ContactService usado para processar as importações
+            max_workers (int, optional): Tamanho do pool (padrão: IMPORT_WORKERS)
+        """
+        self.contact_service = contact_service
+        with ImportJobService._lock:
+            if ImportJobService._executor is None:
+                if max_workers is None:
+                    max_workers = get_setting('app', 'import_workers', 'IMPORT_WORKERS', 4, cast=int)
+                ImportJobService._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='import')
+
+    def submit_text(self, input_text: str, **kwargs) -> str:
+        """
+        Envia uma importação de texto para o pool.
+
+        Args:
+            input_text (str): Texto com os números de telefone
+            **kwargs: Demais argumentos de ContactService.process_contacts
+
+        Returns:
+            str: ID do job
+        """
+        return self._submit(
+            self.contact_service.process_contacts, (input_text,), kwargs,
+            method=kwargs.get('method', 'txt'), bytes_total=len(input_text.encode('utf-8'))
+        )
+
+    def submit_csv(self, file_content: bytes, column_name: str, **kwargs) -> str:
+        """
+        Envia uma importação de CSV para o pool.
+
+        Args:
+            file_content (bytes): Conteúdo do arquivo CSV
+            column_name (str): Nome da coluna que contém os números
+            **kwargs: Demais argumentos de ContactService.process_csv
+
+        Returns:
+            str: ID do job
+        """
+        return self._submit(
+            self.contact_service.process_csv, (file_content, column_name), kwargs,
+            method=kwargs.get('method', 'csv'), bytes_total=len(file_content)
+        )
+
+    def submit_file(self, file_content: bytes, file_name: str, column_name: str, **kwargs) -> str:
+        """
+        Envia uma importação de arquivo (CSV, TXT, XLSX, .gz ou .zip) para o pool.
+
+        Args:
+            file_content (bytes): Conteúdo do arquivo
+            file_name (str): Nome do arquivo, usado para identificar o formato
+            column_name (str): Nome da coluna que contém os números
+            **kwargs: Demais argumentos de ContactService.process_file
+
+        Returns:
+            str: ID do job
+        """
+        return self._submit(
+            self.contact_service.process_file, (file_content, file_name, column_name), kwargs,
+            method=kwargs.get('method', 'csv'), bytes_total=len(file_content)
+        )
+
+    def submit_stream(self, stream, file_format: Dict, column_name: str, **kwargs) -> str:
+        """
+        Envia uma importação em stream (ver ContactService.process_stream) para o pool.
+
+        O stream é fechado ao fim do job. O resultado guardado no registro tem só
+        os totais, sem as listas de números, que ficam no histórico.
+
+        Args:
+            stream: Arquivo binário com o conteúdo (ex.: arquivo temporário)
+            file_format (Dict): Resultado de inspect_stream
+            column_name (str): Nome da coluna (ou campo do NDJSON) que contém os números
+            **kwargs: Demais argumentos de ContactService.process_stream
+
+        Returns:
+            str: ID do job
+        """
+        bytes_total = stream.seek(0, os.SEEK_END)
+        stream.seek(0)
+
+        def process(*args, **process_kwargs):
+            try:
+                return self.contact_service.process_stream(*args, **process_kwargs)
+            finally:
+                stream.close()
+
+        return self._submit(
+            process, (stream, file_format, column_name), kwargs,
+            method=kwargs.get('method', 'api'), bytes_total=bytes_total, keep_numbers=False
+        )
+
+    def _submit(self, function, args, kwargs, method: str, bytes_total: int, keep_numbers: bool = True) -> str:
+        job_id = uuid.uuid4().hex
+        job = {
+            'id': job_id,
+            'method': method,
+            'webhook_name': kwargs.get('webhook_name'),
+            'client_id': kwargs.get('client_id'),
+            'status': 'queued',
+            'rows_read': 0,
+            'valid': 0,
+            'invalid': 0,
+            'bytes_processed': 0,
+            'bytes_total': bytes_total,
+            'submitted_at': datetime.utcnow(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None
+        }
+        with ImportJobService._lock:
+            ImportJobService._jobs[job_id] = job
+            self._prune()
+        IMPORT_JOBS['queued'].inc()
+
+        ImportJobService._executor.submit(self._run, job_id, function, args, kwargs, keep_numbers)
+        logger.info("Importação %s enviada para o pool (%s, %s bytes)", job_id, method, bytes_total)
+        return job_id
+
+    def _update(self, job_id: str, **fields):
+        with ImportJobService._lock:
+            job = ImportJobService._jobs.get(job_id)
+            if job is not None:
+                job.update(fields)
+
+    def _run(self, job_id: str, function, args, kwargs, keep_numbers: bool = True):
+        IMPORT_JOBS['queued'].dec()
+        IMPORT_JOBS['running'].inc()
+        self._update(job_id, status='running', started_at=datetime.utcnow())
+        try:
+            result = function(*args, progress=lambda values: self._update(job_id, **values), **kwargs)
+            if 'error' in result:
+                self._update(job_id, status='failed', error=result['error'], finished_at=datetime.utcnow())
+            else:
+                if not keep_numbers:
+                    result = {key: value for key, value in result.items() if key not in NUMBER_LIST_FIELDS}
+                self._update(job_id, status='completed', result=result, finished_at=datetime.utcnow())
+        except Exception as e:
+            logger.error("Erro na importação %s: %s", job_id, e)
+            self._update(job_id, status='failed', error=str(e), finished_at=datetime.utcnow())
+        finally:
+            IMPORT_JOBS['running'].dec()
+
+    def _prune(self):
+        # Descarta os jobs finalizados mais antigos (chamado com o lock adquirido)
+        finished = [job for job in ImportJobService._jobs.values() if job['finished_at'] is not None]
+        if len(finished) > MAX_FINISHED_JOBS:
+            finished.sort(key=lambda job: job['finished_at'])
+            for job in finished[:len(finished) - MAX_FINISHED_JOBS]:
+                del ImportJobService._jobs[job['id']]
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """
+        Retorna uma cópia do registro de um job.
+        """
+        with ImportJobService._lock:
+            job = ImportJobService._jobs.get(job_id)
+            return dict(job) if job is not None else None
+
+    def get_jobs(self, job_ids: List[str]) -> List[Dict]:
+        """
+        Retorna os registros dos jobs informados que ainda existem, na mesma ordem.
+        """
+        with ImportJobService._lock:
+            return [dict(ImportJobService._jobs[job_id]) for job_id in job_ids if job_id in ImportJobService._jobs]
+
+    @staticmethod
+    def is_active(job: Dict) -> bool:
+        return job['status'] in ('queued', 'running')
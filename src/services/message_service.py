@@ -2,6 +2,7 @@ import requests
 import json
 from typing import List, Dict, Any
 from datetime import datetime
+from .webhook_health_service import probe_webhook
 
 class MessageService:
     def __init__(self, webhook_url: str = None):
@@ -81,21 +82,6 @@ class MessageService:
         Returns:
             bool: True se o webhook está válido, False caso contrário
         """
-        try:
-            # Faz uma requisição de teste com um payload mínimo
-            test_payload = {
-                "test": True,
-                "timestamp": datetime.now().isoformat()
-            }
-            
-            response = requests.post(
-                webhook_url,
-                json=test_payload,
-                headers={"Content-Type": "application/json"},
-                timeout=5  # Timeout de 5 segundos
-            )
-            
-            return response.status_code == 200
-            
-        except Exception:
-            return False
+        # Mesma verificação usada pelo WebhookHealthService; para checar vários
+        # webhooks, prefira o resultado em cache do WebhookHealthService
+        return probe_webhook(webhook_url)['ok']
@@ -0,0 +1,330 @@
+from datetime import datetime
+from typing import Dict, Optional, Tuple
+import atexit
+import logging
+import threading
+import time
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import DuplicateKeyError
+from ..database.mongodb import MongoDB
+from ..utils.config import get_setting
+from ..utils.metrics import metrics
+from .stats_service import stats_day
+
+logger = logging.getLogger(__name__)
+
+QUOTA_CHECKS_TOTAL = {
+    result: metrics.counter('sbsender_quota_checks_total', 'Verificações de cota nas importações por resultado', result=result)
+    for result in ('allowed', 'exceeded')
+}
+QUOTA_LEASES_TOTAL = {
+    result: metrics.counter('sbsender_quota_leases_total', 'Reservas de blocos de cota no banco por resultado', result=result)
+    for result in ('granted', 'denied')
+}
+
+# Máximo de números reservados no banco de cada vez (o processo consome o bloco em memória)
+DEFAULT_BLOCK_SIZE = 10000
+# Fração do saldo livre da cota que um processo pode reservar de cada vez
+DEFAULT_LEASE_FRACTION = 0.1
+# Intervalo entre as gravações do consumo (e devoluções dos blocos), em segundos
+DEFAULT_FLUSH_INTERVAL = 5.0
+# Validade da cota lida do cliente, em segundos
+QUOTA_CACHE_SECONDS = 60
+
+
+def quota_month(when: Optional[datetime] = None) -> str:
+    """
+    Retorna o mês da cota (AAAA-MM, no fuso das estatísticas) de uma data em UTC.
+    """
+    return stats_day(when)[:7]
+
+
+def _usage_id(client_key: str, month: str) -> str:
+    return f"{client_key}:{month}"
+
+
+def _client_value(client_key: str):
+    return ObjectId(client_key) if ObjectId.is_valid(client_key) else client_key
+
+
+class QuotaService:
+    """
+    Cota mensal de números por cliente ('monthly_quota' no documento do
+    cliente; ausente ou 0 = sem limite).
+
+    O consumo fica em 'quota_usage', um documento por cliente e mês com
+    'used' (números importados, menos os que falharam no envio) e 'reserved'
+    ('used' mais o saldo dos blocos em poder dos processos, nunca acima da
+    cota). Cada processo reserva com um $inc condicional ('reserved' só
+    aumenta se couber na cota) um bloco de até QUOTA_BLOCK_SIZE números,
+    limitado a QUOTA_LEASE_FRACTION do saldo livre, e consome o bloco em
+    memória: a verificação de uma importação é uma consulta a um dicionário.
+    Se o bloco não puder ser reservado, a importação é gravada direto com um
+    $inc condicional em 'used' e 'reserved'.
+
+    O consumo é gravado com $inc a cada QUOTA_FLUSH_INTERVAL segundos, e o
+    saldo dos blocos volta para a cota na mesma gravação: o saldo de um
+    processo só fica indisponível para os outros até a próxima gravação. Um
+    processo encerrado à força perde no máximo o bloco em poder dele até o
+    mês seguinte.
+    """
+    _state: Dict[Tuple[str, str], Dict[str, int]] = {}
+    _quotas: Dict[str, Tuple[Optional[int], float]] = {}
+    _lock = threading.Lock()
+    _flush_lock = threading.Lock()
+    _thread = None
+    _stopped = threading.Event()
+
+    def __init__(self, db=None, block_size: Optional[int] = None, flush_interval: Optional[float] = None,
+                 lease_fraction: Optional[float] = None):
+        """
+        Args:
+            db: Banco de dados (padrão: conexão do MongoDB)
+            block_size (int, optional): Máximo de números por reserva no banco (padrão: QUOTA_BLOCK_SIZE)
+            flush_interval (float, optional): Segundos entre gravações (padrão: QUOTA_FLUSH_INTERVAL)
+            lease_fraction (float, optional): Fração do saldo livre por reserva (padrão: QUOTA_LEASE_FRACTION)
+        """
+        self.db = db if db is not None else MongoDB().get_database()
+        self.collection = self.db['quota_usage']
+        self.clients_collection = self.db['clients']
+        if block_size is None:
+            block_size = get_setting('quota', 'block_size', 'QUOTA_BLOCK_SIZE', DEFAULT_BLOCK_SIZE, cast=int)
+        if flush_interval is None:
+            flush_interval = get_setting('quota', 'flush_interval', 'QUOTA_FLUSH_INTERVAL', DEFAULT_FLUSH_INTERVAL, cast=float)
+        if lease_fraction is None:
+            lease_fraction = get_setting('quota', 'lease_fraction', 'QUOTA_LEASE_FRACTION', DEFAULT_LEASE_FRACTION, cast=float)
+        self.block_size = max(block_size, 1)
+        self.flush_interval = flush_interval
+        self.lease_fraction = min(max(lease_fraction, 0.0), 1.0)
+
+    @classmethod
+    def invalidate(cls, client_id):
+        """
+        Descarta a cota em cache de um cliente (após alterá-la).
+        """
+        with cls._lock:
+            cls._quotas.pop(str(client_id), None)
+
+    def get_quota(self, client_id) -> Optional[int]:
+        """
+        Retorna a cota mensal do cliente (None = sem limite), lida do cache.
+        """
+        key = str(client_id)
+        cached = self._quotas.get(key)
+        if cached is not None and cached[1] > time.monotonic():
+            return cached[0]
+        client = self.clients_collection.find_one({'_id': ObjectId(key)}, {'monthly_quota': 1}) if ObjectId.is_valid(key) else None
+        quota = int(client.get('monthly_quota') or 0) if client else 0
+        quota = quota if quota > 0 else None
+        with self._lock:
+            self._quotas[key] = (quota, time.monotonic() + QUOTA_CACHE_SECONDS)
+        return quota
+
+    def _entry(self, client_key: str, month: str) -> Dict[str, int]:
+        # 'available': saldo do bloco; 'used' e 'reserved': incrementos ainda não gravados
+        return self._state.setdefault((client_key, month), {'available': 0, 'used': 0, 'reserved': 0})
+
+    def _increment(self, client_key: str, month: str, quota: int, reserved: int, used: int = 0) -> bool:
+        """
+        Soma reserved a 'reserved' (e used a 'used') se 'reserved' continuar
+        dentro da cota.
+        """
+        if reserved > quota:
+            return False
+        query = {'_id': _usage_id(client_key, month), 'reserved': {'$lte': quota - reserved}}
+        update = {'$inc': {'reserved': reserved, 'used': used}, '$set': {'updated_at': datetime.utcnow()}}
+        try:
+            self.collection.update_one(
+                query, dict(update, **{'$setOnInsert': {'client_id': _client_value(client_key), 'month': month}}),
+                upsert=True
+            )
+        except DuplicateKeyError:
+            # O documento já existe (criado agora por outro processo ou sem saldo
+            # para o incremento): tenta de novo só como atualização condicional
+            return bool(self.collection.update_one(query, update).modified_count)
+        return True
+
+    def _lease(self, client_key: str, month: str, quota: int, missing: int) -> int:
+        """
+        Reserva um bloco de pelo menos missing números. Retorna o reservado.
+        """
+        doc = self.collection.find_one({'_id': _usage_id(client_key, month)}, {'reserved': 1}) or {}
+        free = quota - int(doc.get('reserved', 0))
+        amount = max(missing, min(self.block_size, int(free * self.lease_fraction)))
+        if amount > free or not self._increment(client_key, month, quota, amount):
+            QUOTA_LEASES_TOTAL['denied'].inc()
+            return 0
+        QUOTA_LEASES_TOTAL['granted'].inc()
+        return amount
+
+    def _consume(self, entry: Dict[str, int], numbers: int) -> bool:
+        # Chamado com o lock adquirido
+        if entry['available'] < numbers:
+            return False
+        entry['available'] -= numbers
+        entry['used'] += numbers
+        QUOTA_CHECKS_TOTAL['allowed'].inc()
+        return True
+
+    def reserve(self, client_id, numbers: int, when: Optional[datetime] = None) -> bool:
+        """
+        Consome números da cota do mês de um cliente.
+
+        Args:
+            client_id: ID do cliente (ObjectId, str ou None = sem cota)
+            numbers (int): Números da importação
+            when (datetime, optional): Data da importação em UTC (padrão: agora)
+
+        Returns:
+            bool: True se a cota comporta os números (já descontados)
+        """
+        if client_id is None or numbers <= 0:
+            return True
+        client_key, month = str(client_id), quota_month(when)
+        quota = self.get_quota(client_id)
+        with self._lock:
+            entry = self._entry(client_key, month)
+            if quota is None:
+                entry['used'] += numbers
+                entry['reserved'] += numbers
+                QUOTA_CHECKS_TOTAL['allowed'].inc()
+                return True
+            if self._consume(entry, numbers):
+                return True
+            missing = numbers - entry['available']
+
+        # Bloco esgotado: reserva um novo no banco
+        leased = self._lease(client_key, month, quota, missing)
+        with self._lock:
+            entry = self._entry(client_key, month)
+            entry['available'] += leased
+            if self._consume(entry, numbers):
+                return True
+            # Sem bloco: grava a importação direto, usando também o saldo do processo
+            available, entry['available'] = entry['available'], 0
+        if self._increment(client_key, month, quota, numbers - available, numbers):
+            QUOTA_CHECKS_TOTAL['allowed'].inc()
+            return True
+        with self._lock:
+            self._entry(client_key, month)['available'] += available
+        QUOTA_CHECKS_TOTAL['exceeded'].inc()
+        logger.warning("Cota mensal do cliente %s esgotada (%s números pedidos)", client_id, numbers)
+        return False
+
+    def release(self, client_id, numbers: int, when: Optional[datetime] = None):
+        """
+        Devolve à cota números que não foram enviados (falha no envio ou
+        importação desfeita).
+
+        Args:
+            client_id: ID do cliente
+            numbers (int): Números devolvidos
+            when (datetime, optional): Data da importação em UTC (define o mês)
+        """
+        if client_id is None or numbers <= 0:
+            return
+        with self._lock:
+            # Voltam para o saldo do processo, devolvido à cota na próxima gravação
+            entry = self._entry(str(client_id), quota_month(when))
+            entry['used'] -= numbers
+            entry['available'] += numbers
+
+    def flush(self) -> int:
+        """
+        Grava o consumo acumulado em memória com $inc e devolve o saldo dos
+        blocos. Em caso de erro, o consumo volta para a memória.
+
+        Returns:
+            int: Quantidade de documentos de consumo atualizados
+        """
+        with self._flush_lock:
+            with self._lock:
+                pending = {}
+                for key, entry in self._state.items():
+                    reserved = entry['reserved'] - entry['available']
+                    if entry['used'] or reserved:
+                        pending[key] = (entry['used'], reserved)
+                self._state.clear()
+            if not pending:
+                return 0
+
+            now = datetime.utcnow()
+            operations = [
+                UpdateOne(
+                    {'_id': _usage_id(client_key, month)},
+                    {
+                        '$inc': {'used': used, 'reserved': reserved},
+                        '$set': {'updated_at': now},
+                        '$setOnInsert': {'client_id': _client_value(client_key), 'month': month}
+                    },
+                    upsert=True
+                )
+                for (client_key, month), (used, reserved) in pending.items()
+            ]
+            try:
+                self.collection.bulk_write(operations, ordered=False)
+            except Exception:
+                with self._lock:
+                    for key, (used, reserved) in pending.items():
+                        entry = self._entry(*key)
+                        entry['used'] += used
+                        entry['reserved'] += reserved
+                raise
+            return len(operations)
+
+    def get_usage(self, client_id, when: Optional[datetime] = None) -> Dict:
+        """
+        Retorna a cota e o consumo do mês de um cliente (gravado e em memória).
+
+        Returns:
+            Dict: 'month', 'monthly_quota' (None = sem limite), 'used' e 'remaining'
+                (números que uma importação deste processo pode usar agora; não
+                inclui o saldo dos blocos de outros processos, devolvido na
+                próxima gravação deles)
+        """
+        client_key, month = str(client_id), quota_month(when)
+        quota = self.get_quota(client_id)
+        doc = self.collection.find_one({'_id': _usage_id(client_key, month)}, {'used': 1, 'reserved': 1}) or {}
+        with self._lock:
+            local = self._state.get((client_key, month), {})
+            used = int(doc.get('used', 0)) + local.get('used', 0)
+            reserved = int(doc.get('reserved', 0)) + local.get('reserved', 0) - local.get('available', 0)
+        return {
+            'month': month,
+            'monthly_quota': quota,
+            'used': used,
+            'remaining': max(quota - max(used, reserved), 0) if quota is not None else None
+        }
+
+    def start(self):
+        """
+        Inicia a thread de gravação periódica (uma vez por processo) e grava o
+        consumo na saída do processo.
+        """
+        with QuotaService._lock:
+            if QuotaService._thread is not None:
+                return
+            QuotaService._thread = threading.Thread(target=self._flush_loop, name='quota-flush', daemon=True)
+            QuotaService._thread.start()
+        atexit.register(self.stop)
+        logger.info("Gravação do consumo de cotas a cada %ss", self.flush_interval)
+
+    def stop(self):
+        """
+        Para a thread de gravação, grava o consumo e devolve o saldo dos blocos.
+        """
+        QuotaService._stopped.set()
+        if QuotaService._thread is not None:
+            QuotaService._thread.join()
+        try:
+            self.flush()
+        except Exception as e:
+            logger.error("Erro ao gravar o consumo de cotas: %s", e)
+
+    def _flush_loop(self):
+        while not QuotaService._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error("Erro ao gravar o consumo de cotas: %s", e)
@@ -0,0 +1,218 @@
+from collections import defaultdict
+from datetime import datetime
+from typing import Dict, List, Optional
+import argparse
+import logging
+from ..database.mongodb import MongoDB
+from ..utils.clock import VirtualClock
+from ..utils.config import get_setting
+from ..utils.rate_limiter import RateLimiter
+from .history_service import HistoryService
+from .task_service import DISPATCH_INTERVAL_SECONDS, PROVIDER_POST_SECONDS, chunk_sizes, provider_rate_limiter
+
+logger = logging.getLogger(__name__)
+
+# Latência do POST ao provedor usada quando não há medições no processo (segundos)
+DEFAULT_PROVIDER_LATENCY = 0.5
+# Campos do histórico lidos na simulação (sem as listas de números)
+SIMULATION_PROJECTION = {
+    'valid_count': 1, 'client_id': 1, 'client_name': 1, 'webhook_name': 1,
+    'personalized': 1, 'message_chunks': 1, 'scheduled_for': 1, 'timestamp': 1
+}
+
+
+class DispatchSimulator:
+    """
+    Simulação do dispatcher (dry-run) em um relógio virtual.
+
+    Os registros pendentes do histórico (na ordem em que o dispatcher os
+    encontra) e as campanhas propostas passam pela mesma lógica do envio real:
+    verificações a cada DISPATCH_INTERVAL_SECONDS, adiamento por
+    'scheduled_for', divisão em lotes (PROVIDER_CHUNK_SIZE ou os lotes de
+    mensagens personalizadas) e o limite de ritmo PROVIDER_RATE_LIMIT, com a
+    latência do provedor somada a cada lote. Nenhuma requisição é feita e nada
+    é gravado no banco; o tempo simulado avança sem esperar.
+
+    O resultado traz o início e o fim projetados de cada campanha, o custo
+    (SIMULATION_COST_PER_NUMBER) e o pico de números enviados por minuto.
+    Registros já em 'processing' não entram na simulação.
+    """
+
+    def __init__(self, db=None, chunk_size: Optional[int] = None, rate_limit: Optional[float] = None,
+                 latency: Optional[float] = None, cost_per_number: Optional[float] = None):
+        """
+        Args:
+            db: Banco de dados (padrão: conexão do MongoDB)
+            chunk_size (int, optional): Números por POST (padrão: PROVIDER_CHUNK_SIZE)
+            rate_limit (float, optional): Números por minuto (padrão: PROVIDER_RATE_LIMIT)
+            latency (float, optional): Segundos por POST (padrão: média medida no processo ou DEFAULT_PROVIDER_LATENCY)
+            cost_per_number (float, optional): Custo de cada número enviado (padrão: SIMULATION_COST_PER_NUMBER)
+        """
+        self.db = db if db is not None else MongoDB().get_database()
+        self.history_service = HistoryService(self.db)
+        if chunk_size is None:
+            chunk_size = get_setting('provider', 'chunk_size', 'PROVIDER_CHUNK_SIZE', 0, cast=int)
+        if latency is None:
+            observed = PROVIDER_POST_SECONDS.snapshot()
+            latency = observed['sum'] / observed['count'] if observed['count'] else DEFAULT_PROVIDER_LATENCY
+        if cost_per_number is None:
+            cost_per_number = get_setting('app', 'simulation_cost_per_number', 'SIMULATION_COST_PER_NUMBER', 0.0, cast=float)
+        self.chunk_size = chunk_size
+        self.rate_limit = rate_limit
+        self.latency = latency
+        self.cost_per_number = cost_per_number
+
+    def _rate_limiter(self, clock) -> RateLimiter:
+        if self.rate_limit is None:
+            return provider_rate_limiter(clock)
+        return RateLimiter(self.rate_limit, clock=clock)
+
+    def _pending_jobs(self) -> List[Dict]:
+        jobs = []
+        for entry in self.db['history'].find({'status': 'pending'}, SIMULATION_PROJECTION).sort('_id', 1):
+            numbers = int(entry.get('valid_count') or 0)
+            if entry.get('personalized'):
+                sizes = self.history_service.get_message_chunk_sizes(entry['_id']) if entry.get('message_chunks') else []
+            else:
+                sizes = chunk_sizes(numbers, self.chunk_size) if numbers else []
+            jobs.append({
+                'history_id': str(entry['_id']),
+                'name': f"{entry.get('webhook_name', 'Webhook')} ({entry.get('client_name', 'Cliente')})",
+                'numbers': numbers,
+                'chunk_sizes': sizes,
+                'scheduled_for': entry.get('scheduled_for'),
+                'proposed': False
+            })
+        return jobs
+
+    def _proposed_jobs(self, proposed: List[Dict]) -> List[Dict]:
+        jobs = []
+        for index, campaign in enumerate(proposed):
+            numbers = int(campaign['numbers'])
+            message_chunks = int(campaign.get('message_chunks') or 0)
+            if message_chunks:
+                # Lotes de mensagens personalizadas do mesmo tamanho
+                base, rest = divmod(numbers, message_chunks)
+                sizes = [base + (1 if position < rest else 0) for position in range(message_chunks)]
+            else:
+                sizes = chunk_sizes(numbers, self.chunk_size) if numbers else []
+            jobs.append({
+                'history_id': None,
+                'name': campaign.get('name') or f"Proposta {index + 1}",
+                'numbers': numbers,
+                'chunk_sizes': sizes,
+                'scheduled_for': campaign.get('scheduled_for'),
+                'proposed': True
+            })
+        return jobs
+
+    @staticmethod
+    def _is_due(job: Dict, now: datetime) -> bool:
+        # O mesmo critério do pending_query do dispatcher
+        return job['scheduled_for'] is None or job['scheduled_for'] <= now
+
+    def simulate(self, proposed: Optional[List[Dict]] = None, include_pending: bool = True,
+                 start: Optional[datetime] = None) -> Dict:
+        """
+        Projeta o envio da fila atual e das campanhas propostas.
+
+        Args:
+            proposed (List[Dict], optional): Campanhas a simular depois da fila, cada
+                uma com 'numbers' e, opcionalmente, 'name', 'message_chunks' e 'scheduled_for'
+            include_pending (bool): Inclui os registros pendentes do histórico
+            start (datetime, optional): Início da simulação em UTC (padrão: agora)
+
+        Returns:
+            Dict: 'campaigns' (início, fim, duração e custo de cada uma), 'start',
+                'finish', 'numbers_total', 'cost_total', 'peak_numbers_per_minute',
+                'average_numbers_per_minute' e as configurações usadas
+        """
+        clock = VirtualClock(start)
+        limiter = self._rate_limiter(clock)
+        jobs = (self._pending_jobs() if include_pending else []) + self._proposed_jobs(proposed or [])
+
+        sent_per_minute = defaultdict(int)
+        campaigns = []
+        remaining = jobs
+        while remaining:
+            # Uma verificação do dispatcher: envia, em ordem, os registros já liberados
+            now = clock.now()
+            due = [job for job in remaining if self._is_due(job, now)]
+            remaining = [job for job in remaining if not self._is_due(job, now)]
+            for job in due:
+                projected_start = clock.now()
+                for size in job['chunk_sizes']:
+                    limiter.acquire(size)
+                    clock.sleep(self.latency)
+                    sent_per_minute[int(clock.monotonic() // 60)] += size
+                projected_finish = clock.now()
+                campaigns.append({
+                    'history_id': job['history_id'],
+                    'name': job['name'],
+                    'proposed': job['proposed'],
+                    'numbers': job['numbers'],
+                    'chunks': len(job['chunk_sizes']),
+                    'scheduled_for': job['scheduled_for'],
+                    'projected_start': projected_start,
+                    'projected_finish': projected_finish,
+                    'duration_seconds': (projected_finish - projected_start).total_seconds(),
+                    # Sem lotes, o dispatcher marca o registro como falha
+                    'projected_status': 'completed' if job['chunk_sizes'] else 'failed',
+                    'cost': sum(job['chunk_sizes']) * self.cost_per_number
+                })
+            if remaining:
+                clock.sleep(DISPATCH_INTERVAL_SECONDS)
+
+        numbers_total = sum(campaign['numbers'] for campaign in campaigns if campaign['projected_status'] == 'completed')
+        duration = clock.monotonic()
+        return {
+            'start': clock.start,
+            'finish': clock.now(),
+            'duration_seconds': duration,
+            'campaigns': campaigns,
+            'numbers_total': numbers_total,
+            'cost_total': numbers_total * self.cost_per_number,
+            'peak_numbers_per_minute': max(sent_per_minute.values(), default=0),
+            'average_numbers_per_minute': numbers_total / (duration / 60) if duration else 0.0,
+            'settings': {
+                'chunk_size': self.chunk_size,
+                'rate_limit': limiter.per_second * 60,
+                'latency': self.latency,
+                'cost_per_number': self.cost_per_number
+            }
+        }
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Simulação (dry-run) do envio da fila e de campanhas propostas")
+    parser.add_argument('--numbers', type=int, action='append', default=[], help="Números de uma campanha proposta (repetível)")
+    parser.add_argument('--no-pending', action='store_true', help="Ignora os registros pendentes do histórico")
+    parser.add_argument('--chunk-size', type=int, help="Números por POST (padrão: PROVIDER_CHUNK_SIZE)")
+    parser.add_argument('--rate-limit', type=float, help="Números por minuto (padrão: PROVIDER_RATE_LIMIT)")
+    parser.add_argument('--latency', type=float, help=f"Segundos por POST (padrão: {DEFAULT_PROVIDER_LATENCY})")
+    parser.add_argument('--cost-per-number', type=float, help="Custo de cada número (padrão: SIMULATION_COST_PER_NUMBER)")
+    args = parser.parse_args(argv)
+
+    simulator = DispatchSimulator(
+        chunk_size=args.chunk_size, rate_limit=args.rate_limit,
+        latency=args.latency, cost_per_number=args.cost_per_number
+    )
+    result = simulator.simulate(
+        proposed=[{'numbers': numbers} for numbers in args.numbers],
+        include_pending=not args.no_pending
+    )
+    print(f"{'Campanha':<40} {'Números':>12} {'Lotes':>7} {'Início (UTC)':>14} {'Fim (UTC)':>14} {'Custo':>12}")
+    for campaign in result['campaigns']:
+        print(
+            f"{campaign['name'][:40]:<40} {campaign['numbers']:>12} {campaign['chunks']:>7} "
+            f"{campaign['projected_start']:%d/%m %H:%M:%S} {campaign['projected_finish']:%d/%m %H:%M:%S} {campaign['cost']:>12.2f}"
+        )
+    print(
+        f"\n{result['numbers_total']} números em {result['duration_seconds'] / 3600:.2f}h "
+        f"(fim em {result['finish']:%d/%m/%Y %H:%M} UTC); pico de {result['peak_numbers_per_minute']} números/min, "
+        f"média de {result['average_numbers_per_minute']:.0f} números/min; custo {result['cost_total']:.2f}"
+    )
+
+
+if __name__ == '__main__':
+    main()
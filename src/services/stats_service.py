@@ -0,0 +1,181 @@
+from datetime import datetime
+from typing import Dict, List, Optional
+import argparse
+import logging
+import pytz
+from pymongo import ReplaceOne
+from ..database.mongodb import MongoDB
+
+logger = logging.getLogger(__name__)
+
+# Fuso que define o dia de cada contador (o mesmo usado na exibição do histórico)
+STATS_TIMEZONE = 'America/Sao_Paulo'
+LOCAL_TIMEZONE = pytz.timezone(STATS_TIMEZONE)
+# Contadores mantidos por (dia, cliente, webhook)
+COUNTERS = ('imports', 'valid', 'invalid', 'sent', 'failed')
+# Documentos por bulk_write no backfill
+BACKFILL_BATCH_SIZE = 1000
+
+
+def stats_day(when: Optional[datetime] = None) -> str:
+    """
+    Retorna o dia (YYYY-MM-DD, no fuso STATS_TIMEZONE) de uma data em UTC.
+    """
+    when = when or datetime.utcnow()
+    if when.tzinfo is None:
+        when = pytz.utc.localize(when)
+    return when.astimezone(LOCAL_TIMEZONE).strftime('%Y-%m-%d')
+
+
+class StatsService:
+    """
+    Estatísticas diárias pré-agregadas para o dashboard.
+
+    A collection 'daily_stats' tem um documento por (dia, cliente, webhook) com
+    os contadores de COUNTERS, incrementados com $inc (upsert) no momento de
+    cada importação e de cada envio. O dashboard lê só esses documentos, sem
+    carregar o histórico e suas listas de números.
+    """
+
+    def __init__(self, db=None):
+        """
+        Inicializa o serviço de estatísticas.
+        """
+        self.db = db if db is not None else MongoDB().get_database()
+        self.collection = self.db['daily_stats']
+
+    def _increment(self, client_id, webhook_id, counters: Dict[str, int], when: Optional[datetime] = None):
+        """
+        Soma os contadores no documento do dia, criando-o se não existir.
+        """
+        counters = {name: int(value) for name, value in counters.items() if value}
+        if not counters:
+            return
+        self.collection.update_one(
+            {'day': stats_day(when), 'client_id': client_id, 'webhook_id': webhook_id},
+            {'$inc': counters, '$set': {'updated_at': datetime.utcnow()}},
+            upsert=True
+        )
+
+    def record_import(self, client_id, webhook_id, valid: int, invalid: int, when: Optional[datetime] = None):
+        """
+        Registra uma importação.
+
+        Args:
+            client_id: ID do cliente (ObjectId ou None)
+            webhook_id: ID do webhook (ObjectId)
+            valid (int): Números válidos da importação
+            invalid (int): Números inválidos da importação
+            when (datetime, optional): Data da importação em UTC (padrão: agora)
+        """
+        self._increment(client_id, webhook_id, {'imports': 1, 'valid': valid, 'invalid': invalid}, when)
+
+    def record_send(self, client_id, webhook_id, sent: int, failed: int, when: Optional[datetime] = None):
+        """
+        Registra o resultado do envio de uma importação ao provedor.
+
+        Args:
+            client_id: ID do cliente (ObjectId ou None)
+            webhook_id: ID do webhook (ObjectId)
+            sent (int): Números aceitos pelo provedor
+            failed (int): Números que não foram enviados
+            when (datetime, optional): Data do envio em UTC (padrão: agora)
+        """
+        self._increment(client_id, webhook_id, {'sent': sent, 'failed': failed}, when)
+
+    def get_daily_stats(self, start_day: str, end_day: str, client_id=None) -> List[Dict]:
+        """
+        Retorna os documentos de estatísticas do período, por dia.
+
+        Args:
+            start_day (str): Dia inicial (YYYY-MM-DD)
+            end_day (str): Dia final (YYYY-MM-DD), inclusive
+            client_id (optional): Filtra por cliente
+
+        Returns:
+            List[Dict]: day, client_id, webhook_id e os contadores (ausentes = 0)
+        """
+        query = {'day': {'$gte': start_day, '$lte': end_day}}
+        if client_id is not None:
+            query['client_id'] = client_id
+        stats = []
+        for doc in self.collection.find(query, {'_id': 0, 'updated_at': 0}).sort('day', 1):
+            for name in COUNTERS:
+                doc.setdefault(name, 0)
+            stats.append(doc)
+        return stats
+
+    def backfill(self) -> int:
+        """
+        Reconstrói os contadores a partir do histórico existente.
+
+        Agrupa o histórico no servidor (sem ler as listas de números): as
+        importações pelo dia do timestamp e os envios pelo dia do processed_at.
+        Registros com status 'failed' contam todos os números como falha. Os
+        documentos dos dias encontrados são substituídos; deve ser executado uma
+        vez, com o dispatcher parado, para não perder incrementos concorrentes.
+
+        Returns:
+            int: Quantidade de documentos de estatísticas gravados
+        """
+        def day_of(field):
+            return {'$dateToString': {'format': '%Y-%m-%d', 'date': field, 'timezone': STATS_TIMEZONE}}
+
+        imports = self.db['history'].aggregate([
+            {'$match': {'valid_count': {'$exists': True}, 'timestamp': {'$type': 'date'}}},
+            {'$group': {
+                '_id': {'day': day_of('$timestamp'), 'client_id': '$client_id', 'webhook_id': '$webhook_id'},
+                'imports': {'$sum': 1},
+                'valid': {'$sum': '$valid_count'},
+                'invalid': {'$sum': '$invalid_count'}
+            }}
+        ], allowDiskUse=True)
+        sends = self.db['history'].aggregate([
+            {'$match': {
+                'valid_count': {'$exists': True},
+                'status': {'$in': ['completed', 'failed']},
+                'processed_at': {'$type': 'date'}
+            }},
+            {'$group': {
+                '_id': {'day': day_of('$processed_at'), 'client_id': '$client_id', 'webhook_id': '$webhook_id'},
+                'sent': {'$sum': {'$cond': [{'$eq': ['$status', 'completed']}, '$valid_count', 0]}},
+                'failed': {'$sum': {'$cond': [{'$eq': ['$status', 'failed']}, '$valid_count', 0]}}
+            }}
+        ], allowDiskUse=True)
+
+        rollups: Dict[tuple, Dict] = {}
+        for row in list(imports) + list(sends):
+            key = (row['_id']['day'], row['_id'].get('client_id'), row['_id'].get('webhook_id'))
+            doc = rollups.setdefault(key, {
+                'day': key[0], 'client_id': key[1], 'webhook_id': key[2], **{name: 0 for name in COUNTERS}
+            })
+            for name in COUNTERS:
+                doc[name] += int(row.get(name) or 0)
+
+        now = datetime.utcnow()
+        operations = [
+            ReplaceOne(
+                {'day': doc['day'], 'client_id': doc['client_id'], 'webhook_id': doc['webhook_id']},
+                dict(doc, updated_at=now),
+                upsert=True
+            )
+            for doc in rollups.values()
+        ]
+        for start in range(0, len(operations), BACKFILL_BATCH_SIZE):
+            self.collection.bulk_write(operations[start:start + BACKFILL_BATCH_SIZE], ordered=False)
+        logger.info("Backfill de estatísticas diárias concluído: %s documentos", len(operations))
+        return len(operations)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Estatísticas diárias pré-agregadas (daily_stats)")
+    parser.add_argument('--backfill', action='store_true', help="Reconstrói os contadores a partir do histórico")
+    args = parser.parse_args(argv)
+    if args.backfill:
+        print(f"{StatsService().backfill()} documentos gravados em daily_stats")
+    else:
+        parser.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,148 @@
+from array import array
+from datetime import datetime, timedelta
+from typing import Dict, Iterable
+import logging
+import threading
+import numpy as np
+from pymongo import UpdateOne
+from ..database.mongodb import MongoDB
+from ..utils.phone_index import PhoneIndex
+from ..utils.phone_utils import normalize_phone_array
+
+logger = logging.getLogger(__name__)
+
+# Tamanho dos lotes de escrita e de leitura na collection de supressão
+BATCH_SIZE = 10000
+# Margem para pegar escritas concorrentes no refresh incremental
+SYNC_SKEW = timedelta(seconds=5)
+
+
+class SuppressionService:
+    """
+    Lista de supressão (opt-out) de números que não devem ser contatados.
+
+    Os números ficam na collection 'suppressions' com o próprio número (int64)
+    como _id. Para filtrar importações sem consultar o banco, o serviço mantém
+    um PhoneIndex compartilhado por todo o processo, carregado uma vez e
+    atualizado de forma incremental pelo campo updated_at.
+    """
+    _index = None
+    _synced_at = None
+    _index_lock = threading.Lock()
+
+    def __init__(self, db=None):
+        """
+        Inicializa o serviço de supressão.
+        """
+        self.db = db if db is not None else MongoDB().get_database()
+        self.collection = self.db['suppressions']
+
+    def _set_active(self, numbers: Iterable[str], active: bool, reason: str = None) -> Dict:
+        normalized = normalize_phone_array(list(numbers))
+        valid = np.unique(normalized[normalized > 0])
+        now = datetime.utcnow()
+
+        changed = 0
+        for start in range(0, len(valid), BATCH_SIZE):
+            batch = valid[start:start + BATCH_SIZE].tolist()
+            if active:
+                fields = {'active': True, 'updated_at': now}
+                if reason:
+                    fields['reason'] = reason
+                operations = [
+                    UpdateOne({'_id': number}, {'$set': fields, '$setOnInsert': {'created_at': now}}, upsert=True)
+                    for number in batch
+                ]
+            else:
+                operations = [
+                    UpdateOne({'_id': number, 'active': True}, {'$set': {'active': False, 'updated_at': now}})
+                    for number in batch
+                ]
+            result = self.collection.bulk_write(operations, ordered=False)
+            changed += result.upserted_count + result.modified_count
+
+        # Reflete a alteração no índice local imediatamente
+        index = SuppressionService._index
+        if index is not None and len(valid):
+            if active:
+                index.add(valid)
+            else:
+                index.remove(valid)
+
+        return {
+            'total_received': len(normalized),
+            'total_valid': len(valid),
+            'total_invalid': int((normalized == 0).sum()),
+            'total_changed': changed,
+        }
+
+    def add_numbers(self, numbers: Iterable[str], reason: str = None) -> Dict:
+        """
+        Adiciona números à lista de supressão em lote.
+
+        Args:
+            numbers (Iterable[str]): Números em qualquer formato aceito na importação
+            reason (str, optional): Motivo do opt-out
+
+        Returns:
+            Dict: Contagem de números recebidos, válidos, inválidos e alterados
+        """
+        result = self._set_active(numbers, True, reason)
+        logger.info("Supressão: %s números adicionados", result['total_changed'])
+        return result
+
+    def remove_numbers(self, numbers: Iterable[str]) -> Dict:
+        """
+        Remove números da lista de supressão em lote (soft delete).
+        """
+        result = self._set_active(numbers, False)
+        logger.info("Supressão: %s números removidos", result['total_changed'])
+        return result
+
+    def count(self) -> int:
+        """
+        Retorna o total de números suprimidos.
+        """
+        return self.collection.count_documents({'active': True})
+
+    def _read_numbers(self, query: Dict) -> np.ndarray:
+        # array('q') guarda os inteiros de forma compacta enquanto o cursor é lido
+        numbers = array('q')
+        cursor = self.collection.find(query, {'_id': 1}).batch_size(BATCH_SIZE)
+        for document in cursor:
+            numbers.append(document['_id'])
+        return np.frombuffer(numbers, dtype=np.int64) if numbers else np.zeros(0, dtype=np.int64)
+
+    def load_index(self) -> PhoneIndex:
+        """
+        Carrega (ou recarrega) o índice completo a partir do banco.
+        """
+        with SuppressionService._index_lock:
+            synced_at = datetime.utcnow()
+            index = PhoneIndex(self._read_numbers({'active': True}))
+            SuppressionService._index = index
+            SuppressionService._synced_at = synced_at
+        logger.info("Índice de supressão carregado: %s números (%s bytes)", len(index), index.nbytes)
+        return index
+
+    def refresh_index(self) -> PhoneIndex:
+        """
+        Aplica ao índice apenas as alterações feitas desde a última sincronização.
+        """
+        if SuppressionService._index is None:
+            return self.load_index()
+
+        with SuppressionService._index_lock:
+            index = SuppressionService._index
+            synced_at = datetime.utcnow()
+            since = SuppressionService._synced_at - SYNC_SKEW
+            index.add(self._read_numbers({'updated_at': {'$gte': since}, 'active': True}))
+            index.remove(self._read_numbers({'updated_at': {'$gte': since}, 'active': False}))
+            SuppressionService._synced_at = synced_at
+        return index
+
+    def suppressed_mask(self, numbers: np.ndarray) -> np.ndarray:
+        """
+        Retorna a máscara dos números (int64) que estão na lista de supressão.
+        """
+        return self.refresh_index().contains(numbers)
@@ -6,11 +6,69 @@ from datetime import datetime
 from typing import Dict, List
 import logging
 from ..database.mongodb import MongoDB
+from ..utils.metrics import metrics
+from ..utils.logger import summarize_payload
+from ..utils.config import get_setting
+from ..utils.rate_limiter import RateLimiter
+from .frequency_service import FrequencyService
+from .history_service import HistoryService, expand_packed_numbers
+from .webhook_health_service import WebhookHealthService
+import numpy as np
 from bson import ObjectId
 from urllib.parse import urlparse
 
 logger = logging.getLogger(__name__)
 
+# Métricas do dispatcher
+JOB_CLAIM_SECONDS = metrics.histogram('sbsender_job_claim_seconds', 'Latência para marcar um job como processing')
+PROVIDER_POST_SECONDS = metrics.histogram('sbsender_provider_post_seconds', 'Latência do POST para o provedor')
+STATUS_WRITE_SECONDS = metrics.histogram('sbsender_status_write_seconds', 'Latência da escrita do status final do job')
+JOBS_TOTAL = {
+    status: metrics.counter('sbsender_jobs_total', 'Jobs processados pelo dispatcher', status=status)
+    for status in ('completed', 'failed')
+}
+NUMBERS_SENT_TOTAL = metrics.counter('sbsender_numbers_sent_total', 'Números enviados ao provedor com sucesso')
+JOBS_DEFERRED_TOTAL = metrics.counter('sbsender_jobs_deferred_total', 'Jobs adiados porque o webhook estava fora do ar')
+# Intervalo entre as execuções do arquivamento do histórico (segundos)
+ARCHIVE_INTERVAL_SECONDS = 3600
+# Intervalo entre as buscas por registros pendentes (segundos)
+DISPATCH_INTERVAL_SECONDS = 60
+QUEUE_JOBS = {
+    status: metrics.gauge('sbsender_queue_jobs', 'Jobs no histórico por status', status=status)
+    for status in ('pending', 'processing')
+}
+
+def provider_rate_limiter(clock=None) -> RateLimiter:
+    """
+    Limite de ritmo do envio ao provedor configurado em PROVIDER_RATE_LIMIT
+    (números por minuto) e PROVIDER_RATE_BURST (segundos de ritmo acumulado).
+    """
+    return RateLimiter(
+        get_setting('provider', 'rate_limit', 'PROVIDER_RATE_LIMIT', 0.0, cast=float),
+        burst_seconds=get_setting('provider', 'rate_burst', 'PROVIDER_RATE_BURST', 1.0, cast=float),
+        clock=clock
+    )
+
+
+def pending_query(now: datetime) -> Dict:
+    """
+    Filtro dos registros que o dispatcher envia em uma verificação: pendentes e,
+    se adiados pelo controle de admissão, com 'scheduled_for' já alcançado.
+    """
+    return {'status': 'pending', 'scheduled_for': {'$not': {'$gt': now}}}
+
+
+def chunk_sizes(numbers_total: int, chunk_size: int) -> List[int]:
+    """
+    Tamanhos dos lotes enviados ao provedor para uma lista sem mensagens
+    personalizadas (a mesma divisão do _split_chunks).
+    """
+    if not chunk_size or numbers_total <= chunk_size:
+        return [numbers_total]
+    full, rest = divmod(numbers_total, chunk_size)
+    return [chunk_size] * full + ([rest] if rest else [])
+
+
 class TaskService:
     def __init__(self, db=None):
         """
@@ -35,9 +93,26 @@ class TaskService:
         if not all([parsed_url.scheme, parsed_url.netloc]):
             raise Exception(f"URL do provedor inválida: {self.provider_webhook}")
             
+        # Tamanho máximo de cada POST ao provedor (0 = lista inteira em um único POST)
+        self.chunk_size = get_setting('provider', 'chunk_size', 'PROVIDER_CHUNK_SIZE', 0, cast=int)
+        # Ritmo máximo de números enviados ao provedor por minuto (0 = sem limite)
+        self.rate_limiter = provider_rate_limiter()
+        # URL do callback de status de entrega enviada no payload (opcional; ver api.py)
+        self.callback_url = get_setting('provider', 'callback_url', 'DELIVERY_CALLBACK_URL')
+        self.frequency_service = FrequencyService(self.db)
+        self.history_service = HistoryService(self.db)
+        self.archive_service = self.history_service.archive_service
+        self.admission_service = self.history_service.admission_service
+        self.quota_service = self.history_service.quota_service
+        # Saúde dos webhooks (verificada em background e lida do cache)
+        self.health_service = WebhookHealthService(db=self.db)
+        # Adia os jobs de webhooks fora do ar até a próxima verificação com sucesso
+        self.defer_unhealthy = get_setting('webhook_health', 'defer_unhealthy', 'WEBHOOK_HEALTH_DEFER', False, cast=bool)
+        self._last_archive = 0.0
+            
         self.stop_flag = False
         self.thread = None
-        logger.info(f"TaskService inicializado com webhook: {self.provider_webhook}")
+        logger.info("TaskService inicializado com webhook: %s", self.provider_webhook)
 
     def start_processing(self):
         """
@@ -48,6 +123,7 @@ class TaskService:
             self.thread = threading.Thread(target=self._process_pending_messages)
             self.thread.daemon = True
             self.thread.start()
+            self.health_service.start()
             logger.info("Processamento em background iniciado")
 
     def stop_processing(self):
@@ -55,6 +131,7 @@ class TaskService:
         Para o processamento em background.
         """
         self.stop_flag = True
+        self.health_service.stop()
         if self.thread:
             self.thread.join()
             logger.info("Processamento em background parado")
@@ -65,111 +142,293 @@ class TaskService:
         """
         while not self.stop_flag:
             try:
-                # Busca mensagens pendentes
-                pending_messages = self.history_collection.find({
-                    'status': 'pending'
-                })
+                self.update_queue_gauges()
+
+                # Move o histórico antigo para o arquivo (HISTORY_ARCHIVE_DAYS)
+                if self.archive_service.enabled and time.time() - self._last_archive >= ARCHIVE_INTERVAL_SECONDS:
+                    self._last_archive = time.time()
+                    self.archive_service.archive_old()
+
+                # Busca mensagens pendentes (as adiadas pelo controle de admissão
+                # só a partir de 'scheduled_for')
+                pending_messages = self.history_collection.find(pending_query(datetime.utcnow()))
 
                 for message in pending_messages:
                     if self.stop_flag:
                         break
-
-                    try:
-                        # Valida os dados necessários
-                        if not message.get('valid_numbers'):
-                            raise Exception("Nenhum número válido para enviar")
-                        
-                        webhook_url = message.get('webhook_url')
-                        if not webhook_url:
-                            raise Exception("URL do webhook não encontrada")
-                            
-                        # Valida a URL do webhook
-                        parsed_url = urlparse(webhook_url)
-                        if not all([parsed_url.scheme, parsed_url.netloc]):
-                            raise Exception(f"URL do webhook inválida: {webhook_url}")
-
-                        # Atualiza status para processando
-                        self.history_collection.update_one(
-                            {'_id': message['_id']},
-                            {'$set': {
-                                'status': 'processing',
-                                'processing_started_at': datetime.utcnow()
-                            }}
-                        )
-
-                        logger.info(f"Enviando mensagem para o provedor - ID: {message['_id']}")
-                        logger.info(f"Números: {len(message.get('valid_numbers', []))} - Webhook: {webhook_url}")
-
-                        # Envia a mensagem para o webhook do provedor
-                        # Remove campos específicos do MongoDB que não devem ser enviados
-                        webhook_data = message.copy()
-                        webhook_data.pop('_id', None)  # Remove o _id do MongoDB
-                        webhook_data.pop('status', None)  # Remove status interno
-                        webhook_data.pop('processing_started_at', None)
-                        webhook_data.pop('processed_at', None)
-                        webhook_data.pop('response_status', None)
-                        webhook_data.pop('response_text', None)
-                        webhook_data.pop('error', None)
-
-                        # Função recursiva para converter ObjectIds e datetimes em strings
-                        def convert_for_json(obj):
-                            if isinstance(obj, dict):
-                                return {key: convert_for_json(value) for key, value in obj.items()}
-                            elif isinstance(obj, list):
-                                return [convert_for_json(item) for item in obj]
-                            elif isinstance(obj, ObjectId):
-                                return str(obj)
-                            elif isinstance(obj, datetime):
-                                return obj.isoformat()
-                            return obj
-
-                        # Converte todos os ObjectIds e datetimes no payload
-                        webhook_data = convert_for_json(webhook_data)
-
-                        logger.info(f"Enviando mensagem para o provedor - ID: {message['_id']}")
-                        logger.info(f"Payload: {webhook_data}")
-
-                        response = requests.post(
-                            self.provider_webhook,
-                            json=webhook_data,
-                            timeout=30
-                        )
-
-                        # Atualiza o status baseado na resposta
-                        new_status = 'completed' if response.status_code == 200 else 'failed'
-                        update_data = {
-                            'status': new_status,
-                            'processed_at': datetime.utcnow(),
-                            'response_status': response.status_code,
-                            'response_text': response.text
-                        }
-
-                        if new_status == 'failed':
-                            update_data['error'] = f"Erro do provedor: Status {response.status_code} - {response.text}"
-
-                        self.history_collection.update_one(
-                            {'_id': message['_id']},
-                            {'$set': update_data}
-                        )
-
-                        logger.info(f"Mensagem {message['_id']} processada com status {new_status}")
-
-                    except Exception as e:
-                        error_msg = str(e)
-                        logger.error(f"Erro ao processar mensagem {message['_id']}: {error_msg}")
-                        
-                        # Em caso de erro, marca como falha
-                        self.history_collection.update_one(
-                            {'_id': message['_id']},
-                            {'$set': {
-                                'status': 'failed',
-                                'processed_at': datetime.utcnow(),
-                                'error': error_msg
-                            }}
-                        )
+                    self.process_message(message)
 
             except Exception as e:
-                logger.error(f"Erro no loop de processamento: {str(e)}")
+                logger.error("Erro no loop de processamento: %s", e)
 
             # Aguarda 1 minuto antes da próxima verificação
-            time.sleep(60)
+            time.sleep(DISPATCH_INTERVAL_SECONDS)
+
+    def _split_chunks(self, numbers: List[str]) -> List[List[str]]:
+        """
+        Divide a lista de números em lotes de até chunk_size números.
+        """
+        if not self.chunk_size or len(numbers) <= self.chunk_size:
+            return [numbers]
+        return [numbers[start:start + self.chunk_size] for start in range(0, len(numbers), self.chunk_size)]
+
+    @staticmethod
+    def _chunk_payload(webhook_data: Dict, chunk: List[str], index: int, total: int) -> Dict:
+        """
+        Monta o payload de um lote. Com um único lote, o payload é o registro completo.
+        """
+        if total == 1:
+            return webhook_data
+        payload = dict(webhook_data)
+        payload['valid_numbers'] = chunk
+        payload['valid_count'] = len(chunk)
+        if isinstance(payload.get('details'), dict):
+            payload['details'] = dict(payload['details'], valid_numbers=chunk)
+        payload['chunk'] = {'index': index + 1, 'total': total}
+        return payload
+
+    def _message_chunk_payloads(self, webhook_data: Dict, history_id, total: int):
+        """
+        Gera os payloads de uma importação com mensagens personalizadas, lendo
+        um lote de 'message_chunks' por vez.
+        """
+        for seq, numbers, messages in self.history_service.iter_message_chunks(history_id):
+            payload = dict(webhook_data)
+            payload['valid_numbers'] = numbers
+            payload['valid_count'] = len(numbers)
+            payload['messages'] = [{'phone': phone, 'message': text} for phone, text in zip(numbers, messages)]
+            payload['chunk'] = {'index': seq + 1, 'total': total}
+            yield numbers, payload
+
+    def _record_contacts(self, client_id, numbers: List[str]):
+        """
+        Atualiza o índice de último contato dos números enviados.
+        """
+        try:
+            self.frequency_service.record_contacts(client_id, np.array(numbers, dtype=np.int64))
+        except Exception as e:
+            logger.error("Erro ao registrar contatos enviados: %s", e)
+
+    def _record_stats(self, message: Dict, sent: int, failed: int):
+        """
+        Soma o resultado do envio nas estatísticas diárias.
+        """
+        try:
+            self.history_service.stats_service.record_send(message.get('client_id'), message.get('webhook_id'), sent, failed)
+        except Exception as e:
+            logger.error("Erro ao atualizar estatísticas diárias: %s", e)
+
+    def _release_quota(self, message: Dict, failed: int):
+        """
+        Devolve à cota do cliente os números que não foram enviados.
+        """
+        if not message.get('quota_numbers') or failed <= 0:
+            return
+        try:
+            self.quota_service.release(message.get('client_id'), min(failed, message['quota_numbers']), message.get('timestamp'))
+        except Exception as e:
+            logger.error("Erro ao devolver números à cota: %s", e)
+
+    def _release_queue(self, message: Dict):
+        """
+        Desconta dos contadores da fila os números de um registro finalizado.
+        """
+        if not message.get('queued_numbers'):
+            return
+        try:
+            self.admission_service.release(message.get('client_id'), message['queued_numbers'])
+        except Exception as e:
+            logger.error("Erro ao atualizar os contadores da fila: %s", e)
+
+    def update_queue_gauges(self):
+        """
+        Atualiza os gauges com a quantidade de jobs pendentes e em processamento.
+        """
+        try:
+            counts = {status: 0 for status in QUEUE_JOBS}
+            for row in self.history_collection.aggregate([
+                {'$match': {'status': {'$in': list(QUEUE_JOBS)}}},
+                {'$group': {'_id': '$status', 'count': {'$sum': 1}}}
+            ]):
+                counts[row['_id']] = row['count']
+            for status, count in counts.items():
+                QUEUE_JOBS[status].set(count)
+        except Exception as e:
+            logger.error("Erro ao atualizar métricas da fila: %s", e)
+
+    def process_message(self, message: Dict) -> str:
+        """
+        Envia um registro pendente do histórico para o provedor e atualiza seu status.
+        
+        Args:
+            message (Dict): Documento do histórico com status 'pending'
+            
+        Returns:
+            str: Status final do registro ('completed' ou 'failed'), ou 'pending'
+                se ele foi adiado (WEBHOOK_HEALTH_DEFER)
+        """
+        numbers_sent = 0
+        try:
+            personalized = bool(message.get('personalized'))
+            if personalized:
+                # Os números e mensagens são lidos lote a lote de 'message_chunks'
+                message.pop('valid_numbers_packed', None)
+                numbers_total = message.get('message_chunks') and message.get('valid_count', 0)
+            else:
+                # Descompacta os números válidos gravados pelo register_import
+                expand_packed_numbers(message)
+                numbers_total = len(message.get('valid_numbers') or [])
+
+            # Valida os dados necessários
+            if not numbers_total:
+                raise Exception("Nenhum número válido para enviar")
+            
+            webhook_url = message.get('webhook_url')
+            if not webhook_url:
+                raise Exception("URL do webhook não encontrada")
+                
+            # Valida a URL do webhook
+            parsed_url = urlparse(webhook_url)
+            if not all([parsed_url.scheme, parsed_url.netloc]):
+                raise Exception(f"URL do webhook inválida: {webhook_url}")
+
+            # Consulta a última verificação do webhook (sem requisição)
+            health = self.health_service.get_health(message.get('webhook_id'))
+            if health and not health['healthy']:
+                if self.defer_unhealthy:
+                    logger.warning("Webhook %s fora do ar (%s); mensagem %s adiada",
+                                   message.get('webhook_id'), health['error'], message['_id'])
+                    JOBS_DEFERRED_TOTAL.inc()
+                    return 'pending'
+                logger.warning("Webhook %s falhou na última verificação (%s); enviando mesmo assim",
+                               message.get('webhook_id'), health['error'])
+
+            # Atualiza status para processando
+            with JOB_CLAIM_SECONDS.time():
+                self.history_collection.update_one(
+                    {'_id': message['_id']},
+                    {'$set': {
+                        'status': 'processing',
+                        'processing_started_at': datetime.utcnow()
+                    }}
+                )
+
+            logger.info("Enviando mensagem para o provedor - ID: %s - Números: %s - Webhook: %s",
+                        message['_id'], numbers_total, webhook_url, extra={'sample': 'dispatch.job'})
+
+            # Envia a mensagem para o webhook do provedor
+            # Remove campos específicos do MongoDB que não devem ser enviados
+            webhook_data = message.copy()
+            webhook_data.pop('_id', None)  # Remove o _id do MongoDB
+            webhook_data.pop('status', None)  # Remove status interno
+            webhook_data.pop('processing_started_at', None)
+            webhook_data.pop('processed_at', None)
+            webhook_data.pop('response_status', None)
+            webhook_data.pop('response_text', None)
+            webhook_data.pop('error', None)
+            # Identificação do registro usada pelo provedor nos callbacks de status
+            webhook_data['history_id'] = str(message['_id'])
+            if self.callback_url:
+                webhook_data['callback_url'] = self.callback_url
+
+            # Função recursiva para converter ObjectIds e datetimes em strings
+            def convert_for_json(obj):
+                if isinstance(obj, dict):
+                    return {key: convert_for_json(value) for key, value in obj.items()}
+                elif isinstance(obj, list):
+                    return [convert_for_json(item) for item in obj]
+                elif isinstance(obj, ObjectId):
+                    return str(obj)
+                elif isinstance(obj, datetime):
+                    return obj.isoformat()
+                return obj
+
+            # Converte todos os ObjectIds e datetimes no payload
+            webhook_data = convert_for_json(webhook_data)
+
+            # Envia os números em lotes (PROVIDER_CHUNK_SIZE); sem limite, um único POST.
+            # Mensagens personalizadas seguem os lotes gravados na importação.
+            if personalized:
+                chunks_total = message['message_chunks']
+                batches = self._message_chunk_payloads(webhook_data, message['_id'], chunks_total)
+            else:
+                chunks = self._split_chunks(webhook_data.get('valid_numbers', []))
+                chunks_total = len(chunks)
+                batches = (
+                    (chunk, self._chunk_payload(webhook_data, chunk, index, chunks_total))
+                    for index, chunk in enumerate(chunks)
+                )
+
+            chunks_sent = 0
+            numbers_sent = 0
+            response = None
+            for chunk, payload in batches:
+                logger.debug("Payload: %s", summarize_payload(payload), extra={'sample': 'dispatch.payload'})
+
+                self.rate_limiter.acquire(len(chunk))
+                with PROVIDER_POST_SECONDS.time():
+                    response = requests.post(
+                        self.provider_webhook,
+                        json=payload,
+                        timeout=30
+                    )
+                metrics.counter('sbsender_provider_responses_total', 'Respostas do provedor por status HTTP', code=str(response.status_code)).inc()
+                if response.status_code != 200:
+                    break
+
+                chunks_sent += 1
+                numbers_sent += len(chunk)
+                self._record_contacts(message.get('client_id'), chunk)
+
+            if response is None:
+                raise Exception("Nenhum lote de mensagens encontrado para enviar")
+
+            # Atualiza o status baseado na resposta
+            new_status = 'completed' if chunks_sent == chunks_total else 'failed'
+            update_data = {
+                'status': new_status,
+                'processed_at': datetime.utcnow(),
+                'response_status': response.status_code,
+                'response_text': response.text
+            }
+            if chunks_total > 1 or personalized:
+                update_data['chunks_total'] = chunks_total
+                update_data['chunks_sent'] = chunks_sent
+
+            if new_status == 'failed' and response.status_code == 200:
+                update_data['error'] = f"Lotes de mensagens incompletos: {chunks_sent} de {chunks_total}"
+            elif new_status == 'failed':
+                update_data['error'] = f"Erro do provedor: Status {response.status_code} - {response.text}"
+
+            with STATUS_WRITE_SECONDS.time():
+                self.history_collection.update_one(
+                    {'_id': message['_id']},
+                    {'$set': update_data}
+                )
+            JOBS_TOTAL[new_status].inc()
+            NUMBERS_SENT_TOTAL.inc(numbers_sent)
+            self._record_stats(message, numbers_sent, numbers_total - numbers_sent)
+            self._release_queue(message)
+            self._release_quota(message, numbers_total - numbers_sent)
+
+            logger.info("Mensagem %s processada com status %s", message['_id'], new_status, extra={'sample': 'dispatch.job'})
+            return new_status
+
+        except Exception as e:
+            error_msg = str(e)
+            logger.error("Erro ao processar mensagem %s: %s", message['_id'], error_msg)
+            
+            # Em caso de erro, marca como falha
+            self.history_collection.update_one(
+                {'_id': message['_id']},
+                {'$set': {
+                    'status': 'failed',
+                    'processed_at': datetime.utcnow(),
+                    'error': error_msg
+                }}
+            )
+            JOBS_TOTAL['failed'].inc()
+            self._record_stats(message, numbers_sent, max(message.get('valid_count', 0) - numbers_sent, 0))
+            self._release_queue(message)
+            self._release_quota(message, message.get('valid_count', 0) - numbers_sent)
+            return 'failed'
@@ -0,0 +1,237 @@
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Callable, Dict, List, Optional
+import logging
+import threading
+import time
+import numpy as np
+import requests
+from .webhook_service import WebhookService
+from ..utils.config import get_setting
+from ..utils.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+PROBE_SECONDS = metrics.histogram('sbsender_webhook_probe_seconds', 'Latência das verificações de saúde dos webhooks')
+PROBES_TOTAL = {
+    result: metrics.counter('sbsender_webhook_probes_total', 'Verificações de saúde dos webhooks por resultado', result=result)
+    for result in ('ok', 'error')
+}
+UNHEALTHY_WEBHOOKS = metrics.gauge('sbsender_webhooks_unhealthy', 'Webhooks com a última verificação de saúde com falha')
+
+# Validade de uma verificação em cache, em segundos
+DEFAULT_TTL = 300
+# Timeout de cada verificação, em segundos (o mesmo do validate_webhook)
+DEFAULT_TIMEOUT = 5
+# Verificações simultâneas
+DEFAULT_WORKERS = 32
+# Latências guardadas por URL para os percentis e a taxa de erro
+SAMPLES_PER_URL = 50
+
+_sessions = threading.local()
+
+
+def _session() -> requests.Session:
+    # Uma sessão (e um pool de conexões) por thread do pool de verificações
+    session = getattr(_sessions, 'session', None)
+    if session is None:
+        session = _sessions.session = requests.Session()
+    return session
+
+
+def probe_webhook(webhook_url: str, timeout: float = DEFAULT_TIMEOUT) -> Dict:
+    """
+    Faz uma requisição de teste a um webhook.
+
+    Args:
+        webhook_url (str): URL do webhook
+        timeout (float): Timeout em segundos
+
+    Returns:
+        Dict: 'ok', 'status_code', 'latency' (segundos) e 'error'
+    """
+    payload = {
+        "test": True,
+        "timestamp": datetime.now().isoformat()
+    }
+    start = time.perf_counter()
+    try:
+        response = _session().post(
+            webhook_url,
+            json=payload,
+            headers={"Content-Type": "application/json"},
+            timeout=timeout
+        )
+        ok = response.status_code == 200
+        return {
+            'ok': ok,
+            'status_code': response.status_code,
+            'latency': time.perf_counter() - start,
+            'error': None if ok else f"Status {response.status_code}"
+        }
+    except Exception as e:
+        return {'ok': False, 'status_code': None, 'latency': time.perf_counter() - start, 'error': str(e)[:200]}
+
+
+class WebhookHealthService:
+    """
+    Verificação de saúde dos webhooks ativos, com resultado em cache.
+
+    As verificações rodam em um pool de threads compartilhado pelo processo
+    (WEBHOOK_HEALTH_WORKERS, padrão 32); webhooks com a mesma URL são
+    verificados uma única vez. Cada resultado fica em cache por
+    WEBHOOK_HEALTH_TTL segundos, e as últimas SAMPLES_PER_URL latências de cada
+    URL dão os percentis (p50, p95, p99) e a taxa de erro. A página de
+    Webhooks e o dispatcher leem o cache com get_health/get_all_health, sem
+    fazer requisições; check_all (ou a thread de start) atualiza o cache.
+    """
+    _executor = None
+    _cache: Dict[str, Dict] = {}
+    _samples: Dict[str, deque] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, webhook_service: Optional[WebhookService] = None, db=None, ttl: Optional[float] = None,
+                 timeout: Optional[float] = None, max_workers: Optional[int] = None,
+                 probe: Optional[Callable[[str, float], Dict]] = None):
+        """
+        Args:
+            webhook_service (WebhookService, optional): Fonte dos webhooks ativos (padrão: WebhookService(db))
+            db: Banco de dados (padrão: conexão do MongoDB)
+            ttl (float, optional): Validade do cache em segundos (padrão: WEBHOOK_HEALTH_TTL)
+            timeout (float, optional): Timeout de cada verificação (padrão: WEBHOOK_HEALTH_TIMEOUT)
+            max_workers (int, optional): Tamanho do pool (padrão: WEBHOOK_HEALTH_WORKERS)
+            probe (callable, optional): Função de verificação (padrão: probe_webhook)
+        """
+        self.webhook_service = webhook_service if webhook_service is not None else WebhookService(db)
+        if ttl is None:
+            ttl = get_setting('webhook_health', 'ttl', 'WEBHOOK_HEALTH_TTL', DEFAULT_TTL, cast=float)
+        if timeout is None:
+            timeout = get_setting('webhook_health', 'timeout', 'WEBHOOK_HEALTH_TIMEOUT', DEFAULT_TIMEOUT, cast=float)
+        self.ttl = ttl
+        self.timeout = timeout
+        self.probe = probe or probe_webhook
+        self._stopped = threading.Event()
+        self._thread = None
+        with WebhookHealthService._lock:
+            if WebhookHealthService._executor is None:
+                if max_workers is None:
+                    max_workers = get_setting('webhook_health', 'workers', 'WEBHOOK_HEALTH_WORKERS', DEFAULT_WORKERS, cast=int)
+                WebhookHealthService._executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix='webhook-health')
+
+    def check_all(self, force: bool = False) -> Dict[str, Dict]:
+        """
+        Verifica, em paralelo, os webhooks ativos sem resultado válido em cache.
+
+        Args:
+            force (bool): Verifica todos, mesmo os que estão no cache
+
+        Returns:
+            Dict[str, Dict]: Saúde de cada webhook ativo, por ID
+        """
+        webhooks = self.webhook_service.get_all_webhooks()
+        now = time.monotonic()
+        with WebhookHealthService._lock:
+            stale = [
+                webhook for webhook in webhooks
+                if force or webhook['_id'] not in self._cache
+                or self._cache[webhook['_id']]['url'] != webhook['url']
+                or self._cache[webhook['_id']]['expires_at'] <= now
+            ]
+
+        urls = list(dict.fromkeys(webhook['url'] for webhook in stale))
+        if urls:
+            start = time.perf_counter()
+            results = dict(zip(urls, self._executor.map(lambda url: self.probe(url, self.timeout), urls)))
+            for url, result in results.items():
+                PROBE_SECONDS.observe(result['latency'])
+                PROBES_TOTAL['ok' if result['ok'] else 'error'].inc()
+            self._store(stale, results)
+            logger.info("%s webhooks (%s URLs) verificados em %.2fs", len(stale), len(urls), time.perf_counter() - start)
+
+        active = {webhook['_id'] for webhook in webhooks}
+        with WebhookHealthService._lock:
+            # Remove do cache os webhooks excluídos ou desativados
+            for webhook_id in set(self._cache) - active:
+                del self._cache[webhook_id]
+            UNHEALTHY_WEBHOOKS.set(sum(1 for health in self._cache.values() if not health['healthy']))
+            return {webhook_id: self._public(health) for webhook_id, health in self._cache.items()}
+
+    def _store(self, webhooks: List[Dict], results: Dict[str, Dict]):
+        checked_at = datetime.utcnow()
+        expires_at = time.monotonic() + self.ttl
+        with WebhookHealthService._lock:
+            stats = {}
+            for url, result in results.items():
+                samples = self._samples.setdefault(url, deque(maxlen=SAMPLES_PER_URL))
+                samples.append((result['latency'], result['ok']))
+                latencies = np.array([sample[0] for sample in samples])
+                p50, p95, p99 = np.percentile(latencies, [50, 95, 99]).tolist()
+                stats[url] = {
+                    'p50': p50, 'p95': p95, 'p99': p99,
+                    'error_rate': sum(1 for sample in samples if not sample[1]) / len(samples),
+                    'samples': len(samples)
+                }
+            for webhook in webhooks:
+                result = results[webhook['url']]
+                self._cache[webhook['_id']] = {
+                    'webhook_id': webhook['_id'],
+                    'title': webhook.get('title'),
+                    'url': webhook['url'],
+                    'healthy': result['ok'],
+                    'status_code': result['status_code'],
+                    'latency': result['latency'],
+                    'error': result['error'],
+                    'checked_at': checked_at,
+                    'expires_at': expires_at,
+                    **stats[webhook['url']]
+                }
+
+    @staticmethod
+    def _public(health: Dict) -> Dict:
+        return {name: value for name, value in health.items() if name != 'expires_at'}
+
+    def get_health(self, webhook_id) -> Optional[Dict]:
+        """
+        Retorna a última verificação de um webhook, sem fazer requisições.
+
+        Returns:
+            Optional[Dict]: Saúde do webhook ou None se ele ainda não foi verificado
+        """
+        with WebhookHealthService._lock:
+            health = self._cache.get(str(webhook_id))
+            return self._public(health) if health else None
+
+    def get_all_health(self) -> Dict[str, Dict]:
+        """
+        Retorna a última verificação de cada webhook, sem fazer requisições.
+        """
+        with WebhookHealthService._lock:
+            return {webhook_id: self._public(health) for webhook_id, health in self._cache.items()}
+
+    def start(self):
+        """
+        Inicia a thread que atualiza o cache a cada WEBHOOK_HEALTH_TTL segundos
+        (uma vez por instância).
+        """
+        if self._thread is not None or self.ttl <= 0:
+            return
+        self._thread = threading.Thread(target=self._check_loop, name='webhook-health', daemon=True)
+        self._thread.start()
+        logger.info("Verificação de saúde dos webhooks a cada %ss", self.ttl)
+
+    def stop(self):
+        """
+        Para a thread de verificação.
+        """
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+
+    def _check_loop(self):
+        while not self._stopped.is_set():
+            try:
+                self.check_all()
+            except Exception as e:
+                logger.error("Erro ao verificar a saúde dos webhooks: %s", e)
+            self._stopped.wait(self.ttl)
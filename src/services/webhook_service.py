@@ -1,6 +1,7 @@
 from datetime import datetime
 from bson import ObjectId
 from ..database.mongodb import MongoDB
+from ..utils.logger import summarize_payload
 from typing import Dict, List, Optional
 import logging
 
@@ -19,12 +20,12 @@ class WebhookService:
         """
         Cria um novo webhook.
         """
-        logger.info(f"Iniciando criação de webhook - Título: {title}, URL: {url}")
+        logger.info("Iniciando criação de webhook - Título: %s, URL: %s", title, url)
         
         # Verifica se já existe um webhook com o mesmo título
         existing_webhook = self.collection.find_one({'title': title, 'active': True})
         if existing_webhook:
-            logger.warning(f"Webhook com título '{title}' já existe")
+            logger.warning("Webhook com título '%s' já existe", title)
             raise ValueError(f"Já existe um webhook com o título '{title}'")
         
         webhook = {
@@ -37,11 +38,11 @@ class WebhookService:
             'active': True
         }
         
-        logger.debug(f"Dados do webhook a ser criado: {webhook}")
+        logger.debug("Dados do webhook a ser criado: %s", summarize_payload(webhook))
         result = self.collection.insert_one(webhook)
         webhook['_id'] = str(result.inserted_id)
         webhook['client_id'] = str(webhook['client_id'])
-        logger.info(f"Webhook criado com sucesso. ID: {webhook['_id']}")
+        logger.info("Webhook criado com sucesso. ID: %s", webhook['_id'])
         return webhook
 
     def get_all_webhooks(self) -> List[Dict]:
@@ -53,21 +54,21 @@ class WebhookService:
         for webhook in webhooks:
             webhook['_id'] = str(webhook['_id'])
             webhook['client_id'] = str(webhook['client_id'])
-        logger.info(f"Total de webhooks encontrados: {len(webhooks)}")
+        logger.info("Total de webhooks encontrados: %s", len(webhooks))
         return webhooks
 
     def get_webhook_by_id(self, webhook_id: str) -> Optional[Dict]:
         """
         Busca um webhook pelo ID.
         """
-        logger.info(f"Buscando webhook pelo ID: {webhook_id}")
+        logger.info("Buscando webhook pelo ID: %s", webhook_id)
         webhook = self.collection.find_one({'_id': ObjectId(webhook_id), 'active': True})
         if webhook:
             webhook['_id'] = str(webhook['_id'])
             webhook['client_id'] = str(webhook['client_id'])
-            logger.info(f"Webhook encontrado: {webhook['_id']}")
+            logger.info("Webhook encontrado: %s", webhook['_id'])
         else:
-            logger.info(f"Webhook não encontrado com ID: {webhook_id}")
+            logger.info("Webhook não encontrado com ID: %s", webhook_id)
         return webhook
 
     def get_webhooks_by_client(self, client_id: str) -> List[Dict]:
@@ -84,14 +85,14 @@ class WebhookService:
                 webhook['client_id'] = str(webhook['client_id'])
             return webhooks
         except Exception as e:
-            logger.error(f"Erro ao buscar webhooks do cliente {client_id}: {str(e)}")
+            logger.error("Erro ao buscar webhooks do cliente %s: %s", client_id, e)
             raise Exception(f"Erro ao buscar webhooks: {str(e)}")
 
     def update_webhook(self, webhook_id: str, title: str, url: str, client_id: str, client_name: str) -> Optional[Dict]:
         """
         Atualiza um webhook existente.
         """
-        logger.info(f"Atualizando webhook com ID: {webhook_id}")
+        logger.info("Atualizando webhook com ID: %s", webhook_id)
         update_data = {
             'title': title,
             'url': url,
@@ -106,18 +107,18 @@ class WebhookService:
         )
         
         if result.modified_count:
-            logger.info(f"Webhook atualizado com sucesso: {webhook_id}")
+            logger.info("Webhook atualizado com sucesso: %s", webhook_id)
             webhook = self.get_webhook_by_id(webhook_id)
             return webhook
         else:
-            logger.info(f"Webhook não encontrado ou não atualizado: {webhook_id}")
+            logger.info("Webhook não encontrado ou não atualizado: %s", webhook_id)
         return None
 
     def delete_webhook(self, webhook_id: str) -> bool:
         """
         Desativa um webhook (soft delete).
         """
-        logger.info(f"Desativando webhook com ID: {webhook_id}")
+        logger.info("Desativando webhook com ID: %s", webhook_id)
         result = self.collection.update_one(
             {'_id': ObjectId(webhook_id), 'active': True},
             {
@@ -128,7 +129,7 @@ class WebhookService:
             }
         )
         if result.modified_count:
-            logger.info(f"Webhook desativado com sucesso: {webhook_id}")
+            logger.info("Webhook desativado com sucesso: %s", webhook_id)
         else:
-            logger.info(f"Webhook não encontrado ou não desativado: {webhook_id}")
+            logger.info("Webhook não encontrado ou não desativado: %s", webhook_id)
         return bool(result.modified_count)
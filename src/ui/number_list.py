@@ -0,0 +1,49 @@
+from typing import Sequence
+import pandas as pd
+import streamlit as st
+from ..utils.list_preview import search_items, page_count, page_slice, iter_csv_blocks
+
+# Linhas exibidas por página
+PAGE_SIZE = 100
+
+
+def render_number_list(items: Sequence[str], key: str, label: str = "Número", file_name: str = "numeros.csv", page_size: int = PAGE_SIZE):
+    """
+    Exibe uma lista grande de números em páginas, com busca e download.
+
+    Apenas a página atual (page_size linhas) é enviada ao navegador. A busca e a
+    paginação rodam no servidor, e o arquivo completo só é gerado quando o
+    usuário pede o download, sendo servido por HTTP em vez de ir pelo websocket.
+
+    Args:
+        items (Sequence[str]): Lista completa de números
+        key (str): Prefixo único para as chaves dos widgets
+        label (str): Nome da coluna exibida e do cabeçalho do CSV
+        file_name (str): Nome do arquivo de download
+        page_size (int): Linhas por página
+    """
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        query = st.text_input("Buscar:", key=f"{key}_search", placeholder="Parte do número")
+    filtered = search_items(items, query)
+    total_pages = page_count(len(filtered), page_size)
+    with col2:
+        page = st.number_input("Página:", min_value=1, max_value=total_pages, value=1, step=1, key=f"{key}_page")
+
+    rows, first, last = page_slice(filtered, int(page), page_size)
+    st.dataframe(pd.DataFrame({label: rows}), hide_index=True, use_container_width=True)
+    st.caption(f"Mostrando {first}-{last} de {len(filtered)}" + (f" (filtrados de {len(items)})" if len(filtered) != len(items) else ""))
+
+    # O CSV completo só é montado depois que o usuário pede
+    export_key = f"{key}_export"
+    if st.session_state.get(export_key):
+        st.download_button(
+            label=f"📥 Baixar lista completa ({len(items)})",
+            data=b''.join(iter_csv_blocks(items, label)),
+            file_name=file_name,
+            mime="text/csv",
+            key=f"{key}_download"
+        )
+    elif st.button("Preparar download da lista completa", key=f"{key}_prepare"):
+        st.session_state[export_key] = True
+        st.rerun()
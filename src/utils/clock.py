@@ -0,0 +1,47 @@
+from datetime import datetime, timedelta
+import threading
+import time
+
+
+class SystemClock:
+    """
+    Relógio real: datas em UTC, tempo monotônico e espera com time.sleep.
+    """
+
+    def now(self) -> datetime:
+        return datetime.utcnow()
+
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """
+    Relógio simulado: sleep avança o tempo na hora, sem esperar.
+
+    Usado para executar a lógica do dispatcher (ritmo de envio, intervalo entre
+    verificações) em uma simulação, com o mesmo código que usa o SystemClock.
+    """
+
+    def __init__(self, start: datetime = None):
+        self.start = start or datetime.utcnow()
+        self._elapsed = 0.0
+        self._lock = threading.Lock()
+
+    def now(self) -> datetime:
+        return self.start + timedelta(seconds=self._elapsed)
+
+    def monotonic(self) -> float:
+        return self._elapsed
+
+    def sleep(self, seconds: float):
+        if seconds > 0:
+            with self._lock:
+                self._elapsed += seconds
+
+
+SYSTEM_CLOCK = SystemClock()
@@ -0,0 +1,41 @@
+import os
+from typing import Any, Callable, Optional
+from dotenv import load_dotenv
+
+# Carrega as variáveis de ambiente
+load_dotenv()
+
+
+def get_setting(section: str, key: str, env_var: str, default: Any = None, cast: Optional[Callable] = None) -> Any:
+    """
+    Lê uma configuração do st.secrets (Streamlit Cloud) com fallback para variáveis de ambiente.
+
+    Args:
+        section (str): Seção no secrets.toml (ex.: 'provider')
+        key (str): Chave dentro da seção
+        env_var (str): Nome da variável de ambiente usada como fallback
+        default (Any): Valor padrão se a configuração não existir
+        cast (Callable, optional): Função para converter o valor lido (ex.: int, float)
+
+    Returns:
+        Any: Valor da configuração
+    """
+    value = None
+    # Para o Streamlit Cloud, use st.secrets
+    try:
+        import streamlit as st
+        value = st.secrets[section][key]
+    except Exception:
+        # Fallback para variáveis de ambiente locais
+        value = os.getenv(env_var)
+
+    if value is None or value == '':
+        return default
+    if cast is bool and isinstance(value, str):
+        return value.strip().lower() in ('1', 'true', 'yes', 'sim', 'on')
+    if cast is not None:
+        try:
+            return cast(value)
+        except (TypeError, ValueError):
+            return default
+    return value
@@ -0,0 +1,123 @@
+import csv
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Optional
+from .phone_utils import normalize_phone_array
+
+# Bytes lidos do início do arquivo para detectar o formato
+SAMPLE_BYTES = 64 * 1024
+# Linhas de amostra usadas para escolher a coluna de telefone
+SAMPLE_ROWS = 200
+# Resultados guardados em memória (chave: hash da amostra)
+CACHE_SIZE = 64
+
+DELIMITERS = ',;\t|'
+ENCODINGS = ('utf-8', 'cp1252', 'latin-1')
+# Nomes de coluna que indicam telefone, usados para desempatar
+PHONE_COLUMN_HINTS = ('telefone', 'celular', 'whatsapp', 'fone', 'phone', 'numero', 'número', 'contato')
+
+_cache: 'OrderedDict[str, Dict]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def _read_sample(content: bytes) -> bytes:
+    sample = bytes(content[:SAMPLE_BYTES])
+    # Descarta a última linha, que pode ter sido cortada no meio
+    if len(content) > SAMPLE_BYTES and b'\n' in sample:
+        sample = sample[:sample.rindex(b'\n') + 1]
+    return sample
+
+
+def _detect_encoding(sample: bytes) -> str:
+    if sample.startswith(b'\xef\xbb\xbf'):
+        return 'utf-8-sig'
+    for encoding in ENCODINGS:
+        try:
+            sample.decode(encoding)
+            return encoding
+        except UnicodeDecodeError:
+            continue
+    return 'latin-1'
+
+
+def _detect_delimiter(text: str) -> str:
+    try:
+        return csv.Sniffer().sniff(text, delimiters=DELIMITERS).delimiter
+    except csv.Error:
+        # Arquivos de uma coluna só não têm delimitador para detectar
+        return ','
+
+
+def detect_phone_column(columns: List[str], rows: List[List[str]]) -> Optional[str]:
+    """
+    Escolhe a coluna com mais telefones válidos na amostra (mínimo de 50%).
+    Sem candidata, usa o nome da coluna como dica ou a primeira coluna.
+    """
+    if not columns:
+        return None
+
+    def hinted(column: str) -> bool:
+        name = column.strip().lower()
+        return any(hint in name for hint in PHONE_COLUMN_HINTS)
+
+    best, best_score = None, 0.0
+    for position, column in enumerate(columns):
+        values = [row[position] for row in rows if position < len(row) and row[position].strip()]
+        if not values:
+            continue
+        score = float((normalize_phone_array(values) > 0).mean())
+        if hinted(column):
+            score += 0.01
+        if score > best_score:
+            best, best_score = column, score
+
+    if best is not None and best_score >= 0.5:
+        return best
+    return next((column for column in columns if hinted(column)), columns[0])
+
+
+def sniff_csv(content: bytes) -> Dict:
+    """
+    Detecta o formato de um CSV lendo apenas o cabeçalho e uma pequena amostra.
+
+    Descobre a codificação, o delimitador, as colunas e a coluna que mais
+    provavelmente contém os telefones (a que tem mais números válidos na
+    amostra). O resultado depende só dos primeiros SAMPLE_BYTES bytes e fica em
+    cache pelo hash dessa amostra, então reexecuções da página com o mesmo
+    arquivo não refazem a detecção.
+
+    Args:
+        content (bytes): Conteúdo do arquivo
+
+    Returns:
+        Dict: encoding, delimiter, columns, phone_column e sample_rows
+    """
+    sample = _read_sample(content)
+    digest = hashlib.sha256(sample).hexdigest()
+    with _cache_lock:
+        if digest in _cache:
+            _cache.move_to_end(digest)
+            return _cache[digest]
+
+    encoding = _detect_encoding(sample)
+    text = sample.decode(encoding)
+    delimiter = _detect_delimiter(text)
+
+    reader = csv.reader(io.StringIO(text), delimiter=delimiter)
+    columns = next(reader, [])
+    rows = [row for _, row in zip(range(SAMPLE_ROWS), reader)]
+
+    result = {
+        'encoding': encoding,
+        'delimiter': delimiter,
+        'columns': columns,
+        'phone_column': detect_phone_column(columns, rows),
+        'sample_rows': rows[:20]
+    }
+    with _cache_lock:
+        _cache[digest] = result
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return result
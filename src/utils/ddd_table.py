@@ -0,0 +1,63 @@
+from typing import Dict
+import numpy as np
+
+# DDDs existentes no Brasil e a UF de cada um (plano de numeração da Anatel)
+DDD_STATES: Dict[int, str] = {
+    **{ddd: 'SP' for ddd in range(11, 20)},
+    21: 'RJ', 22: 'RJ', 24: 'RJ',
+    27: 'ES', 28: 'ES',
+    **{ddd: 'MG' for ddd in (31, 32, 33, 34, 35, 37, 38)},
+    **{ddd: 'PR' for ddd in range(41, 47)},
+    47: 'SC', 48: 'SC', 49: 'SC',
+    51: 'RS', 53: 'RS', 54: 'RS', 55: 'RS',
+    61: 'DF', 62: 'GO', 64: 'GO', 63: 'TO', 65: 'MT', 66: 'MT', 67: 'MS', 68: 'AC', 69: 'RO',
+    **{ddd: 'BA' for ddd in (71, 73, 74, 75, 77)},
+    79: 'SE', 81: 'PE', 87: 'PE', 82: 'AL', 83: 'PB', 84: 'RN', 85: 'CE', 88: 'CE', 86: 'PI', 89: 'PI',
+    91: 'PA', 93: 'PA', 94: 'PA', 92: 'AM', 97: 'AM', 95: 'RR', 96: 'AP', 98: 'MA', 99: 'MA'
+}
+VALID_DDDS = frozenset(DDD_STATES)
+STATES = sorted(set(DDD_STATES.values()))
+
+# Primeiro dígito dos números de 8 dígitos (anteriores ao 9 na frente) que eram
+# celulares; 2 a 5 são telefones fixos
+LEGACY_MOBILE_DIGITS = '6789'
+
+# Tabelas indexadas diretamente pelo DDD (0-99) e pelo dígito (0-9), montadas
+# uma vez na importação do módulo
+DDD_STATE_INDEX = np.zeros(100, dtype=np.int64)  # posição da UF em STATES + 1; 0 = DDD inexistente
+for _ddd, _state in DDD_STATES.items():
+    DDD_STATE_INDEX[_ddd] = STATES.index(_state) + 1
+VALID_DDD_TABLE = DDD_STATE_INDEX > 0
+LEGACY_MOBILE_TABLE = np.zeros(10, dtype=bool)
+LEGACY_MOBILE_TABLE[[int(digit) for digit in LEGACY_MOBILE_DIGITS]] = True
+
+
+def ddd_of(values: np.ndarray) -> np.ndarray:
+    """
+    Extrai o DDD de números já normalizados (int64 no formato 55 + DDD + 9 dígitos).
+    """
+    return (np.asarray(values, dtype=np.int64) // 10**9) % 100
+
+
+def ddd_counts(values: np.ndarray) -> np.ndarray:
+    """
+    Conta os números normalizados por DDD.
+
+    Returns:
+        np.ndarray: Array de 100 posições com a quantidade de números de cada DDD
+    """
+    return np.bincount(ddd_of(values), minlength=100)
+
+
+def summarize_ddd_counts(counts: np.ndarray) -> Dict[str, Dict[str, int]]:
+    """
+    Converte as contagens de ddd_counts nos totais por DDD e por UF.
+
+    Returns:
+        Dict[str, Dict[str, int]]: {'by_ddd': {'11': n, ...}, 'by_state': {'SP': n, ...}}
+    """
+    by_state = np.bincount(DDD_STATE_INDEX, weights=counts, minlength=len(STATES) + 1)[1:]
+    return {
+        'by_ddd': {f"{ddd:02d}": int(counts[ddd]) for ddd in np.flatnonzero(counts)},
+        'by_state': {state: int(total) for state, total in zip(STATES, by_state) if total}
+    }
@@ -0,0 +1,94 @@
+import io
+from typing import Iterable, Iterator
+import pandas as pd
+
+# Formatos de exportação e o tipo MIME de cada um
+EXPORT_FORMATS = {
+    'csv': 'text/csv',
+    'parquet': 'application/vnd.apache.parquet'
+}
+
+
+def iter_csv_bytes(frames: Iterable[pd.DataFrame], empty: pd.DataFrame) -> Iterator[bytes]:
+    """
+    Converte os blocos em CSV à medida que são gerados; o cabeçalho sai só no primeiro.
+
+    Args:
+        frames (Iterable[pd.DataFrame]): Blocos com as mesmas colunas
+        empty (pd.DataFrame): Bloco vazio com as colunas, usado se não houver nenhum bloco
+    """
+    header = True
+    for frame in frames:
+        yield frame.to_csv(index=False, header=header).encode('utf-8')
+        header = False
+    if header:
+        yield empty.to_csv(index=False).encode('utf-8')
+
+
+class _StreamSink(io.RawIOBase):
+    """
+    Destino de escrita que acumula os bytes até serem retirados com drain().
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._chunks = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._chunks.append(bytes(data))
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        data = b''.join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_parquet_bytes(frames: Iterable[pd.DataFrame], empty: pd.DataFrame) -> Iterator[bytes]:
+    """
+    Grava os blocos como row groups de um arquivo Parquet, devolvendo os bytes
+    de cada row group assim que ele é escrito (requer o pacote pyarrow).
+
+    Args:
+        frames (Iterable[pd.DataFrame]): Blocos com as mesmas colunas
+        empty (pd.DataFrame): Bloco vazio com as colunas, usado se não houver nenhum bloco
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise Exception("A exportação em Parquet requer o pacote pyarrow (pip install pyarrow)")
+
+    sink = _StreamSink()
+    writer = None
+    for frame in frames:
+        table = pa.Table.from_pandas(frame, preserve_index=False)
+        if writer is None:
+            writer = pq.ParquetWriter(sink, table.schema, compression='zstd')
+        writer.write_table(table.cast(writer.schema))
+        data = sink.drain()
+        if data:
+            yield data
+    if writer is None:
+        writer = pq.ParquetWriter(sink, pa.Table.from_pandas(empty, preserve_index=False).schema)
+    writer.close()
+    yield sink.drain()
+
+
+def iter_export_bytes(frames: Iterable[pd.DataFrame], empty: pd.DataFrame, export_format: str) -> Iterator[bytes]:
+    """
+    Gera o arquivo de exportação no formato pedido ('csv' ou 'parquet').
+    """
+    if export_format == 'csv':
+        return iter_csv_bytes(frames, empty)
+    if export_format == 'parquet':
+        return iter_parquet_bytes(frames, empty)
+    raise ValueError(f"Formato de exportação inválido: {export_format}")
@@ -0,0 +1,359 @@
+import codecs
+import gzip
+import hashlib
+import io
+import json
+import re
+import threading
+import zipfile
+from collections import OrderedDict
+from typing import Dict, Iterator, List, Optional, Tuple
+import pandas as pd
+from .csv_sniffer import SAMPLE_BYTES, sniff_csv, detect_phone_column
+
+# Extensões aceitas no upload
+IMPORT_EXTENSIONS = ['csv', 'txt', 'xlsx', 'gz', 'zip']
+# Coluna única dos arquivos .txt (números separados por quebra de linha ou vírgula)
+TEXT_COLUMN = 'numero'
+# Caracteres lidos por vez dos arquivos .txt
+TEXT_READ_CHARS = 1024 * 1024
+# Separadores aceitos nos arquivos .txt e no texto colado
+TEXT_SEPARATORS = re.compile(r'[\r\n,;]+')
+# Formatos aceitos em importações recebidas em stream (ver iter_stream_blocks)
+STREAM_KINDS = ('csv', 'txt', 'ndjson')
+# Formatos detectados guardados em memória (chave: impressão digital do arquivo)
+CACHE_SIZE = 64
+
+_cache: 'OrderedDict[str, Dict]' = OrderedDict()
+_cache_lock = threading.Lock()
+
+# Tratamento de erro usado nos arquivos detectados como UTF-8: a detecção vê só
+# os primeiros SAMPLE_BYTES, e os bytes inválidos que aparecem depois (ex.: um
+# nome acentuado salvo em cp1252) são lidos como cp1252 em vez de abortar a leitura
+CP1252_FALLBACK = 'sbsender-cp1252-fallback'
+
+
+def _cp1252_fallback(error: UnicodeDecodeError):
+    return bytes(error.object[error.start:error.end]).decode('cp1252', errors='replace'), error.end
+
+
+codecs.register_error(CP1252_FALLBACK, _cp1252_fallback)
+
+
+def _decode_errors(encoding: str) -> str:
+    return CP1252_FALLBACK if encoding.startswith('utf-8') else 'replace'
+
+
+def split_numbers(text: str) -> List[str]:
+    """
+    Separa números colados em texto por quebra de linha, vírgula ou ponto e vírgula.
+    """
+    return [token.strip() for token in TEXT_SEPARATORS.split(text) if token.strip()]
+
+
+def detect_kind(file_name: str) -> Tuple[str, Optional[str]]:
+    """
+    Identifica o formato e a compressão pelo nome do arquivo.
+
+    Returns:
+        Tuple[str, Optional[str]]: ('csv' | 'txt' | 'xlsx', None | 'gzip' | 'zip')
+    """
+    name = (file_name or '').lower()
+    compression = None
+    if name.endswith('.gz'):
+        compression, name = 'gzip', name[:-3]
+    elif name.endswith('.zip'):
+        compression, name = 'zip', name[:-4]
+
+    if name.endswith('.xlsx') and compression is None:
+        return 'xlsx', None
+    if name.endswith('.txt'):
+        return 'txt', compression
+    return 'csv', compression
+
+
+def _zip_member(archive: zipfile.ZipFile) -> zipfile.ZipInfo:
+    for info in archive.infolist():
+        name = info.filename.lower()
+        if info.is_dir() or name.startswith('__macosx/') or not name.endswith(('.csv', '.txt')):
+            continue
+        return info
+    raise ValueError("O arquivo .zip não contém nenhum .csv ou .txt")
+
+
+def _open_stream(buffer: io.BytesIO, file_format: Dict):
+    """
+    Abre o conteúdo (descomprimido sob demanda, sem gravar em disco) como stream binário.
+    """
+    if file_format.get('compression') == 'gzip':
+        return gzip.GzipFile(fileobj=buffer, mode='rb')
+    if file_format.get('compression') == 'zip':
+        archive = zipfile.ZipFile(buffer)
+        return archive.open(file_format['member'])
+    return buffer
+
+
+def _fingerprint(content: bytes, file_name: str) -> str:
+    # Início e fim do arquivo mais o tamanho: o fim de .zip/.xlsx/.gz guarda os
+    # CRCs do conteúdo, e o formato de CSV/TXT depende só do início
+    digest = hashlib.sha256()
+    digest.update(f"{file_name}|{len(content)}|".encode('utf-8'))
+    digest.update(content[:SAMPLE_BYTES])
+    digest.update(content[-SAMPLE_BYTES:])
+    return digest.hexdigest()
+
+
+def _cell_to_str(value) -> Optional[str]:
+    if value is None:
+        return None
+    if isinstance(value, float) and value.is_integer():
+        # Números de telefone digitados como número no Excel
+        return str(int(value))
+    return str(value)
+
+
+def _xlsx_header(row) -> List[str]:
+    return [str(value).strip() if value is not None else f"Coluna {position + 1}" for position, value in enumerate(row)]
+
+
+def _inspect(content: bytes, file_name: str) -> Dict:
+    kind, compression = detect_kind(file_name)
+    file_format = {'kind': kind, 'compression': compression, 'member': None, 'encoding': None, 'delimiter': None}
+
+    if kind == 'xlsx':
+        from openpyxl import load_workbook
+        workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+        try:
+            rows = workbook.active.iter_rows(values_only=True)
+            columns = _xlsx_header(next(rows, ()))
+            sample = [[_cell_to_str(value) or '' for value in row] for _, row in zip(range(200), rows)]
+        finally:
+            workbook.close()
+        file_format.update(columns=columns, phone_column=detect_phone_column(columns, sample), sample_rows=sample[:20])
+        return file_format
+
+    buffer = io.BytesIO(content)
+    if compression == 'zip':
+        file_format['member'] = _zip_member(zipfile.ZipFile(buffer)).filename
+        # O formato é o do arquivo dentro do .zip, não o do nome do .zip
+        file_format['kind'] = 'txt' if file_format['member'].lower().endswith('.txt') else 'csv'
+    stream = _open_stream(buffer, file_format)
+    # Lê um byte a mais que a amostra para o sniff_csv descartar a última linha cortada
+    head = stream.read(SAMPLE_BYTES + 1)
+    return _inspect_head(head, file_format)
+
+
+def _ndjson_row(line: bytes) -> Dict:
+    # Cada linha é um objeto ({"telefone": "...", "nome": "..."}) ou só o número
+    value = json.loads(line)
+    if isinstance(value, dict):
+        return {str(key): None if item is None else str(item) for key, item in value.items()}
+    return {TEXT_COLUMN: str(value)}
+
+
+def _inspect_head(head: bytes, file_format: Dict) -> Dict:
+    """
+    Completa o formato de um arquivo CSV, TXT ou NDJSON a partir do início dele.
+    """
+    if file_format['kind'] == 'ndjson':
+        lines = head.split(b'\n')
+        if len(head) > SAMPLE_BYTES:
+            # A última linha da amostra pode estar cortada
+            lines.pop()
+        records = [_ndjson_row(line) for line in [line for line in lines if line.strip()][:200]]
+        columns = list(dict.fromkeys(column for record in records for column in record)) or [TEXT_COLUMN]
+        sample = [[record.get(column) or '' for column in columns] for record in records]
+        file_format.update(encoding='utf-8', columns=columns, phone_column=detect_phone_column(columns, sample), sample_rows=sample[:20])
+        return file_format
+
+    sniffed = sniff_csv(head)
+    file_format['encoding'] = sniffed['encoding']
+    if file_format['kind'] == 'txt':
+        sample = split_numbers(head[:4096].decode(sniffed['encoding'], errors='ignore'))
+        file_format.update(columns=[TEXT_COLUMN], phone_column=TEXT_COLUMN, sample_rows=[[number] for number in sample[:20]])
+    else:
+        file_format.update(
+            delimiter=sniffed['delimiter'],
+            columns=sniffed['columns'],
+            phone_column=sniffed['phone_column'],
+            sample_rows=sniffed['sample_rows']
+        )
+    return file_format
+
+
+def inspect_file(content: bytes, file_name: str) -> Dict:
+    """
+    Detecta o formato de um arquivo de importação lendo só o início dele.
+
+    CSV e TXT (inclusive dentro de .gz e .zip) são descomprimidos apenas até a
+    amostra usada pelo sniff_csv; XLSX é aberto em modo somente leitura e só as
+    primeiras linhas da planilha são lidas. O resultado fica em cache pela impressão
+    digital do arquivo.
+
+    Args:
+        content (bytes): Conteúdo do arquivo
+        file_name (str): Nome do arquivo (define formato e compressão)
+
+    Returns:
+        Dict: kind, compression, member, encoding, delimiter, columns, phone_column e sample_rows
+    """
+    key = _fingerprint(content, file_name)
+    with _cache_lock:
+        if key in _cache:
+            _cache.move_to_end(key)
+            return _cache[key]
+
+    file_format = _inspect(content, file_name)
+    with _cache_lock:
+        _cache[key] = file_format
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+    return file_format
+
+
+def _csv_blocks(buffer, stream, file_format: Dict, usecols: List[str], block_rows: int):
+    encoding = file_format['encoding'] or 'utf-8'
+    reader = pd.read_csv(
+        stream,
+        sep=file_format['delimiter'] or ',',
+        encoding=encoding,
+        encoding_errors=_decode_errors(encoding),
+        usecols=usecols,
+        dtype=str,
+        chunksize=block_rows
+    )
+    for frame in reader:
+        yield frame, buffer.tell()
+
+
+def _text_blocks(buffer, stream, file_format: Dict, block_rows: int):
+    encoding = file_format['encoding'] or 'utf-8'
+    text = io.TextIOWrapper(stream, encoding=encoding, errors=_decode_errors(encoding), newline='')
+    pending: List[str] = []
+    tail = ''
+    while True:
+        data = text.read(TEXT_READ_CHARS)
+        if not data:
+            break
+        tokens = TEXT_SEPARATORS.split(tail + data)
+        # O último pedaço pode ser um número cortado no meio; fica para a próxima leitura
+        tail = tokens.pop()
+        pending.extend(token.strip() for token in tokens if token.strip())
+        while len(pending) >= block_rows:
+            yield pd.DataFrame({TEXT_COLUMN: pending[:block_rows]}, dtype=object), buffer.tell()
+            pending = pending[block_rows:]
+    if tail.strip():
+        pending.append(tail.strip())
+    if pending:
+        yield pd.DataFrame({TEXT_COLUMN: pending}, dtype=object), buffer.tell()
+
+
+def _ndjson_blocks(buffer, stream, usecols: List[str], block_rows: int):
+    block: List[Dict] = []
+    for line in stream:
+        if not line.strip():
+            continue
+        block.append(_ndjson_row(line))
+        if len(block) >= block_rows:
+            yield pd.DataFrame(block, columns=usecols, dtype=object), buffer.tell()
+            block = []
+    if block:
+        yield pd.DataFrame(block, columns=usecols, dtype=object), buffer.tell()
+
+
+def _xlsx_blocks(content: bytes, usecols: List[str], block_rows: int):
+    from openpyxl import load_workbook
+    workbook = load_workbook(io.BytesIO(content), read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        rows = sheet.iter_rows(values_only=True)
+        columns = _xlsx_header(next(rows, ()))
+        positions = [columns.index(column) for column in usecols]
+        # Modo somente leitura não informa bytes lidos; estima pela proporção de linhas
+        total_rows = max((sheet.max_row or 1) - 1, 1)
+        read = 0
+        block: List[List[Optional[str]]] = []
+        for row in rows:
+            block.append([_cell_to_str(row[p]) if p < len(row) else None for p in positions])
+            if len(block) >= block_rows:
+                read += len(block)
+                yield pd.DataFrame(block, columns=usecols, dtype=object), int(len(content) * min(read / total_rows, 1.0))
+                block = []
+        if block:
+            yield pd.DataFrame(block, columns=usecols, dtype=object), len(content)
+    finally:
+        workbook.close()
+
+
+def iter_blocks(content: bytes, file_format: Dict, usecols: List[str], block_rows: int) -> Iterator[Tuple[pd.DataFrame, int]]:
+    """
+    Lê um arquivo de importação em blocos de até block_rows linhas.
+
+    A descompressão de .gz e .zip acontece em streaming, em memória, conforme os
+    blocos são consumidos; nenhum arquivo é descomprimido por inteiro.
+
+    Args:
+        content (bytes): Conteúdo do arquivo
+        file_format (Dict): Resultado de inspect_file
+        usecols (List[str]): Colunas necessárias (a dos números e as do template)
+        block_rows (int): Linhas por bloco
+
+    Returns:
+        Iterator[Tuple[pd.DataFrame, int]]: Blocos e bytes do arquivo lidos até o fim de cada um
+    """
+    if file_format.get('kind') == 'xlsx':
+        yield from _xlsx_blocks(content, usecols, block_rows)
+        return
+
+    buffer = io.BytesIO(content)
+    stream = _open_stream(buffer, file_format)
+    if file_format.get('kind') == 'txt':
+        yield from _text_blocks(buffer, stream, file_format, block_rows)
+    else:
+        yield from _csv_blocks(buffer, stream, file_format, usecols, block_rows)
+
+
+def inspect_stream(stream, kind: str, compression: Optional[str] = None) -> Dict:
+    """
+    Detecta o formato de uma importação recebida em stream (ex.: o corpo de uma
+    requisição da API gravado em arquivo temporário), lendo só o início dele.
+    O stream volta para o começo.
+
+    Args:
+        stream: Arquivo binário com suporte a seek
+        kind (str): 'csv', 'txt' ou 'ndjson' (ver STREAM_KINDS)
+        compression (str, optional): None ou 'gzip'
+
+    Returns:
+        Dict: O mesmo formato de inspect_file
+    """
+    if kind not in STREAM_KINDS:
+        raise ValueError(f"Formato de importação inválido: {kind}")
+    file_format = {'kind': kind, 'compression': compression, 'member': None, 'encoding': None, 'delimiter': None}
+    stream.seek(0)
+    head = _open_stream(stream, file_format).read(SAMPLE_BYTES + 1)
+    stream.seek(0)
+    return _inspect_head(head, file_format)
+
+
+def iter_stream_blocks(stream, file_format: Dict, usecols: List[str], block_rows: int) -> Iterator[Tuple[pd.DataFrame, int]]:
+    """
+    Lê uma importação em stream (CSV, TXT ou NDJSON, opcionalmente gzip) em
+    blocos de até block_rows linhas, sem carregar o conteúdo inteiro.
+
+    Args:
+        stream: Arquivo binário posicionado no início
+        file_format (Dict): Resultado de inspect_stream
+        usecols (List[str]): Colunas necessárias (a dos números e as do template)
+        block_rows (int): Linhas por bloco
+
+    Returns:
+        Iterator[Tuple[pd.DataFrame, int]]: Blocos e bytes do stream lidos até o fim de cada um
+    """
+    source = _open_stream(stream, file_format)
+    if file_format['kind'] == 'ndjson':
+        yield from _ndjson_blocks(stream, source, usecols, block_rows)
+    elif file_format['kind'] == 'txt':
+        yield from _text_blocks(stream, source, file_format, block_rows)
+    else:
+        yield from _csv_blocks(stream, source, file_format, usecols, block_rows)
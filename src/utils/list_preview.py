@@ -0,0 +1,58 @@
+import math
+from typing import Iterator, List, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+# Linhas por bloco ao gerar o arquivo de download
+EXPORT_BLOCK_ROWS = 50000
+
+
+def search_items(items: Sequence[str], query: str) -> Sequence[str]:
+    """
+    Filtra os itens que contêm o texto buscado (sem diferenciar maiúsculas).
+
+    Args:
+        items (Sequence[str]): Lista completa
+        query (str): Texto buscado; vazio retorna a lista sem cópia
+
+    Returns:
+        Sequence[str]: Itens encontrados, na ordem original
+    """
+    query = (query or '').strip()
+    if not query or not len(items):
+        return items
+    mask = pd.Series(items, dtype=object).astype(str).str.contains(query, case=False, regex=False).to_numpy()
+    return [items[i] for i in np.flatnonzero(mask)]
+
+
+def page_count(total: int, page_size: int) -> int:
+    """
+    Retorna a quantidade de páginas (no mínimo 1).
+    """
+    return max(1, math.ceil(total / page_size))
+
+
+def page_slice(items: Sequence[str], page: int, page_size: int) -> Tuple[List[str], int, int]:
+    """
+    Retorna os itens de uma página (começando em 1).
+
+    Returns:
+        Tuple[List[str], int, int]: Itens da página, posição inicial (1) e final
+    """
+    page = min(max(1, page), page_count(len(items), page_size))
+    start = (page - 1) * page_size
+    end = min(start + page_size, len(items))
+    return list(items[start:end]), (start + 1 if end > start else 0), end
+
+
+def iter_csv_blocks(items: Sequence[str], header: str) -> Iterator[bytes]:
+    """
+    Gera um CSV de uma coluna em blocos de bytes, sem montar o texto inteiro
+    de uma vez.
+    """
+    if not len(items):
+        yield pd.DataFrame({header: []}).to_csv(index=False).encode('utf-8')
+        return
+    for start in range(0, len(items), EXPORT_BLOCK_ROWS):
+        block = pd.DataFrame({header: list(items[start:start + EXPORT_BLOCK_ROWS])})
+        yield block.to_csv(index=False, header=start == 0).encode('utf-8')
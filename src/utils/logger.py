@@ -1,41 +1,159 @@
-import os
+import atexit
 import logging
-from datetime import datetime
+import os
+import queue
 import sys
+import threading
+from datetime import datetime
+from logging.handlers import QueueHandler, QueueListener
+from typing import Any, Dict
+
+from .config import get_setting
+
+# Loggers da aplicação: o logger global e os módulos em src/ (logging.getLogger(__name__))
+APP_LOGGERS = ('SBsender', 'src')
+
+
+class PayloadSummary:
+    """
+    Resumo preguiçoso de um payload para log.
+
+    Listas viram contagens e strings longas viram tamanhos. O resumo só é
+    calculado quando o registro é de fato formatado, então não custa nada se o
+    nível de log estiver desabilitado.
+    """
+    __slots__ = ('payload', 'max_string')
+
+    def __init__(self, payload: Any, max_string: int = 80):
+        self.payload = payload
+        self.max_string = max_string
+
+    def _summarize(self, value: Any, depth: int = 0) -> Any:
+        if isinstance(value, dict):
+            if depth >= 2:
+                return f"<dict keys={len(value)}>"
+            return {key: self._summarize(item, depth + 1) for key, item in value.items()}
+        if isinstance(value, (list, tuple, set)):
+            return f"<{type(value).__name__} len={len(value)}>"
+        if isinstance(value, (str, bytes)) and len(value) > self.max_string:
+            return f"<{type(value).__name__} size={len(value)}>"
+        return value
+
+    def __str__(self) -> str:
+        return str(self._summarize(self.payload))
+
+    __repr__ = __str__
+
+
+def summarize_payload(payload: Any, max_string: int = 80) -> PayloadSummary:
+    """
+    Retorna um resumo preguiçoso do payload para usar como argumento de log.
+
+    Exemplo:
+        logger.info("Payload: %s", summarize_payload(webhook_data))
+    """
+    return PayloadSummary(payload, max_string)
 
-def setup_logger():
-    # Configura o logger
+
+class SamplingFilter(logging.Filter):
+    """
+    Amostra eventos de alto volume marcados com extra={'sample': '<evento>'}.
+
+    As taxas vêm de LOG_SAMPLE_RATES no formato "evento=taxa,evento=taxa"
+    (ex.: "dispatch.job=0.01"). Com taxa 0.01 é registrado 1 a cada 100
+    eventos. Registros sem a marcação, ou com nível WARNING ou superior, sempre
+    passam.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = rates
+        self._counters: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def parse_rates(value: str) -> Dict[str, float]:
+        rates = {}
+        for item in (value or '').split(','):
+            if '=' not in item:
+                continue
+            event, rate = item.split('=', 1)
+            try:
+                rates[event.strip()] = min(max(float(rate), 0.0), 1.0)
+            except ValueError:
+                continue
+        return rates
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        event = getattr(record, 'sample', None)
+        if event is None or record.levelno >= logging.WARNING:
+            return True
+        rate = self.rates.get(event, 1.0)
+        if rate >= 1.0:
+            return True
+        if rate <= 0.0:
+            return False
+        every = int(round(1 / rate))
+        with self._lock:
+            count = self._counters.get(event, 0)
+            self._counters[event] = count + 1
+        return count % every == 0
+
+
+def setup_logging():
+    """
+    Configura os loggers da aplicação (APP_LOGGERS): nível LOG_LEVEL, console e
+    arquivo opcional em LOG_DIRECTORY, escritos por uma thread (QueueListener).
+
+    Chamado pelos pontos de entrada (app.py e api.py); importar os módulos de
+    src/ não configura nada, então testes e ferramentas de linha de comando
+    usam a configuração padrão do logging. Chamadas repetidas não têm efeito.
+    """
     logger = logging.getLogger('SBsender')
-    logger.setLevel(logging.CRITICAL)  # Define o nível para CRITICAL para suprimir logs de menor nível
-    
+    if getattr(logger, '_sbsender_configured', False):
+        return logger
+
+    level_name = str(get_setting('app', 'log_level', 'LOG_LEVEL', 'WARNING')).upper()
+    level = getattr(logging, level_name, logging.WARNING)
+
     # Cria um formatter que inclui timestamp
-    # formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
     # Handler para console
-    # console_handler = logging.StreamHandler(sys.stdout)
-    # console_handler.setLevel(logging.DEBUG)
-    # console_handler.setFormatter(formatter)
-    
-    # Ensure the logs directory exists
-    # log_directory = 'logs'
-    # if not os.path.exists(log_directory):
-    #     print(f"Creating log directory at: {log_directory}")
-    #     os.makedirs(log_directory)
-    # else:
-    #     print(f"Log directory already exists at: {log_directory}")
-    
-    # Handler para arquivo
-    # log_file_path = f'{log_directory}/sbsender_{datetime.now().strftime("%Y%m%d")}.log'
-    # print(f"Log file path: {log_file_path}")
-    # file_handler = logging.FileHandler(log_file_path)
-    # file_handler.setLevel(logging.DEBUG)
-    # file_handler.setFormatter(formatter)
-    
-    # Adiciona os handlers ao logger
-    # logger.addHandler(console_handler)
-    # logger.addHandler(file_handler)
-    
+    handlers = []
+    console_handler = logging.StreamHandler(sys.stdout)
+    console_handler.setFormatter(formatter)
+    handlers.append(console_handler)
+
+    # Handler para arquivo, opcional
+    log_directory = get_setting('app', 'log_directory', 'LOG_DIRECTORY')
+    if log_directory:
+        os.makedirs(log_directory, exist_ok=True)
+        log_file_path = os.path.join(log_directory, f'sbsender_{datetime.now().strftime("%Y%m%d")}.log')
+        file_handler = logging.FileHandler(log_file_path, encoding='utf-8')
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+
+    # A escrita acontece em uma thread separada; quem loga só enfileira o registro
+    log_queue = queue.SimpleQueue()
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    atexit.register(listener.stop)
+
+    queue_handler = QueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(
+        SamplingFilter.parse_rates(get_setting('app', 'log_sample_rates', 'LOG_SAMPLE_RATES', ''))
+    ))
+
+    for name in APP_LOGGERS:
+        app_logger = logging.getLogger(name)
+        app_logger.setLevel(level)
+        app_logger.addHandler(queue_handler)
+        app_logger.propagate = False
+
+    logger._sbsender_configured = True
+    logger.listener = listener
     return logger
 
-# Cria uma instância global do logger
-logger = setup_logger()
\ No newline at end of file
+# Logger global da aplicação (configurado por setup_logging)
+logger = logging.getLogger('SBsender')
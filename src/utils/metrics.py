@@ -0,0 +1,273 @@
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List, Optional, Tuple
+import logging
+
+from .config import get_setting
+
+logger = logging.getLogger(__name__)
+
+# Buckets padrão de latência, em segundos
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+class Counter:
+    """
+    Contador monotônico.
+    """
+    kind = 'counter'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def snapshot(self) -> Dict:
+        return {'value': self.value}
+
+
+class Gauge:
+    """
+    Valor instantâneo que pode subir ou descer.
+    """
+    kind = 'gauge'
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.value = 0
+
+    def set(self, value: float):
+        self.value = value
+
+    def inc(self, amount: float = 1):
+        with self._lock:
+            self.value += amount
+
+    def dec(self, amount: float = 1):
+        self.inc(-amount)
+
+    def snapshot(self) -> Dict:
+        return {'value': self.value}
+
+
+class Histogram:
+    """
+    Histograma de buckets fixos, no formato cumulativo do Prometheus.
+    """
+    kind = 'histogram'
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self._lock = threading.Lock()
+        self.buckets = tuple(sorted(buckets))
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def time(self) -> '_Timer':
+        """
+        Context manager que observa a duração do bloco em segundos.
+        """
+        return _Timer(self)
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counts = list(self.counts)
+            total, count = self.sum, self.count
+        cumulative = []
+        running = 0
+        for bound, bucket_count in zip(self.buckets + (float('inf'),), counts):
+            running += bucket_count
+            cumulative.append((bound, running))
+        return {'buckets': cumulative, 'sum': total, 'count': count}
+
+
+class _Timer:
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: Histogram):
+        self.histogram = histogram
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.histogram.observe(time.perf_counter() - self.start)
+
+
+class MetricsRegistry:
+    """
+    Registro de métricas do processo, indexadas por nome e labels.
+
+    As métricas são criadas uma única vez; o caminho quente só faz a busca no
+    dicionário e a atualização do valor protegida por lock.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[Tuple[str, Tuple], object] = {}
+        self._help: Dict[str, str] = {}
+
+    def _get_or_create(self, factory, name: str, help_text: str, labels: Dict[str, str], **kwargs):
+        key = (name, tuple(sorted(labels.items())))
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = factory(**kwargs)
+                    self._metrics[key] = metric
+                    if help_text:
+                        self._help.setdefault(name, help_text)
+        return metric
+
+    def counter(self, name: str, help_text: str = '', **labels) -> Counter:
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def gauge(self, name: str, help_text: str = '', **labels) -> Gauge:
+        return self._get_or_create(Gauge, name, help_text, labels)
+
+    def histogram(self, name: str, help_text: str = '', buckets: Tuple[float, ...] = DEFAULT_BUCKETS, **labels) -> Histogram:
+        return self._get_or_create(Histogram, name, help_text, labels, buckets=buckets)
+
+    def _grouped(self) -> Dict[str, List[Tuple[Tuple, object]]]:
+        with self._lock:
+            items = list(self._metrics.items())
+        grouped: Dict[str, List[Tuple[Tuple, object]]] = {}
+        for (name, labels), metric in sorted(items, key=lambda item: item[0]):
+            grouped.setdefault(name, []).append((labels, metric))
+        return grouped
+
+    def snapshot(self) -> Dict:
+        """
+        Retorna todas as métricas em um dicionário serializável em JSON.
+        """
+        result = {}
+        for name, series in self._grouped().items():
+            result[name] = []
+            for labels, metric in series:
+                data = metric.snapshot()
+                if 'buckets' in data:
+                    data['buckets'] = [['+Inf' if bound == float('inf') else bound, count] for bound, count in data['buckets']]
+                result[name].append({'labels': dict(labels), 'type': metric.kind, **data})
+        return result
+
+    def render_prometheus(self) -> str:
+        """
+        Renderiza as métricas no formato de texto do Prometheus.
+        """
+        lines = []
+        for name, series in self._grouped().items():
+            if name in self._help:
+                lines.append(f"# HELP {name} {self._help[name]}")
+            lines.append(f"# TYPE {name} {series[0][1].kind}")
+            for labels, metric in series:
+                data = metric.snapshot()
+                if metric.kind != 'histogram':
+                    lines.append(f"{name}{_format_labels(labels)} {data['value']}")
+                    continue
+                for bound, count in data['buckets']:
+                    le = '+Inf' if bound == float('inf') else repr(bound)
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', le),))} {count}")
+                lines.append(f"{name}_sum{_format_labels(labels)} {data['sum']}")
+                lines.append(f"{name}_count{_format_labels(labels)} {data['count']}")
+        return '\n'.join(lines) + '\n'
+
+
+def _format_labels(labels: Tuple) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(f'{key}="{str(value)}"' for key, value in labels)
+    return '{' + pairs + '}'
+
+
+# Registro global do processo
+metrics = MetricsRegistry()
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.rstrip('/') == '/metrics':
+            body = metrics.render_prometheus().encode('utf-8')
+            content_type = 'text/plain; version=0.0.4; charset=utf-8'
+        elif self.path.rstrip('/') == '/metrics.json':
+            body = json.dumps(metrics.snapshot()).encode('utf-8')
+            content_type = 'application/json'
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_exporter_lock = threading.Lock()
+_exporter_started = False
+
+
+def _dump_loop(path: str, interval: float):
+    while True:
+        time.sleep(interval)
+        try:
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump({'timestamp': time.time(), 'metrics': metrics.snapshot()}, f)
+            os.replace(tmp_path, path)
+        except Exception as e:
+            logger.error("Erro ao gravar dump de métricas: %s", e)
+
+
+def start_metrics_exporter(port: Optional[int] = None, dump_path: Optional[str] = None, dump_interval: Optional[float] = None) -> bool:
+    """
+    Inicia a exportação das métricas, uma única vez por processo.
+
+    Com METRICS_PORT configurado, sobe um servidor HTTP em background que expõe
+    /metrics (texto Prometheus) e /metrics.json. Com METRICS_DUMP_PATH, grava um
+    JSON com as métricas a cada METRICS_DUMP_INTERVAL segundos.
+
+    Returns:
+        bool: True se algum exportador foi iniciado nesta chamada
+    """
+    global _exporter_started
+    with _exporter_lock:
+        if _exporter_started:
+            return False
+
+        port = port if port is not None else get_setting('metrics', 'port', 'METRICS_PORT', cast=int)
+        dump_path = dump_path or get_setting('metrics', 'dump_path', 'METRICS_DUMP_PATH')
+        dump_interval = dump_interval or get_setting('metrics', 'dump_interval', 'METRICS_DUMP_INTERVAL', 60.0, cast=float)
+
+        if port:
+            server = ThreadingHTTPServer(('0.0.0.0', port), _MetricsHandler)
+            server.daemon_threads = True
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            logger.info("Endpoint de métricas disponível na porta %s", port)
+            _exporter_started = True
+
+        if dump_path:
+            thread = threading.Thread(target=_dump_loop, args=(dump_path, dump_interval), daemon=True)
+            thread.start()
+            logger.info("Dump de métricas em %s a cada %ss", dump_path, dump_interval)
+            _exporter_started = True
+
+        return _exporter_started
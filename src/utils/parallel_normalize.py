@@ -0,0 +1,121 @@
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import get_context
+from multiprocessing.shared_memory import SharedMemory
+from typing import Dict, List
+import logging
+import threading
+import numpy as np
+from .phone_utils import _VECTOR_WIDTH, apply_fallback, normalize_codes, normalize_phone_array
+
+logger = logging.getLogger(__name__)
+
+# Abaixo desta quantidade o custo de coordenar os processos não compensa
+MIN_PARALLEL_ROWS = 20000
+_DTYPE = f'<U{_VECTOR_WIDTH}'
+
+
+def _normalize_shard(input_name: str, output_name: str, count: int, start: int, end: int):
+    """
+    Executado nos processos do pool: normaliza as posições [start, end) do
+    buffer compartilhado de entrada e grava o resultado nas mesmas posições do
+    buffer de saída.
+    """
+    input_shm = SharedMemory(name=input_name)
+    output_shm = SharedMemory(name=output_name)
+    try:
+        codes = np.ndarray((count,), dtype=_DTYPE, buffer=input_shm.buf)
+        output = np.ndarray((count,), dtype=np.int64, buffer=output_shm.buf)
+        output[start:end] = normalize_codes(codes[start:end])
+        del codes, output
+    finally:
+        input_shm.close()
+        output_shm.close()
+
+
+class ParallelNormalizer:
+    """
+    Normalização de números distribuída entre vários processos.
+
+    Os números de um bloco são copiados uma vez para um buffer de memória
+    compartilhada com strings de largura fixa; cada processo normaliza uma
+    faixa contígua do buffer e grava os int64 na mesma faixa de um buffer de
+    saída, então o resultado fica na ordem original sem etapa de junção e sem
+    serializar listas entre processos. Números que exigem o caminho escalar
+    (longos ou não ASCII) são completados no processo principal.
+    """
+    _pools: Dict[int, ProcessPoolExecutor] = {}
+    _lock = threading.Lock()
+
+    def __init__(self, workers: int, min_rows: int = MIN_PARALLEL_ROWS):
+        """
+        Args:
+            workers (int): Quantidade de processos (0 ou 1 normaliza no próprio processo)
+            min_rows (int): Tamanho mínimo do bloco para usar o pool
+        """
+        self.workers = max(0, workers)
+        self.min_rows = min_rows
+
+    @property
+    def enabled(self) -> bool:
+        return self.workers > 1
+
+    def _pool(self) -> ProcessPoolExecutor:
+        # Pool compartilhado pelo processo; 'spawn' evita fork de um processo com threads
+        with ParallelNormalizer._lock:
+            pool = ParallelNormalizer._pools.get(self.workers)
+            if pool is None:
+                pool = ProcessPoolExecutor(max_workers=self.workers, mp_context=get_context('spawn'))
+                ParallelNormalizer._pools[self.workers] = pool
+                logger.info("Pool de normalização iniciado com %s processos", self.workers)
+            return pool
+
+    def normalize(self, strings: List[str]) -> np.ndarray:
+        """
+        Equivalente a normalize_phone_array, distribuído entre os processos.
+
+        Args:
+            strings (List[str]): Números brutos
+
+        Returns:
+            np.ndarray: Números formatados como int64, com 0 nas posições inválidas
+        """
+        count = len(strings)
+        if not self.enabled or count < self.min_rows:
+            return normalize_phone_array(strings)
+
+        itemsize = np.dtype(_DTYPE).itemsize
+        input_shm = SharedMemory(create=True, size=count * itemsize)
+        output_shm = SharedMemory(create=True, size=count * 8)
+        try:
+            codes = np.ndarray((count,), dtype=_DTYPE, buffer=input_shm.buf)
+            codes[:] = strings
+            del codes
+
+            bounds = np.linspace(0, count, self.workers + 1).astype(int)
+            pool = self._pool()
+            futures = [
+                pool.submit(_normalize_shard, input_shm.name, output_shm.name, count, int(start), int(end))
+                for start, end in zip(bounds[:-1], bounds[1:]) if end > start
+            ]
+            for future in futures:
+                future.result()
+
+            result = np.ndarray((count,), dtype=np.int64, buffer=output_shm.buf).copy()
+        finally:
+            input_shm.close()
+            input_shm.unlink()
+            output_shm.close()
+            output_shm.unlink()
+
+        lengths = np.fromiter(map(len, strings), dtype=np.int64, count=count)
+        return apply_fallback(strings, result, lengths)
+
+    @classmethod
+    def shutdown(cls):
+        """
+        Encerra os pools de processos abertos.
+        """
+        with cls._lock:
+            for pool in cls._pools.values():
+                pool.shutdown(wait=True)
+            cls._pools.clear()
@@ -0,0 +1,343 @@
+import logging
+import os
+import threading
+from typing import Callable, Dict, List, Optional
+import numpy as np
+from .config import get_setting
+from .metrics import metrics
+from .phone_utils import _VECTOR_WIDTH, NORMALIZATION_VERSION, format_phone_number, normalize_phone_array
+
+logger = logging.getLogger(__name__)
+
+CACHE_LOOKUPS = {
+    result: metrics.counter('sbsender_phone_cache_lookups_total', 'Consultas ao cache de normalização', result=result)
+    for result in ('memory_hit', 'disk_hit', 'miss')
+}
+
+# Registro de cada posição da tabela em disco: texto bruto (até 24 caracteres
+# ASCII, em 3 palavras de 8 bytes), o número normalizado e a soma de
+# verificação do registro
+SLOT_DTYPE = np.dtype([('k0', '<u8'), ('k1', '<u8'), ('k2', '<u8'), ('value', '<i8'), ('check', '<u8')])
+# Versão do formato do arquivo (faz parte do nome, com a versão das regras)
+TABLE_VERSION = 2
+# Posições testadas por chave (endereçamento aberto com sondagem linear)
+PROBES = 8
+# Acima desta ocupação a tabela em disco é esvaziada e recomeça
+MAX_LOAD = 0.75
+_MIX = (np.uint64(0x9E3779B97F4A7C15), np.uint64(0xC2B2AE3D27D4EB4F), np.uint64(0x165667B19E3779F9))
+
+
+class DiskPhoneTable:
+    """
+    Tabela hash em arquivo (np.memmap) que mapeia o texto bruto de um número
+    para o número normalizado, preservada entre reinícios do processo.
+
+    A chave é o próprio texto (até 24 caracteres ASCII), então não há colisão
+    de hash resultando em número errado. Consultas e inserções são vetorizadas
+    sobre o bloco inteiro. Quando a ocupação passa de MAX_LOAD, a tabela é
+    esvaziada: o cache recomeça com os números das próximas importações.
+
+    O arquivo pode ser aberto por vários processos (app.py e api.py) sem lock
+    entre eles: cada registro guarda uma soma de verificação das chaves e do
+    valor, conferida na consulta. Um registro misturado por gravações
+    simultâneas na mesma posição, ou lido no meio de uma gravação ou da
+    limpeza da tabela, não confere e é tratado como falta (o número é
+    normalizado de novo e regravado).
+    """
+
+    def __init__(self, path: str, slots: int = 1 << 22):
+        """
+        Args:
+            path (str): Arquivo da tabela (criado se não existir)
+            slots (int): Quantidade de posições (arredondada para potência de 2); 40 bytes cada
+        """
+        slots = 1 << max(int(slots) - 1, 1).bit_length()
+        if os.path.exists(path) and os.path.getsize(path) % SLOT_DTYPE.itemsize == 0 and os.path.getsize(path):
+            slots = os.path.getsize(path) // SLOT_DTYPE.itemsize
+            self.table = np.memmap(path, dtype=SLOT_DTYPE, mode='r+')
+        else:
+            self.table = np.memmap(path, dtype=SLOT_DTYPE, mode='w+', shape=(slots,))
+        self.path = path
+        self.mask = np.uint64(slots - 1)
+        self.used = int(np.count_nonzero(self.table['k0'] | self.table['k1'] | self.table['k2']))
+
+    def __len__(self) -> int:
+        return self.used
+
+    @staticmethod
+    def encode_keys(strings: List[str]):
+        """
+        Converte os textos em chaves de 3 palavras de 8 bytes.
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Chaves (n, 3) e máscara dos textos que
+            podem ser gravados (ASCII, não vazios, até 24 caracteres)
+        """
+        count = len(strings)
+        codes = np.array(strings, dtype=f'<U{_VECTOR_WIDTH}').view(np.uint32).reshape(count, _VECTOR_WIDTH)
+        lengths = np.fromiter(map(len, strings), dtype=np.int64, count=count)
+        storable = (lengths > 0) & (lengths <= _VECTOR_WIDTH) & ~(codes > 127).any(axis=1)
+        keys = np.ascontiguousarray(codes.astype(np.uint8)).view('<u8').reshape(count, 3)
+        return keys, storable
+
+    def _hash(self, keys: np.ndarray) -> np.ndarray:
+        h = (keys[:, 0] * _MIX[0]) ^ (keys[:, 1] * _MIX[1]) ^ (keys[:, 2] * _MIX[2])
+        return h ^ (h >> np.uint64(29))
+
+    @staticmethod
+    def _checksum(k0: np.ndarray, k1: np.ndarray, k2: np.ndarray, value: np.ndarray) -> np.ndarray:
+        h = (k0 * _MIX[1]) ^ (k1 * _MIX[2]) ^ (k2 * _MIX[0]) ^ (value.astype(np.uint64) * _MIX[1])
+        h = (h ^ (h >> np.uint64(31))) * _MIX[2]
+        return h ^ (h >> np.uint64(29))
+
+    def lookup(self, keys: np.ndarray) -> np.ndarray:
+        """
+        Busca as chaves na tabela.
+
+        Returns:
+            np.ndarray: Números normalizados (int64), -1 onde a chave não existe
+        """
+        result = np.full(len(keys), -1, dtype=np.int64)
+        pending = np.arange(len(keys))
+        start = self._hash(keys)
+        for probe in range(PROBES):
+            if not len(pending):
+                break
+            slots = self.table[(start[pending] + np.uint64(probe)) & self.mask]
+            k = keys[pending]
+            match = (slots['k0'] == k[:, 0]) & (slots['k1'] == k[:, 1]) & (slots['k2'] == k[:, 2])
+            match &= slots['check'] == self._checksum(slots['k0'], slots['k1'], slots['k2'], slots['value'])
+            result[pending[match]] = slots['value'][match]
+            empty = (slots['k0'] | slots['k1'] | slots['k2']) == 0
+            pending = pending[~match & ~empty]
+        return result
+
+    def insert(self, keys: np.ndarray, values: np.ndarray):
+        """
+        Grava as chaves e valores; as que não encontram posição livre em PROBES
+        tentativas são descartadas.
+        """
+        if self.used + len(keys) > MAX_LOAD * len(self.table):
+            # Outro processo pode ter esvaziado a tabela: confere a ocupação antes
+            self.used = int(np.count_nonzero(self.table['k0'] | self.table['k1'] | self.table['k2']))
+        if self.used + len(keys) > MAX_LOAD * len(self.table):
+            self.table[:] = 0
+            self.used = 0
+            logger.info("Cache de normalização em disco esvaziado (%s posições)", len(self.table))
+
+        pending = np.arange(len(keys))
+        start = self._hash(keys)
+        for probe in range(PROBES):
+            if not len(pending):
+                break
+            positions = (start[pending] + np.uint64(probe)) & self.mask
+            slots = self.table[positions]
+            k = keys[pending]
+            empty = (slots['k0'] | slots['k1'] | slots['k2']) == 0
+            same = (slots['k0'] == k[:, 0]) & (slots['k1'] == k[:, 1]) & (slots['k2'] == k[:, 2])
+            free = empty | same
+
+            # Uma única chave por posição em cada rodada
+            unique_positions, first = np.unique(positions[free], return_index=True)
+            chosen = pending[free][first]
+            records = np.zeros(len(chosen), dtype=SLOT_DTYPE)
+            records['k0'], records['k1'], records['k2'] = keys[chosen, 0], keys[chosen, 1], keys[chosen, 2]
+            records['value'] = values[chosen]
+            records['check'] = self._checksum(records['k0'], records['k1'], records['k2'], records['value'])
+            self.table[unique_positions] = records
+            self.used += int(empty[free][first].sum())
+
+            placed = np.zeros(len(pending), dtype=bool)
+            placed[np.flatnonzero(free)[first]] = True
+            pending = pending[~placed]
+
+    def flush(self):
+        self.table.flush()
+
+
+class PhoneCache:
+    """
+    Memoização da normalização de números, pelo texto bruto recebido.
+
+    Clientes reenviam listas muito parecidas; em vez de normalizar de novo cada
+    texto, o resultado fica em um cache em memória limitado a `capacity`
+    entradas. Como a normalização vetorizada já é barata, o cache só compensa
+    quando a taxa de acerto é alta (listas reimportadas); stats() informa essa
+    taxa. A remoção é por gerações (aproximação de LRU sem custo por
+    acerto): as entradas vivem em uma geração nova e uma antiga; quando a nova
+    enche, a antiga é descartada, e acertos na antiga voltam para a nova.
+    Opcionalmente, uma DiskPhoneTable serve de segundo nível persistente.
+    """
+
+    def __init__(self, capacity: int = 200000, disk_table: Optional[DiskPhoneTable] = None):
+        """
+        Args:
+            capacity (int): Máximo de entradas em memória
+            disk_table (DiskPhoneTable, optional): Segundo nível em disco
+        """
+        self.capacity = capacity
+        self.disk_table = disk_table
+        self._lock = threading.Lock()
+        self._recent: Dict[str, int] = {}
+        self._old: Dict[str, int] = {}
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __len__(self) -> int:
+        return len(self._recent) + len(self._old)
+
+    def _store(self, strings: List[str], values: List[int]):
+        # Chamado com o lock adquirido; cada geração guarda até metade da capacidade
+        generation = max(self.capacity // 2, 1)
+        start = 0
+        while start < len(strings):
+            room = max(generation - len(self._recent), 0)
+            end = start + room
+            self._recent.update(zip(strings[start:end], values[start:end]))
+            start = end
+            if len(self._recent) >= generation:
+                self.evictions += len(self._old)
+                self._old = self._recent
+                self._recent = {}
+
+    def normalize(self, strings: List[str], normalize: Callable[[List[str]], np.ndarray] = normalize_phone_array) -> np.ndarray:
+        """
+        Normaliza os números usando o cache; só os textos não encontrados
+        passam pela função de normalização.
+
+        Args:
+            strings (List[str]): Números brutos
+            normalize (Callable): Normalização em lote usada nas faltas
+
+        Returns:
+            np.ndarray: Números formatados como int64, com 0 nas posições inválidas
+        """
+        strings = list(map(str, strings))
+        with self._lock:
+            recent, old = self._recent, self._old
+            # Logo após iniciar o processo o cache está vazio; evita a consulta item a item
+            values = [recent.get(s, -1) for s in strings] if recent or old else [-1] * len(strings)
+            promoted = []
+            if old:
+                for index in [i for i, value in enumerate(values) if value < 0]:
+                    value = old.get(strings[index])
+                    if value is not None:
+                        values[index] = value
+                        promoted.append(index)
+            if promoted:
+                self._store([strings[i] for i in promoted], [values[i] for i in promoted])
+
+        result = np.array(values, dtype=np.int64)
+        missing = np.flatnonzero(result < 0)
+        memory_hits = len(strings) - len(missing)
+
+        disk_hits = 0
+        if len(missing) and self.disk_table is not None:
+            missing_strings = [strings[i] for i in missing]
+            keys, storable = DiskPhoneTable.encode_keys(missing_strings)
+            found = np.full(len(missing), -1, dtype=np.int64)
+            with self._lock:
+                found[storable] = self.disk_table.lookup(keys[storable])
+            hit = found >= 0
+            result[missing[hit]] = found[hit]
+            disk_hits = int(hit.sum())
+            with self._lock:
+                self._store([missing_strings[i] for i in np.flatnonzero(hit)], found[hit].tolist())
+            new = ~hit
+            computed = normalize([missing_strings[i] for i in np.flatnonzero(new)]) if new.any() else np.zeros(0, dtype=np.int64)
+            result[missing[new]] = computed
+            insert = storable[new]
+            if insert.any():
+                with self._lock:
+                    self.disk_table.insert(keys[new][insert], computed[insert])
+                    self.disk_table.flush()
+            missing_values = computed.tolist()
+            missing_keys = [missing_strings[i] for i in np.flatnonzero(new)]
+        elif len(missing):
+            missing_keys = [strings[i] for i in missing]
+            computed = normalize(missing_keys)
+            result[missing] = computed
+            missing_values = computed.tolist()
+        else:
+            missing_keys, missing_values = [], []
+
+        with self._lock:
+            if missing_keys:
+                self._store(missing_keys, missing_values)
+            self.memory_hits += memory_hits
+            self.disk_hits += disk_hits
+            self.misses += len(missing_keys)
+        CACHE_LOOKUPS['memory_hit'].inc(memory_hits)
+        CACHE_LOOKUPS['disk_hit'].inc(disk_hits)
+        CACHE_LOOKUPS['miss'].inc(len(missing_keys))
+        return result
+
+    def format(self, phone: str) -> Optional[str]:
+        """
+        Versão com cache de format_phone_number para um único número.
+        """
+        phone = str(phone)
+        with self._lock:
+            value = self._recent.get(phone)
+            if value is None:
+                value = self._old.get(phone)
+                if value is not None:
+                    self._store([phone], [value])
+            if value is not None:
+                self.memory_hits += 1
+                CACHE_LOOKUPS['memory_hit'].inc()
+                return str(value) if value else None
+
+        formatted = format_phone_number(phone)
+        with self._lock:
+            self._store([phone], [int(formatted) if formatted else 0])
+            self.misses += 1
+        CACHE_LOOKUPS['miss'].inc()
+        return formatted
+
+    def stats(self) -> Dict:
+        """
+        Retorna os contadores de acertos, faltas e remoções do cache.
+        """
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return {
+            'entries': len(self),
+            'capacity': self.capacity,
+            'disk_entries': len(self.disk_table) if self.disk_table is not None else None,
+            'memory_hits': self.memory_hits,
+            'disk_hits': self.disk_hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'hit_rate': round((self.memory_hits + self.disk_hits) / lookups, 4) if lookups else 0.0
+        }
+
+
+_shared_cache = None
+_shared_lock = threading.Lock()
+
+
+def get_phone_cache() -> Optional[PhoneCache]:
+    """
+    Retorna o cache compartilhado pelo processo, configurado por PHONE_CACHE_SIZE
+    (0, o padrão, desativa), PHONE_CACHE_PATH (tabela em disco, opcional) e
+    PHONE_CACHE_DISK_SLOTS.
+    """
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            capacity = get_setting('app', 'phone_cache_size', 'PHONE_CACHE_SIZE', 0, cast=int)
+            if capacity <= 0:
+                return None
+            disk_table = None
+            path = get_setting('app', 'phone_cache_path', 'PHONE_CACHE_PATH', None)
+            if path:
+                try:
+                    slots = get_setting('app', 'phone_cache_disk_slots', 'PHONE_CACHE_DISK_SLOTS', 1 << 22, cast=int)
+                    # Um arquivo por versão das regras e do formato, para não reaproveitar resultados antigos
+                    disk_table = DiskPhoneTable(f"{path}.v{NORMALIZATION_VERSION}.t{TABLE_VERSION}", slots)
+                except Exception as e:
+                    logger.error("Erro ao abrir o cache de normalização em disco %s: %s", path, e)
+            _shared_cache = PhoneCache(capacity, disk_table)
+        return _shared_cache
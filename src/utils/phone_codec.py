@@ -0,0 +1,79 @@
+import struct
+import zlib
+from typing import Iterable, List
+import numpy as np
+
+# Formato: MAGIC (3 bytes) + versão (1) + flags (1) + quantidade (uint32 LE) + dados
+MAGIC = b'SBP'
+VERSION = 1
+HEADER = struct.Struct('<3sBBI')
+
+FLAG_DELTA = 0x01     # Números ordenados e gravados como diferenças do anterior
+FLAG_SHUFFLE = 0x02   # Bytes agrupados por posição (todos os bytes 0, depois todos os 1...)
+FLAG_ZLIB = 0x04      # Dados comprimidos com zlib
+
+
+def encode_phones(numbers: Iterable, sort: bool = True, compress: bool = True) -> bytes:
+    """
+    Codifica uma lista de números de telefone em um binário compacto.
+
+    Cada número válido (13 dígitos) vira um int64. Com sort=True os números são
+    ordenados e gravados como diferenças, o que deixa quase todos os bytes
+    altos zerados; com compress=True o resultado é comprimido com zlib.
+    Tipicamente fica abaixo de 4 bytes por número, contra ~25 bytes de uma
+    string dentro de um array BSON.
+
+    Args:
+        numbers (Iterable): Números formatados (str) ou inteiros
+        sort (bool): Ordena os números (a ordem original não é preservada)
+        compress (bool): Comprime os dados com zlib
+
+    Returns:
+        bytes: Binário pronto para ser gravado no MongoDB
+    """
+    values = np.asarray(numbers if isinstance(numbers, np.ndarray) else list(numbers), dtype=np.int64)
+    flags = 0
+    if sort and len(values):
+        values = np.sort(values)
+        values = np.diff(values, prepend=np.int64(0))
+        flags |= FLAG_DELTA | FLAG_SHUFFLE
+
+    data = values.astype('<i8', copy=False)
+    if flags & FLAG_SHUFFLE:
+        data = data.view(np.uint8).reshape(-1, 8).T
+    data = data.tobytes()
+
+    if compress:
+        data = zlib.compress(data, 6)
+        flags |= FLAG_ZLIB
+    return HEADER.pack(MAGIC, VERSION, flags, len(values)) + data
+
+
+def decode_phones(data: bytes) -> np.ndarray:
+    """
+    Decodifica o binário gerado por encode_phones em um array int64.
+    """
+    magic, version, flags, count = HEADER.unpack_from(data)
+    if magic != MAGIC or version != VERSION:
+        raise ValueError("Formato de números compactados inválido")
+
+    payload = bytes(data[HEADER.size:])
+    if flags & FLAG_ZLIB:
+        payload = zlib.decompress(payload)
+    raw = np.frombuffer(payload, dtype=np.uint8)
+    if len(raw) != count * 8:
+        raise ValueError("Tamanho dos números compactados não confere")
+
+    if flags & FLAG_SHUFFLE:
+        raw = np.ascontiguousarray(raw.reshape(8, count).T)
+    values = raw.view('<i8').astype(np.int64)
+    if flags & FLAG_DELTA:
+        values = np.cumsum(values)
+    return values
+
+
+def decode_phone_strings(data: bytes) -> List[str]:
+    """
+    Decodifica o binário gerado por encode_phones em uma lista de strings.
+    """
+    return decode_phones(data).astype(str).tolist()
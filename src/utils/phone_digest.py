@@ -0,0 +1,73 @@
+import hashlib
+import struct
+from typing import Optional
+import numpy as np
+
+# Constantes do splitmix64
+_GOLDEN = np.uint64(0x9E3779B97F4A7C15)
+_MIX1 = np.uint64(0xBF58476D1CE4E5B9)
+_MIX2 = np.uint64(0x94D049BB133111EB)
+# Sementes dos dois acumuladores (cada um com um misturador diferente)
+_SEEDS = (np.uint64(0), np.uint64(0x5BD1E9955BD1E995))
+_MASK = (1 << 64) - 1
+
+
+def _mix(values: np.ndarray, seed: np.uint64) -> np.ndarray:
+    z = values.astype(np.uint64) ^ seed
+    z = z + _GOLDEN
+    z = (z ^ (z >> np.uint64(30))) * _MIX1
+    z = (z ^ (z >> np.uint64(27))) * _MIX2
+    return z ^ (z >> np.uint64(31))
+
+
+class PhoneSetDigest:
+    """
+    Resumo de um conjunto de números (int64) calculado bloco a bloco.
+
+    Cada número passa por dois misturadores de 64 bits (splitmix64 com sementes
+    diferentes) e os resultados são somados módulo 2^64; a soma não depende da
+    ordem dos números nem da divisão em blocos. O estado tem tamanho fixo, então
+    o custo é uma passada vetorizada por bloco, sem ordenar nem guardar os
+    números. Os números devem vir sem repetição (como os válidos de uma
+    importação, já deduplicados).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self._sums = [0, 0]
+
+    def update(self, values: np.ndarray):
+        """
+        Acrescenta um bloco de números ao resumo.
+        """
+        if not len(values):
+            return
+        values = np.asarray(values, dtype=np.int64)
+        for position, seed in enumerate(_SEEDS):
+            # A soma de uint64 do numpy já é módulo 2^64
+            self._sums[position] = (self._sums[position] + int(_mix(values, seed).sum(dtype=np.uint64))) & _MASK
+        self.count += len(values)
+
+    def hexdigest(self) -> str:
+        """
+        Retorna o resumo (SHA-256 da quantidade e das somas) em hexadecimal.
+        """
+        return hashlib.sha256(struct.pack('<QQQ', self.count, *self._sums)).hexdigest()
+
+
+def idempotency_key(client_id, webhook_id, numbers_digest: str, message_template: Optional[str] = None) -> str:
+    """
+    Chave de idempotência de uma importação: o mesmo cliente, webhook, conjunto
+    de números e mensagem personalizada geram sempre a mesma chave.
+
+    Args:
+        client_id: ID do cliente (ObjectId, str ou None)
+        webhook_id: ID do webhook
+        numbers_digest (str): PhoneSetDigest.hexdigest() dos números válidos
+        message_template (str, optional): Template das mensagens personalizadas
+
+    Returns:
+        str: SHA-256 em hexadecimal
+    """
+    parts = [str(client_id or ''), str(webhook_id), numbers_digest, message_template or '']
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
@@ -0,0 +1,113 @@
+import threading
+from typing import Iterable
+import numpy as np
+
+
+def sorted_contains(sorted_values: np.ndarray, values: np.ndarray) -> np.ndarray:
+    """
+    Retorna uma máscara indicando quais valores existem no array ordenado.
+    """
+    if not len(sorted_values) or not len(values):
+        return np.zeros(len(values), dtype=bool)
+    positions = np.searchsorted(sorted_values, values)
+    positions[positions == len(sorted_values)] = 0
+    return sorted_values[positions] == values
+
+
+class PhoneIndex:
+    """
+    Conjunto compacto de números (int64) com teste de pertinência vetorizado.
+
+    Os números ficam em um array int64 ordenado (8 bytes por número, sem
+    overhead de objetos Python), consultado com busca binária. Inserções e
+    remoções incrementais vão para dois pequenos arrays de delta, que são
+    incorporados ao array principal quando passam de merge_threshold.
+    """
+
+    def __init__(self, values: Iterable[int] = None, merge_threshold: int = 65536):
+        self._lock = threading.Lock()
+        self.merge_threshold = merge_threshold
+        self._base = np.unique(np.asarray(values if values is not None else [], dtype=np.int64))
+        self._added = np.zeros(0, dtype=np.int64)
+        self._removed = np.zeros(0, dtype=np.int64)
+
+    def __len__(self) -> int:
+        return len(self._base) - len(self._removed) + len(self._added)
+
+    @property
+    def nbytes(self) -> int:
+        return self._base.nbytes + self._added.nbytes + self._removed.nbytes
+
+    def contains(self, values: np.ndarray) -> np.ndarray:
+        """
+        Testa a pertinência de um array de números de uma só vez.
+
+        Args:
+            values (np.ndarray): Números int64
+
+        Returns:
+            np.ndarray: Máscara booleana com True para os números presentes
+        """
+        values = np.asarray(values, dtype=np.int64)
+        base, added, removed = self._base, self._added, self._removed
+        mask = sorted_contains(base, values)
+        if len(removed):
+            mask &= ~sorted_contains(removed, values)
+        if len(added):
+            mask |= sorted_contains(added, values)
+        return mask
+
+    def __contains__(self, value: int) -> bool:
+        return bool(self.contains(np.array([value], dtype=np.int64))[0])
+
+    def add(self, values: Iterable[int]):
+        """
+        Adiciona números ao índice.
+        """
+        values = np.unique(np.asarray(values, dtype=np.int64))
+        with self._lock:
+            # Números que voltam depois de removidos já estão no array principal
+            self._removed = self._removed[~sorted_contains(values, self._removed)]
+            new = values[~sorted_contains(self._base, values)]
+            self._added = np.union1d(self._added, new)
+            self._maybe_merge()
+
+    def remove(self, values: Iterable[int]):
+        """
+        Remove números do índice.
+        """
+        values = np.unique(np.asarray(values, dtype=np.int64))
+        with self._lock:
+            self._added = self._added[~sorted_contains(values, self._added)]
+            in_base = values[sorted_contains(self._base, values)]
+            self._removed = np.union1d(self._removed, in_base)
+            self._maybe_merge()
+
+    def _maybe_merge(self):
+        if len(self._added) + len(self._removed) > self.merge_threshold:
+            self._merge()
+
+    def _merge(self):
+        base = self._base
+        if len(self._removed):
+            base = base[~sorted_contains(self._removed, base)]
+        if len(self._added):
+            base = np.union1d(base, self._added)
+        self._base = base
+        self._added = np.zeros(0, dtype=np.int64)
+        self._removed = np.zeros(0, dtype=np.int64)
+
+    def compact(self):
+        """
+        Incorpora os deltas pendentes ao array principal.
+        """
+        with self._lock:
+            self._merge()
+
+    def to_array(self) -> np.ndarray:
+        """
+        Retorna todos os números do índice em um array ordenado.
+        """
+        with self._lock:
+            self._merge()
+            return self._base.copy()
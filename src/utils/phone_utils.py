@@ -1,4 +1,7 @@
 import re
+from typing import List, Optional
+import numpy as np
+from .ddd_table import LEGACY_MOBILE_DIGITS, LEGACY_MOBILE_TABLE, VALID_DDDS, VALID_DDD_TABLE
 
 def clean_phone_number(phone: str) -> str:
     """
@@ -36,16 +39,22 @@ def format_phone_number(phone: str) -> str:
     if len(numbers_only) < 12 or len(numbers_only) > 13:
         return None
     
-    # Se tiver 12 dígitos (sem o 9), adiciona o 9
+    # Se tiver 12 dígitos (sem o 9), adiciona o 9; os começados em 2-5 são fixos
     if len(numbers_only) == 12:
         area_code = numbers_only[2:4]
         number = numbers_only[4:]
+        if number[0] not in LEGACY_MOBILE_DIGITS:
+            return None
         numbers_only = f"55{area_code}9{number}"
     
     # Verifica o formato final
     if not re.match(r'^55\d{2}9\d{8}$', numbers_only):
         return None
     
+    # Rejeita DDDs inexistentes
+    if int(numbers_only[2:4]) not in VALID_DDDS:
+        return None
+    
     return numbers_only
 
 def validate_phone_list(numbers: list) -> tuple:
@@ -69,3 +78,116 @@ def validate_phone_list(numbers: list) -> tuple:
             invalid_numbers.append(number)
     
     return valid_numbers, invalid_numbers
+
+
+# Versão das regras de normalização; incrementar ao mudar as regras descarta
+# os resultados guardados pelo cache persistente (phone_cache)
+NORMALIZATION_VERSION = 2
+# Tamanho máximo (em caracteres) tratado pelo caminho vetorizado; entradas
+# maiores ou com caracteres não ASCII usam format_phone_number
+_VECTOR_WIDTH = 24
+_VECTOR_CHUNK = 65536
+_POWERS = 10 ** np.arange(19, dtype=np.int64)
+
+
+def normalize_codes(codes: np.ndarray) -> np.ndarray:
+    """
+    Núcleo vetorizado de normalize_phone_array sobre números já convertidos
+    para um array de strings de largura fixa (dtype '<U24', ver _VECTOR_WIDTH).
+    
+    Recebe o buffer diretamente (por exemplo, em memória compartilhada), sem
+    objetos Python por número.
+    
+    Args:
+        codes (np.ndarray): Array 1-D '<U24'
+        
+    Returns:
+        np.ndarray: Números formatados como int64, 0 nas posições inválidas e -1
+        nas posições com caracteres não ASCII (que exigem format_phone_number)
+    """
+    count = len(codes)
+    codes = codes.view(np.uint32).reshape(count, _VECTOR_WIDTH)
+    non_ascii = (codes > 127).any(axis=1)
+
+    # Remove os caracteres não numéricos acumulando os dígitos coluna a coluna
+    number = np.zeros(count, dtype=np.int64)
+    digit_count = np.zeros(count, dtype=np.int64)
+    for column in np.ascontiguousarray(codes.T) - 48:
+        is_digit = column < 10
+        number = np.where(is_digit, number * 10 + column, number)
+        digit_count += is_digit
+    candidate = (digit_count > 0) & (digit_count <= 14)
+    digit_count = np.where(candidate, digit_count, 1)
+
+    # Se começar com 0, remove
+    leading_zero = number < _POWERS[digit_count - 1]
+    digit_count -= leading_zero
+
+    # Adiciona o código do país se não tiver
+    has_country = (digit_count >= 2) & (number // _POWERS[np.maximum(digit_count - 2, 0)] == 55)
+    number = np.where(has_country, number, 55 * _POWERS[digit_count] + number)
+    digit_count += np.where(has_country, 0, 2)
+
+    # Se tiver 12 dígitos (sem o 9), adiciona o 9; os começados em 2-5 são fixos
+    without_nine = digit_count == 12
+    landline = without_nine & ~LEGACY_MOBILE_TABLE[(number // 10**7) % 10]
+    number = np.where(without_nine, (number // 10**8) * 10**9 + 9 * 10**8 + number % 10**8, number)
+    digit_count += without_nine
+
+    # Verifica o formato final: 55 + DDD existente + 9 + 8 dígitos
+    valid = candidate & (digit_count == 13) & ((number // 10**8) % 10 == 9) & ~landline
+    valid &= VALID_DDD_TABLE[(number // 10**9) % 100]
+    result = np.where(valid, number, 0)
+    result[non_ascii] = -1
+    return result
+
+
+def apply_fallback(strings: list, result: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """
+    Completa com format_phone_number as posições que o núcleo vetorizado não
+    trata: números com mais de _VECTOR_WIDTH caracteres ou não ASCII (-1).
+    """
+    for index in np.flatnonzero((lengths > _VECTOR_WIDTH) | (result < 0)):
+        formatted = format_phone_number(strings[index])
+        result[index] = int(formatted) if formatted else 0
+    return result
+
+
+def _normalize_chunk(strings: list) -> np.ndarray:
+    count = len(strings)
+    if not count:
+        return np.zeros(0, dtype=np.int64)
+
+    codes = np.array(strings, dtype=f'<U{_VECTOR_WIDTH}')
+    lengths = np.fromiter(map(len, strings), dtype=np.int64, count=count)
+    return apply_fallback(strings, normalize_codes(codes), lengths)
+
+
+def normalize_phone_array(phones) -> np.ndarray:
+    """
+    Versão vetorizada de format_phone_number para uma sequência de números.
+    
+    Aplica as mesmas regras de format_phone_number com operações do numpy sobre
+    blocos de números, sem chamar uma função Python por número.
+    
+    Args:
+        phones: Sequência (lista, pd.Series ou array) de números brutos
+        
+    Returns:
+        np.ndarray: Números formatados como int64, com 0 nas posições inválidas
+    """
+    strings = list(map(str, phones))
+    if len(strings) <= _VECTOR_CHUNK:
+        return _normalize_chunk(strings)
+    return np.concatenate([
+        _normalize_chunk(strings[start:start + _VECTOR_CHUNK])
+        for start in range(0, len(strings), _VECTOR_CHUNK)
+    ])
+
+
+def format_phone_numbers(phones) -> List[Optional[str]]:
+    """
+    Formata uma sequência de números, retornando None nas posições inválidas.
+    """
+    normalized = normalize_phone_array(phones)
+    return [str(number) if number else None for number in normalized.tolist()]
@@ -0,0 +1,53 @@
+from typing import Optional
+import threading
+from .clock import SYSTEM_CLOCK
+
+
+class RateLimiter:
+    """
+    Limite de ritmo (balde de fichas) em unidades por minuto.
+
+    O balde começa cheio, com até burst_seconds de ritmo acumulado. Um pedido
+    maior que o saldo deixa o balde negativo e espera o tempo de repor a
+    diferença, então lotes maiores que o balde também respeitam o ritmo médio e
+    o próximo pedido espera pela dívida do anterior. O relógio é injetável
+    (SystemClock ou VirtualClock), para a simulação usar o mesmo limite do
+    dispatcher.
+    """
+
+    def __init__(self, per_minute: float, burst_seconds: float = 1.0, clock=None):
+        """
+        Args:
+            per_minute (float): Unidades (números) por minuto; 0 desativa o limite
+            burst_seconds (float): Segundos de ritmo que podem ser usados de uma vez
+            clock (optional): Relógio usado para medir e esperar (padrão: SystemClock)
+        """
+        self.per_second = per_minute / 60.0
+        self.clock = clock or SYSTEM_CLOCK
+        self.capacity = self.per_second * max(burst_seconds, 0.0)
+        self._tokens = self.capacity
+        self._updated: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        return self.per_second > 0
+
+    def acquire(self, amount: float) -> float:
+        """
+        Reserva amount unidades, esperando (no relógio do limite) se necessário.
+
+        Returns:
+            float: Segundos de espera
+        """
+        if not self.enabled or amount <= 0:
+            return 0.0
+        with self._lock:
+            now = self.clock.monotonic()
+            if self._updated is not None:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.per_second)
+            self._updated = now
+            self._tokens -= amount
+            wait = -self._tokens / self.per_second if self._tokens < 0 else 0.0
+        self.clock.sleep(wait)
+        return wait
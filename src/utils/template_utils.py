@@ -0,0 +1,75 @@
+from string import Formatter
+from typing import Dict, List, Tuple
+import pandas as pd
+
+
+class MessageTemplate:
+    """
+    Template de mensagem compilado uma única vez, como "Olá {nome}, tudo bem?".
+
+    Os campos entre chaves são nomes de colunas do CSV. A compilação separa o
+    texto fixo dos campos, e a renderização concatena colunas inteiras de um
+    DataFrame de uma vez, sem formatar linha a linha.
+    """
+
+    def __init__(self, template: str):
+        """
+        Args:
+            template (str): Texto com campos no formato {coluna}
+
+        Raises:
+            ValueError: Se o template tiver sintaxe inválida ou campos não suportados
+        """
+        self.template = template
+        self.parts: List[Tuple[str, str]] = []
+        try:
+            parsed = list(Formatter().parse(template))
+        except ValueError as e:
+            raise ValueError(f"Template inválido: {str(e)}")
+
+        for literal, field, format_spec, conversion in parsed:
+            if field is not None:
+                field = field.strip()
+                if not field or format_spec or conversion:
+                    raise ValueError(f"Campo inválido no template: {{{field}}}")
+            self.parts.append((literal, field))
+
+    @property
+    def fields(self) -> List[str]:
+        """
+        Colunas usadas pelo template, na ordem em que aparecem (sem repetição).
+        """
+        return list(dict.fromkeys(field for _, field in self.parts if field))
+
+    def missing_fields(self, columns) -> List[str]:
+        """
+        Retorna os campos do template que não existem nas colunas informadas.
+        """
+        available = set(columns)
+        return [field for field in self.fields if field not in available]
+
+    def render(self, values: Dict[str, str]) -> str:
+        """
+        Renderiza o template para um único contato.
+        """
+        rendered = []
+        for literal, field in self.parts:
+            rendered.append(literal)
+            if field:
+                value = values.get(field)
+                rendered.append('' if value is None or pd.isna(value) else str(value))
+        return ''.join(rendered)
+
+    def render_frame(self, frame: pd.DataFrame) -> pd.Series:
+        """
+        Renderiza o template para todas as linhas de um DataFrame de uma vez.
+
+        Valores ausentes viram string vazia.
+        """
+        result = pd.Series([''] * len(frame), index=frame.index, dtype=object)
+        for literal, field in self.parts:
+            if literal:
+                result = result + literal
+            if field:
+                result = result + frame[field].fillna('').astype(str)
+        return result
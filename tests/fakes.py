@@ -0,0 +1,309 @@
+"""
+Banco em memória usado nos testes no lugar do MongoDB.
+
+FakeDatabase cria as collections sob demanda, então um serviço que passa a
+usar outra collection não exige mudar os testes de outros serviços. Cada
+FakeCollection implementa o subconjunto do pymongo usado pelos serviços
+(consultas com os operadores comuns, projeção, ordenação, atualizações com
+upsert e bulk_write) e guarda as chamadas recebidas para as verificações.
+"""
+import copy
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+
+
+class FakeResult:
+    """
+    Resultado de uma escrita, com os atributos usados dos resultados do pymongo.
+    """
+
+    def __init__(self, **fields):
+        self.inserted_id = None
+        self.upserted_id = None
+        self.matched_count = 0
+        self.modified_count = 0
+        self.deleted_count = 0
+        self.__dict__.update(fields)
+
+
+class FakeCursor(list):
+    """
+    Cursor já materializado, com sort, skip, limit e batch_size encadeáveis.
+    """
+
+    def sort(self, key, direction=1):
+        keys = [(key, direction)] if isinstance(key, str) else list(key)
+        docs = list(self)
+        # Ordena da última chave para a primeira (sort estável); campos ausentes vêm antes
+        for name, order in reversed(keys):
+            docs.sort(key=lambda doc: _sort_key(_get(doc, name)), reverse=order < 0)
+        return FakeCursor(docs)
+
+    def skip(self, count):
+        return FakeCursor(self[count:])
+
+    def limit(self, count):
+        return FakeCursor(self[:count] if count else self)
+
+    def batch_size(self, size):
+        return self
+
+
+_MISSING = object()
+
+
+def _get(doc, name):
+    value = doc
+    for part in name.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return _MISSING
+        value = value[part]
+    return value
+
+
+def _sort_key(value):
+    if value is _MISSING or value is None:
+        return (0, 0)
+    return (1, value)
+
+
+def _compare(value, operator, expected):
+    if operator == '$eq':
+        return value == expected
+    if operator == '$ne':
+        return value != expected
+    if operator == '$in':
+        return value in expected
+    if operator == '$nin':
+        return value not in expected
+    if operator == '$exists':
+        return (value is not _MISSING) == bool(expected)
+    if value is _MISSING or value is None:
+        return False
+    if operator == '$lt':
+        return value < expected
+    if operator == '$lte':
+        return value <= expected
+    if operator == '$gt':
+        return value > expected
+    if operator == '$gte':
+        return value >= expected
+    raise NotImplementedError(f"Operador não suportado pelo FakeCollection: {operator}")
+
+
+def matches(doc, query):
+    """
+    Verifica se o documento atende à consulta (igualdade, $in, $nin, $exists,
+    comparações, $ne, $or e $and).
+    """
+    for key, expected in (query or {}).items():
+        if key == '$or':
+            if not any(matches(doc, part) for part in expected):
+                return False
+        elif key == '$and':
+            if not all(matches(doc, part) for part in expected):
+                return False
+        elif isinstance(expected, dict) and expected and all(name.startswith('$') for name in expected):
+            value = _get(doc, key)
+            if not all(_compare(value, operator, operand) for operator, operand in expected.items()):
+                return False
+        elif _get(doc, key) is _MISSING or _get(doc, key) != expected:
+            if not (expected is None and _get(doc, key) is _MISSING):
+                return False
+    return True
+
+
+def project(doc, projection):
+    """
+    Aplica uma projeção de inclusão ({'campo': 1}) ou de exclusão ({'campo': 0}).
+    """
+    doc = copy.deepcopy(doc)
+    if not projection:
+        return doc
+    include = {name for name, flag in projection.items() if flag and name != '_id'}
+    if include:
+        result = {name: doc[name] for name in include if name in doc}
+        if projection.get('_id', 1) and '_id' in doc:
+            result['_id'] = doc['_id']
+        return result
+    for name, flag in projection.items():
+        if not flag:
+            doc.pop(name, None)
+    return doc
+
+
+def _set(doc, name, value):
+    parts = name.split('.')
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _unset(doc, name):
+    parts = name.split('.')
+    for part in parts[:-1]:
+        doc = doc.get(part)
+        if not isinstance(doc, dict):
+            return
+    doc.pop(parts[-1], None)
+
+
+def apply_update(doc, update, inserted=False):
+    """
+    Aplica $set, $unset, $inc e (só na inserção) $setOnInsert ao documento.
+    """
+    if inserted:
+        for name, value in update.get('$setOnInsert', {}).items():
+            _set(doc, name, copy.deepcopy(value))
+    for name, value in update.get('$set', {}).items():
+        _set(doc, name, copy.deepcopy(value))
+    for name in update.get('$unset', {}):
+        _unset(doc, name)
+    for name, value in update.get('$inc', {}).items():
+        current = _get(doc, name)
+        _set(doc, name, (0 if current is _MISSING else current) + value)
+
+
+class FakeCollection:
+    """
+    Collection em memória.
+
+    Args:
+        docs (list, optional): Documentos iniciais
+        unique (tuple): Campos com índice único (além do _id); valores None não conflitam
+    """
+
+    def __init__(self, docs=None, unique=()):
+        self.docs = list(docs or [])
+        self.unique = tuple(unique)
+        # (método, consulta, projeção ou atualização) de cada chamada
+        self.calls = []
+
+    @property
+    def queries(self):
+        """(consulta, projeção) de cada find, na ordem."""
+        return [(query, extra) for method, query, extra in self.calls if method == 'find']
+
+    def count_calls(self, method):
+        return sum(1 for name, _, _ in self.calls if name == method)
+
+    def _check_unique(self, doc, ignore=None):
+        for other in self.docs:
+            if other is ignore:
+                continue
+            if other.get('_id') == doc.get('_id'):
+                raise DuplicateKeyError(f"E11000 duplicate key error (_id: {doc.get('_id')})")
+            for name in self.unique:
+                if doc.get(name) is not None and other.get(name) == doc.get(name):
+                    raise DuplicateKeyError(f"E11000 duplicate key error ({name})")
+
+    def _first(self, query):
+        return next((doc for doc in self.docs if matches(doc, query)), None)
+
+    def _upsert(self, query, update):
+        doc = {
+            key: copy.deepcopy(value) for key, value in query.items()
+            if not key.startswith('$') and not (isinstance(value, dict) and any(name.startswith('$') for name in value))
+        }
+        doc.setdefault('_id', ObjectId())
+        apply_update(doc, update, inserted=True)
+        self._check_unique(doc)
+        self.docs.append(doc)
+        return doc['_id']
+
+    def find(self, query=None, projection=None):
+        self.calls.append(('find', query, projection))
+        return FakeCursor(project(doc, projection) for doc in self.docs if matches(doc, query))
+
+    def find_one(self, query=None, projection=None):
+        self.calls.append(('find_one', query, projection))
+        doc = self._first(query)
+        return project(doc, projection) if doc is not None else None
+
+    def count_documents(self, query):
+        return sum(1 for doc in self.docs if matches(doc, query))
+
+    def insert_one(self, doc):
+        self.calls.append(('insert_one', doc, None))
+        doc.setdefault('_id', ObjectId())
+        self._check_unique(doc)
+        self.docs.append(copy.deepcopy(doc))
+        return FakeResult(inserted_id=doc['_id'])
+
+    def insert_many(self, docs, ordered=True):
+        return FakeResult(inserted_ids=[self.insert_one(doc).inserted_id for doc in docs])
+
+    def update_one(self, query, update, upsert=False):
+        self.calls.append(('update_one', query, update))
+        doc = self._first(query)
+        if doc is not None:
+            apply_update(doc, update)
+            return FakeResult(matched_count=1, modified_count=1)
+        if upsert:
+            return FakeResult(upserted_id=self._upsert(query, update))
+        return FakeResult()
+
+    def update_many(self, query, update, upsert=False):
+        self.calls.append(('update_many', query, update))
+        docs = [doc for doc in self.docs if matches(doc, query)]
+        for doc in docs:
+            apply_update(doc, update)
+        if not docs and upsert:
+            return FakeResult(upserted_id=self._upsert(query, update))
+        return FakeResult(matched_count=len(docs), modified_count=len(docs))
+
+    def delete_one(self, query):
+        self.calls.append(('delete_one', query, None))
+        doc = self._first(query)
+        if doc is not None:
+            self.docs.remove(doc)
+        return FakeResult(deleted_count=int(doc is not None))
+
+    def delete_many(self, query):
+        self.calls.append(('delete_many', query, None))
+        kept = [doc for doc in self.docs if not matches(doc, query)]
+        deleted, self.docs = len(self.docs) - len(kept), kept
+        return FakeResult(deleted_count=deleted)
+
+    def bulk_write(self, operations, ordered=True):
+        """
+        Executa InsertOne, UpdateOne, UpdateMany, DeleteOne e DeleteMany do pymongo.
+        """
+        self.calls.append(('bulk_write', operations, None))
+        for op in operations:
+            kind = type(op).__name__
+            if kind == 'InsertOne':
+                self.insert_one(op._doc)
+            elif kind == 'UpdateOne':
+                self.update_one(op._filter, op._doc, upsert=bool(op._upsert))
+            elif kind == 'UpdateMany':
+                self.update_many(op._filter, op._doc, upsert=bool(op._upsert))
+            elif kind == 'DeleteOne':
+                self.delete_one(op._filter)
+            elif kind == 'DeleteMany':
+                self.delete_many(op._filter)
+            else:
+                raise NotImplementedError(f"Operação não suportada pelo FakeCollection: {kind}")
+        return FakeResult()
+
+    def create_index(self, *args, **kwargs):
+        pass
+
+
+class FakeDatabase(dict):
+    """
+    Banco em memória: db['nome'] cria a collection vazia no primeiro acesso.
+
+    Args:
+        **collections: Collections iniciais (FakeCollection ou listas de documentos)
+    """
+
+    def __init__(self, **collections):
+        super().__init__({
+            name: collection if isinstance(collection, FakeCollection) else FakeCollection(collection)
+            for name, collection in collections.items()
+        })
+
+    def __missing__(self, name):
+        collection = self[name] = FakeCollection()
+        return collection
@@ -0,0 +1,75 @@
+import unittest
+from datetime import datetime, timedelta
+from bson import ObjectId
+from src.services.admission_service import AdmissionService, client_key
+from src.services.history_service import HistoryService
+from tests.fakes import FakeCollection, FakeDatabase
+
+class TestAdmissionService(unittest.TestCase):
+    def setUp(self):
+        self.counters = FakeCollection()
+        # 1000 números por minuto; fila global de 10000 e 4000 por cliente; adiamento de até 1h
+        self.service = AdmissionService(
+            db=FakeDatabase(queue_counters=self.counters), send_rate=1000,
+            max_pending=10000, max_pending_per_client=4000, max_delay_hours=1
+        )
+        self.now = datetime(2026, 1, 5, 12, 0)
+        self.client_a, self.client_b = ObjectId(), ObjectId()
+
+    def test_accept_defer_reject(self):
+        """Testa as decisões pelos contadores da fila global e do cliente"""
+        first = self.service.decide(self.client_a, 4000, self.now)
+        self.assertEqual(first['decision'], 'accepted')
+        self.assertEqual(first['estimated_start'], self.now)
+        self.service.reserve(self.client_a, 4000)
+
+        # O mesmo cliente passa do seu limite: espera a sua fila liberar 3000 números
+        deferred = self.service.decide(self.client_a, 3000, self.now)
+        self.assertEqual(deferred['decision'], 'deferred')
+        self.assertEqual(deferred['scheduled_for'], self.now + timedelta(minutes=3))
+        self.assertEqual(deferred['estimated_start'], self.now + timedelta(minutes=4))
+
+        # Outro cliente cabe nos limites; a estimativa considera a fila global
+        other = self.service.decide(self.client_b, 3000, self.now)
+        self.assertEqual(other['decision'], 'accepted')
+        self.assertEqual(other['estimated_start'], self.now + timedelta(minutes=4))
+
+        # Fila global de 64000 números: liberar o excesso levaria mais de 1h
+        self.service.reserve(self.client_b, 60000)
+        rejected = self.service.decide(self.client_b, 10000, self.now)
+        self.assertEqual(rejected['decision'], 'rejected')
+        self.assertEqual(rejected['estimated_start'], self.now + timedelta(minutes=64))
+
+        self.service.release(self.client_b, 60000)
+        self.assertEqual(self.service.get_pending(self.client_b)['client'], {'numbers': 0, 'jobs': 0})
+        self.assertEqual(self.service.get_pending()['global'], {'numbers': 4000, 'jobs': 1})
+
+    def test_empty_queue_never_defers(self):
+        """Testa que uma importação maior que o limite não espera por uma fila vazia"""
+        self.assertEqual(self.service.decide(self.client_a, 50000, self.now)['decision'], 'accepted')
+
+    def test_register_import(self):
+        """Testa o registro adiado, a recusa sem gravação e os contadores da fila"""
+        history = FakeCollection()
+        webhook_id = ObjectId()
+        service = HistoryService(db=FakeDatabase(
+            history=history, queue_counters=self.counters,
+            webhooks=[{'_id': webhook_id, 'client_id': self.client_a}]
+        ))
+        service.admission_service = self.service
+        self.service.reserve(self.client_a, 3000)
+
+        entry = service.register_import([f"55119{i:08d}" for i in range(2000)], [], str(webhook_id), 'W', 'http://provedor')
+        self.assertEqual(entry['admission']['decision'], 'deferred')
+        self.assertEqual(history.docs[0]['queued_numbers'], 2000)
+        self.assertIn('scheduled_for', history.docs[0])
+        self.assertEqual(self.counters.find_one({'_id': client_key(self.client_a)})['pending_numbers'], 5000)
+
+        self.service.reserve(self.client_a, 60000)
+        entry = service.register_import(["5511999999999"] * 2000, [], str(webhook_id), 'W', 'http://provedor')
+        self.assertEqual(entry['status'], 'rejected')
+        self.assertIsNone(entry['_id'])
+        self.assertEqual(len(history.docs), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,136 @@
+import gzip
+import json
+import time
+import unittest
+from datetime import datetime
+from bson import ObjectId
+from src.api.testing import LocalClient
+from src.api.wsgi import ApiApp
+from src.services.contact_service import ContactService
+from src.services.history_service import HistoryService
+from src.services.import_job_service import ImportJobService
+from tests.fakes import FakeCollection, FakeDatabase
+
+WEBHOOK_ID = str(ObjectId())
+
+class FakeWebhookService:
+    def get_webhook_by_id(self, webhook_id):
+        ObjectId(webhook_id)
+        if webhook_id != WEBHOOK_ID:
+            return None
+        return {'_id': WEBHOOK_ID, 'title': 'Campanha', 'url': 'http://provedor', 'client_id': str(ObjectId())}
+
+class FakeHistoryService:
+    def __init__(self):
+        self.calls = []
+
+    def get_history_page(self, **kwargs):
+        self.calls.append(kwargs)
+        return {'items': [{'_id': 'a', 'timestamp': datetime(2024, 9, 1)}], 'next_cursor': None}
+
+    def export_numbers(self, export_format, **filters):
+        self.calls.append(filters)
+        yield b"history_id,phone\n"
+        yield b"a,5511999999999\n"
+
+class TestApi(unittest.TestCase):
+    def setUp(self):
+        self.history_service = FakeHistoryService()
+        self.jobs = ImportJobService(ContactService(workers=0))
+        self.client = LocalClient(ApiApp(self.history_service, FakeWebhookService(), self.jobs, token='segredo'))
+        self.auth = {'Authorization': 'Bearer segredo'}
+
+    def wait_job(self, job_id):
+        for _ in range(200):
+            job = self.client.get(f"/jobs/{job_id}", headers=self.auth).json()
+            if job['status'] not in ('queued', 'running'):
+                return job
+            time.sleep(0.02)
+        self.fail("Job não terminou")
+
+    def test_submit_ndjson(self):
+        """Testa o envio em NDJSON comprimido, sem o resultado guardar as listas de números"""
+        lines = [json.dumps({'telefone': '11999999999', 'nome': 'Ana'}), json.dumps({'telefone': '123'}), '']
+        response = self.client.post(
+            f"/webhooks/{WEBHOOK_ID}/imports", gzip.compress('\n'.join(lines).encode('utf-8')),
+            headers={**self.auth, 'Content-Type': 'application/x-ndjson', 'Content-Encoding': 'gzip'},
+            query={'column': 'telefone'}
+        )
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.headers['Location'], response.json()['status_url'])
+
+        job = self.wait_job(response.json()['job_id'])
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['rows_read'], 2)
+        self.assertEqual(job['result']['total_valid'], 1)
+        self.assertEqual(job['result']['total_invalid'], 1)
+        self.assertNotIn('valid_numbers', job['result'])
+
+    def test_submit_csv_detects_column(self):
+        """Testa o CSV com a coluna dos números detectada"""
+        body = "nome;celular\nAna;11999999999\nBia;21988888888\n".encode('utf-8')
+        response = self.client.post(f"/webhooks/{WEBHOOK_ID}/imports", body, headers={**self.auth, 'Content-Type': 'text/csv'})
+        self.assertEqual(response.json()['column'], 'celular')
+        self.assertEqual(self.wait_job(response.json()['job_id'])['result']['total_valid'], 2)
+
+    def test_errors(self):
+        """Testa token, webhook, formato e coluna inválidos"""
+        url = f"/webhooks/{WEBHOOK_ID}/imports"
+        self.assertEqual(self.client.post(url, b"1", headers={'Content-Type': 'text/plain'}).status_code, 401)
+        self.assertEqual(self.client.post("/webhooks/x/imports", b"1", headers={**self.auth, 'Content-Type': 'text/plain'}).status_code, 404)
+        self.assertEqual(self.client.post(url, b"1", headers={**self.auth, 'Content-Type': 'application/pdf'}).status_code, 415)
+        response = self.client.post(url, b"a,b\n1,2\n", headers={**self.auth, 'Content-Type': 'text/csv'}, query={'column': 'fone'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("fone", response.json()['error'])
+        self.assertEqual(self.client.get(url, headers=self.auth).status_code, 405)
+        self.assertEqual(self.client.get("/jobs/inexistente", headers=self.auth).status_code, 404)
+        self.assertEqual(self.client.get("/health").status_code, 200)
+
+    def test_requires_configured_token(self):
+        """Testa que a API sem token recusa as rotas autenticadas, exceto com insecure"""
+        client = LocalClient(ApiApp(self.history_service, FakeWebhookService(), self.jobs, token=''))
+        self.assertEqual(client.get("/history").status_code, 401)
+        self.assertEqual(client.get("/health").status_code, 200)
+        client = LocalClient(ApiApp(self.history_service, FakeWebhookService(), self.jobs, token='', insecure=True))
+        self.assertEqual(client.get("/history").status_code, 200)
+
+    def test_history_listing(self):
+        """Testa a repassagem dos filtros e a serialização das datas"""
+        response = self.client.get("/history", headers=self.auth, query={'limit': '10', 'status': 'completed', 'start': '2024-09-01'})
+        self.assertEqual(response.json()['items'][0]['timestamp'], '2024-09-01T00:00:00')
+        call = self.history_service.calls[0]
+        self.assertEqual((call['limit'], call['status'], call['start_date']), (10, 'completed', datetime(2024, 9, 1)))
+
+    def test_history_export(self):
+        """Testa a exportação em streaming com os filtros e o formato"""
+        response = self.client.get("/history/export", headers=self.auth, query={'status': 'completed', 'end': '2024-10-01'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Type'], 'text/csv')
+        self.assertEqual(response.body, b"history_id,phone\na,5511999999999\n")
+        self.assertEqual((self.history_service.calls[0]['status'], self.history_service.calls[0]['end_date']), ('completed', datetime(2024, 10, 1)))
+        self.assertEqual(self.client.get("/history/export", headers=self.auth, query={'format': 'xlsx'}).status_code, 400)
+        self.assertEqual(self.client.get("/history", headers=self.auth, query={'limit': 'x'}).status_code, 400)
+
+class TestHistoryPage(unittest.TestCase):
+    def test_keyset_cursor(self):
+        """Testa o cursor da próxima página e a consulta a partir dele"""
+        docs = [{'_id': ObjectId(), 'timestamp': datetime(2024, 9, 3 - i), 'status': 'completed'} for i in range(3)]
+        history = FakeCollection(docs)
+        service = HistoryService(db=FakeDatabase(history=history))
+
+        page = service.get_history_page(limit=2)
+        self.assertEqual(len(page['items']), 2)
+        self.assertNotIn('valid_numbers_packed', history.queries[0][1])
+        self.assertTrue(page['next_cursor'].endswith(str(docs[1]['_id'])))
+
+        page = service.get_history_page(limit=2, cursor=page['next_cursor'])
+        self.assertEqual([item['_id'] for item in page['items']], [str(docs[2]['_id'])])
+        self.assertIsNone(page['next_cursor'])
+        after = history.queries[1][0]['$or']
+        self.assertEqual(after[0], {'timestamp': {'$lt': datetime(2024, 9, 2)}})
+        self.assertEqual(after[1]['_id'], {'$lt': docs[1]['_id']})
+        with self.assertRaises(ValueError):
+            service.get_history_page(cursor="invalido")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+from datetime import datetime
+from bson import ObjectId
+from src.services import archive_service
+from src.services.archive_service import ArchiveService
+from src.utils.phone_codec import encode_phones
+from tests.fakes import FakeDatabase
+
+class TestArchiveService(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = FakeDatabase()
+        self.service = ArchiveService(self.db, directory=self.directory.name, max_age_days=90)
+
+    def tearDown(self):
+        self.directory.cleanup()
+
+    def entry(self, client_id, timestamp):
+        entry = {
+            '_id': ObjectId(),
+            'client_id': client_id,
+            'timestamp': timestamp,
+            'status': 'completed',
+            'valid_count': 2,
+            'valid_numbers_packed': encode_phones(["5511999999999", "5521988888888"]),
+            'invalid_numbers': ["123"],
+            'details': {'method': 'txt'}
+        }
+        self.db['history'].insert_one(dict(entry))
+        return entry
+
+    def stub(self, entry):
+        return self.db['history'].find_one({'_id': entry['_id']})
+
+    def test_archive_and_fetch(self):
+        """Testa a gravação por cliente/mês, o documento resumido e a leitura de volta"""
+        client = ObjectId()
+        entries = [self.entry(client, datetime(2024, 1, 5)), self.entry(client, datetime(2024, 2, 5)), self.entry(None, datetime(2024, 1, 9))]
+        originals = [dict(entry) for entry in entries]
+        self.assertEqual(self.service._archive_batch(entries), 3)
+
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, str(client), '2024-01.jsonl.gz')))
+        self.assertTrue(os.path.exists(os.path.join(self.directory.name, 'sem_cliente', '2024-01.jsonl.gz')))
+
+        stub = self.stub(originals[0])
+        self.assertFalse({'valid_numbers_packed', 'invalid_numbers', 'details'} & set(stub))
+        self.assertEqual((stub['valid_count'], stub['status']), (2, 'completed'))
+
+        # Um segundo bloco na mesma partição vira outro membro gzip do arquivo
+        later = self.entry(client, datetime(2024, 1, 20))
+        self.service._archive_batch([dict(later)])
+
+        for original in originals + [later]:
+            stub = self.stub(original)
+            fetched = self.service.fetch(dict(stub, _id=str(stub['_id'])))
+            self.assertEqual(fetched, original)
+        self.assertGreater(self.stub(later)['archived']['offset'], 0)
+
+    def test_member_read_in_small_blocks(self):
+        """Testa a leitura do membro em blocos menores que uma linha"""
+        client = ObjectId()
+        entries = [self.entry(client, datetime(2024, 1, day)) for day in range(1, 6)]
+        originals = [dict(entry) for entry in entries]
+        self.service._archive_batch(entries)
+        location = self.stub(originals[0])['archived']
+
+        with mock.patch.object(archive_service, 'READ_BLOCK_BYTES', 7):
+            self.assertEqual(list(self.service.iter_member(location)), originals)
+            self.assertEqual(self.service.fetch({'_id': originals[2]['_id'], 'archived': location}), originals[2])
+        self.assertEqual(list(self.service.iter_member({'partition': 'ausente.jsonl.gz', 'offset': 0})), [])
+
+if __name__ == '__main__':
+    unittest.main()
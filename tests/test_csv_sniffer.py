@@ -0,0 +1,41 @@
+import unittest
+from src.utils import csv_sniffer
+from src.utils.csv_sniffer import sniff_csv
+
+class TestCsvSniffer(unittest.TestCase):
+    def test_model_file(self):
+        """Testa a detecção no arquivo modelo"""
+        with open("static/modelo_contatos.csv", "rb") as f:
+            result = sniff_csv(f.read())
+        self.assertEqual(result['delimiter'], ',')
+        self.assertEqual(result['columns'], ['nome', 'telefone', 'cidade'])
+        self.assertEqual(result['phone_column'], 'telefone')
+
+    def test_semicolon_cp1252(self):
+        """Testa arquivo exportado pelo Excel (ponto e vírgula, cp1252)"""
+        content = "Nome;Cidade;Celular\nJoão;São Paulo;(11) 99999-9999\nMaria;Recife;81 98888-8888\n".encode('cp1252')
+        result = sniff_csv(content)
+        self.assertEqual(result['delimiter'], ';')
+        self.assertEqual(result['encoding'], 'cp1252')
+        self.assertEqual(result['columns'], ['Nome', 'Cidade', 'Celular'])
+        self.assertEqual(result['phone_column'], 'Celular')
+
+    def test_bom_single_column(self):
+        """Testa arquivo de uma coluna com BOM"""
+        result = sniff_csv("﻿telefone\n11999999999\n".encode('utf-8'))
+        self.assertEqual(result['encoding'], 'utf-8-sig')
+        self.assertEqual(result['columns'], ['telefone'])
+        self.assertEqual(result['phone_column'], 'telefone')
+
+    def test_reads_only_sample(self):
+        """Testa que só o início do arquivo é lido e que o resultado fica em cache"""
+        header = b"id,numero\n"
+        content = header + b"".join(b"%d,5511999%06d\n" % (i, i) for i in range(20000)) + b"\xff\xfe,quebrado\n"
+        self.assertGreater(len(content), csv_sniffer.SAMPLE_BYTES)
+        result = sniff_csv(content)
+        self.assertEqual(result['encoding'], 'utf-8')
+        self.assertEqual(result['phone_column'], 'numero')
+        self.assertIs(sniff_csv(content), result)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,24 @@
+import unittest
+import numpy as np
+from src.utils.ddd_table import DDD_STATES, ddd_counts, ddd_of, summarize_ddd_counts
+
+class TestDddTable(unittest.TestCase):
+    def test_ddd_table(self):
+        """Testa a tabela de DDDs existentes"""
+        self.assertEqual(len(DDD_STATES), 67)
+        self.assertEqual(DDD_STATES[11], 'SP')
+        self.assertEqual(DDD_STATES[61], 'DF')
+        self.assertNotIn(20, DDD_STATES)
+
+    def test_breakdown(self):
+        """Testa as contagens por DDD e por estado"""
+        values = np.array([5511999999999, 5519988887777, 5521977776666, 5511966665555], dtype=np.int64)
+        self.assertEqual(ddd_of(values).tolist(), [11, 19, 21, 11])
+
+        counts = ddd_counts(values[:2]) + ddd_counts(values[2:])
+        summary = summarize_ddd_counts(counts)
+        self.assertEqual(summary['by_ddd'], {'11': 2, '19': 1, '21': 1})
+        self.assertEqual(summary['by_state'], {'RJ': 1, 'SP': 3})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+import json
+import unittest
+from bson import ObjectId
+from src.api.testing import LocalClient
+from src.api.wsgi import ApiApp
+from src.services.delivery_service import DeliveryBacklogFull, DeliveryService
+from tests.fakes import FakeDatabase
+
+class TestDeliveryService(unittest.TestCase):
+    def setUp(self):
+        self.history_id = ObjectId()
+        self.db = FakeDatabase(history=[{'_id': self.history_id}])
+        self.history, self.status = self.db['history'], self.db['delivery_status']
+        self.service = DeliveryService(
+            db=self.db,
+            flush_size=1000, flush_interval=60, max_buffered=10
+        )
+
+    def event(self, phone, status):
+        return {'history_id': str(self.history_id), 'phone': phone, 'status': status}
+
+    def counters(self):
+        return self.history.docs[0].get('delivery', {})
+
+    def test_flush_keeps_highest_status(self):
+        """Testa o status de maior ordem por número, os contadores e os eventos recusados"""
+        counts = self.service.submit([
+            self.event('5511999999999', 'sent'),
+            self.event('5511999999999', 'read'),
+            self.event('11999999999', 'delivered'),
+            self.event('5521988888888', 'failed'),
+            self.event('5521988888888', 'entregue'),
+            {'history_id': 'x', 'phone': '5521988888888', 'status': 'read'},
+        ])
+        self.assertEqual(counts, {'accepted': 4, 'rejected': 2})
+        self.assertEqual(self.service.flush(), 2)
+        self.assertEqual({d['phone']: d['status'] for d in self.status.docs}, {5511999999999: 'read', 5521988888888: 'failed'})
+        self.assertEqual(self.counters(), {'read': 1, 'failed': 1})
+
+        # 'delivered' atrasado não desfaz 'read'; depois de 'failed', conta como nova tentativa
+        self.service.submit([self.event('5511999999999', 'delivered'), self.event('5521988888888', 'delivered')])
+        self.assertEqual(self.service.flush(), 1)
+        self.assertEqual(self.counters(), {'read': 1, 'failed': 0, 'delivered': 1})
+        self.assertEqual(self.service.flush(), 0)
+
+    def test_backlog_full(self):
+        """Testa a recusa quando a fila em memória está cheia"""
+        self.service.submit([self.event(f'55119{i:08d}', 'sent') for i in range(10)])
+        with self.assertRaises(DeliveryBacklogFull):
+            self.service.submit([self.event('5511999999999', 'read')])
+
+    def test_callback_route(self):
+        """Testa o callback em NDJSON com token próprio e a resposta 503 com a fila cheia"""
+        client = LocalClient(ApiApp(None, None, None, token='api', delivery_service=self.service, callback_token='cb'))
+        body = '\n'.join(json.dumps(self.event('5511999999999', status)) for status in ('sent', 'delivered')).encode('utf-8')
+        headers = {'Content-Type': 'application/x-ndjson'}
+        self.assertEqual(client.post("/callbacks/delivery", body, headers=headers).status_code, 401)
+        response = client.post("/callbacks/delivery", body, headers=headers, query={'token': 'cb'})
+        self.assertEqual(response.status_code, 202)
+        self.assertEqual(response.json(), {'accepted': 2, 'rejected': 0})
+
+        events = json.dumps({'events': [self.event('5511999999999', 'read')] * 9}).encode('utf-8')
+        response = client.post("/callbacks/delivery", events, headers={'X-Callback-Token': 'cb', 'Content-Type': 'application/json'})
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '5')
+
+    def test_callback_requires_token(self):
+        """Testa o callback com o token da API e sem nenhum token configurado"""
+        body = json.dumps(self.event('5511999999999', 'sent')).encode('utf-8')
+        headers = {'Content-Type': 'application/json'}
+        client = LocalClient(ApiApp(None, None, None, token='api', delivery_service=self.service, callback_token=''))
+        self.assertEqual(client.post("/callbacks/delivery", body, headers=headers).status_code, 401)
+        self.assertEqual(client.post("/callbacks/delivery", body, headers={**headers, 'Authorization': 'Bearer api'}).status_code, 202)
+
+        client = LocalClient(ApiApp(None, None, None, token='', delivery_service=self.service, callback_token='', insecure=True))
+        self.assertEqual(client.post("/callbacks/delivery", body, headers=headers).status_code, 404)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,71 @@
+import io
+import unittest
+from datetime import datetime
+import pandas as pd
+from bson import ObjectId
+from src.services.history_service import HistoryService
+from src.utils.phone_codec import encode_phones
+from tests.fakes import FakeCollection, FakeDatabase
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+class TestHistoryExport(unittest.TestCase):
+    def setUp(self):
+        self.history = FakeCollection([
+            {'_id': ObjectId(), 'timestamp': datetime(2024, 9, 1), 'client_name': 'A', 'webhook_name': 'W', 'status': 'completed',
+             'valid_numbers_packed': encode_phones(["5511999999999", "5521988888888", "5531977777777"]), 'invalid_numbers': ["1"]},
+            {'_id': ObjectId(), 'timestamp': datetime(2024, 9, 2), 'client_name': 'A', 'webhook_name': 'W', 'status': 'failed',
+             'valid_numbers': ["5511966666666"]},
+        ])
+        self.service = HistoryService(db=FakeDatabase(history=self.history))
+
+    def test_csv_blocks(self):
+        """Testa o CSV em blocos, com cabeçalho único e projeção sem as listas de inválidos"""
+        data = b''.join(self.service.export_numbers('csv', block_rows=2))
+        frame = pd.read_csv(io.BytesIO(data))
+        self.assertEqual(frame['phone'].tolist(), [5511999999999, 5521988888888, 5531977777777, 5511966666666])
+        self.assertEqual(frame['status'].tolist(), ['completed'] * 3 + ['failed'])
+        self.assertNotIn('invalid_numbers', self.history.queries[0][1])
+
+        sent = pd.read_csv(io.BytesIO(b''.join(self.service.export_numbers('csv', status='completed'))))
+        self.assertEqual(len(sent), 3)
+
+    def test_archived_member_read_once(self):
+        """Testa que cada membro do arquivo é lido uma única vez na exportação"""
+        location = {'partition': 'cliente/2024-08.jsonl.gz', 'offset': 0}
+        records = [
+            {'_id': ObjectId(), 'timestamp': datetime(2024, 8, day), 'client_name': 'A', 'webhook_name': 'W', 'status': 'completed',
+             'valid_numbers_packed': encode_phones([f"55119{day:08d}"])}
+            for day in (1, 2, 3)
+        ]
+        reads = []
+        def iter_member(member):
+            reads.append(member)
+            return iter(records)
+        self.service.archive_service.iter_member = iter_member
+        self.history.docs = [
+            {'_id': record['_id'], 'timestamp': record['timestamp'], 'status': 'completed', 'archived': location}
+            for record in records[:2]
+        ] + self.history.docs
+
+        frame = pd.read_csv(io.BytesIO(b''.join(self.service.export_numbers('csv'))))
+        self.assertEqual(reads, [location])
+        self.assertEqual(frame['phone'].tolist(), [5511999999999, 5521988888888, 5531977777777, 5511966666666, 5511900000001, 5511900000002])
+
+    def test_empty_csv(self):
+        """Testa que a exportação sem registros gera só o cabeçalho"""
+        self.history.docs = []
+        self.assertEqual(b''.join(self.service.export_numbers('csv')).decode().strip(), "history_id,timestamp,client_name,webhook_name,status,phone")
+
+    @unittest.skipUnless(pyarrow, "pyarrow não instalado")
+    def test_parquet(self):
+        """Testa o Parquet gravado em row groups"""
+        data = b''.join(self.service.export_numbers('parquet', block_rows=2))
+        frame = pd.read_parquet(io.BytesIO(data))
+        self.assertEqual(frame['phone'].tolist(), [5511999999999, 5521988888888, 5531977777777, 5511966666666])
+
+if __name__ == '__main__':
+    unittest.main()
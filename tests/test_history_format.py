@@ -0,0 +1,31 @@
+import unittest
+from datetime import datetime, timezone
+from src.services.history_service import HistoryService
+from tests.fakes import FakeDatabase
+
+class TestHistoryFormat(unittest.TestCase):
+    def setUp(self):
+        self.service = HistoryService(db=FakeDatabase())
+
+    def test_batch_titles(self):
+        """Testa a conversão de UTC para o horário de Brasília em lote, com datetimes sem e com fuso"""
+        entries = [
+            {'timestamp': datetime(2024, 1, 15, 13, 5), 'webhook_name': 'W1', 'client_name': 'C1'},
+            {'timestamp': datetime(2024, 7, 1, 2, 30), 'webhook_name': 'W2'},
+            {'timestamp': datetime(2024, 7, 1, 2, 30, tzinfo=timezone.utc), 'client_name': 'C3'},
+        ]
+        titles = [entry['display_title'] for entry in self.service.format_history_entries(entries)]
+        self.assertEqual(titles, [
+            "15/01/2024 10:05 - W1 (C1)",
+            "30/06/2024 23:30 - W2 (Cliente)",
+            "30/06/2024 23:30 - Webhook (C3)",
+        ])
+
+    def test_single_entry_and_missing_timestamp(self):
+        """Testa o formato de um registro e o uso do horário atual sem timestamp"""
+        entry = self.service.format_history_entry({'webhook_name': 'W'})
+        self.assertTrue(entry['display_title'].endswith(" - W (Cliente)"))
+        self.assertEqual(self.service.format_history_entries([]), [])
+
+if __name__ == '__main__':
+    unittest.main()
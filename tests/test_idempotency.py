@@ -0,0 +1,68 @@
+import unittest
+from datetime import timedelta
+import numpy as np
+from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
+from src.services.history_service import HistoryService
+from src.utils.phone_digest import PhoneSetDigest, idempotency_key
+from tests.fakes import FakeCollection, FakeDatabase
+
+def digest_of(*blocks):
+    digest = PhoneSetDigest()
+    for block in blocks:
+        digest.update(np.array(block, dtype=np.int64))
+    return digest.hexdigest()
+
+class TestIdempotency(unittest.TestCase):
+    def setUp(self):
+        self.history = FakeCollection(unique=('idempotency_key',))
+        self.service = HistoryService(db=FakeDatabase(history=self.history))
+        self.webhook_id = str(ObjectId())
+
+    def register(self, numbers, template=None):
+        return self.service.register_import(
+            numbers, [], self.webhook_id, 'W', 'http://provedor', 'csv',
+            message_template=template, numbers_digest=digest_of(numbers)
+        )
+
+    def test_digest_ignores_order_and_blocks(self):
+        """Testa que o resumo depende só do conjunto de números"""
+        numbers = [5511999999999, 5521988888888, 5531977777777]
+        self.assertEqual(digest_of(numbers), digest_of(numbers[::-1][:1], [], numbers[::-1][1:]))
+        self.assertNotEqual(digest_of(numbers), digest_of(numbers[:2]))
+        self.assertNotEqual(
+            idempotency_key(None, self.webhook_id, digest_of(numbers)),
+            idempotency_key(None, self.webhook_id, digest_of(numbers), "Olá {nome}")
+        )
+
+    def test_duplicate_import_returns_existing(self):
+        """Testa que a mesma lista no mesmo webhook não cria outro registro"""
+        first = self.register(["5511999999999", "5521988888888"])
+        second = self.register(["5521988888888", "5511999999999"])
+        self.assertTrue(second['duplicate'])
+        self.assertEqual(second['_id'], first['_id'])
+        self.assertEqual(len(self.history.docs), 1)
+        self.assertNotIn('duplicate', self.register(["5511999999999"]))
+
+    def test_key_released_after_window_or_failure(self):
+        """Testa o reenvio depois da janela e depois de uma falha"""
+        first = self.register(["5511999999999"])
+        self.history.docs[0]['status'] = 'failed'
+        second = self.register(["5511999999999"])
+        self.assertNotIn('duplicate', second)
+        self.assertNotIn('idempotency_key', self.history.find_one({'_id': ObjectId(first['_id'])}))
+
+        self.history.docs[1]['timestamp'] -= timedelta(hours=25)
+        self.assertNotIn('duplicate', self.register(["5511999999999"]))
+        self.assertEqual(len(self.history.docs), 3)
+
+    def test_duplicate_id_without_key_raises(self):
+        """Testa que um _id repetido sem chave de idempotência não é tratado como importação idêntica"""
+        history_id = ObjectId()
+        self.history.docs.append({'_id': history_id, 'status': 'completed'})
+        with self.assertRaises(DuplicateKeyError):
+            self.service.register_import(["5511999999999"], [], self.webhook_id, 'W', 'http://provedor', 'csv', history_id=history_id)
+        self.assertEqual(len(self.history.docs), 1)
+
+if __name__ == '__main__':
+    unittest.main()
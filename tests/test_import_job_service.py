@@ -0,0 +1,58 @@
+import threading
+import time
+import unittest
+from src.services.import_job_service import ImportJobService
+
+class FakeContactService:
+    def __init__(self):
+        self.release = threading.Event()
+
+    def process_contacts(self, input_text, progress=None, **kwargs):
+        numbers = input_text.split('\n')
+        progress({'rows_read': len(numbers), 'valid': len(numbers), 'invalid': 0, 'bytes_processed': len(input_text)})
+        self.release.wait(5)
+        return {'total_valid': len(numbers), 'valid_numbers': numbers}
+
+    def process_csv(self, file_content, column_name, progress=None, **kwargs):
+        return {'error': f"Coluna '{column_name}' não encontrada no arquivo"}
+
+class TestImportJobService(unittest.TestCase):
+    def wait_finished(self, service, job_id):
+        for _ in range(100):
+            job = service.get_job(job_id)
+            if not service.is_active(job):
+                return job
+            time.sleep(0.02)
+        self.fail("Job não terminou")
+
+    def test_progress_and_result(self):
+        """Testa o progresso parcial e o resultado de um job de texto"""
+        contact_service = FakeContactService()
+        service = ImportJobService(contact_service)
+        job_id = service.submit_text("5511999999999\n5521988888888", webhook_name="Teste", method='txt')
+
+        for _ in range(100):
+            if service.get_job(job_id)['rows_read']:
+                break
+            time.sleep(0.02)
+        job = service.get_job(job_id)
+        self.assertEqual(job['status'], 'running')
+        self.assertEqual(job['rows_read'], 2)
+
+        contact_service.release.set()
+        job = self.wait_finished(service, job_id)
+        self.assertEqual(job['status'], 'completed')
+        self.assertEqual(job['result']['total_valid'], 2)
+        self.assertEqual(job['bytes_total'], 27)
+
+    def test_failed_job(self):
+        """Testa que um erro retornado pelo processamento marca o job como falho"""
+        service = ImportJobService(FakeContactService())
+        job_id = service.submit_csv(b"telefone\n5511999999999\n", "numero", method='csv')
+        job = self.wait_finished(service, job_id)
+        self.assertEqual(job['status'], 'failed')
+        self.assertIn("numero", job['error'])
+        self.assertEqual(service.get_jobs(["inexistente", job_id])[0]['id'], job_id)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import gzip
+import io
+import unittest
+import zipfile
+import pandas as pd
+from openpyxl import Workbook
+from src.services.contact_service import ContactService
+from src.utils.import_readers import detect_kind, inspect_file, inspect_stream, iter_blocks, iter_stream_blocks, split_numbers
+
+CSV = "nome;telefone\nJoão;11999999999\nMaria;(21) 98888-8888\nJosé;123\n".encode('utf-8')
+
+def read_all(content, file_name, usecols, block_rows=2):
+    file_format = inspect_file(content, file_name)
+    blocks = list(iter_blocks(content, file_format, usecols, block_rows))
+    return file_format, pd.concat([frame for frame, _ in blocks], ignore_index=True), [size for _, size in blocks]
+
+class TestImportReaders(unittest.TestCase):
+    def test_detect_kind(self):
+        """Testa a identificação do formato pelo nome do arquivo"""
+        self.assertEqual(detect_kind("lista.CSV"), ('csv', None))
+        self.assertEqual(detect_kind("lista.csv.gz"), ('csv', 'gzip'))
+        self.assertEqual(detect_kind("lista.txt.zip"), ('txt', 'zip'))
+        self.assertEqual(detect_kind("lista.xlsx"), ('xlsx', None))
+
+    def test_split_numbers(self):
+        """Testa números separados por vírgula e quebra de linha"""
+        self.assertEqual(split_numbers("11999999999, 21988888888\r\n\n31977777777;"), ["11999999999", "21988888888", "31977777777"])
+
+    def test_compressed_csv(self):
+        """Testa CSV puro, .gz e .zip com o mesmo resultado"""
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w', zipfile.ZIP_DEFLATED) as z:
+            z.writestr("__MACOSX/._contatos.csv", b"lixo")
+            z.writestr("contatos.csv", CSV)
+        for content, name in [(CSV, "contatos.csv"), (gzip.compress(CSV), "contatos.csv.gz"), (archive.getvalue(), "contatos.zip")]:
+            file_format, frame, sizes = read_all(content, name, ["telefone"])
+            self.assertEqual(file_format['delimiter'], ';')
+            self.assertEqual(file_format['phone_column'], 'telefone')
+            self.assertEqual(frame["telefone"].tolist(), ["11999999999", "(21) 98888-8888", "123"])
+            self.assertEqual(sizes, sorted(sizes))
+            self.assertLessEqual(sizes[-1], len(content))
+
+    def test_text_file(self):
+        """Testa .txt com números cortados entre leituras"""
+        from src.utils import import_readers
+        numbers = [str(11900000000 + i) for i in range(50)]
+        content = (",\n".join(numbers)).encode('utf-8')
+        import_readers.TEXT_READ_CHARS, original = 7, import_readers.TEXT_READ_CHARS
+        try:
+            file_format, frame, _ = read_all(content, "lista.txt", ["numero"], block_rows=8)
+        finally:
+            import_readers.TEXT_READ_CHARS = original
+        self.assertEqual(file_format['columns'], ["numero"])
+        self.assertEqual(frame["numero"].tolist(), numbers)
+
+    def test_cp1252_after_sample(self):
+        """Testa um nome em cp1252 depois da amostra usada para detectar a codificação"""
+        content = b"nome,telefone\n" + b"Ana,11999999999\n" * 5000 + "João,11988887777\n".encode('cp1252')
+        file_format, frame, _ = read_all(content, "contatos.csv", ["nome", "telefone"], block_rows=1000)
+        self.assertEqual(file_format['encoding'], 'utf-8')
+        self.assertEqual(frame.iloc[-1].tolist(), ["João", "11988887777"])
+
+        result = ContactService(workers=0).process_csv(content, "telefone", "http://provedor", "id", "W")
+        self.assertNotIn('error', result)
+        self.assertEqual(result['total_processed'], 5001)
+        self.assertEqual(result['total_valid'], 2)
+
+    def test_zipped_text_file(self):
+        """Testa .txt dentro de um .zip com outro nome (sem cabeçalho)"""
+        numbers = ["11999999999", "21988888888", "31977777777"]
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as z:
+            z.writestr("lista.txt", "\n".join(numbers))
+        file_format, frame, _ = read_all(archive.getvalue(), "contatos.zip", ["numero"])
+        self.assertEqual(file_format['kind'], 'txt')
+        self.assertEqual(frame["numero"].tolist(), numbers)
+
+    def test_xlsx(self):
+        """Testa planilha com telefone digitado como número"""
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["nome", "celular", "cidade"])
+        sheet.append(["João", 5511999999999, "São Paulo"])
+        sheet.append(["Maria", "21988888888", None])
+        sheet.append(["José", None, "Recife"])
+        buffer = io.BytesIO()
+        workbook.save(buffer)
+
+        file_format, frame, sizes = read_all(buffer.getvalue(), "contatos.xlsx", ["celular", "nome"])
+        self.assertEqual(file_format['columns'], ["nome", "celular", "cidade"])
+        self.assertEqual(file_format['phone_column'], "celular")
+        self.assertEqual(frame["celular"].tolist(), ["5511999999999", "21988888888", None])
+        self.assertEqual(frame["nome"].tolist(), ["João", "Maria", "José"])
+        self.assertEqual(sizes[-1], len(buffer.getvalue()))
+
+    def test_ndjson_stream(self):
+        """Testa NDJSON em stream com objetos e números soltos"""
+        content = b'{"nome": "Ana", "celular": "11999999999"}\n\n"21988888888"\n{"nome": "Bia", "celular": 5531977777777}\n'
+        stream = io.BytesIO(gzip.compress(content))
+        file_format = inspect_stream(stream, 'ndjson', 'gzip')
+        self.assertEqual(file_format['columns'], ["nome", "celular", "numero"])
+        self.assertEqual(file_format['phone_column'], "celular")
+        frame = pd.concat([frame for frame, _ in iter_stream_blocks(stream, file_format, ["celular", "numero"], 2)], ignore_index=True).fillna('')
+        self.assertEqual(frame["celular"].tolist(), ["11999999999", "", "5531977777777"])
+        self.assertEqual(frame["numero"].tolist(), ["", "21988888888", ""])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import pandas as pd
+from io import BytesIO
+from src.utils import list_preview
+from src.utils.list_preview import search_items, page_count, page_slice, iter_csv_blocks
+
+class TestListPreview(unittest.TestCase):
+    def setUp(self):
+        self.numbers = [str(5511900000000 + i) for i in range(250)]
+
+    def test_pages(self):
+        """Testa a divisão em páginas, incluindo página fora do intervalo"""
+        self.assertEqual(page_count(250, 100), 3)
+        self.assertEqual(page_count(0, 100), 1)
+        rows, first, last = page_slice(self.numbers, 3, 100)
+        self.assertEqual((len(rows), first, last), (50, 201, 250))
+        self.assertEqual(page_slice(self.numbers, 99, 100)[0], rows)
+        self.assertEqual(page_slice([], 1, 100), ([], 0, 0))
+
+    def test_search(self):
+        """Testa a busca por parte do número"""
+        self.assertIs(search_items(self.numbers, "  "), self.numbers)
+        self.assertEqual(search_items(self.numbers, "0000249"), ["5511900000249"])
+        self.assertEqual(search_items(["abc", "ABD", "x"], "ab"), ["abc", "ABD"])
+
+    def test_csv_blocks(self):
+        """Testa que o CSV em blocos equivale à lista completa"""
+        list_preview.EXPORT_BLOCK_ROWS, original = 100, list_preview.EXPORT_BLOCK_ROWS
+        try:
+            items = self.numbers + ["11,9999"]
+            data = b''.join(iter_csv_blocks(items, "Número"))
+        finally:
+            list_preview.EXPORT_BLOCK_ROWS = original
+        frame = pd.read_csv(BytesIO(data), dtype=str)
+        self.assertEqual(frame["Número"].tolist(), items)
+        self.assertEqual(b''.join(iter_csv_blocks([], "Número")).decode('utf-8').strip(), "Número")
+
+if __name__ == '__main__':
+    unittest.main()
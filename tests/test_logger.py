@@ -0,0 +1,42 @@
+import logging
+import unittest
+from src.utils.logger import SamplingFilter, summarize_payload
+
+class TestLogger(unittest.TestCase):
+    def test_summarize_payload(self):
+        """Testa que listas viram contagens no resumo do payload"""
+        payload = {
+            'valid_numbers': ['5511999999999'] * 1000,
+            'webhook_name': 'Campanha',
+            'details': {'invalid_numbers': ['123', '456']}
+        }
+        summary = str(summarize_payload(payload))
+        self.assertIn("<list len=1000>", summary)
+        self.assertIn("<list len=2>", summary)
+        self.assertIn("Campanha", summary)
+        self.assertNotIn("5511999999999", summary)
+
+    def test_sampling_filter(self):
+        """Testa a amostragem de eventos de alto volume"""
+        sampling = SamplingFilter(SamplingFilter.parse_rates("dispatch.job=0.1, invalido"))
+        self.assertEqual(sampling.rates, {'dispatch.job': 0.1})
+
+        def make_record(level, sample=None):
+            record = logging.LogRecord('src', level, __file__, 1, "msg", None, None)
+            if sample:
+                record.sample = sample
+            return record
+
+        passed = sum(sampling.filter(make_record(logging.INFO, 'dispatch.job')) for _ in range(100))
+        self.assertEqual(passed, 10)
+        self.assertTrue(sampling.filter(make_record(logging.ERROR, 'dispatch.job')))
+        self.assertTrue(sampling.filter(make_record(logging.INFO)))
+
+    def test_import_does_not_configure(self):
+        """Testa que importar os módulos não configura os loggers (só setup_logging)"""
+        import src.services.task_service  # noqa: F401
+        self.assertTrue(logging.getLogger('src').propagate)
+        self.assertFalse(logging.getLogger('src').handlers)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import unittest
+from src.utils.metrics import MetricsRegistry
+
+class TestMetrics(unittest.TestCase):
+    def test_counter_and_gauge(self):
+        """Testa contadores e gauges com labels"""
+        registry = MetricsRegistry()
+        registry.counter('jobs_total', 'Jobs', status='completed').inc()
+        registry.counter('jobs_total', 'Jobs', status='completed').inc(2)
+        registry.gauge('queue_jobs', status='pending').set(5)
+
+        snapshot = registry.snapshot()
+        self.assertEqual(snapshot['jobs_total'][0]['value'], 3)
+        self.assertEqual(snapshot['jobs_total'][0]['labels'], {'status': 'completed'})
+        self.assertEqual(snapshot['queue_jobs'][0]['value'], 5)
+
+    def test_histogram_prometheus_format(self):
+        """Testa a renderização cumulativa dos buckets do histograma"""
+        registry = MetricsRegistry()
+        histogram = registry.histogram('post_seconds', 'POST', buckets=(0.1, 1.0))
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+        histogram.observe(5)
+
+        text = registry.render_prometheus()
+        self.assertIn('# TYPE post_seconds histogram', text)
+        self.assertIn('post_seconds_bucket{le="0.1"} 1', text)
+        self.assertIn('post_seconds_bucket{le="1.0"} 2', text)
+        self.assertIn('post_seconds_bucket{le="+Inf"} 3', text)
+        self.assertIn('post_seconds_count 3', text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import random
+import unittest
+import numpy as np
+from src.utils.parallel_normalize import ParallelNormalizer
+from src.utils.phone_utils import normalize_phone_array
+
+class TestParallelNormalizer(unittest.TestCase):
+    @classmethod
+    def tearDownClass(cls):
+        ParallelNormalizer.shutdown()
+
+    def test_matches_in_process(self):
+        """Testa que o resultado distribuído é igual ao do próprio processo, na mesma ordem"""
+        rng = random.Random(7)
+        alphabet = "0123456789 ()-+."
+        numbers = [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 20))) for _ in range(3000)]
+        numbers += ["11999999999", "(11) 9999-9999", "５５11999999999", "1" * 40, "55 11 99999 9999 " * 3]
+        rng.shuffle(numbers)
+
+        result = ParallelNormalizer(3, min_rows=0).normalize(numbers)
+        np.testing.assert_array_equal(result, normalize_phone_array(numbers))
+
+    def test_small_blocks_in_process(self):
+        """Testa que blocos pequenos e 1 processo não usam o pool"""
+        self.assertFalse(ParallelNormalizer(1).enabled)
+        result = ParallelNormalizer(5).normalize(["11999999999", "abc"])
+        self.assertEqual(result.tolist(), [5511999999999, 0])
+        self.assertNotIn(5, ParallelNormalizer._pools)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,33 @@
+import random
+import unittest
+from src.utils.phone_utils import format_phone_number, format_phone_numbers, normalize_phone_array
+
+class TestPhoneBatch(unittest.TestCase):
+    def test_matches_scalar_formatting(self):
+        """Testa que a normalização vetorizada segue as regras de format_phone_number"""
+        numbers = [
+            "11999999999", "5511999999999", "+55 (11) 99999-9999", "011999999999",
+            "1199999999", "05511999999999", "999999", "abc123", "", "0", None, 5511999999999,
+            "55 11 9 9999 9999 " * 3, "é11999999999", "1" * 30
+        ]
+        rng = random.Random(42)
+        alphabet = "0123456789555509 -()+."
+        numbers += [''.join(rng.choice(alphabet) for _ in range(rng.randint(0, 26))) for _ in range(5000)]
+
+        expected = [format_phone_number(number) for number in numbers]
+        self.assertEqual(format_phone_numbers(numbers), expected)
+
+    def test_normalize_phone_array(self):
+        """Testa o retorno em int64 com 0 para inválidos"""
+        result = normalize_phone_array(["11 99999-9999", "123", "551188887777"])
+        self.assertEqual(result.tolist(), [5511999999999, 0, 5511988887777])
+
+    def test_rejects_unknown_ddd_and_landlines(self):
+        """Testa que DDDs inexistentes e telefones fixos são rejeitados nos dois caminhos"""
+        numbers = ["20999999999", "23988887777", "1133334444", "(21) 2555-1234", "2188887777", "(61) 99999-0000"]
+        expected = [None, None, None, None, "5521988887777", "5561999990000"]
+        self.assertEqual([format_phone_number(number) for number in numbers], expected)
+        self.assertEqual(format_phone_numbers(numbers), expected)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import os
+import random
+import tempfile
+import unittest
+import numpy as np
+from src.utils.phone_cache import DiskPhoneTable, PhoneCache
+from src.utils.phone_utils import format_phone_number, normalize_phone_array
+
+class TestPhoneCache(unittest.TestCase):
+    def setUp(self):
+        rng = random.Random(3)
+        alphabet = "0123456789 ()-+."
+        self.numbers = [''.join(rng.choice(alphabet) for _ in range(rng.randint(1, 20))) for _ in range(2000)]
+        self.numbers += ["11999999999", "(11) 9999-9999", "５５11999999999", "1" * 40, "11999999999"]
+
+    def test_matches_normalize_phone_array(self):
+        """Testa que o resultado com cache frio e quente é igual ao sem cache"""
+        cache = PhoneCache(capacity=100000)
+        expected = normalize_phone_array(self.numbers)
+        np.testing.assert_array_equal(cache.normalize(self.numbers), expected)
+        np.testing.assert_array_equal(cache.normalize(self.numbers), expected)
+
+        stats = cache.stats()
+        self.assertEqual(stats['memory_hits'] + stats['misses'], 2 * len(self.numbers))
+        self.assertGreaterEqual(stats['hit_rate'], 0.5)
+
+    def test_bounded_capacity(self):
+        """Testa que o cache não passa da capacidade e conta as remoções"""
+        cache = PhoneCache(capacity=100)
+        cache.normalize([f"1199999{i:04d}" for i in range(1000)])
+        self.assertLessEqual(len(cache), 100)
+        self.assertGreater(cache.stats()['evictions'], 0)
+
+    def test_scalar_format(self):
+        """Testa a versão escalar com cache"""
+        cache = PhoneCache(capacity=10)
+        for phone in ["11999999999", "abc", "11999999999"]:
+            self.assertEqual(cache.format(phone), format_phone_number(phone))
+        self.assertEqual(cache.stats()['memory_hits'], 1)
+
+    def test_disk_tier_survives_restart(self):
+        """Testa que a tabela em disco devolve os resultados em um novo processo (nova instância)"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.bin')
+            expected = normalize_phone_array(self.numbers)
+            first = PhoneCache(capacity=100000, disk_table=DiskPhoneTable(path, slots=8192))
+            np.testing.assert_array_equal(first.normalize(self.numbers), expected)
+            del first
+
+            second = PhoneCache(capacity=100000, disk_table=DiskPhoneTable(path, slots=8192))
+            self.assertGreater(len(second.disk_table), 0)
+            np.testing.assert_array_equal(second.normalize(self.numbers), expected)
+            self.assertGreater(second.stats()['disk_hits'], 0)
+
+    def test_disk_table_shared_between_processes(self):
+        """Testa duas instâncias no mesmo arquivo e a recusa de registros misturados"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'cache.bin')
+            first, second = DiskPhoneTable(path, slots=1024), DiskPhoneTable(path, slots=1024)
+            strings = ["11999999999", "21988888888"]
+            keys, _ = DiskPhoneTable.encode_keys(strings)
+            first.insert(keys[:1], np.array([5511999999999]))
+            second.insert(keys[1:], np.array([5521988888888]))
+            np.testing.assert_array_equal(second.lookup(keys), [5511999999999, 5521988888888])
+
+            # Chaves de um registro com o valor de outro (gravação simultânea na mesma posição)
+            slot = np.flatnonzero(first.table['k0'] == keys[0, 0])[0]
+            first.table['value'][slot] = 5521988888888
+            np.testing.assert_array_equal(second.lookup(keys), [-1, 5521988888888])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,36 @@
+import unittest
+import numpy as np
+from src.utils.phone_codec import encode_phones, decode_phones, decode_phone_strings
+
+class TestPhoneCodec(unittest.TestCase):
+    def test_roundtrip_sorted(self):
+        """Testa a codificação ordenada com delta e compressão"""
+        numbers = ["5531977777777", "5511999999999", "5521988888888"]
+        data = encode_phones(numbers)
+        self.assertEqual(decode_phone_strings(data), sorted(numbers))
+
+    def test_roundtrip_preserving_order(self):
+        """Testa a codificação sem ordenação e sem compressão"""
+        numbers = np.array([5531977777777, 5511999999999, 5521988888888], dtype=np.int64)
+        data = encode_phones(numbers, sort=False, compress=False)
+        self.assertEqual(decode_phones(data).tolist(), numbers.tolist())
+
+    def test_empty_list(self):
+        """Testa a codificação de uma lista vazia"""
+        self.assertEqual(decode_phone_strings(encode_phones([])), [])
+
+    def test_compact_size(self):
+        """Testa que a codificação ocupa bem menos que 8 bytes por número"""
+        rng = np.random.default_rng(42)
+        numbers = 5511900000000 + rng.choice(10**8, size=100000, replace=False)
+        data = encode_phones(numbers)
+        self.assertLess(len(data) / len(numbers), 4)
+        self.assertEqual(decode_phones(data).tolist(), np.sort(numbers).tolist())
+
+    def test_invalid_data(self):
+        """Testa a rejeição de dados que não foram gerados pelo codec"""
+        with self.assertRaises(ValueError):
+            decode_phones(b"XXXX\x00\x00\x00\x00\x00")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,35 @@
+import unittest
+import numpy as np
+from src.utils.phone_index import PhoneIndex
+
+class TestPhoneIndex(unittest.TestCase):
+    def test_contains(self):
+        """Testa a pertinência vetorizada no índice"""
+        index = PhoneIndex([5511999999999, 5521988888888, 5511999999999])
+        mask = index.contains(np.array([5511999999999, 5531977777777, 5521988888888]))
+        self.assertEqual(mask.tolist(), [True, False, True])
+        self.assertEqual(len(index), 2)
+
+    def test_incremental_add_and_remove(self):
+        """Testa inserções e remoções incrementais antes e depois do merge"""
+        for threshold in (1000, 1):
+            with self.subTest(merge_threshold=threshold):
+                index = PhoneIndex([5511999999999, 5521988888888], merge_threshold=threshold)
+                index.add([5531977777777])
+                index.remove([5511999999999])
+                self.assertIn(5531977777777, index)
+                self.assertNotIn(5511999999999, index)
+
+                # Número removido pode voltar para a lista
+                index.add([5511999999999])
+                self.assertIn(5511999999999, index)
+                self.assertEqual(index.to_array().tolist(), [5511999999999, 5521988888888, 5531977777777])
+
+    def test_empty_index(self):
+        """Testa consultas em um índice vazio"""
+        index = PhoneIndex()
+        self.assertEqual(index.contains(np.array([5511999999999])).tolist(), [False])
+        self.assertEqual(len(index), 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+from bson import ObjectId
+from src.services.quota_service import QuotaService, quota_month
+from tests.fakes import FakeDatabase
+
+class TestQuotaService(unittest.TestCase):
+    def setUp(self):
+        QuotaService._state = {}
+        QuotaService._quotas = {}
+        self.client_id, self.unlimited_id = ObjectId(), ObjectId()
+        self.db = FakeDatabase(clients=[
+            {'_id': self.client_id, 'monthly_quota': 10000},
+            {'_id': self.unlimited_id, 'monthly_quota': None}
+        ])
+        self.usage = self.db['quota_usage']
+
+    def tearDown(self):
+        QuotaService._state = {}
+        QuotaService._quotas = {}
+
+    def usage_doc(self):
+        return self.usage.find_one({'_id': f"{self.client_id}:{quota_month()}"})
+
+    def test_reserve_consumes_leased_block(self):
+        """Testa o consumo do bloco em memória, as reservas perto do limite e a gravação"""
+        service = QuotaService(self.db, block_size=4000, lease_fraction=0.5)
+        self.assertTrue(service.reserve(self.client_id, 1000))
+        self.assertTrue(service.reserve(self.client_id, 3000))
+        self.assertEqual(self.usage.count_calls('update_one'), 1)
+        self.assertEqual(self.usage_doc()['reserved'], 4000)
+
+        # Blocos seguintes até a cota; a reserva que passa dela é recusada
+        self.assertTrue(service.reserve(self.client_id, 5500))
+        self.assertFalse(service.reserve(self.client_id, 1000))
+        self.assertTrue(service.reserve(self.client_id, 500))
+        self.assertEqual(self.usage_doc()['reserved'], 10000)
+
+        self.assertEqual(service.flush(), 1)
+        self.assertEqual(self.usage_doc()['used'], 10000)
+        self.assertEqual(service.get_usage(self.client_id)['remaining'], 0)
+
+    def test_limit_shared_between_processes(self):
+        """Testa o limite entre processos e a devolução dos blocos e das falhas de envio"""
+        first = QuotaService(self.db, block_size=10000, lease_fraction=0.1)
+        self.assertTrue(first.reserve(self.client_id, 100))
+        first_state = QuotaService._state
+
+        # Outro processo: estado em memória próprio, mesma collection
+        QuotaService._state = {}
+        second = QuotaService(self.db, block_size=10000, lease_fraction=0.1)
+        self.assertTrue(second.reserve(self.client_id, 100))
+        self.assertTrue(second.reserve(self.client_id, 8000))
+
+        # O saldo do primeiro processo ainda não voltou: a recusa informa o que resta
+        self.assertFalse(second.reserve(self.client_id, 1000))
+        self.assertEqual(second.get_usage(self.client_id)['remaining'], 900)
+
+        # A gravação periódica do primeiro devolve o saldo do bloco dele
+        second_state, QuotaService._state = QuotaService._state, first_state
+        first.flush()
+        QuotaService._state = second_state
+        self.assertTrue(second.reserve(self.client_id, 1000))
+
+        # Números que falharam no envio voltam para o saldo do processo
+        second.release(self.client_id, 5000)
+        self.assertTrue(second.reserve(self.client_id, 2000))
+        second.flush()
+        doc = self.usage_doc()
+        self.assertEqual(doc['used'], 6200)
+        self.assertEqual(doc['reserved'], 6200)
+        self.assertEqual(second.get_usage(self.client_id)['remaining'], 3800)
+
+    def test_direct_increment_without_block(self):
+        """Testa a gravação direta da importação quando o bloco não é reservado"""
+        service = QuotaService(self.db, block_size=4000)
+        service._lease = lambda *args: 0
+        self.assertTrue(service.reserve(self.client_id, 9000))
+        self.assertEqual((self.usage_doc()['used'], self.usage_doc()['reserved']), (9000, 9000))
+        self.assertFalse(service.reserve(self.client_id, 1001))
+        self.assertEqual(service.get_usage(self.client_id), {
+            'month': quota_month(), 'monthly_quota': 10000, 'used': 9000, 'remaining': 1000
+        })
+
+    def test_unlimited_client(self):
+        """Testa que clientes sem cota e importações sem cliente não acessam o banco"""
+        service = QuotaService(self.db, block_size=4000)
+        self.assertTrue(service.reserve(self.unlimited_id, 50000))
+        self.assertTrue(service.reserve(None, 50000))
+        self.assertEqual(self.usage.count_calls('update_one'), 0)
+        usage = service.get_usage(self.unlimited_id)
+        self.assertIsNone(usage['monthly_quota'])
+        self.assertEqual(usage['used'], 50000)
+
+if __name__ == '__main__':
+    unittest.main()
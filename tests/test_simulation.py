@@ -0,0 +1,64 @@
+import unittest
+from datetime import datetime, timedelta
+from bson import ObjectId
+from src.services.simulation_service import DispatchSimulator
+from src.utils.clock import VirtualClock
+from src.utils.rate_limiter import RateLimiter
+from tests.fakes import FakeCollection, FakeDatabase
+
+class ReadOnlyCollection(FakeCollection):
+    """Collection somente leitura: qualquer escrita falha o teste"""
+    def _write(self, *args, **kwargs):
+        raise AssertionError("Escrita inesperada na simulação")
+
+    insert_one = insert_many = update_one = update_many = bulk_write = delete_one = delete_many = _write
+
+class TestRateLimiter(unittest.TestCase):
+    def test_virtual_clock(self):
+        """Testa o ritmo médio, inclusive com pedidos maiores que o balde"""
+        clock = VirtualClock(datetime(2026, 1, 5))
+        limiter = RateLimiter(600, burst_seconds=1, clock=clock)
+        self.assertEqual(limiter.acquire(10), 0)
+        self.assertAlmostEqual(limiter.acquire(100), 10)
+        self.assertAlmostEqual(limiter.acquire(10), 1)
+        self.assertAlmostEqual(clock.monotonic(), 11)
+        self.assertEqual(clock.now(), datetime(2026, 1, 5, 0, 0, 11))
+
+class TestDispatchSimulator(unittest.TestCase):
+    def setUp(self):
+        self.start = datetime(2026, 1, 5, 12, 0)
+        self.history = ReadOnlyCollection([
+            {'_id': ObjectId(), 'status': 'pending', 'valid_count': 2500, 'webhook_name': 'A', 'client_name': 'X'},
+            {'_id': ObjectId(), 'status': 'completed', 'valid_count': 1000},
+            # Adiado pelo controle de admissão: só sai na verificação depois de 12:05
+            {'_id': ObjectId(), 'status': 'pending', 'valid_count': 1000, 'scheduled_for': self.start + timedelta(minutes=5)},
+        ])
+        self.simulator = DispatchSimulator(
+            db=FakeDatabase(history=self.history),
+            chunk_size=1000, rate_limit=6000, latency=0.5, cost_per_number=0.01
+        )
+
+    def test_projection(self):
+        """Testa início e fim por campanha, adiamento, pico e custo no relógio virtual"""
+        result = self.simulator.simulate(proposed=[{'numbers': 3000, 'name': 'Nova'}], start=self.start)
+        campaigns = {campaign['name']: campaign for campaign in result['campaigns']}
+        self.assertEqual([c['name'] for c in result['campaigns']], ['A (X)', 'Nova', 'Webhook (Cliente)'])
+
+        # 100 números/s com 1s de balde: lotes de 1000, 1000 e 500, com 0,5s de latência
+        # cada (o balde se recompõe também durante a latência)
+        first = campaigns['A (X)']
+        self.assertEqual(first['chunks'], 3)
+        self.assertEqual(first['projected_start'], self.start)
+        self.assertAlmostEqual(first['duration_seconds'], 24.5, places=6)
+        self.assertEqual(campaigns['Nova']['projected_start'], first['projected_finish'])
+
+        # O adiado sai na primeira verificação (60s depois do fim da anterior) a partir de 12:05
+        deferred = campaigns['Webhook (Cliente)']
+        cycle_end = campaigns['Nova']['projected_finish']
+        self.assertEqual(deferred['projected_start'], cycle_end + timedelta(minutes=5))
+        self.assertEqual(result['numbers_total'], 6500)
+        self.assertAlmostEqual(result['cost_total'], 65.0)
+        self.assertLessEqual(result['peak_numbers_per_minute'], 6000 + 100)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+from datetime import datetime
+from src.services.stats_service import StatsService, stats_day
+from tests.fakes import FakeDatabase
+
+class TestStatsService(unittest.TestCase):
+    def test_stats_day_uses_local_timezone(self):
+        """Testa que o dia segue o fuso de São Paulo (UTC-3)"""
+        self.assertEqual(stats_day(datetime(2024, 3, 2, 2, 30)), '2024-03-01')
+        self.assertEqual(stats_day(datetime(2024, 3, 2, 3, 30)), '2024-03-02')
+
+    def test_increments(self):
+        """Testa que importações e envios somam no documento do dia, cliente e webhook"""
+        service = StatsService(db=FakeDatabase())
+        when = datetime(2024, 3, 2, 15, 0)
+        service.record_import('c1', 'w1', valid=10, invalid=2, when=when)
+        service.record_import('c1', 'w1', valid=5, invalid=0, when=when)
+        service.record_send('c1', 'w1', sent=12, failed=3, when=when)
+        service.record_import('c2', 'w2', valid=1, invalid=1, when=when)
+
+        stats = service.get_daily_stats('2024-03-01', '2024-03-31', client_id='c1')
+        self.assertEqual(len(stats), 1)
+        self.assertEqual(
+            {k: stats[0][k] for k in ('day', 'imports', 'valid', 'invalid', 'sent', 'failed')},
+            {'day': '2024-03-02', 'imports': 2, 'valid': 15, 'invalid': 2, 'sent': 12, 'failed': 3}
+        )
+        self.assertEqual(len(service.get_daily_stats('2024-03-01', '2024-03-31')), 2)
+        self.assertEqual(service.get_daily_stats('2024-04-01', '2024-04-30'), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import pandas as pd
+from src.utils.template_utils import MessageTemplate
+
+class TestMessageTemplate(unittest.TestCase):
+    def test_fields(self):
+        """Testa a extração dos campos do template"""
+        template = MessageTemplate("Olá {nome}, de {cidade}! Até mais, {nome}.")
+        self.assertEqual(template.fields, ["nome", "cidade"])
+        self.assertEqual(template.missing_fields(["nome", "telefone"]), ["cidade"])
+
+    def test_render_frame(self):
+        """Testa a renderização vetorizada, com valores ausentes"""
+        template = MessageTemplate("Olá {nome} ({cidade})")
+        frame = pd.DataFrame({
+            "nome": ["João Silva", "Maria Santos", None],
+            "cidade": ["São Paulo", None, "Recife"],
+        })
+        self.assertEqual(template.render_frame(frame).tolist(), [
+            "Olá João Silva (São Paulo)",
+            "Olá Maria Santos ()",
+            "Olá  (Recife)",
+        ])
+
+    def test_render_matches_frame(self):
+        """Testa que a renderização de um contato é igual à vetorizada"""
+        template = MessageTemplate("{nome}: {{literal}}")
+        frame = pd.DataFrame({"nome": ["Ana"]})
+        self.assertEqual(template.render({"nome": "Ana"}), template.render_frame(frame).iloc[0])
+        self.assertEqual(template.render({"nome": "Ana"}), "Ana: {literal}")
+
+    def test_invalid_templates(self):
+        """Testa a rejeição de templates inválidos"""
+        for text in ["Olá {nome", "Olá {}", "Olá {nome!r}", "Olá {nome:>10}"]:
+            with self.assertRaises(ValueError):
+                MessageTemplate(text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import threading
+import time
+import unittest
+from src.services.webhook_health_service import WebhookHealthService
+
+class FakeWebhookService:
+    def __init__(self, webhooks):
+        self.webhooks = webhooks
+
+    def get_all_webhooks(self):
+        return [dict(w) for w in self.webhooks]
+
+class FakeProbe:
+    """Verificação simulada: 'down' na URL indica falha; conta as chamadas"""
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = []
+        self._lock = threading.Lock()
+
+    def __call__(self, url, timeout):
+        with self._lock:
+            self.calls.append(url)
+        time.sleep(self.delay)
+        ok = 'down' not in url
+        return {'ok': ok, 'status_code': 200 if ok else 500, 'latency': self.delay, 'error': None if ok else "Status 500"}
+
+class TestWebhookHealthService(unittest.TestCase):
+    def setUp(self):
+        WebhookHealthService._cache.clear()
+        WebhookHealthService._samples.clear()
+        self.webhooks = [
+            {'_id': str(i), 'title': f'W{i}', 'url': f'http://cliente{i}/{"down" if i == 3 else "ok"}'}
+            for i in range(20)
+        ]
+        # Dois webhooks com a mesma URL são verificados uma vez
+        self.webhooks.append({'_id': 'dup', 'title': 'Dup', 'url': 'http://cliente0/ok'})
+
+    def service(self, probe, ttl=300):
+        return WebhookHealthService(FakeWebhookService(self.webhooks), ttl=ttl, timeout=1, max_workers=32, probe=probe)
+
+    def test_check_all_concurrent_and_cached(self):
+        """Testa as verificações em paralelo, o cache e a leitura sem requisições"""
+        probe = FakeProbe(delay=0.2)
+        service = self.service(probe)
+        start = time.perf_counter()
+        health = service.check_all()
+        self.assertLess(time.perf_counter() - start, 1.0)
+        self.assertEqual(len(probe.calls), 20)
+        self.assertEqual(len(health), 21)
+        self.assertFalse(health['3']['healthy'])
+        self.assertEqual(health['dup']['status_code'], 200)
+
+        service.check_all()
+        self.assertEqual(len(probe.calls), 20)
+        self.assertEqual(service.get_health('3')['error_rate'], 1.0)
+        self.assertIsNone(service.get_health('desconhecido'))
+
+        # Webhook removido sai do cache
+        self.webhooks.pop()
+        self.assertNotIn('dup', service.check_all())
+
+    def test_expired_entries_are_rechecked(self):
+        """Testa a nova verificação depois do TTL e os percentis das amostras"""
+        probe = FakeProbe()
+        service = self.service(probe, ttl=0)
+        service.check_all()
+        service.check_all()
+        self.assertEqual(len(probe.calls), 40)
+        health = service.get_health('0')
+        self.assertEqual(health['samples'], 2)
+        self.assertEqual(health['error_rate'], 0.0)
+        self.assertEqual(health['p95'], 0.0)
+
+if __name__ == '__main__':
+    unittest.main()